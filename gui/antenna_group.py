@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Antenna Group
+=============
+Several magnet loop controllers driven from one process and one asyncio
+event loop: every antenna has its own ``AntennaControllerCore`` and its
+own profile (a ``Configuration`` file named after the antenna), all serial
+ports are read by the same loop.
+
+A profile directory describes the station; each profile remembers the USB
+identity of its controller (``known_controllers``, with ``last_port`` as
+fallback), so the antennas stay apart when ttyACM numbers change:
+
+    antennas/
+        loop_north.json
+        loop_south.json
+
+Usage:
+    python3 antenna_group.py --profiles antennas --channel 19
+    python3 antenna_group.py --antenna north=/dev/ttyACM0 --antenna south=/dev/ttyACM1 --channel 19
+"""
+
+import argparse
+import asyncio
+import os
+
+from configuration import Configuration
+from controller_core import AntennaControllerCore, LogMessage
+from port_discovery import known_port
+
+
+class AntennaGroup:
+    """Named antenna controllers sharing one event loop"""
+
+    def __init__(self, profile_dir="antennas"):
+        self.profile_dir = profile_dir
+        self.antennas = {}  # name -> AntennaControllerCore
+        self._subscribers = []
+
+    @classmethod
+    def from_profiles(cls, profile_dir):
+        """One antenna per ``<name>.json`` in ``profile_dir``"""
+        group = cls(profile_dir)
+        for filename in sorted(os.listdir(profile_dir)):
+            if filename.endswith(".json"):
+                group.add_antenna(filename[:-5])
+        return group
+
+    def add_antenna(self, name, port=None):
+        """Create the controller of antenna ``name`` with its own profile"""
+        if name in self.antennas:
+            raise ValueError(f"Antenne {name} existiert bereits")
+        os.makedirs(self.profile_dir, exist_ok=True)
+        config = Configuration(os.path.join(self.profile_dir, f"{name}.json"))
+        if port:
+            config.set("last_port", port)
+        core = AntennaControllerCore(config)
+        core.subscribe(lambda event: self._publish(name, event))
+        self.antennas[name] = core
+        return core
+
+    def __getitem__(self, name):
+        return self.antennas[name]
+
+    # ------------------------------------------------------------------
+    # Events
+
+    def subscribe(self, callback):
+        """Call ``callback(name, event)`` for the events of every antenna"""
+        self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback)
+
+    def _publish(self, name, event):
+        for callback in list(self._subscribers):
+            callback(name, event)
+
+    # ------------------------------------------------------------------
+    # Group commands
+
+    async def _each(self, func, names=None):
+        """Run ``func(core)`` for the selected antennas concurrently; name -> result or exception"""
+        names = list(names or self.antennas)
+        results = await asyncio.gather(*(func(self.antennas[name]) for name in names),
+                                       return_exceptions=True)
+        return dict(zip(names, results))
+
+    async def connect_all(self, names=None):
+        """Connect every antenna to the controller remembered in its profile
+
+        The port is looked up by USB identity (``known_controllers``), so
+        swapped ttyACM numbers do not mix up the antennas; ``last_port`` is
+        the fallback.
+        """
+        async def connect(core):
+            port = known_port(core.config)
+            if not port:
+                raise ValueError("Controller des Profils nicht gefunden")
+            return await core.connect(port)
+        return await self._each(connect, names)
+
+    async def goto_channel(self, channel, names=None):
+        """Tune all (or the named) antennas to ``channel``; the moves run in parallel"""
+        async def move(core):
+            move = core.move_to_channel(channel)
+            if move is None:
+                raise ConnectionError("Nicht mit Arduino verbunden!")
+            return await move
+        return await self._each(move, names)
+
+    async def idle(self):
+        """Wait until no antenna has a pending move"""
+        await asyncio.gather(*(core.idle() for core in self.antennas.values() if core.commands))
+
+    def close(self):
+        """Disconnect every antenna and write its profile"""
+        for core in self.antennas.values():
+            core.close()
+
+
+def _print_log(name, event):
+    if isinstance(event, LogMessage):
+        print(f"[{name}] {event.text}")
+
+
+async def _run(args):
+    if args.antenna:
+        group = AntennaGroup(args.profiles)
+        for spec in args.antenna:
+            name, _, port = spec.partition("=")
+            group.add_antenna(name, port)
+    else:
+        group = AntennaGroup.from_profiles(args.profiles)
+    if not group.antennas:
+        print(f"Keine Antennen-Profile in {args.profiles}")
+        return
+
+    group.subscribe(_print_log)
+    try:
+        print(await group.connect_all())
+        await asyncio.gather(*(core.synced() for core in group.antennas.values()))
+        if args.channel:
+            for name, result in (await group.goto_channel(args.channel)).items():
+                print(f"{name}: {result}")
+    finally:
+        group.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mehrere Magnet Loop Antennen gemeinsam steuern")
+    parser.add_argument("--profiles", default="antennas", help="directory with one profile per antenna")
+    parser.add_argument("--antenna", action="append", metavar="NAME=PORT", help="antenna and its port")
+    parser.add_argument("--channel", type=int, help="tune all antennas to this channel")
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Band Sweep
+==========
+Automatic calibration from one monotonic pass over the capacitor.
+
+The motor moves once from ``start`` to ``end`` (forward only, after
+approaching ``start``) while a resonance meter on a second serial port
+(an antenna analyser reporting the frequency of the SWR minimum, see
+``firmware_simulator/resonance_meter.py``) is read as fast as it answers.
+Each reading is taken at a known time, and the motor position at that
+time follows from the start and the end of the move: "Motor startet" is
+printed as the move begins and "Motor fertig" with the last step (each
+less the time its bytes need on the line), and CheapStepper steps at a
+constant interval in between. The interval is measured from these two
+anchors rather than taken from the RPM, as the loop of a real board steps
+slower than nominal. No reply may wait on the line ahead of either
+anchor: the sweep starts only after the position of the approach was
+reported, and the core does not confirm the position before "Motor
+fertig" during the sweep (``confirm_early``).
+
+The readings are fitted with a non-decreasing curve (pool adjacent
+violators, so a noisy reading cannot fold it), and the position of every
+channel is where the curve crosses the channel frequency, linear between
+neighbouring readings. All 80 channels come from the same pass: there is
+no search per channel and the motor never reverses except for approaching
+``start``.
+
+The firmware orders the channels by number, but channel 23 is above 24
+and 25 in frequency. The calibration points are the longest run of
+channels whose positions rise in that order; the others (``skipped``)
+are left to the interpolation of the calibration table.
+"""
+
+import asyncio
+import time
+from bisect import bisect_left
+from dataclasses import dataclass
+from typing import Optional
+
+import serial
+
+from calibration_table import MAX_POSITION
+from cb_band import CHANNEL_FREQUENCIES
+from framed_protocol import HEADER_SIZE
+from response_parser import ChannelReport, MotionStarted, MotionFinished
+
+# "Motor fertig - Bewegung abgeschlossen" with CR LF / MOTION_FINISHED frame (int32 position, CRC)
+FINISHED_BYTES = len("Motor fertig - Bewegung abgeschlossen\r\n")
+FINISHED_FRAME_BYTES = HEADER_SIZE + 4 + 1
+# MOTION_STARTED frame (int32 steps, uint8 channel, CRC); the text line depends on the steps
+STARTED_FRAME_BYTES = HEADER_SIZE + 5 + 1
+
+
+@dataclass(frozen=True, slots=True)
+class SweepFinished:
+    """Result of a band sweep"""
+    positions: dict  # channel -> best position
+    seconds: float  # approach and sweep
+    reversals: int  # changes of the motor direction
+    samples: int  # meter readings during the sweep
+    steps: int  # steps moved
+    skipped: tuple = ()  # channels out of order for the calibration table
+    problem: Optional[str] = None
+    points: tuple = ()  # (channel, position) for the calibration
+
+
+class SerialResonanceMeter:
+    """Resonance meter answering ``RES?`` with ``RES <frequency in Hz>``"""
+
+    def __init__(self, port, baudrate=9600, timeout=1.0):
+        self.serial = serial.Serial(port, baudrate, timeout=timeout)
+
+    def read(self):
+        """Resonance frequency in Hz (blocking)"""
+        self.serial.write(b"RES?\n")
+        line = self.serial.readline().decode("ascii", errors="replace").strip()
+        if not line:
+            raise TimeoutError("Keine Antwort vom Resonanzmessgerät")
+        if not line.startswith("RES "):
+            raise ValueError(f"Unerwartete Antwort vom Resonanzmessgerät: {line}")
+        return float(line[4:])
+
+    def close(self):
+        self.serial.close()
+
+
+def _isotonic(values):
+    """Least-squares non-decreasing fit of ``values`` (pool adjacent violators)"""
+    blocks = []  # [sum, count]
+    for value in values:
+        blocks.append([value, 1])
+        while len(blocks) > 1 and blocks[-2][0] * blocks[-1][1] > blocks[-1][0] * blocks[-2][1]:
+            total, count = blocks.pop()
+            blocks[-1][0] += total
+            blocks[-1][1] += count
+    fitted = []
+    for total, count in blocks:
+        fitted.extend([total / count] * count)
+    return fitted
+
+
+def channel_positions(samples, frequencies=CHANNEL_FREQUENCIES):
+    """Position of each channel frequency on the curve through ``(position, frequency)`` samples
+
+    Channels outside the swept frequencies are missing from the result.
+    """
+    samples = sorted(samples)
+    if len(samples) < 2:
+        return {}
+    positions = [position for position, _ in samples]
+    readings = [frequency for _, frequency in samples]
+    falling = readings[-1] < readings[0]
+    fitted = _isotonic([-f for f in readings] if falling else readings)
+    result = {}
+    for channel, frequency in frequencies.items():
+        target = -frequency if falling else frequency
+        k = bisect_left(fitted, target)
+        if k == len(fitted) or (k == 0 and fitted[0] > target):
+            continue
+        if k == 0 or fitted[k] == target:
+            result[channel] = positions[k]
+            continue
+        share = (target - fitted[k - 1]) / (fitted[k] - fitted[k - 1])
+        result[channel] = positions[k - 1] + share * (positions[k] - positions[k - 1])
+    return result
+
+
+def rising_points(positions, order):
+    """Calibration points from ``positions`` in the firmware's channel ``order``
+
+    The first and last channel of ``order`` are kept; of the others the
+    longest run with rising positions between them. Returns the points
+    ``(channel, position)`` and the skipped channels.
+    """
+    first, last = positions[order[0]], positions[order[-1]]
+    inner = [channel for channel in order[1:-1] if first < positions[channel] < last]
+    tails, tail_channels, previous = [], [], {}
+    for channel in inner:
+        position = positions[channel]
+        k = bisect_left(tails, position)
+        previous[channel] = tail_channels[k - 1] if k else None
+        if k == len(tails):
+            tails.append(position)
+            tail_channels.append(channel)
+        else:
+            tails[k] = position
+            tail_channels[k] = channel
+    run = []
+    channel = tail_channels[-1] if tail_channels else None
+    while channel is not None:
+        run.append(channel)
+        channel = previous[channel]
+    kept = [order[0]] + run[::-1] + [order[-1]]
+    points = [(channel, positions[channel]) for channel in kept]
+    kept = set(kept)
+    return points, tuple(channel for channel in order if channel not in kept)
+
+
+class BandSweep:
+    """One pass of ``core``'s motor from ``start`` to ``end`` reading ``meter``"""
+
+    def __init__(self, core, meter, start=0, end=MAX_POSITION):
+        if not 0 <= start < end:
+            raise ValueError(f"Ungültiger Sweep-Bereich: {start}-{end}")
+        self.core = core
+        self.meter = meter
+        self.start = start
+        self.end = end
+
+        # Statistics
+        self.readings = []  # (time, frequency)
+        self.moves = []  # directions of the moves, True = forward
+        self.steps = 0
+
+    def _move(self, steps, forward):
+        move = self.core.move_steps(steps, forward)
+        if move is None:
+            raise ConnectionError("Nicht mit Arduino verbunden")
+        self.moves.append(forward)
+        self.steps += steps
+        return move
+
+    async def run(self):
+        """Approach, sweep and evaluate; returns the SweepFinished"""
+        loop = asyncio.get_running_loop()
+        began = time.monotonic()
+        anchors = {}  # event type -> arrival time
+        unsubscribe = self.core.subscribe(
+            lambda event: isinstance(event, (MotionStarted, MotionFinished))
+            and anchors.setdefault(type(event), time.monotonic()))
+        self.core.confirm_early = False
+        try:
+            position = self.core.config.get("current_position", 0)
+            if position != self.start:
+                await self._move(abs(self.start - position), self.start > position)
+            await self._drain()
+            anchors.clear()
+            move = self._move(self.end - self.start, True)
+            while not move.done():
+                asked = time.monotonic()
+                frequency = await loop.run_in_executor(None, self.meter.read)
+                self.readings.append(((asked + time.monotonic()) / 2, frequency))
+            await move
+        finally:
+            unsubscribe()
+            self.core.confirm_early = True
+        seconds = time.monotonic() - began
+        if len(anchors) < 2:
+            raise ConnectionError("Start oder Ende des Sweeps nicht gemeldet")
+        started = f"Motor startet - Fahre {self.end - self.start} Schritte vorwärts\r\n"
+        return self.evaluate(
+            anchors[MotionStarted] - self._line_seconds(len(started.encode()), STARTED_FRAME_BYTES),
+            anchors[MotionFinished] - self._line_seconds(FINISHED_BYTES, FINISHED_FRAME_BYTES), seconds)
+
+    async def _drain(self):
+        """Ask for the position and wait for the last line of the reply, so the line is idle"""
+        reported = self.core.query_position()
+        if reported is None:
+            raise ConnectionError("Position vor dem Sweep nicht abgefragt")
+        channel = asyncio.get_running_loop().create_future()
+        unsubscribe = self.core.subscribe(
+            lambda event: isinstance(event, ChannelReport) and reported.done()
+            and not channel.done() and channel.set_result(event))
+        try:
+            await reported
+            await asyncio.wait_for(channel, self.core.REPLY_TIMEOUT)
+        finally:
+            unsubscribe()
+
+    def _line_seconds(self, text_bytes, frame_bytes):
+        """Time a reply needs on the serial line"""
+        size = frame_bytes if self.core.framed else text_bytes
+        return size * 10 / self.core.serial_connection.baudrate
+
+    def evaluate(self, started, finished, seconds):
+        """SweepFinished from the readings and the times of the first and the last step of the sweep"""
+        reversals = sum(a != b for a, b in zip(self.moves, self.moves[1:]))
+        result = dict(seconds=seconds, reversals=reversals, samples=len(self.readings), steps=self.steps)
+        rate = (self.end - self.start) / (finished - started)  # steps per second
+        samples = []
+        for at, frequency in self.readings:
+            position = self.start + (at - started) * rate
+            samples.append((min(max(position, self.start), self.end), frequency))
+        positions = {channel: round(position) for channel, position in channel_positions(samples).items()}
+        missing = sorted(set(CHANNEL_FREQUENCIES) - set(positions))
+        if missing:
+            return SweepFinished(positions, problem=f"Band nicht vollständig überstrichen: "
+                                                    f"{len(missing)} Kanäle fehlen", **result)
+        points, skipped = rising_points(positions, self.core.config.frequency_order_channels)
+        return SweepFinished(positions, skipped=skipped, points=tuple(points), **result)
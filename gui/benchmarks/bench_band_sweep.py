@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Band sweep vs. search per channel
+============================================
+Calibrates all 80 channels against the firmware simulator and a simulated
+resonance meter (nonlinear capacitor, ``--noise`` Hz of reading noise,
+``--rate`` readings per second) two ways:
+
+    sweep       ``core.sweep_calibration``: one forward pass from
+                ``--start`` to ``--end`` reading the meter meanwhile
+    search      channel by channel: read the meter at rest, move by the
+                estimated distance to the channel frequency (secant through
+                the last two readings), until the reading is within
+                ``--tolerance`` Hz
+
+Reported are the total time, the motor moves and reversals, the meter
+readings and the largest deviation from the true resonance position.
+Both run in real time (the sweep converts times to steps).
+
+Usage:
+    python3 benchmarks/bench_band_sweep.py [--rpm 12] [--noise 200] [--rate 20] [--tolerance 1000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from cb_band import CHANNEL_FREQUENCIES
+from configuration import Configuration
+from controller_core import AntennaControllerCore, CommandSent
+from firmware_simulator import PtyFirmwareSimulator, SimulatedResonanceMeter, FREQUENCY_ORDER
+
+
+class PacedMeter(SimulatedResonanceMeter):
+    """Meter that needs ``1 / rate`` seconds per reading, measuring in the middle of it"""
+
+    def __init__(self, simulator, noise, rate):
+        super().__init__(simulator, noise=noise)
+        self.pause = 0.5 / rate if rate else 0
+
+    def read(self):
+        time.sleep(self.pause)
+        frequency = super().read()
+        time.sleep(self.pause)
+        return frequency
+
+
+async def connect(directory, sim, rpm):
+    core = AntennaControllerCore(Configuration(os.path.join(directory, "antenna_config.json")))
+    assert await core.connect(sim.port) and await core.synced()
+    await core.request(f"RPM{rpm}", core.REPLY_TIMEOUT)
+    await core.move_steps(1000, True)
+    return core
+
+
+def moves(sent):
+    """Motor moves and reversals of the sent commands"""
+    directions = [command[0] == "F" for command in sent if command[:1] in ("F", "B")]
+    return len(directions), sum(a != b for a, b in zip(directions, directions[1:]))
+
+
+async def search(core, meter, tolerance):
+    """Position of each channel by secant steps from the previous one"""
+    positions = {}
+    position = core.config.get("current_position", 0)
+    reading = await asyncio.to_thread(meter.read)
+    previous = None  # (position, reading)
+    slope = 1 / 400  # steps per Hz, first guess
+    for channel in FREQUENCY_ORDER:
+        target = CHANNEL_FREQUENCIES[channel]
+        for _ in range(8):
+            if abs(reading - target) <= tolerance:
+                break
+            steps = round((target - reading) * slope)
+            if steps == 0:
+                break
+            position = await core.move_steps(abs(steps), steps > 0)
+            previous, reading = (position - steps, reading), await asyncio.to_thread(meter.read)
+            if reading != previous[1]:
+                slope = min(max((position - previous[0]) / (reading - previous[1]), 1 / 4000), 1 / 40)
+        positions[channel] = position
+    return positions
+
+
+async def run(directory, sim, meter, args):
+    results = {}
+    for name in ("Sweep", "Suche je Kanal"):
+        core = await connect(directory, sim, args.rpm)
+        sent = []
+        core.subscribe(lambda e: isinstance(e, CommandSent) and sent.append(e.command))
+        readings = meter.readings
+        start = time.monotonic()
+        if name == "Sweep":
+            positions = (await core.sweep_calibration(meter=meter, start=args.start, end=args.end)).positions
+        else:
+            positions = await search(core, meter, args.tolerance)
+        seconds = time.monotonic() - start
+        error = max(abs(positions[channel] - meter.curve.position(frequency))
+                    for channel, frequency in CHANNEL_FREQUENCIES.items())
+        results[name] = (seconds, *moves(sent), meter.readings - readings, error)
+        core.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rpm", type=int, default=12, help="motor speed")
+    parser.add_argument("--noise", type=float, default=200, help="reading noise of the meter in Hz")
+    parser.add_argument("--rate", type=float, default=20, help="meter readings per second (0 = unpaced)")
+    parser.add_argument("--tolerance", type=float, default=1000, help="search: Hz off the channel frequency")
+    parser.add_argument("--start", type=int, default=0, help="sweep: first position")
+    parser.add_argument("--end", type=int, default=4075, help="sweep: last position")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            PtyFirmwareSimulator(time_scale=1, reset_on_open=False) as sim:
+        meter = PacedMeter(sim, args.noise, args.rate)
+        results = asyncio.run(run(tmp, sim, meter, args))
+
+    print(f"80 Kanäle, {args.rpm} RPM, Messrauschen {args.noise:g} Hz, {args.rate:g} Messungen/s")
+    print(f"{'Verfahren':<16} {'Sekunden':>9} {'Fahrten':>8} {'Umkehrungen':>12} {'Messungen':>10} "
+          f"{'max. Fehler':>12}")
+    print("-" * 72)
+    for name, (seconds, count, reversals, readings, error) in results.items():
+        print(f"{name:<16} {seconds:9.1f} {count:8} {reversals:12} {readings:10} {error:10.1f} S")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Correction moves with two-point and multi-point calibration
+======================================================================
+A nonlinear variable capacitor (resonance position rising with the
+frequency position to the power ``--exponent``, with a small ripple of the
+plate shape) is calibrated with 2, 4, 6 and 10 evenly spaced points, the
+tables interpolated linearly and with the monotone spline. Then
+``--qsys`` QSYs to random channels are tuned with each table; a channel
+that lands more than ``--tolerance`` steps off resonance needs a
+correction with F/B.
+
+Reported are the largest deviation from resonance, the share of QSYs with
+a correction, the correction steps and their motor time at ``--rpm``, and
+the CALT bytes sent to the firmware.
+
+Usage:
+    python3 benchmarks/bench_calibration_table.py [--qsys 10000] [--tolerance 3] [--exponent 1.4]
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from calibration_table import CalibrationTable, FREQUENCY_POSITIONS
+from motion_model import step_interval
+
+
+def capacitor(exponent):
+    """Resonance position of each frequency position"""
+    return [300 + 3200 * (x / 79) ** exponent + 6 * math.sin(x / 79 * 3 * math.pi)
+            for x in range(FREQUENCY_POSITIONS)]
+
+
+def anchors(resonance, count):
+    """``count`` evenly spaced calibration points, measured to the step"""
+    return [(x, round(resonance[x])) for x in sorted({round(i * 79 / (count - 1)) for i in range(count)})]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--qsys", type=int, default=10000, help="QSYs to random channels")
+    parser.add_argument("--tolerance", type=int, default=3, help="steps off resonance without correction")
+    parser.add_argument("--exponent", type=float, default=1.4, help="nonlinearity of the capacitor")
+    parser.add_argument("--rpm", type=int, default=12, help="speed of the corrections")
+    args = parser.parse_args()
+
+    resonance = capacitor(args.exponent)
+    rng = random.Random(1)
+    targets = [rng.randrange(FREQUENCY_POSITIONS) for _ in range(args.qsys)]
+
+    print(f"{args.qsys} QSYs, Toleranz ±{args.tolerance} Schritte, Exponent {args.exponent:g}, {args.rpm} RPM")
+    print(f"{'Kalibrierung':<22} {'max. Fehler':>11} {'Korrekturen':>12} {'Schritte':>9} "
+          f"{'Motorzeit':>10} {'CALT-Bytes':>11}")
+    print("-" * 80)
+    for count in (2, 4, 6, 10):
+        for method in (("linear",) if count == 2 else ("linear", "spline")):
+            table = CalibrationTable.from_points(anchors(resonance, count), method)
+            errors = [abs(table.position(x) - resonance[x]) for x in targets]
+            off = [round(error) for error in errors if error > args.tolerance]
+            seconds = sum(off) * step_interval(args.rpm)
+            sent = sum(len(segment) + 1 for segment in table.segments()) if count > 2 else "CAL"
+            name = "2 Punkte (CAL)" if count == 2 else f"{count} Punkte, {method}"
+            print(f"{name:<22} {max(errors):11.1f} {len(off) / len(targets):11.1%} {sum(off):9} "
+                  f"{seconds:9.1f}s {sent:>11}")
+
+
+if __name__ == "__main__":
+    main()
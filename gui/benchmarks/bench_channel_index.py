@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark: channel <-> motor position conversion
+================================================
+Compares the original ``Configuration`` conversions (``list.index`` plus a
+calibration re-validation on every call) with the precomputed channel
+index. Converts all 80 channels in both directions and shows the cost per
+frequency position: the old lookup grows with the position of the channel
+in the CB frequency order, the index stays flat.
+
+Usage:
+    python3 benchmarks/bench_channel_index.py [--repeat 2000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from magnet_loop_controller import Configuration
+
+
+class LegacyConfiguration(Configuration):
+    """Conversions as implemented before the precomputed index"""
+
+    def get_channel_frequency_position(self, channel):
+        try:
+            return self.frequency_order_channels.index(channel)
+        except ValueError:
+            return None
+
+    def is_calibration_valid(self):
+        return self._check_calibration()
+
+    def get_steps_per_channel(self):
+        valid, msg = self.is_calibration_valid()
+        if not valid:
+            return 30.0
+        ch40_pos = self.config.get("channel_40_position", 0)
+        ch41_pos = self.config.get("channel_41_position", 0)
+        return (ch40_pos - ch41_pos) / 79
+
+    def calculate_channel_position(self, channel):
+        if channel < 1 or channel > 80:
+            return None
+        valid, msg = self.is_calibration_valid()
+        if not valid:
+            return None
+        freq_pos = self.get_channel_frequency_position(channel)
+        if freq_pos is None:
+            return None
+        ch41_pos = self.config.get("channel_41_position", 0)
+        return ch41_pos + (freq_pos * self.get_steps_per_channel())
+
+    def calculate_channel_from_position(self, position):
+        valid, msg = self.is_calibration_valid()
+        if not valid:
+            return 41
+        ch41_pos = self.config.get("channel_41_position", 0)
+        steps_per_channel = self.get_steps_per_channel()
+        if steps_per_channel <= 0:
+            return 41
+        freq_pos = round((position - ch41_pos) / steps_per_channel)
+        freq_pos = max(0, min(79, freq_pos))
+        return self.get_channel_from_frequency_position(freq_pos)
+
+
+def make_config(cls, directory):
+    config = cls(os.path.join(directory, "bench_config.json"))
+    config.set("channel_41_position", 100)
+    config.set("channel_40_position", 2470)
+    return config
+
+
+def time_call(func, arg, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(arg)
+    return (time.perf_counter() - start) / repeat * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeat", type=int, default=2000, help="calls per measurement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configs = {"Legacy": make_config(LegacyConfiguration, tmp),
+                   "Index": make_config(Configuration, tmp)}
+        channels = configs["Index"].frequency_order_channels
+        positions = [configs["Index"].calculate_channel_position(ch) for ch in channels]
+
+        # Both implementations must agree on every channel
+        for ch, pos in zip(channels, positions):
+            assert configs["Legacy"].calculate_channel_position(ch) == pos
+            assert configs["Legacy"].calculate_channel_from_position(pos) == ch
+            assert configs["Index"].calculate_channel_from_position(pos) == ch
+
+        print("All 80 channels, both directions")
+        print("-" * 60)
+        totals = {}
+        for name, config in configs.items():
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                for ch, pos in zip(channels, positions):
+                    config.calculate_channel_position(ch)
+                    config.calculate_channel_from_position(pos)
+            totals[name] = (time.perf_counter() - start) / args.repeat
+            print(f"{name:<8} {totals[name] * 1e6:8.1f} µs per 160 conversions")
+        print(f"Speedup: {totals['Legacy'] / totals['Index']:.1f}x")
+
+        print()
+        print("Channel -> position, cost by frequency position (ns/call)")
+        print("-" * 60)
+        print(f"{'Freq-Pos':<10} {'Kanal':<7} {'Legacy':>10} {'Index':>10}")
+        for freq_pos in (0, 20, 40, 60, 79):
+            ch = channels[freq_pos]
+            row = [time_call(c.calculate_channel_position, ch, args.repeat * 10) for c in configs.values()]
+            print(f"{freq_pos:<10} {ch:<7} {row[0]:10.0f} {row[1]:10.0f}")
+
+
+if __name__ == "__main__":
+    main()
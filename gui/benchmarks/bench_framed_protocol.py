@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark: text protocol vs. framed binary protocol
+===================================================
+Runs the same traffic against the firmware simulator over the text
+protocol at 9600 baud and over the framed protocol (``BIN<baud>``) at
+several baud rates:
+
+    bytes/move    bytes on the wire for one channel change: CH, "Motor
+                  startet", "Motor fertig" with position and the follow-up
+                  P (both directions)
+    P latency     P sent -> position received (median, p99)
+    P/s           pipelined P requests answered per second
+
+Times are firmware time, so results do not depend on ``--time-scale``
+(as long as the host keeps up; use 1 for the most exact latencies).
+
+Usage:
+    python3 benchmarks/bench_framed_protocol.py [--requests 200] [--time-scale 1]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from configuration import Configuration
+from controller_core import AntennaControllerCore
+from firmware_simulator import PtyFirmwareSimulator
+from response_parser import PositionSet
+
+MODES = [
+    ("Text 9600", 0),
+    ("Binär 9600", 9600),
+    ("Binär 115200", 115200),
+    ("Binär 1000000", 1000000),
+]
+
+
+async def measure(sim, tmp, framed_baudrate, requests):
+    config = Configuration(os.path.join(tmp, "antenna_config.json"))
+    config.set("channel_41_position", 0)
+    config.set("channel_40_position", 2370)
+    config.set("current_channel", 41)
+    config.set("current_position", 0)
+    core = AntennaControllerCore(config)
+    core.POSITION_QUERY_DELAY_MS = 0
+    synced = asyncio.Event()
+    core.subscribe(lambda event: isinstance(event, PositionSet) and synced.set())
+    try:
+        await core.connect(sim.port, framed_baudrate=framed_baudrate)
+        await asyncio.wait_for(synced.wait(), 10)
+        if bool(framed_baudrate) != core.framed:
+            raise RuntimeError("Protokoll nicht ausgehandelt")
+
+        # One channel change with its follow-up P
+        before = sim.bytes_received + sim.bytes_sent
+        await core.move_to_channel(42)
+        await core.query_position()  # the automatic follow-up P
+        await asyncio.sleep(0.05)
+        move_bytes = sim.bytes_received + sim.bytes_sent - before
+        move_bytes -= await query_bytes(sim, core)  # count only one P
+
+        # Round trips one at a time
+        latencies = []
+        for _ in range(requests):
+            start = time.perf_counter()
+            await core.query_position()
+            latencies.append((time.perf_counter() - start) * sim.time_scale)
+
+        # Pipelined requests
+        start = time.perf_counter()
+        await asyncio.gather(*(core.query_position(timeout=30) for _ in range(requests)))
+        throughput = requests / ((time.perf_counter() - start) * sim.time_scale)
+    finally:
+        core.close()
+    return move_bytes, latencies, throughput
+
+
+async def query_bytes(sim, core):
+    """Bytes of one P round trip on the wire"""
+    before = sim.bytes_received + sim.bytes_sent
+    await core.query_position()
+    await asyncio.sleep(0.05)
+    return sim.bytes_received + sim.bytes_sent - before
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--requests", type=int, default=200, help="P requests per measurement")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="simulator speed-up")
+    args = parser.parse_args()
+
+    print(f"{'Protokoll':<15} {'Bytes/Fahrt':>11} {'P median':>10} {'P p99':>10} {'P/s':>8}")
+    print("-" * 58)
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, framed_baudrate in MODES:
+            with PtyFirmwareSimulator(time_scale=args.time_scale) as sim:
+                move_bytes, latencies, throughput = asyncio.run(
+                    measure(sim, tmp, framed_baudrate, args.requests))
+            print(f"{name:<15} {move_bytes:>11} {statistics.median(latencies) * 1000:8.2f}ms "
+                  f"{percentile(latencies, 0.99) * 1000:8.2f}ms {throughput:8.0f}")
+
+
+if __name__ == "__main__":
+    main()
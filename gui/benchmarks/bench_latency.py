@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Benchmark: end-to-end channel change latency
+============================================
+Measures the operator-visible latency of channel changes against the
+firmware simulator, headless. Button presses go through the same
+``AntennaControllerCore`` and ``CoreBridge`` as in the GUI, and a poller
+drains the core events at the GUI frame interval, so every delay of the
+real path (readiness handshake, confirming ``P`` at the predicted end of
+the move, event hand-over to Tk) is included.
+
+Every scenario is split into three stages:
+
+    command_to_ack    button pressed -> firmware acknowledged the command
+    ack_to_complete   acknowledgement -> motion complete ("Motor fertig")
+    complete_to_gui   motion complete -> GUI shows the confirmed position
+                      (reply to the confirming P drained by the GUI)
+
+For ``reconnect`` the stages are port open -> ready banner, banner ->
+calibration acknowledged and acknowledgement -> position set.
+
+Medians are compared with a JSON baseline; a stage that got slower than
+the tolerance is reported as a regression and the exit code is 1.
+
+Usage:
+    python3 benchmarks/bench_latency.py [--repeat 3] [--time-scale 1]
+    python3 benchmarks/bench_latency.py --save-baseline
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from configuration import Configuration
+from controller_core import AntennaControllerCore, CommandSent
+from core_bridge import CoreBridge
+from firmware_simulator import PtyFirmwareSimulator
+from magnet_loop_controller import MagnetLoopController
+from response_parser import (
+    ControllerReady, PositionReport, PositionSet, MotionStarted,
+    MotionFinished, MotionStopped, AlreadyOnChannel, CalibrationAck
+)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "latency_baseline.json")
+STAGES = ("command_to_ack", "ack_to_complete", "complete_to_gui")
+
+# Calibration of antenna_config.json.example
+CH41_POSITION = 0
+CH40_POSITION = 2370
+
+
+class HeadlessGui:
+    """The GUI side of MagnetLoopController without a window
+
+    Runs the real core behind a ``CoreBridge`` and drains its events every
+    ``LOG_FLUSH_INTERVAL_MS`` like the Tk main loop. Button presses,
+    commands, replies (timed in the core thread) and drained events are
+    appended to ``events`` as ``(time, kind, payload)`` with kind
+    "press", "tx", "rx" or "gui".
+    """
+
+    def __init__(self, port_name, config_dir, clock=time.perf_counter):
+        self.port_name = port_name
+        self.clock = clock
+        self.events = []
+        self._changed = threading.Condition()
+        config = Configuration(os.path.join(config_dir, "antenna_config.json"))
+        config.set("channel_41_position", CH41_POSITION)
+        config.set("channel_40_position", CH40_POSITION)
+        self.core = AntennaControllerCore(config)
+        self.core.subscribe(self._on_core_event)
+        self.bridge = CoreBridge(self.core).start()
+        self._stop = threading.Event()
+        self._poller = threading.Thread(target=self._poll, daemon=True)
+        self._poller.start()
+
+    def press(self, func, *args):
+        """Forward a button press to the core like the GUI does"""
+        pressed = self._record("press", func.__name__)
+        self.bridge.call(func, *args).result(timeout=30)
+        return pressed
+
+    def connect(self):
+        return self.press(self.core.connect, self.port_name)
+
+    def close(self):
+        self._stop.set()
+        self._poller.join(timeout=1)
+        self.bridge.stop()
+
+    def _on_core_event(self, event):
+        if isinstance(event, CommandSent):
+            self._record("tx", event.command)
+        elif type(event).__module__ == "response_parser":
+            self._record("rx", event)
+
+    def _poll(self):
+        interval = MagnetLoopController.LOG_FLUSH_INTERVAL_MS / 1000
+        while not self._stop.wait(interval):
+            for event in self.bridge.drain():
+                self._record("gui", event)
+
+    def _record(self, kind, payload):
+        with self._changed:
+            now = self.clock()
+            self.events.append((now, kind, payload))
+            self._changed.notify_all()
+            return now
+
+    def wait_for(self, predicate, start, timeout=30):
+        """Index and time of the first event at or after ``start`` matching ``predicate``"""
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                for index in range(start, len(self.events)):
+                    if predicate(*self.events[index][1:]):
+                        return index, self.events[index][0]
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("Timeout beim Warten auf die Firmware")
+                self._changed.wait(remaining)
+
+
+def received(*types):
+    return lambda kind, payload: kind == "rx" and isinstance(payload, types)
+
+
+def drained(*types):
+    return lambda kind, payload: kind == "gui" and isinstance(payload, types)
+
+
+def measure_move(client, func, *args, stop_after=None):
+    """Stage times of one channel command, optionally interrupted by STOP"""
+    start = len(client.events)
+    t_command = client.press(func, *args)
+    index, t_ack = client.wait_for(received(MotionStarted, AlreadyOnChannel), start)
+    if isinstance(client.events[index][2], AlreadyOnChannel):
+        return {"command_to_ack": t_ack - t_command, "ack_to_complete": 0.0, "complete_to_gui": 0.0}
+    if stop_after is not None:
+        time.sleep(stop_after)
+        start = len(client.events)
+        t_command = client.press(client.core.stop_movement)
+        index, t_ack = client.wait_for(received(MotionStopped), start)
+    index, t_complete = client.wait_for(received(MotionFinished), index)
+    index, _ = client.wait_for(received(PositionReport), index)  # printed with "Motor fertig"
+    index, _ = client.wait_for(received(PositionReport), index + 1)  # reply to the confirming P
+    _, t_gui = client.wait_for(drained(PositionReport), index)
+    return {"command_to_ack": t_ack - t_command,
+            "ack_to_complete": t_complete - t_ack,
+            "complete_to_gui": t_gui - t_complete}
+
+
+def scenario_single_step(client, sim):
+    return [measure_move(client, client.core.change_channel, 1)]
+
+
+def scenario_plus_minus_10(client, sim):
+    return [measure_move(client, client.core.change_channel, delta) for delta in (10, -10)]
+
+
+def scenario_full_band(client, sim):
+    return [measure_move(client, client.core.goto_channel, target) for target in (40, 41)]
+
+
+def scenario_goto_channel(client, sim):
+    return [measure_move(client, client.core.goto_channel, target) for target in (20, 41)]
+
+
+def scenario_stop_while_moving(client, sim):
+    # Stop a full-band move after a quarter of its travel time
+    travel = sim.to_wall(sim.firmware.move_duration(CH40_POSITION - CH41_POSITION))
+    sample = measure_move(client, client.core.goto_channel, 40, stop_after=travel / 4)
+    # The firmware reports the target after S; drive back to the start
+    measure_move(client, client.core.goto_channel, 41)
+    return [sample]
+
+
+def scenario_reconnect(client, sim):
+    client.press(client.core.disconnect)
+    start = len(client.events)
+    t_open = client.connect()
+    index, t_ready = client.wait_for(received(ControllerReady), start)
+    index, t_ack = client.wait_for(received(CalibrationAck), index)
+    index, _ = client.wait_for(received(PositionSet), index)
+    _, t_set = client.wait_for(drained(PositionSet), index)
+    return [{"command_to_ack": t_ready - t_open,
+             "ack_to_complete": t_ack - t_ready,
+             "complete_to_gui": t_set - t_ack}]
+
+
+SCENARIOS = {
+    "single_step": scenario_single_step,
+    "plus_minus_10": scenario_plus_minus_10,
+    "full_band": scenario_full_band,
+    "goto_channel": scenario_goto_channel,
+    "stop_while_moving": scenario_stop_while_moving,
+    "reconnect": scenario_reconnect,
+}
+
+
+def run_suite(repeat, time_scale, selected):
+    samples = {name: [] for name in selected}
+    with PtyFirmwareSimulator(time_scale=time_scale) as sim, tempfile.TemporaryDirectory() as tmp:
+        client = HeadlessGui(sim.port, tmp)
+        try:
+            start = len(client.events)
+            client.connect()
+            client.wait_for(received(PositionSet), start)
+            for _ in range(repeat):
+                for name in selected:
+                    samples[name].extend(SCENARIOS[name](client, sim))
+        finally:
+            client.close()
+    return samples
+
+
+def summarize(samples):
+    results = {}
+    for name, runs in samples.items():
+        stages = {}
+        for stage in STAGES + ("total",):
+            if stage == "total":
+                values = [sum(run[s] for s in STAGES) for run in runs]
+            else:
+                values = [run[stage] for run in runs]
+            stages[stage] = {"median_ms": round(statistics.median(values) * 1000, 2),
+                             "max_ms": round(max(values) * 1000, 2)}
+        results[name] = stages
+    return results
+
+
+def find_regressions(results, baseline, tolerance, slack_ms):
+    """(scenario, stage, baseline ms, current ms) for every stage that got slower"""
+    regressions = []
+    for name, stages in results.items():
+        for stage, values in stages.items():
+            reference = baseline.get(name, {}).get(stage)
+            if reference is None:
+                continue
+            limit = reference["median_ms"] * (1 + tolerance) + slack_ms
+            if values["median_ms"] > limit:
+                regressions.append((name, stage, reference["median_ms"], values["median_ms"]))
+    return regressions
+
+
+def print_results(results, baseline):
+    print(f"{'Szenario':<20} {'Stufe':<17} {'Median':>10} {'Max':>10} {'Baseline':>10}")
+    print("-" * 71)
+    for name, stages in results.items():
+        for stage, values in stages.items():
+            reference = baseline.get(name, {}).get(stage, {}).get("median_ms")
+            reference = f"{reference:8.1f}ms" if reference is not None else "-"
+            print(f"{name:<20} {stage:<17} {values['median_ms']:8.1f}ms {values['max_ms']:8.1f}ms {reference:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeat", type=int, default=3, help="runs per scenario")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="simulator speed-up (GUI delays stay in real time)")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="run only this scenario (repeatable)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--slack-ms", type=float, default=20.0, help="allowed absolute slowdown")
+    args = parser.parse_args()
+
+    selected = args.scenario or list(SCENARIOS)
+    results = summarize(run_suite(args.repeat, args.time_scale, selected))
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            stored = json.load(f)
+        if stored.get("time_scale") == args.time_scale:
+            baseline = stored["results"]
+        else:
+            print(f"Baseline mit anderem Zeitfaktor ({stored.get('time_scale')}) - kein Vergleich")
+
+    print_results(results, baseline)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({"time_scale": args.time_scale, "repeat": args.repeat,
+                       "python": platform.python_version(), "results": results}, f, indent=2)
+            f.write("\n")
+        print(f"\nBaseline gespeichert: {args.baseline}")
+        return 0
+
+    regressions = find_regressions(results, baseline, args.tolerance, args.slack_ms)
+    for name, stage, reference, current in regressions:
+        print(f"REGRESSION {name}/{stage}: {reference:.1f} ms -> {current:.1f} ms")
+    if baseline and not regressions:
+        print("\nKeine Regressionen gegenüber der Baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark: motion coalescer vs. firmware queue
+==============================================
+Replays operator click sequences against the firmware simulator twice:
+
+    queued      every click is sent at once and waits in the firmware
+                ``moveQueue`` (raw ``move_to_channel`` / ``move_steps``)
+    coalesced   clicks go through ``goto_channel`` / ``change_channel`` /
+                ``jog_steps`` and are merged while the motor runs
+
+Both variants end at the same position. Reported per sequence:
+
+    starts      "Motor startet" lines (motor start/stop cycles)
+    travel      first click -> all moves complete, in firmware seconds
+
+Click intervals are firmware time, so results do not depend on
+``--time-scale``.
+
+Usage:
+    python3 benchmarks/bench_motion_coalescer.py [--time-scale 5] [--repeat 3]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from configuration import Configuration
+from controller_core import AntennaControllerCore
+from firmware_simulator import PtyFirmwareSimulator
+from response_parser import MotionStarted, PositionSet
+
+# Click sequences: (pause before the click in firmware seconds, kind, value)
+_rng = random.Random(7)
+SEQUENCES = {
+    "plus_one_x5": [(0.02, "delta", 1)] * 5,
+    "plus_ten_x4": [(0.2, "delta", 10)] * 4,
+    "jog_f100_x8_b100_x3": [(0.1, "steps", 100)] * 8 + [(0.1, "steps", -100)] * 3,
+    "band_map_8_targets": [(0.3, "channel", _rng.randint(1, 80)) for _ in range(8)],
+}
+
+
+class Operator:
+    """Replays clicks in one of the two modes"""
+
+    def __init__(self, core, coalesced):
+        self.core = core
+        self.coalesced = coalesced
+        self.channel = core.config.get("current_channel", 41)
+
+    def click(self, kind, value):
+        core = self.core
+        if self.coalesced:
+            if kind == "delta":
+                return core.change_channel(value)
+            if kind == "channel":
+                return core.goto_channel(value)
+            return core.jog_steps(abs(value), value > 0)
+        if kind == "steps":
+            return core.move_steps(abs(value), value > 0)
+        self.channel = (self.channel + value - 1) % 80 + 1 if kind == "delta" else value
+        return core.move_to_channel(self.channel)
+
+
+async def replay(sim, tmp, sequence, coalesced):
+    config = Configuration(os.path.join(tmp, "antenna_config.json"))
+    config.set("channel_41_position", 0)
+    config.set("channel_40_position", 2370)
+    config.set("current_channel", 41)
+    core = AntennaControllerCore(config)
+    starts = 0
+    synced = asyncio.Event()
+
+    def on_event(event):
+        nonlocal starts
+        if isinstance(event, MotionStarted):
+            starts += 1
+        elif isinstance(event, PositionSet):
+            synced.set()
+
+    core.subscribe(on_event)
+    try:
+        await core.connect(sim.port)
+        await asyncio.wait_for(synced.wait(), 10)
+        await core.move_to_channel(41)
+        starts = 0
+
+        operator = Operator(core, coalesced)
+        start = sim.now()
+        for pause, kind, value in sequence:
+            await asyncio.sleep(sim.to_wall(pause))
+            operator.click(kind, value)
+        await core.motion.settled()
+        await core.idle()
+        travel = sim.now() - start - sum(pause for pause, _, _ in sequence[:1])
+        position = await core.query_position()
+    finally:
+        core.close()
+    return starts, travel, position
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--time-scale", type=float, default=5.0, help="simulator speed-up")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per sequence and mode")
+    args = parser.parse_args()
+
+    print(f"{'Sequenz':<22} {'Klicks':>6} {'Starts':>13} {'Fahrzeit (Firmware)':>25}")
+    print(f"{'':<22} {'':>6} {'queued':>6} {'coal.':>6} {'queued':>8} {'coal.':>8} {'gespart':>8}")
+    print("-" * 72)
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, sequence in SEQUENCES.items():
+            results = {}
+            for coalesced in (False, True):
+                runs = []
+                for _ in range(args.repeat):
+                    with PtyFirmwareSimulator(time_scale=args.time_scale) as sim:
+                        runs.append(asyncio.run(replay(sim, tmp, sequence, coalesced)))
+                positions = {position for _, _, position in runs}
+                results[coalesced] = (statistics.median(r[0] for r in runs),
+                                      statistics.median(r[1] for r in runs), positions)
+            (q_starts, q_travel, q_pos), (c_starts, c_travel, c_pos) = results[False], results[True]
+            if q_pos != c_pos:
+                raise RuntimeError(f"{name}: Endpositionen verschieden ({q_pos} / {c_pos})")
+            print(f"{name:<22} {len(sequence):>6} {q_starts:>6.0f} {c_starts:>6.0f} "
+                  f"{q_travel:7.2f}s {c_travel:7.2f}s {1 - c_travel / q_travel:7.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark: many antennas in one event loop
+==========================================
+Runs ``AntennaGroup`` against 1, 2, 4 and 8 simulated controllers. The
+simulators run in separate processes (``python3 -m firmware_simulator``),
+so the CPU time measured here is the controller process alone.
+
+For every group size the antennas are tuned back and forth between CH41
+and CH42 together, and the benchmark reports:
+
+    round     group command -> all moves complete
+    ack       command sent -> "Motor startet" per antenna
+    cpu       CPU time of this process per wall-clock second
+
+"added" is the difference to a single antenna.
+
+Usage:
+    python3 benchmarks/bench_multi_antenna.py [--max-antennas 8] [--rounds 20]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+GUI_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, GUI_DIR)
+
+from antenna_group import AntennaGroup
+from controller_core import CommandSent
+from response_parser import MotionStarted, PositionSet
+
+
+def start_simulators(directory, count, time_scale):
+    processes, ports = [], []
+    for index in range(count):
+        link = os.path.join(directory, f"sim{index}")
+        processes.append(subprocess.Popen(
+            [sys.executable, "-m", "firmware_simulator", "--link", link, "--time-scale", str(time_scale)],
+            cwd=GUI_DIR, stdout=subprocess.DEVNULL))
+        ports.append(link)
+    deadline = time.monotonic() + 10
+    while not all(os.path.exists(port) for port in ports):
+        if time.monotonic() > deadline:
+            raise RuntimeError("Simulatoren nicht gestartet")
+        time.sleep(0.05)
+    return processes, ports
+
+
+async def run_group(count, rounds, time_scale):
+    with tempfile.TemporaryDirectory() as tmp:
+        processes, ports = start_simulators(tmp, count, time_scale)
+        group = AntennaGroup(os.path.join(tmp, "antennas"))
+        sent, acks, synced = {}, [], set()
+        all_synced = asyncio.Event()
+
+        def on_event(name, event):
+            if isinstance(event, CommandSent) and event.command.startswith("CH"):
+                sent[name] = time.perf_counter()
+            elif isinstance(event, MotionStarted) and name in sent:
+                acks.append(time.perf_counter() - sent.pop(name))
+            elif isinstance(event, PositionSet):
+                synced.add(name)
+                if len(synced) == count:
+                    all_synced.set()
+
+        try:
+            for index, port in enumerate(ports):
+                core = group.add_antenna(f"loop{index}", port)
+                core.config.set("channel_41_position", 0)
+                core.config.set("channel_40_position", 2370)
+            group.subscribe(on_event)
+            await group.connect_all()
+            await asyncio.wait_for(all_synced.wait(), 15)
+
+            round_times = []
+            cpu_start, wall_start = time.process_time(), time.perf_counter()
+            for index in range(rounds):
+                start = time.perf_counter()
+                results = await group.goto_channel(42 if index % 2 == 0 else 41)
+                round_times.append(time.perf_counter() - start)
+                failed = [r for r in results.values() if isinstance(r, Exception)]
+                if failed:
+                    raise failed[0]
+            cpu = (time.process_time() - cpu_start) / (time.perf_counter() - wall_start)
+            await group.idle()
+        finally:
+            group.close()
+            for process in processes:
+                process.terminate()
+                process.wait()
+        return statistics.median(round_times), statistics.median(acks), max(acks), cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--max-antennas", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=20, help="group moves per size")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="simulator speed-up")
+    args = parser.parse_args()
+
+    sizes = [n for n in (1, 2, 4, 8, 16, 32) if n <= args.max_antennas]
+    print(f"{args.rounds} Gruppenbefehle CH41 <-> CH42 je Größe")
+    print(f"{'Antennen':>8} {'Runde':>10} {'+':>8} {'Ack':>9} {'+':>8} {'Ack max':>9} {'CPU':>7}")
+    print("-" * 66)
+    reference = None
+    for count in sizes:
+        round_time, ack, ack_max, cpu = asyncio.run(run_group(count, args.rounds, args.time_scale))
+        if reference is None:
+            reference = (round_time, ack)
+        print(f"{count:>8} {round_time * 1000:8.1f}ms {(round_time - reference[0]) * 1000:+7.1f} "
+              f"{ack * 1000:7.1f}ms {(ack - reference[1]) * 1000:+7.1f} {ack_max * 1000:7.1f}ms {cpu:6.1%}")
+
+
+if __name__ == "__main__":
+    main()
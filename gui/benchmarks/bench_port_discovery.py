@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark: port discovery at startup
+====================================
+Simulates a machine with many USB serial devices: ``--ports`` silent ptys
+(GPS receivers, radios, other boards that do not answer) and one firmware
+simulator that resets on open. Reported per strategy, in wall time:
+
+    sequential    probe one port after the other until the firmware answers
+                  (simulator last, the worst case)
+    parallel      ``discover(first=True)``: all probes at once
+    known         ``list_ports`` plus ``known_port``: the remembered USB
+                  identity is looked up in the port list of the system,
+                  nothing is opened (startup with a known controller)
+
+Usage:
+    python3 benchmarks/bench_port_discovery.py [--ports 15] [--timeout 2.5]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from configuration import Configuration
+from firmware_simulator import PtyFirmwareSimulator
+from port_discovery import PortInfo, discover, known_port, list_ports, probe_port
+
+
+def sequential(ports, timeout):
+    for port in ports:
+        if probe_port(port.device, timeout):
+            return port.device
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--ports", type=int, default=15, help="silent ports besides the controller")
+    parser.add_argument("--timeout", type=float, default=2.5, help="probe timeout in seconds")
+    parser.add_argument("--repeat", type=int, default=100, help="lookups for the known strategy")
+    args = parser.parse_args()
+
+    ptys = [os.openpty() for _ in range(args.ports)]
+    try:
+        with PtyFirmwareSimulator() as sim, tempfile.TemporaryDirectory() as tmp:
+            ports = [PortInfo(os.ttyname(slave), "Silent", f"0403:6001:S{index}")
+                     for index, (_, slave) in enumerate(ptys)]
+            ports.append(PortInfo(sim.port, "UNO R4", "2341:1002:F412FA6F"))
+
+            start = time.perf_counter()
+            if sequential(ports, args.timeout) != sim.port:
+                raise RuntimeError("Controller nicht gefunden (Timeout kürzer als der Boot?)")
+            sequential_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            found = asyncio.run(discover(ports, args.timeout, first=True))
+            parallel_time = time.perf_counter() - start
+            assert found[0].port.device == sim.port
+
+            config = Configuration(os.path.join(tmp, "antenna_config.json"))
+            config.set("known_controllers", ["2341:1002:F412FA6F"])
+            lookups = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                list_ports()  # the real port list; the simulated ports are not in it
+                assert known_port(config, ports) == sim.port
+                lookups.append(time.perf_counter() - start)
+            known_time = statistics.median(lookups)
+    finally:
+        for master, slave in ptys:
+            os.close(master)
+            os.close(slave)
+
+    print(f"{len(ports)} Ports, davon 1 Controller (Reset beim Öffnen, Timeout {args.timeout:.1f} s)")
+    print(f"{'Strategie':<12} {'Zeit bis Port':>14}")
+    print("-" * 27)
+    print(f"{'sequentiell':<12} {sequential_time * 1000:12.0f}ms")
+    print(f"{'parallel':<12} {parallel_time * 1000:12.0f}ms")
+    print(f"{'bekannt':<12} {known_time * 1000:12.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
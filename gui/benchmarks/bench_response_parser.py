@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: firmware response parsing throughput
+===============================================
+Compares the old substring chain of ``parse_arduino_response`` (reduced to
+its classification and number extraction, without GUI side effects, and
+emitting the same event objects) with the table-driven
+``response_parser.parse_response``.
+
+The parser is measured twice: cold (its line cache is cleared before each
+pass over the corpus) and in steady state, where repeated firmware lines
+are served from the cache as they are in a real session.
+
+The corpus is a recorded firmware session (``firmware_session.txt``):
+startup banner, calibration, channel changes, queued commands, manual
+moves and a stop.
+
+Usage:
+    python3 benchmarks/bench_response_parser.py [--repeat 2000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from response_parser import (
+    parse_response, PositionReport, PositionSet, MotionStarted, MotionFinished, MotionStopped,
+    AlreadyOnChannel, MotorStatus, CalibrationAck, FallbackWarning
+)
+
+CORPUS_FILE = os.path.join(os.path.dirname(__file__), "firmware_session.txt")
+
+
+def legacy_parse(response):
+    """Classification logic of the original parse_arduino_response,
+    producing the same event objects so both parsers do the same work"""
+    if "Position:" in response or "Aktuelle Position:" in response:
+        parts = response.split(":")
+        if len(parts) >= 2:
+            return PositionReport(int(parts[1].strip()))
+    elif "Motor angehalten" in response or "STOPP" in response:
+        return MotionStopped()
+    elif "Motor fertig" in response or "Bewegung abgeschlossen" in response:
+        return MotionFinished()
+    elif "Motor startet" in response:
+        channel = None
+        if "Kanal" in response:
+            try:
+                parts = response.split()
+                for i, part in enumerate(parts):
+                    if part == "Kanal" and i + 1 < len(parts):
+                        channel = int(parts[i + 1])
+                        break
+            except (ValueError, IndexError):
+                pass
+        # The old chain never extracted steps/direction; rescan for them
+        parts = response.split()
+        steps = int(parts[parts.index("Schritte") - 1])
+        return MotionStarted(steps, parts[-1] == "vorwärts", channel)
+    elif "Bereits auf Kanal" in response:
+        return AlreadyOnChannel(int(response.split()[-1]))
+    elif "Motor Status:" in response:
+        if "Bereit" in response:
+            return MotorStatus(False)
+        elif "Beschäftigt" in response:
+            return MotorStatus(True)
+    elif "Kalibrierung empfangen:" in response:
+        parts = response.split("=")
+        return CalibrationAck(int(parts[1].split(",")[0]), int(parts[2].split(",")[0]), float(parts[3]))
+    elif "Position gesetzt auf:" in response:
+        parts = response.split(":")
+        if len(parts) >= 2:
+            return PositionSet(int(parts[1].strip()))
+    elif "Warnung: Verwende Fallback-Berechnung" in response:
+        return FallbackWarning()
+    return None
+
+
+def measure(parse, corpus, repeat, reset=None):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        if reset:
+            reset()
+        for line in corpus:
+            parse(line)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeat", type=int, default=2000, help="passes over the corpus")
+    args = parser.parse_args()
+
+    with open(CORPUS_FILE, encoding="utf-8") as f:
+        corpus = [line.rstrip("\n") for line in f if line.strip()]
+    total = len(corpus) * args.repeat
+
+    print(f"Parsing {len(corpus)} recorded lines x {args.repeat} ({total} lines)")
+    print("-" * 60)
+    results = {}
+    runs = (
+        ("Substring chain", legacy_parse, None),
+        # Cache cleared before every pass: every distinct line is parsed from scratch
+        ("Parser (cold)", parse_response, parse_response.cache_clear),
+        ("Parser", parse_response, None),
+    )
+    for name, parse, reset in runs:
+        elapsed = measure(parse, corpus, args.repeat, reset)
+        results[name] = elapsed
+        print(f"{name:<16} {total / elapsed / 1000:10.1f} k lines/s   {elapsed * 1e9 / total:8.0f} ns/line")
+    for name in ("Parser (cold)", "Parser"):
+        print(f"Speedup {name:<14} {results['Substring chain'] / results[name]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark: rigctld server under load
+====================================
+Hundreds of local TCP clients talk to ``RigctlServer`` at the same time
+while the controller drives a simulated antenna. The clients run in a
+separate process (one asyncio loop, one connection each) and alternate
+``F <random CB frequency>`` and ``f``; the server process runs the core,
+the server and nothing else. The simulator runs in its own process.
+
+Reported per client count:
+
+    set / get     request sent -> reply received (median, p99, max)
+    req/s         requests answered per second over all clients
+    moves         moves sent to the motor for all set requests (merged)
+
+Usage:
+    python3 benchmarks/bench_rigctl_load.py [--clients 50 200 500] [--requests 20]
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+GUI_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, GUI_DIR)
+
+from cb_band import CHANNEL_FREQUENCIES
+from configuration import Configuration
+from controller_core import AntennaControllerCore
+from response_parser import PositionSet
+from rigctl_server import RigctlServer
+
+
+async def run_clients(port, clients, requests, seed):
+    """(set latencies, get latencies, wall time) of all clients"""
+    rng = random.Random(seed)
+    frequencies = list(CHANNEL_FREQUENCIES.values())
+    set_times, get_times = [], []
+    connected = 0
+    all_connected = asyncio.Event()
+
+    async def client():
+        nonlocal connected
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        connected += 1
+        if connected == clients:
+            all_connected.set()
+        await all_connected.wait()
+        for index in range(requests):
+            if index % 2 == 0:
+                line, times = f"F {rng.choice(frequencies)}\n", set_times
+            else:
+                line, times = "f\n", get_times
+            start = time.perf_counter()
+            writer.write(line.encode())
+            reply = await reader.readline()
+            times.append(time.perf_counter() - start)
+            if reply.startswith(b"RPRT -"):
+                raise RuntimeError(f"Fehler vom Server: {reply!r}")
+        writer.write(b"q\n")
+        await writer.drain()
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return set_times, get_times, time.perf_counter() - start
+
+
+def client_process(port, clients, requests, seed, results):
+    results.put(asyncio.run(run_clients(port, clients, requests, seed)))
+
+
+async def run_server(sim_port, tmp, client_counts, requests):
+    config = Configuration(os.path.join(tmp, "antenna_config.json"))
+    config.set("channel_41_position", 0)
+    config.set("channel_40_position", 2370)
+    core = AntennaControllerCore(config)
+    synced = asyncio.Event()
+    core.subscribe(lambda event: isinstance(event, PositionSet) and synced.set())
+    server = await RigctlServer(core, port=0).start()
+    loop = asyncio.get_running_loop()
+    rows = []
+    try:
+        await core.connect(sim_port)
+        await asyncio.wait_for(synced.wait(), 15)
+        for clients in client_counts:
+            before = (server.set_requests, core.motion.moves_sent)
+            results = multiprocessing.Queue()
+            process = multiprocessing.Process(
+                target=client_process, args=(server.port, clients, requests, clients, results))
+            process.start()
+            set_times, get_times, wall = await loop.run_in_executor(None, results.get)
+            await loop.run_in_executor(None, process.join)
+            await server.tuned()
+            rows.append((clients, set_times, get_times, wall,
+                         server.set_requests - before[0], core.motion.moves_sent - before[1]))
+    finally:
+        server.close()
+        core.close()
+    return rows
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--clients", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="simulator speed-up")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        link = os.path.join(tmp, "sim")
+        simulator = subprocess.Popen(
+            [sys.executable, "-m", "firmware_simulator", "--link", link, "--time-scale", str(args.time_scale)],
+            cwd=GUI_DIR, stdout=subprocess.DEVNULL)
+        try:
+            deadline = time.monotonic() + 10
+            while not os.path.exists(link):
+                if time.monotonic() > deadline:
+                    raise RuntimeError("Simulator nicht gestartet")
+                time.sleep(0.05)
+            rows = asyncio.run(run_server(link, tmp, args.clients, args.requests))
+        finally:
+            simulator.terminate()
+            simulator.wait()
+
+    print(f"{args.requests} Anfragen je Client (F/f abwechselnd)")
+    print(f"{'Clients':>7} {'set med':>9} {'set p99':>9} {'get med':>9} {'get p99':>9} "
+          f"{'max':>9} {'req/s':>8} {'sets':>6} {'moves':>6}")
+    print("-" * 82)
+    for clients, set_times, get_times, wall, sets, moves in rows:
+        worst = max(set_times + get_times)
+        print(f"{clients:>7} {statistics.median(set_times) * 1000:7.2f}ms {percentile(set_times, 0.99) * 1000:7.2f}ms "
+              f"{statistics.median(get_times) * 1000:7.2f}ms {percentile(get_times, 0.99) * 1000:7.2f}ms "
+              f"{worst * 1000:7.2f}ms {(len(set_times) + len(get_times)) / wall:8.0f} {sets:>6} {moves:>6}")
+
+
+if __name__ == "__main__":
+    main()
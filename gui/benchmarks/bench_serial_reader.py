@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Benchmark: firmware write -> Python dispatch latency
+====================================================
+Compares the old polling loop of ``read_serial`` (``in_waiting`` check plus
+``time.sleep(0.1)``) with the read path of ``AntennaControllerCore``
+(``_on_readable`` on the event loop, incremental decoding, ``handle_line``).
+
+A local pty stands in for the Arduino: the benchmark writes firmware
+replies to the master side and measures the time until the decoded line
+is dispatched (for the core: until a subscriber sees its log event).
+Single lines and bursts are mixed, as they occur after a channel change
+("Motor fertig" followed by the position). The core also reports the
+latency of its receive stamp ``received_at``.
+
+Usage:
+    python3 benchmarks/bench_serial_reader.py [--samples 100]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import select
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import serial
+
+from configuration import Configuration
+from controller_core import AntennaControllerCore, LogMessage
+
+READY_BANNER = b"Magnet Loop Antenna Controller Ready\n"
+
+
+def legacy_reader(port, on_line, should_stop):
+    """The original polling loop from MagnetLoopController.read_serial"""
+    while not should_stop():
+        if port.in_waiting > 0:
+            data = port.readline().decode('utf-8').strip()
+            if data:
+                on_line(data)
+        time.sleep(0.1)
+
+
+def write_lines(master, samples, written, seed):
+    """Write ``samples`` numbered lines in single lines and bursts"""
+    rng = random.Random(seed)
+    seq = 0
+    while seq < samples:
+        burst = 1 if rng.random() < 0.7 else rng.randint(2, 5)
+        for _ in range(min(burst, samples - seq)):
+            written[seq] = time.monotonic()
+            os.write(master, f"Testzeile {seq}\n".encode("utf-8"))
+            seq += 1
+        time.sleep(rng.uniform(0.005, 0.05))
+
+
+def run_legacy(samples, seed=1):
+    """Per-line latencies of the polling loop"""
+    master, slave = os.openpty()
+    port = serial.Serial(os.ttyname(slave), baudrate=9600)
+    os.close(slave)
+
+    written = {}
+    latencies = []
+    done = threading.Event()
+    stop = threading.Event()
+
+    def on_line(line):
+        seq = int(line.rsplit(" ", 1)[1])
+        latencies.append(time.monotonic() - written[seq])
+        if len(latencies) == samples:
+            done.set()
+
+    thread = threading.Thread(target=legacy_reader, args=(port, on_line, stop.is_set), daemon=True)
+    thread.start()
+    write_lines(master, samples, written, seed)
+
+    done.wait(timeout=samples * 0.2 + 5)
+    stop.set()
+    thread.join(timeout=1)
+    port.close()
+    os.close(master)
+    return latencies
+
+
+def answer_ping(master, stop):
+    """Board side: answer the readiness ping and drain the commands"""
+    while not stop.is_set():
+        if select.select([master], [], [], 0.05)[0] and b"Q" in os.read(master, 1024):
+            os.write(master, READY_BANNER)
+
+
+async def run_core(samples, seed=1):
+    """Per-line dispatch and receive stamp latencies of the core"""
+    master, slave = os.openpty()
+    port_name = os.ttyname(slave)
+    stop = threading.Event()
+    board = threading.Thread(target=answer_ping, args=(master, stop), daemon=True)
+    board.start()
+
+    written = {}
+    latencies = []
+    stamps = []
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        core = AntennaControllerCore(Configuration(os.path.join(tmp, "antenna_config.json")))
+
+        def on_event(event):
+            if not isinstance(event, LogMessage) or not event.text.startswith("Arduino: Testzeile"):
+                return
+            seq = int(event.text.rsplit(" ", 1)[1])
+            latencies.append(time.monotonic() - written[seq])
+            stamps.append(core.received_at - written[seq])
+            if len(latencies) == samples and not done.done():
+                done.set_result(None)
+
+        core.subscribe(on_event)
+        try:
+            if await core.connect(port_name):
+                await loop.run_in_executor(None, write_lines, master, samples, written, seed)
+                await asyncio.wait_for(done, timeout=samples * 0.2 + 5)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            core.disconnect()
+            stop.set()
+            board.join(timeout=1)
+            os.close(slave)
+            os.close(master)
+    return latencies, stamps
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(name, latencies, samples):
+    if len(latencies) < samples:
+        print(f"{name:<22} only {len(latencies)}/{samples} lines received")
+    if not latencies:
+        return
+    median = statistics.median(latencies) * 1000
+    p99 = percentile(latencies, 0.99) * 1000
+    print(f"{name:<22} median {median:8.2f} ms   p99 {p99:8.2f} ms   max {max(latencies) * 1000:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--samples", type=int, default=100, help="number of lines per reader")
+    args = parser.parse_args()
+
+    print(f"Firmware write -> dispatch latency over a pty ({args.samples} lines)")
+    print("-" * 72)
+    report("Polling (sleep 0.1 s)", run_legacy(args.samples), args.samples)
+    latencies, stamps = asyncio.run(run_core(args.samples))
+    report("Core dispatch", latencies, args.samples)
+    report("Core received_at", stamps, args.samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark: GUI redraws per firmware reply
+=========================================
+Replays a recorded firmware session (``firmware_session.txt``) through
+the controller core and renders the published state into stand-in
+widgets, in batches of ``--frame`` replies (one GUI frame):
+
+    snapshot      the newest StateChanged/CalibrationChanged of the batch
+                  redraws all of its widgets (channel, motor and sync
+                  status; calibration values and status)
+    store         the batch is one ``StateStore`` transaction; only the
+                  widgets of fields that differ are redrawn
+
+Reported are widget writes per reply and per frame (mean and max) and the
+time of the UI work per frame. The stand-ins cost next to nothing, so the
+time column is the overhead of the rendering path itself; in the GUI every
+write is a call into Tcl/Tk on top of it.
+
+Usage:
+    python3 benchmarks/bench_state_store.py [--frame 1 4 16] [--repeat 200]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from command_tracker import CommandTracker
+from configuration import Configuration
+from controller_core import AntennaControllerCore, CalibrationChanged, StateChanged
+from state_store import StateStore
+
+CORPUS_FILE = os.path.join(os.path.dirname(__file__), "firmware_session.txt")
+
+
+class Widgets:
+    """Stand-ins for the status widgets of the GUI, counting writes"""
+
+    def __init__(self):
+        self.writes = 0
+        self.values = {}
+
+    def write(self, name, value):
+        self.writes += 1
+        self.values[name] = value
+
+    def channel(self, channel):
+        self.write("channel", f"Kanal {channel}")
+
+    def motor(self, moving):
+        self.write("motor", "🔄 Motor läuft" if moving else "⚫ Motor bereit")
+
+    def sync(self, synced):
+        self.write("sync", "Position synchronisiert" if synced else "Position NICHT synchronisiert!")
+
+    def calibration(self, event):
+        self.write("ch41", str(event.channel_41_position))
+        self.write("ch40", str(event.channel_40_position))
+        self.write("steps", f"{event.steps_per_channel:.2f}")
+        self.write("calibration", ("✓ " if event.valid else "⚠ ") + event.message)
+
+
+def record_replies(corpus, directory):
+    """State events published by the core for each reply of the session"""
+    async def replay():
+        config = Configuration(os.path.join(directory, "antenna_config.json"))
+        core = AntennaControllerCore(config)
+        core.commands = CommandTracker(asyncio.get_running_loop())
+        events = []
+        core.subscribe(lambda e: isinstance(e, (StateChanged, CalibrationChanged)) and events.append(e))
+        replies = []
+        for line in corpus:
+            core.handle_line(line)
+            replies.append(events[:])
+            events.clear()
+        config.flush()
+        return replies
+
+    return asyncio.run(replay())
+
+
+def render_snapshots(widgets, events):
+    newest = {type(event): event for event in events}
+    if StateChanged in newest:
+        state = newest[StateChanged]
+        widgets.channel(state.channel)
+        widgets.motor(state.moving)
+        widgets.sync(state.synced)
+    if CalibrationChanged in newest:
+        widgets.calibration(newest[CalibrationChanged])
+
+
+def store_renderer(widgets):
+    store = StateStore()
+    store.subscribe(lambda changes: widgets.channel(changes["channel"]), ("channel",))
+    store.subscribe(lambda changes: widgets.motor(changes["moving"]), ("moving",))
+    store.subscribe(lambda changes: widgets.sync(changes["synced"]), ("synced",))
+    store.subscribe(lambda changes: widgets.calibration(changes["calibration"]), ("calibration",))
+
+    def render(events):
+        with store.transaction():
+            for event in events:
+                if isinstance(event, StateChanged):
+                    store.set(channel=event.channel, position=event.position,
+                              moving=event.moving, synced=event.synced)
+                else:
+                    store.set(calibration=event)
+    return render
+
+
+def measure(replies, frame, repeat, use_store):
+    """(writes per frame, seconds per frame) over ``repeat`` passes"""
+    frames = [sum(replies[i:i + frame], []) for i in range(0, len(replies), frame)]
+    writes = []
+    elapsed = 0.0
+    for index in range(repeat):
+        widgets = Widgets()
+        render = store_renderer(widgets) if use_store else lambda events: render_snapshots(widgets, events)
+        for events in frames:
+            before = widgets.writes
+            start = time.perf_counter()
+            render(events)
+            elapsed += time.perf_counter() - start
+            if index == 0:
+                writes.append(widgets.writes - before)
+    return writes, elapsed / (repeat * len(frames))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--frame", type=int, nargs="+", default=[1, 4, 16], help="replies per GUI frame")
+    parser.add_argument("--repeat", type=int, default=200, help="passes over the session")
+    args = parser.parse_args()
+
+    with open(CORPUS_FILE, encoding="utf-8") as f:
+        corpus = [line.rstrip("\n") for line in f if line.strip()]
+    with tempfile.TemporaryDirectory() as tmp:
+        replies = record_replies(corpus, tmp)
+    published = sum(len(events) for events in replies)
+    print(f"{len(corpus)} Antworten, {published} Zustandsereignisse")
+    print(f"{'Frame':>5}  {'Modus':<9} {'Writes/Antwort':>14} {'Writes/Frame':>12} {'max':>5} {'µs/Frame':>9}")
+    print("-" * 62)
+    for frame in args.frame:
+        for name, use_store in (("Snapshot", False), ("Store", True)):
+            writes, seconds = measure(replies, frame, args.repeat, use_store)
+            print(f"{frame:>5}  {name:<9} {sum(writes) / len(corpus):14.2f} "
+                  f"{sum(writes) / len(writes):12.2f} {max(writes):5d} {seconds * 1e6:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: STOP latency under load
+==================================
+While the motor runs a long move, ``--load`` further moves are queued
+(raw ``move_steps``, as a burst of clicks before the coalescer existed
+would) and then STOP is issued. Measured is the time from
+``stop_movement()`` to "Motor angehalten", for two writer setups:
+
+    FIFO          every command goes to the port at once and STOP drops
+                  nothing (the behaviour before the writer thread): S
+                  queues behind the moves on the wire and behind their
+                  "Befehl in Warteschlange eingereiht" replies
+    priority      the writer paces to the baud rate, S overtakes the
+                  backlog and the moves not yet written are dropped
+
+Runs at real time (``--time-scale 1``), because the writer paces in wall
+time.
+
+Usage:
+    python3 benchmarks/bench_stop_latency.py [--load 0 10 30] [--repeat 5]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from command_tracker import CommandError
+from configuration import Configuration
+from controller_core import AntennaControllerCore
+from firmware_simulator import PtyFirmwareSimulator
+from response_parser import MotionStopped
+
+MODES = [("FIFO", False), ("Priorität", True)]
+
+
+def fifo_stop(core):
+    """``stop_movement`` without dropping queued moves"""
+    core.motion.cancel()
+    core.send_command("S")
+    core._set_moving(False)
+
+
+async def measure(sim, tmp, priority, loads, repeat):
+    config = Configuration(os.path.join(tmp, "antenna_config.json"))
+    config.set("channel_41_position", 0)
+    config.set("channel_40_position", 2370)
+    core = AntennaControllerCore(config)
+    if not priority:
+        core.WRITE_PACING = False
+        core.PRIORITY_COMMANDS = ()
+    stopped = None
+
+    def on_event(event):
+        if isinstance(event, MotionStopped) and stopped is not None and not stopped.done():
+            stopped.set_result(time.perf_counter())
+
+    core.subscribe(on_event)
+    results = {}
+    try:
+        await core.connect(sim.port)
+        await core.synced()
+        for load in loads:
+            latencies = []
+            for index in range(repeat):
+                forward = index % 2 == 0  # S reports the target: back and forth in range
+                moves = [core.move_steps(3000, forward)]
+                await asyncio.sleep(0.2)  # motor running
+                moves += [core.move_steps(10, forward) for _ in range(load)]
+                stopped = asyncio.get_running_loop().create_future()
+                start = time.perf_counter()
+                if priority:
+                    core.stop_movement()
+                else:
+                    fifo_stop(core)
+                latencies.append(await asyncio.wait_for(stopped, 30) - start)
+                await asyncio.gather(*moves, return_exceptions=True)
+                await core.idle()
+                try:
+                    await core.query_position()  # line is quiet again
+                except CommandError:
+                    pass
+            results[load] = latencies
+    finally:
+        core.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--load", type=int, nargs="+", default=[0, 10, 30], help="moves queued before STOP")
+    parser.add_argument("--repeat", type=int, default=5, help="STOPs per load")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="simulator speed-up")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, priority in MODES:
+            with PtyFirmwareSimulator(time_scale=args.time_scale, reset_on_open=False) as sim:
+                results[name] = asyncio.run(measure(sim, tmp, priority, args.load, args.repeat))
+
+    print(f"{'Last':>5}  " + "  ".join(f"{name + ' median':>17} {'max':>8}" for name, _ in MODES))
+    print("-" * 62)
+    for load in args.load:
+        cells = []
+        for name, _ in MODES:
+            latencies = results[name][load]
+            cells.append(f"{statistics.median(latencies) * 1000:15.1f}ms {max(latencies) * 1000:6.1f}ms")
+        print(f"{load:>5}  " + "  ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Telemetry recording of a week of operation
+=====================================================
+Feeds the events of a synthetic week (a QSY every ``--interval`` seconds
+to a random channel, with the replies, position and channel changes the
+core publishes for it) into a ``TelemetryRecorder`` with a simulated
+clock, then streams the recording back with ``iter_records``.
+
+Reported are the recorder time per event, the size of the recording next
+to the same events as lines of the GUI log, and the read-back rate.
+
+Usage:
+    python3 benchmarks/bench_telemetry.py [--days 7] [--interval 30]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from controller_core import CommandSent, StateChanged
+from response_parser import ChannelReport, MotionFinished, MotionStarted, PositionReport
+from telemetry import TelemetryRecorder, iter_records
+
+STEPS_PER_CHANNEL = 2370 / 40
+
+
+class SimulatedClock:
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self):
+        return self.now
+
+
+def week(days, interval, seed=1):
+    """(seconds to wait, event) of the synthetic operation"""
+    rng = random.Random(seed)
+    position = 0
+    for _ in range(int(days * 86400 / interval)):
+        target = rng.randint(1, 80)
+        goal = round((41 - target) * STEPS_PER_CHANNEL)
+        steps = goal - position
+        yield interval, CommandSent(f"CH{target}")
+        yield 0.01, StateChanged(target, position, False, True)
+        if steps == 0:
+            continue
+        yield 0.02, MotionStarted(abs(steps), steps > 0, target)
+        yield 0.0, StateChanged(target, position, True, True)
+        yield abs(steps) * 0.0012, CommandSent("P")
+        yield 0.01, MotionFinished()
+        yield 0.0, StateChanged(target, goal, False, True)
+        yield 0.01, PositionReport(goal)
+        yield 0.02, ChannelReport(target)
+        position = goal
+
+
+def log_line(event):
+    """Line of the event in the GUI log"""
+    return f"[{time.strftime('%H:%M:%S')}] {event}\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--days", type=float, default=7, help="days of operation")
+    parser.add_argument("--interval", type=float, default=30, help="seconds between two QSYs")
+    args = parser.parse_args()
+
+    events = list(week(args.days, args.interval))
+    log_bytes = sum(len(log_line(event).encode()) for _, event in events)
+    clock = SimulatedClock()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "week.mlt")
+        start = time.perf_counter()
+        with TelemetryRecorder(path, clock=clock) as recorder:
+            for wait, event in events:
+                clock.now += wait
+                recorder.on_event(event)
+        write = time.perf_counter() - start
+        size = os.path.getsize(path)
+
+        start = time.perf_counter()
+        decoded = sum(1 for _ in iter_records(path))
+        read = time.perf_counter() - start
+
+    print(f"{args.days:g} Tage, QSY alle {args.interval:g} s: {len(events)} Ereignisse, "
+          f"{recorder.records} Datensätze")
+    print(f"{'':<16} {'Größe':>10} {'µs/Ereignis':>12} {'Datensätze/s':>13}")
+    print("-" * 54)
+    print(f"{'Log-Text':<16} {log_bytes / 1e6:8.2f} MB {'':>12} {'':>13}")
+    print(f"{'Aufzeichnung':<16} {size / 1e6:8.2f} MB {write / len(events) * 1e6:12.2f} {'':>13}")
+    print(f"{'Lesen':<16} {'':>10} {'':>12} {decoded / read:13,.0f}")
+
+
+if __name__ == "__main__":
+    main()
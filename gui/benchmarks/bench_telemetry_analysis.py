@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Offline analysis of a telemetry archive
+==================================================
+Records a synthetic archive of several million events (one recording per
+day of operation: a QSY every ``--interval`` seconds, corrections with F/B,
+RPM changes, stopped moves and occasional position drift) and computes the
+report of ``telemetry_analysis.py`` three ways:
+
+    python      record by record with ``telemetry.iter_records``
+    numpy       ``summarize`` per file in this process
+    pool        ``summarize`` in a process pool (``--workers``, default one per CPU)
+
+Reported are the time and the decoding rate of each; all three reports
+must be identical.
+
+Usage:
+    python3 benchmarks/bench_telemetry_analysis.py [--days 240] [--interval 30] [--workers 4]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from controller_core import CommandSent, StateChanged
+from motion_model import step_interval
+from response_parser import (
+    ControllerReady, RpmReport, PositionReport, ChannelReport, MotionStarted, MotionFinished, MotionStopped
+)
+from telemetry import TelemetryRecorder, iter_records, COMMAND, REPLY, CHANNEL
+from telemetry_analysis import CHANNELS, FileSummary, report, summarize, summarize_all
+
+STEPS_PER_CHANNEL = 2370 / 40
+RESETS = ("MotionStopped", "PositionSet", "ControllerReady", "FirmwareState")
+
+
+def day(rng, interval):
+    """(seconds to wait, event) of one day of operation"""
+    rpm, position = 12, 0
+    yield 0.0, ControllerReady()
+    yield 0.1, RpmReport(rpm)
+    yield 0.1, PositionReport(position)
+
+    def move(steps, channel=None):
+        yield 0.02, MotionStarted(abs(steps), steps > 0, channel)
+        yield abs(steps) * step_interval(rpm) * rng.uniform(1.0, 1.05) + 0.03, MotionFinished()
+
+    for _ in range(int(86400 / interval)):
+        if rng.random() < 0.01:
+            rpm = rng.choice((8, 12, 16, 24))
+            yield 1.0, CommandSent(f"RPM{rpm}")
+            yield 0.02, RpmReport(rpm)
+        target = rng.randint(1, CHANNELS)
+        goal = round((41 - target) * STEPS_PER_CHANNEL)
+        yield interval, CommandSent(f"CH{target}")
+        yield 0.01, StateChanged(target, position, False, True)
+        if goal == position:
+            continue
+        if rng.random() < 0.01:  # stopped halfway
+            yield 0.02, MotionStarted(abs(goal - position), goal > position, target)
+            yield 0.3, CommandSent("S")
+            yield 0.01, MotionStopped()
+            position = (position + goal) // 2
+            yield 0.01, PositionReport(position)
+            yield 0.0, StateChanged(target, position, False, True)
+            continue
+        yield from move(goal - position, target)
+        position = goal
+        if rng.random() < 0.005:  # lost steps
+            position += rng.choice((-1, 1)) * rng.randint(1, 20)
+        yield 0.01, PositionReport(position)
+        yield 0.0, StateChanged(target, position, False, True)
+        yield 0.02, ChannelReport(target)
+        while rng.random() < 0.1:  # correction
+            steps = rng.randint(-15, 15) or 1
+            yield 3.0, CommandSent(f"F{steps}" if steps > 0 else f"B{-steps}")
+            yield from move(steps)
+            position += steps
+            yield 0.01, PositionReport(position)
+            yield 0.0, StateChanged(target, position, False, True)
+
+
+def record_archive(directory, days, interval):
+    files = []
+    start = time.time() - days * 86400
+    for number in range(days):
+        rng = random.Random(number)
+        path = os.path.join(directory, f"telemetry-{number:04d}.mlt")
+        now = [start + number * 86400]
+        with TelemetryRecorder(path, clock=lambda: now[0]) as recorder:
+            for wait, event in day(rng, interval):
+                now[0] += wait
+                recorder.on_event(event)
+        files.append(path)
+    return files
+
+
+def summarize_python(path):
+    """``summarize`` record by record"""
+    records = hours = reports = 0
+    first = last = None
+    drift, moves = [], []
+    arrivals, corrections = Counter(), Counter()
+    previous = None  # last position report
+    steps = 0  # steps started since
+    reset = False
+    rpm, started, channel = 0, None, None
+    for record in iter_records(path):
+        records += 1
+        ms = round(record.time * 1000)
+        first = ms if first is None else first
+        last = ms
+        name = record.name
+        if record.kind == REPLY:
+            if name == "PositionReport":
+                if previous is not None and not reset:
+                    reports += 1
+                    drift.append(record.value - previous - steps)
+                previous, steps, reset = record.value, 0, False
+            elif name == "MotionStarted":
+                steps += record.value
+                started = (ms, abs(record.value), rpm)
+            elif name == "MotionFinished":
+                if started is not None:
+                    moves.append((started[2], started[1], ms - started[0]))
+                started = None
+            elif name == "RpmReport":
+                rpm = record.value
+            if name in RESETS:
+                reset = True
+                if name == "MotionStopped":
+                    started = None
+        elif record.kind == CHANNEL:
+            channel = min(max(record.value, 0), CHANNELS)
+            arrivals[channel] += 1
+        elif record.kind == COMMAND and name in ("F", "B") and channel is not None:
+            corrections[channel] += 1
+    if records:
+        hours = (last - first) / 3.6e6
+    rpm, steps, ms = (np.array(column, np.int32) for column in (zip(*moves) if moves else ([], [], [])))
+
+    def counts(counter):
+        array = np.zeros(CHANNELS + 1, np.int64)
+        for channel, count in counter.items():
+            array[channel] = count
+        return array
+
+    return FileSummary(records, hours, reports, np.array(drift, np.int32), rpm, steps, ms,
+                       counts(arrivals), counts(corrections))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--days", type=int, default=240, help="recordings (one per day)")
+    parser.add_argument("--interval", type=float, default=30, help="seconds between two QSYs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes of the pool")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        files = record_archive(tmp, args.days, args.interval)
+        recorded = time.perf_counter() - start
+        size = sum(os.path.getsize(path) for path in files)
+
+        results = {}
+        timings = {}
+        for name, run in (("Python", lambda: [summarize_python(path) for path in files]),
+                          ("NumPy", lambda: [summarize(path) for path in files]),
+                          (f"NumPy, {args.workers} Prozesse", lambda: summarize_all(files, args.workers))):
+            start = time.perf_counter()
+            results[name] = report(run())
+            timings[name] = time.perf_counter() - start
+
+    records = results["Python"]["records"]
+    print(f"{len(files)} Aufzeichnungen, {records:,} Datensätze, {size / 1e6:.1f} MB "
+          f"(aufgezeichnet in {recorded:.1f} s), {os.cpu_count()} CPU")
+    print(f"{'Verfahren':<22} {'Sekunden':>9} {'Datensätze/s':>14} {'Faktor':>7}")
+    print("-" * 55)
+    for name, seconds in timings.items():
+        print(f"{name:<22} {seconds:9.2f} {records / seconds:14,.0f} {timings['Python'] / seconds:7.1f}")
+    reference = results["Python"]
+    print("Ergebnisse identisch: " + ("ja" if all(r == reference for r in results.values()) else "NEIN"))
+    drift = reference["drift"]
+    print(f"Drift: {drift['drifts']} von {drift['reports']} Positionsmeldungen, "
+          f"{len(reference['moves'])} RPM-Stufen")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Calibration Table
+=================
+Motor positions of the 80 frequency positions (0 = channel 41, lowest
+frequency, 79 = channel 40), interpolated from any number of calibration
+points ``(frequency position, motor position)``.
+
+The variable capacitor is not linear, so two points (channel 41 and 40)
+leave every channel in between a few steps off. With more points the
+positions between them are interpolated
+
+    linear      piecewise linear between neighbouring points
+    spline      monotone cubic Hermite spline (Fritsch-Carlson slopes):
+                smooth through all points and never overshooting them,
+                so the positions keep rising with the frequency
+
+Both directions are lookups in the precomputed table: the position of a
+frequency position is an index, the nearest frequency position of a
+motor position a bisection of the midpoints between neighbours (ties go
+to the higher channel, like the rounding of the firmware).
+
+The firmware gets the table as ``CALT`` segments instead of the two-point
+``CAL``: ``CALT<start>:`` followed by the position of frequency position
+``start`` as three hex digits and the steps to each following position
+as two hex digits, ``SEGMENT_POSITIONS`` positions per segment (48 bytes,
+one frame of the framed protocol). Segments are sent in order from 0; the
+firmware switches to the table when position 79 arrived. ``checksum()``
+is what the firmware reports with STATE for its active table.
+"""
+
+import struct
+from bisect import bisect_right
+
+from framed_protocol import crc8
+
+FREQUENCY_POSITIONS = 80
+MAX_POSITION = 4075
+SEGMENT_POSITIONS = 20
+MAX_SPACING = 0xFF  # two hex digits per step between neighbours
+METHODS = ("spline", "linear")
+
+
+def _linear(xs, ys, x):
+    k = min(max(bisect_right(xs, x) - 1, 0), len(xs) - 2)
+    return ys[k] + (ys[k + 1] - ys[k]) * (x - xs[k]) / (xs[k + 1] - xs[k])
+
+
+def _monotone_slopes(xs, ys):
+    """Fritsch-Carlson tangents of a monotone cubic Hermite spline"""
+    h = [b - a for a, b in zip(xs, xs[1:])]
+    d = [(ys[k + 1] - ys[k]) / h[k] for k in range(len(h))]
+    slopes = [d[0]]
+    for k in range(1, len(h)):
+        if d[k - 1] * d[k] <= 0:
+            slopes.append(0.0)
+        else:
+            # Weighted harmonic mean of the neighbouring secants
+            w1, w2 = 2 * h[k] + h[k - 1], h[k] + 2 * h[k - 1]
+            slopes.append((w1 + w2) / (w1 / d[k - 1] + w2 / d[k]))
+    slopes.append(d[-1])
+    return slopes
+
+
+def _spline(xs, ys, slopes, x):
+    k = min(max(bisect_right(xs, x) - 1, 0), len(xs) - 2)
+    h = xs[k + 1] - xs[k]
+    t = (x - xs[k]) / h
+    t2, t3 = t * t, t * t * t
+    return ((2 * t3 - 3 * t2 + 1) * ys[k] + (t3 - 2 * t2 + t) * h * slopes[k]
+            + (-2 * t3 + 3 * t2) * ys[k + 1] + (t3 - t2) * h * slopes[k + 1])
+
+
+def interpolate(points, method="spline"):
+    """Positions of all frequency positions from ``(frequency position, position)`` points
+
+    ``points`` must include frequency positions 0 and 79 and rise in both
+    coordinates.
+    """
+    points = sorted(points)
+    xs = [x for x, _ in points]
+    ys = [y for _, y in points]
+    if method not in METHODS:
+        raise ValueError(f"Unbekannte Interpolation: {method}")
+    if method == "linear" or len(points) == 2:
+        return [_linear(xs, ys, x) for x in range(FREQUENCY_POSITIONS)]
+    slopes = _monotone_slopes(xs, ys)
+    return [_spline(xs, ys, slopes, x) for x in range(FREQUENCY_POSITIONS)]
+
+
+class CalibrationTable:
+    """Positions by frequency position with nearest-position lookup"""
+
+    __slots__ = ("positions", "_bounds")
+
+    def __init__(self, positions):
+        if len(positions) != FREQUENCY_POSITIONS:
+            raise ValueError(f"{FREQUENCY_POSITIONS} Positionen erwartet, nicht {len(positions)}")
+        self.positions = tuple(positions)
+        # Midpoints between neighbours; a position on a midpoint belongs to the higher one
+        self._bounds = [(a + b) / 2 for a, b in zip(self.positions, self.positions[1:])]
+
+    @classmethod
+    def from_points(cls, points, method="spline"):
+        """Table of whole steps interpolated from ``(frequency position, position)`` points"""
+        return cls([round(position) for position in interpolate(points, method)])
+
+    def position(self, frequency_position):
+        return self.positions[frequency_position]
+
+    def frequency_position(self, position):
+        """Nearest frequency position of a motor position (clamped to 0-79)"""
+        return bisect_right(self._bounds, position)
+
+    def problem(self):
+        """Why the firmware cannot take the table, or None"""
+        positions = self.positions
+        if not (0 <= positions[0] and positions[-1] <= MAX_POSITION):
+            return f"Kalibrierung ungültig: Positionen müssen zwischen 0 und {MAX_POSITION} liegen"
+        for index, (a, b) in enumerate(zip(positions, positions[1:]), 1):
+            if not 0 < b - a <= MAX_SPACING:
+                return (f"Kalibrierung ungültig: Abstand {b - a} Schritte vor Frequenz-Position {index} "
+                        f"(erlaubt 1-{MAX_SPACING})")
+        return None
+
+    def segments(self):
+        """CALT commands carrying the table to the firmware"""
+        commands = []
+        for start in range(0, FREQUENCY_POSITIONS, SEGMENT_POSITIONS):
+            part = self.positions[start:start + SEGMENT_POSITIONS]
+            steps = "".join(f"{b - a:02X}" for a, b in zip(part, part[1:]))
+            commands.append(f"CALT{start}:{part[0]:03X}{steps}")
+        return commands
+
+    def checksum(self):
+        """CRC-8 over the positions as little-endian uint16 (reported by STATE)"""
+        return crc8(struct.pack(f"<{FREQUENCY_POSITIONS}H", *self.positions))
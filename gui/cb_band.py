@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+CB Band Plan
+============
+Frequencies of the 80 German CB channels (11 m band):
+
+    - channels 41-80: 26.565 - 26.955 MHz in 10 kHz steps
+    - channels 1-40:  26.965 - 27.405 MHz (CEPT/FCC raster with the gaps
+      at 26.995, 27.045, ... and channels 23/24/25 out of order)
+
+Frequencies are integer Hz, the unit of the rigctld protocol.
+"""
+
+# Channels 1-40 in kHz, channel 1 first
+_CEPT_CHANNELS_KHZ = (
+    26965, 26975, 26985, 27005, 27015, 27025, 27035, 27055, 27065, 27075,
+    27085, 27105, 27115, 27125, 27135, 27155, 27165, 27175, 27185, 27205,
+    27215, 27225, 27255, 27235, 27245, 27265, 27275, 27285, 27295, 27305,
+    27315, 27325, 27335, 27345, 27355, 27365, 27375, 27385, 27395, 27405,
+)
+
+# Channel -> frequency in Hz
+CHANNEL_FREQUENCIES = {channel: khz * 1000 for channel, khz in enumerate(_CEPT_CHANNELS_KHZ, start=1)}
+CHANNEL_FREQUENCIES.update({channel: 26565000 + (channel - 41) * 10000 for channel in range(41, 81)})
+
+BAND_START = CHANNEL_FREQUENCIES[41]
+BAND_END = CHANNEL_FREQUENCIES[40]
+
+# Largest distance to a channel centre that still selects the channel (half the raster)
+CHANNEL_TOLERANCE = 5000
+
+_BY_FREQUENCY = sorted((frequency, channel) for channel, frequency in CHANNEL_FREQUENCIES.items())
+
+
+def channel_frequency(channel):
+    """Centre frequency of ``channel`` in Hz"""
+    return CHANNEL_FREQUENCIES[channel]
+
+
+def channel_for_frequency(frequency, tolerance=CHANNEL_TOLERANCE):
+    """Channel nearest to ``frequency`` (Hz), or None outside the band
+
+    Frequencies in the gaps of the channel raster (e.g. 26.995 MHz) select
+    the lower neighbour.
+    """
+    if frequency < BAND_START - tolerance or frequency > BAND_END + tolerance:
+        return None
+    best_frequency, best_channel = min(_BY_FREQUENCY, key=lambda item: abs(item[0] - frequency))
+    return best_channel
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Command Tracker
+===============
+Correlates firmware replies with the commands that caused them and keeps a
+model of the firmware ``moveQueue``.
+
+The firmware answers strictly in order and has no request ids, so
+correlation follows its state machine:
+
+    - P / CAL / CALT / SETPOS / RPM / Q / BIN / STATE are answered immediately; the oldest
+      request expecting the reply type gets it
+    - F / B / CH are acknowledged with "Motor startet", "Bereits auf Kanal"
+      or, while the motor runs, "Befehl in Warteschlange eingereiht"
+    - a queued move starts with "Führe Befehl aus Warteschlange aus"
+    - a move completes with "Motor fertig" and the position line after it;
+      its future resolves to that position ("Bereits auf Kanal": None)
+    - S ("Motor angehalten") cancels the running move and clears the queue
+
+The "Aktuelle Position" printed with "Motor fertig" belongs to the move,
+not to a pending P.
+"""
+
+from collections import deque
+
+from response_parser import (
+    PositionReport, PositionSet, MotionStarted, MotionFinished, MotionStopped,
+    AlreadyOnChannel, CommandQueued, QueuedCommandStarted, CalibrationAck,
+    CalibrationRejected, CalibrationTableAck, RpmReport, InvalidRpm, InvalidChannel, QueueStatus,
+    ProtocolSwitched, InvalidBaudrate, FirmwareState, UnknownCommand
+)
+
+
+class CommandError(Exception):
+    """The firmware rejected a command"""
+
+
+class MotionCancelled(CommandError):
+    """A move was stopped (S) or dropped from the firmware queue"""
+
+
+# Immediate replies: command prefix -> (success types, failure types)
+REPLIES = {
+    "P": ((PositionReport,), ()),
+    "CAL": ((CalibrationAck,), (CalibrationRejected,)),
+    "CALT": ((CalibrationTableAck,), (CalibrationRejected,)),
+    "SETPOS": ((PositionSet,), ()),
+    "RPM": ((RpmReport,), (InvalidRpm,)),
+    "Q": ((QueueStatus,), ()),
+    "BIN": ((ProtocolSwitched,), (InvalidBaudrate, UnknownCommand)),
+    "STATE": ((FirmwareState,), (UnknownCommand,)),
+}
+
+
+def is_move(command):
+    """F / B / CH: acknowledged when the motor starts, complete when it stops (BIN is none)"""
+    return (command[:1] in ("F", "B") or command.startswith("CH")) and not command.startswith("BIN")
+
+
+class PendingCommand:
+    """A sent command waiting for its reply"""
+
+    __slots__ = ("command", "future", "success", "failure", "timer")
+
+    def __init__(self, command, future, success=(), failure=()):
+        self.command = command
+        self.future = future
+        self.success = success
+        self.failure = failure
+        self.timer = None
+
+
+class CommandTracker:
+    """Futures for sent commands, resolved by parsed firmware events"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self._requests = []  # immediate replies, oldest first
+        self._awaiting_ack = deque()  # moves sent or dequeued, not yet acknowledged
+        self._queued = deque()  # moves in the firmware moveQueue
+        self._running = None  # move the motor currently executes
+        self._finished = None  # move whose final position line is next
+        self._idle_waiters = []
+
+    # ------------------------------------------------------------------
+    # Model
+
+    @property
+    def queue_depth(self):
+        """Moves waiting in the firmware moveQueue"""
+        return len(self._queued)
+
+    @property
+    def pending_moves(self):
+        """Moves sent and not yet complete (including the running one)"""
+        return len(self._awaiting_ack) + len(self._queued) + (self._running is not None)
+
+    def idle(self):
+        """Future resolving once no move is pending"""
+        future = self.loop.create_future()
+        if self.pending_moves == 0:
+            future.set_result(None)
+        else:
+            self._idle_waiters.append(future)
+        return future
+
+    # ------------------------------------------------------------------
+    # Tracking sent commands
+
+    def _new(self, command, timeout, success=(), failure=()):
+        pending = PendingCommand(command, self.loop.create_future(), success, failure)
+        # Nobody may await a fire-and-forget command; retrieve its exception
+        pending.future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        if timeout is not None:
+            pending.timer = self.loop.call_later(timeout, self._timeout, pending)
+        return pending
+
+    def track(self, command, timeout=None):
+        """Future for ``command`` just written, or None if it has no reply to wait for"""
+        for prefix in ("SETPOS", "STATE", "CALT", "CAL", "RPM", "BIN", "P", "Q"):
+            if command == prefix or (prefix not in ("P", "Q") and command.startswith(prefix)):
+                pending = self._new(command, timeout, *REPLIES[prefix])
+                self._requests.append(pending)
+                return pending.future
+        if is_move(command):
+            pending = self._new(command, timeout)
+            self._awaiting_ack.append(pending)
+            return pending.future
+        return None
+
+    def forget(self, future):
+        """Stop waiting for the reply behind ``future`` (the command was lost)"""
+        for container in (self._requests, self._awaiting_ack):
+            for pending in container:
+                if pending.future is future:
+                    container.remove(pending)
+                    if pending.timer is not None:
+                        pending.timer.cancel()
+                        pending.timer = None
+                    future.cancel()
+                    return True
+        return False
+
+    def withdraw(self, commands):
+        """Cancel moves that were dropped before they were written (newest tracked first)"""
+        for command in reversed(commands):
+            for pending in reversed(self._awaiting_ack):
+                if pending.command == command:
+                    self._awaiting_ack.remove(pending)
+                    self._settle(pending, exc=MotionCancelled(f"{command} verworfen"))
+                    break
+        self._notify_idle()
+
+    def fail_all(self, exc):
+        """Fail every pending command (connection lost)"""
+        pending = list(self._requests) + list(self._awaiting_ack) + list(self._queued)
+        pending += [p for p in (self._running, self._finished) if p not in (None, True)]
+        self._requests.clear()
+        self._awaiting_ack.clear()
+        self._queued.clear()
+        self._running = self._finished = None
+        for p in pending:
+            self._settle(p, exc=exc)
+        self._notify_idle()
+
+    def _timeout(self, pending):
+        pending.timer = None
+        for container in (self._requests, self._awaiting_ack, self._queued):
+            if pending in container:
+                container.remove(pending)
+        if self._running is pending:
+            self._running = None
+        if self._finished is pending:
+            self._finished = None
+        self._settle(pending, exc=TimeoutError(f"Keine Antwort auf {pending.command}"))
+        self._notify_idle()
+
+    def _settle(self, pending, result=None, exc=None):
+        if pending.timer is not None:
+            pending.timer.cancel()
+            pending.timer = None
+        if pending.future.done():
+            return
+        if exc is not None:
+            pending.future.set_exception(exc)
+        else:
+            pending.future.set_result(result)
+
+    def _notify_idle(self):
+        if self.pending_moves == 0:
+            waiters, self._idle_waiters = self._idle_waiters, []
+            for future in waiters:
+                if not future.done():
+                    future.set_result(None)
+
+    # ------------------------------------------------------------------
+    # Firmware events
+
+    def on_event(self, event):
+        """Feed every parsed firmware event in arrival order"""
+        kind = type(event)
+        if kind is PositionReport and self._finished is not None:
+            # Position line printed together with "Motor fertig"
+            finished, self._finished = self._finished, None
+            if finished is not True:
+                self._settle(finished, event.position)
+            self._notify_idle()
+            return
+        if kind is MotionStarted:
+            if self._awaiting_ack:
+                self._running = self._awaiting_ack.popleft()
+        elif kind is AlreadyOnChannel:
+            if self._awaiting_ack:
+                self._settle(self._awaiting_ack.popleft(), None)
+                self._notify_idle()
+        elif kind is InvalidChannel or kind is UnknownCommand:
+            if self._awaiting_ack and (kind is InvalidChannel or
+                                       self._awaiting_ack[0].command == event.command):
+                self._settle(self._awaiting_ack.popleft(), exc=CommandError(str(event)))
+                self._notify_idle()
+            elif kind is UnknownCommand:
+                self._resolve_request(event)
+        elif kind is CommandQueued:
+            if self._awaiting_ack:
+                self._queued.append(self._awaiting_ack.popleft())
+        elif kind is QueuedCommandStarted:
+            if self._queued:
+                self._awaiting_ack.appendleft(self._queued.popleft())
+        elif kind is MotionFinished:
+            # After S the stopped move has already been cancelled
+            self._finished = self._running if self._running is not None else True
+            self._running = None
+        elif kind is MotionStopped:
+            cancelled = ([self._running] if self._running else []) + list(self._queued)
+            self._running = None
+            self._queued.clear()
+            for pending in cancelled:
+                self._settle(pending, exc=MotionCancelled(f"{pending.command} abgebrochen"))
+            self._notify_idle()
+        else:
+            self._resolve_request(event)
+
+    def _resolve_request(self, event):
+        kind = type(event)
+        for pending in self._requests:
+            if kind in pending.success or kind in pending.failure:
+                self._requests.remove(pending)
+                if kind in pending.success:
+                    self._settle(pending, event.position if kind in (PositionReport, PositionSet) else event)
+                else:
+                    self._settle(pending, exc=CommandError(str(event)))
+                return
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Antenna Configuration
+=====================
+Persistent calibration and state of one antenna (``antenna_config.json``)
+with the precomputed channel <-> motor position index.
+
+The calibration is channel 41 and channel 40 plus any number of further
+points ``calibration_points`` ([channel, position]); with points the index
+is a ``calibration_table.CalibrationTable`` interpolated through all of
+them, which is also what the firmware gets instead of ``CAL``.
+"""
+
+import json
+import os
+import atexit
+import tempfile
+import threading
+import time
+import weakref
+
+from calibration_table import CalibrationTable, FREQUENCY_POSITIONS, METHODS
+
+
+# Configurations with a pending write-behind save, flushed at interpreter exit
+_pending_configurations = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_pending_configurations():
+    for configuration in list(_pending_configurations):
+        configuration.flush()
+
+
+class Configuration:
+    """Configuration management for the antenna controller
+    
+    Saving is write-behind: save_config() only schedules a write, and a burst
+    of saves is merged into one atomic write after save_delay seconds of
+    quiet (or at flush()/close()). A steady stream of saves is written at the
+    latest max_save_delay seconds after its first save. Use save_delay=0 for
+    synchronous writes.
+    """
+    
+    def __init__(self, config_file="antenna_config.json", save_delay=0.5, max_save_delay=5.0):
+        self.config_file = config_file
+        self.save_delay = save_delay
+        self.max_save_delay = max_save_delay
+        self.config = {
+            "channel_41_position": 0,  # Base position offset to match Arduino behavior
+            "channel_40_position": 2400,  # Highest frequency position (channel 40)
+            "current_channel": 41,  # Current channel position
+            "current_position": 0,  # Current motor position
+            "last_port": "",  # Last used serial port
+            "last_rpm": 12,  # Last used RPM setting
+            "log_max_lines": 2000,  # Maximum scrollback of the log widget
+            "rigctl_port": 0,  # TCP port of the rigctld server (0 = off)
+            "framed_baudrate": 0,  # Baud rate of the framed binary protocol (0 = text protocol)
+            "known_controllers": [],  # USB identities "VID:PID:SERIAL" of controllers, most recent first
+            "probe_exclude": [],  # Ports never probed when searching the controller (device paths or "VID:PID")
+            "auto_reconnect": True,  # Reconnect automatically after the port was lost
+            "motion_timing": {"overhead": 0.0, "scale": 1.0},  # Fitted move durations (see motion_model)
+            "telemetry_dir": "",  # Directory of the telemetry recordings (empty = off)
+            "calibration_points": [],  # Further calibration points [channel, position] between channel 41 and 40
+            "calibration_interpolation": "spline",  # Between the calibration points: "spline" (monotone) or "linear"
+            "resonance_meter_port": ""  # Serial port of the resonance meter for the band sweep (empty = none)
+        }
+        
+        # Arduino channel to frequency position mapping (CB Funk Frequenz-Reihenfolge)
+        # Dies ist die Reihenfolge der Kanäle nach Frequenz (niedrigste zu höchste)
+        # Index = Frequenz-Position (0 = niedrigste Frequenz, 79 = höchste Frequenz)
+        # Wert = Kanal-Nummer
+        self.frequency_order_channels = [
+            41, 42, 43, 44, 45, 46, 47, 48, 49, 50,  # Frequenz-Positionen 0-9: Kanäle 41-50
+            51, 52, 53, 54, 55, 56, 57, 58, 59, 60,  # Frequenz-Positionen 10-19: Kanäle 51-60
+            61, 62, 63, 64, 65, 66, 67, 68, 69, 70,  # Frequenz-Positionen 20-29: Kanäle 61-70
+            71, 72, 73, 74, 75, 76, 77, 78, 79, 80,  # Frequenz-Positionen 30-39: Kanäle 71-80
+            1, 2, 3, 4, 5, 6, 7, 8, 9, 10,          # Frequenz-Positionen 40-49: Kanäle 1-10
+            11, 12, 13, 14, 15, 16, 17, 18, 19, 20,  # Frequenz-Positionen 50-59: Kanäle 11-20
+            21, 22, 23, 24, 25, 26, 27, 28, 29, 30,  # Frequenz-Positionen 60-69: Kanäle 21-30
+            31, 32, 33, 34, 35, 36, 37, 38, 39, 40   # Frequenz-Positionen 70-79: Kanäle 31-40
+        ]
+        
+        # Write-behind state
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._save_wakeup = threading.Condition(self._lock)
+        self._saver = None  # Thread writing the pending burst
+        self._save_pending = False
+        self._first_save = self._last_save = 0.0  # time.monotonic() of the pending burst
+        self.writes = 0  # Number of times the file was actually written
+        self.writes_avoided = 0  # Save requests merged into another write
+        
+        self.load_config()
+    
+    def load_config(self):
+        """Load configuration from file"""
+        try:
+            if os.path.exists(self.config_file):
+                with open(self.config_file, 'r') as f:
+                    saved_config = json.load(f)
+                    self.config.update(saved_config)
+        except Exception as e:
+            print(f"Error loading config: {e}")
+        self._rebuild_channel_index()
+    
+    def save_config(self):
+        """Request a save; bursts of requests are merged into one write"""
+        with self._lock:
+            now = time.monotonic()
+            if self._save_pending:
+                self.writes_avoided += 1
+            else:
+                self._first_save = now
+            self._save_pending = True
+            self._last_save = now  # Restarts the quiet period
+            if self.save_delay > 0:
+                if self._saver is None:
+                    self._saver = threading.Thread(target=self._save_later, name="config-saver", daemon=True)
+                    self._saver.start()
+                _pending_configurations.add(self)
+                return
+        self.flush()
+    
+    def _save_later(self):
+        """Saver thread: write after the quiet period or the maximum delay, until nothing is pending"""
+        while True:
+            with self._lock:
+                while self._save_pending:
+                    delay = min(self._last_save + self.save_delay,
+                                self._first_save + self.max_save_delay) - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._save_wakeup.wait(delay)
+                if not self._save_pending:
+                    self._saver = None
+                    return
+            self.flush()
+    
+    def flush(self):
+        """Write a pending save to disk now"""
+        with self._write_lock:
+            with self._lock:
+                self._save_wakeup.notify_all()  # The saver thread ends
+                if not self._save_pending:
+                    return
+                self._save_pending = False
+                _pending_configurations.discard(self)
+                data = json.dumps(self.config, indent=2)
+            # The slow part (fsync) runs without blocking set()/get()
+            try:
+                self._write_atomic(data)
+                self.writes += 1
+            except Exception as e:
+                print(f"Error saving config: {e}")
+    
+    def close(self):
+        """Flush pending changes (call at shutdown)"""
+        self.flush()
+    
+    def _write_atomic(self, data):
+        """Write to a temp file, fsync and rename over the config file"""
+        directory = os.path.dirname(os.path.abspath(self.config_file))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".antenna_config.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.config_file)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        # Persist the rename itself
+        if hasattr(os, "O_DIRECTORY"):
+            dir_fd = os.open(directory, os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+    
+    def get(self, key, default=None):
+        """Get configuration value"""
+        return self.config.get(key, default)
+    
+    # Keys whose change invalidates the precomputed channel index
+    CALIBRATION_KEYS = ("channel_41_position", "channel_40_position",
+                        "calibration_points", "calibration_interpolation")
+    
+    def set(self, key, value):
+        """Set configuration value"""
+        with self._lock:
+            changed = self.config.get(key) != value
+            self.config[key] = value
+            if changed and key in self.CALIBRATION_KEYS:
+                self._rebuild_channel_index()
+    
+    def _rebuild_channel_index(self):
+        """Precompute channel lookups and calibration state
+        
+        Called once after loading and whenever a calibration position changes,
+        so the per-call conversions below are plain table lookups.
+        """
+        self._frequency_positions = {
+            channel: freq_pos for freq_pos, channel in enumerate(self.frequency_order_channels)
+        }
+        self._calibration_state = self._check_calibration()
+        self._table = None  # CalibrationTable if there are further calibration points
+        self._lookup = None
+        
+        valid, msg = self._calibration_state
+        if valid:
+            ch40_pos = self.config.get("channel_40_position", 0)
+            ch41_pos = self.config.get("channel_41_position", 0)
+            
+            # Kanal 41 ist bei Frequenz-Position 0 (niedrigste Frequenz, niedrigste Position)
+            # Kanal 40 ist bei Frequenz-Position 79 (höchste Frequenz, höchste Position)
+            # Der Unterschied ist 79 Frequenz-Positionen
+            frequency_positions_diff = 79  # Von Position 0 (Kanal 41) zu Position 79 (Kanal 40)
+            motor_positions_diff = ch40_pos - ch41_pos  # CH40 ist höher als CH41
+            self._steps_per_channel = motor_positions_diff / frequency_positions_diff
+            
+            points = self._frequency_points()
+            if len(points) > 2:
+                # Interpolated through all points, in whole steps like the firmware table
+                table = CalibrationTable.from_points(points, self.config.get("calibration_interpolation", "spline"))
+                problem = table.problem()
+                if problem:
+                    self._calibration_state = (False, problem)
+                else:
+                    self._table = self._lookup = table
+            else:
+                # Motorposition = Basis-Position + (Frequenz-Position * Schritte pro Kanal)
+                self._lookup = CalibrationTable([ch41_pos + freq_pos * self._steps_per_channel
+                                                 for freq_pos in range(FREQUENCY_POSITIONS)])
+        
+        if self._lookup is not None:
+            self._channel_positions = {
+                channel: self._lookup.position(freq_pos)
+                for channel, freq_pos in self._frequency_positions.items()
+            }
+        else:
+            self._steps_per_channel = 30.0  # Fallback-Wert
+            self._channel_positions = {}
+    
+    def _frequency_points(self):
+        """Calibration points as (frequency position, position), channel 41 and 40 included"""
+        points = [(0, self.config.get("channel_41_position", 0)),
+                  (79, self.config.get("channel_40_position", 0))]
+        points += [(self._frequency_positions[channel], position)
+                   for channel, position in self.config.get("calibration_points", [])]
+        return sorted(points)
+    
+    def get_channel_frequency_position(self, channel):
+        """Gibt die Frequenz-Position für einen Kanal zurück (0-79)"""
+        return self._frequency_positions.get(channel)
+    
+    def get_channel_from_frequency_position(self, freq_pos):
+        """Gibt den Kanal für eine Frequenz-Position zurück"""
+        if 0 <= freq_pos < len(self.frequency_order_channels):
+            return self.frequency_order_channels[freq_pos]
+        return None
+    
+    def is_calibration_valid(self):
+        """Prüft ob die Kalibrierung gültig ist"""
+        return self._calibration_state
+    
+    def _check_calibration(self):
+        """Validate the calibration positions (see is_calibration_valid)"""
+        ch40_pos = self.config.get("channel_40_position", -1)
+        ch41_pos = self.config.get("channel_41_position", -1)
+        
+        # Kalibrierung muss vorliegen
+        if ch40_pos < 0 or ch41_pos < 0:
+            return False, "Kalibrierung fehlt: Beide Kanäle müssen kalibriert werden"
+        
+        # Positionen müssen in gültigen Bereichen sein
+        if not (0 <= ch40_pos <= 4075) or not (0 <= ch41_pos <= 4075):
+            return False, "Kalibrierung ungültig: Positionen müssen zwischen 0 und 4075 liegen"
+        
+        # Kanal 40 muss höher als Kanal 41 sein (höchste Frequenz = höchste Position)
+        if ch40_pos <= ch41_pos:
+            return False, "Kalibrierung ungültig: Kanal 40 (höchste Freq.) muss höhere Position als Kanal 41 (niedrigste Freq.) haben"
+        
+        # Weitere Stützpunkte: ein Punkt je Kanal, Position steigt mit der Frequenz
+        points = self.config.get("calibration_points", [])
+        if not points:
+            return True, "Kalibrierung gültig"
+        if self.config.get("calibration_interpolation", "spline") not in METHODS:
+            return False, "Kalibrierung ungültig: Interpolation muss \"spline\" oder \"linear\" sein"
+        channels = set()
+        for point in points:
+            if (not isinstance(point, (list, tuple)) or len(point) != 2
+                    or not all(isinstance(value, int) for value in point)):
+                return False, f"Kalibrierung ungültig: Stützpunkt {point} ist nicht [Kanal, Position]"
+            channel, position = point
+            if channel not in self._frequency_positions or channel in (40, 41) or channel in channels:
+                return False, f"Kalibrierung ungültig: Stützpunkt für Kanal {channel} ungültig oder doppelt"
+            if not 0 <= position <= 4075:
+                return False, "Kalibrierung ungültig: Positionen müssen zwischen 0 und 4075 liegen"
+            channels.add(channel)
+        order = self._frequency_points()
+        for (_, lower), (freq_pos, position) in zip(order, order[1:]):
+            if position <= lower:
+                channel = self.frequency_order_channels[freq_pos]
+                return False, f"Kalibrierung ungültig: Position von Kanal {channel} muss höher sein als die des Kanals darunter"
+        
+        return True, f"Kalibrierung gültig ({len(points)} Stützpunkte)"
+    
+    def get_calibration_points(self):
+        """Further calibration points as (channel, position), lowest frequency first"""
+        points = self.config.get("calibration_points", [])
+        return sorted(((channel, position) for channel, position in points),
+                      key=lambda point: self._frequency_positions.get(point[0], 0))
+    
+    def add_calibration_point(self, channel, position):
+        """Store ``position`` for ``channel`` (41 and 40 set the base calibration)"""
+        if channel == 41:
+            self.set("channel_41_position", position)
+        elif channel == 40:
+            self.set("channel_40_position", position)
+        else:
+            # A new list, so set() sees the change
+            points = [[c, p] for c, p in self.config.get("calibration_points", []) if c != channel]
+            self.set("calibration_points", points + [[channel, position]])
+    
+    def remove_calibration_point(self, channel):
+        self.set("calibration_points", [[c, p] for c, p in self.config.get("calibration_points", [])
+                                        if c != channel])
+    
+    def calibration_table(self):
+        """CalibrationTable for the firmware, or None (two-point calibration or invalid)"""
+        return self._table
+    
+    def get_steps_per_channel(self):
+        """Berechnet Schritte pro Kanal aus der Kalibrierung"""
+        return self._steps_per_channel
+    
+    def calculate_channel_position(self, channel):
+        """Calculate motor position for a given channel using calibration"""
+        # None for invalid calibration or channels outside 1-80
+        return self._channel_positions.get(channel)
+    
+    def calculate_channel_from_position(self, position):
+        """Calculate channel number from motor position using calibration"""
+        # Prüfe Kalibrierung
+        if self._lookup is None:
+            return 41  # Fallback zu Kanal 41
+        
+        # Nächste Frequenz-Position (0-79) per Bisektion in der Tabelle
+        freq_pos = self._lookup.frequency_position(position)
+        
+        # Finde Kanal für diese Frequenz-Position
+        return self.frequency_order_channels[freq_pos]
+    
+    def get_calculated_steps_per_channel(self):
+        """Get steps per channel - calculated from calibration positions for display only"""
+        return self.get_steps_per_channel()
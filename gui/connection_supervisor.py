@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Connection Supervisor
+=====================
+Brings the connection of an ``AntennaControllerCore`` back after the port
+was lost (USB cable glitch, board re-enumerated, power cycle).
+
+The core reports a lost port as soon as a read or write fails; on Linux
+an unplugged USB serial device makes the port readable and the read
+raise at once. The supervisor then waits for the device to come back:
+
+    - the directory of the device node (``/dev``, or the directory of a
+      simulator link) is watched with inotify, so a replugged board is
+      tried the moment its node appears or udev changes its permissions
+    - the device is looked up by its USB identity first (it may come back
+      as ttyACM1), then by its old path
+    - attempts are repeated with exponential backoff (``BACKOFF_INITIAL``
+      doubling up to ``BACKOFF_MAX``), which is also the polling interval
+      where inotify is not available
+
+After the reconnect the core's ``sync_state`` restores calibration and
+position (only what differs on a board that kept running). Outages and
+reconnect times are counted and published as ``ConnectionRestored``.
+
+A disconnect or connect requested by the operator ends a reconnect in
+progress; ``auto_reconnect`` in the configuration turns the supervisor off.
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import os
+from dataclasses import dataclass
+
+from port_discovery import list_ports
+
+
+@dataclass(frozen=True, slots=True)
+class ConnectionLost:
+    """The port failed while connected"""
+    port: str
+    error: str
+
+
+@dataclass(frozen=True, slots=True)
+class ConnectionRestored:
+    """The supervisor reconnected and the firmware state was restored"""
+    port: str
+    seconds: float  # port lost -> state restored
+    attempts: int
+    outages: int  # outages since the start
+
+
+class DeviceWatcher:
+    """Wakes up when entries of ``directory`` appear or change (inotify)
+
+    Without inotify (not Linux, no libc) ``wait`` just sleeps for its timeout.
+    """
+
+    IN_ATTRIB = 0x004  # udev changes owner/mode after the node was created
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+
+    def __init__(self, directory, loop):
+        self._loop = loop
+        self._changed = asyncio.Event()
+        self._fd = None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return
+        if fd < 0:
+            return
+        mask = self.IN_ATTRIB | self.IN_MOVED_TO | self.IN_CREATE
+        if libc.inotify_add_watch(fd, os.fsencode(directory or "."), mask) < 0:
+            os.close(fd)
+            return
+        self._fd = fd
+        loop.add_reader(fd, self._on_event)
+
+    @property
+    def active(self):
+        return self._fd is not None
+
+    def _on_event(self):
+        try:
+            os.read(self._fd, 4096)
+        except OSError:
+            pass
+        self._changed.set()
+
+    async def wait(self, timeout):
+        """Wait until something changed in the directory, at most ``timeout`` seconds"""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._changed.clear()
+
+    def close(self):
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ConnectionSupervisor:
+    """Reconnects one ``AntennaControllerCore`` after its port was lost"""
+
+    BACKOFF_INITIAL = 0.1
+    BACKOFF_MAX = 5.0
+
+    def __init__(self, core):
+        self.core = core
+        self._task = None
+
+        # Statistics
+        self.outages = 0  # ports lost while connected
+        self.reconnects = 0  # outages ended by the supervisor
+        self.reconnect_times = []  # seconds from port lost to state restored
+        self.attempts = 0  # connect attempts
+
+    @property
+    def enabled(self):
+        return self.core.config.get("auto_reconnect", True)
+
+    @property
+    def reconnecting(self):
+        return self._task is not None and not self._task.done()
+
+    def connection_lost(self, port, error, moving):
+        """Called by the core after it closed a failed port"""
+        self.outages += 1
+        self.core.publish(ConnectionLost(port, str(error)))
+        if not self.enabled or port is None:
+            return
+        self.core.log(f"Verbindung zu {port} verloren - warte auf das Gerät")
+        loop = asyncio.get_running_loop()
+        self._task = self.core._spawn(self._reconnect(port, loop.time(), moving))
+
+    def cancel(self):
+        """Stop reconnecting (operator disconnected or connects by hand)
+
+        No-op inside the reconnect itself (``connect`` may reopen the port).
+        """
+        if not self.reconnecting or self._task is asyncio.current_task():
+            return
+        self._task.cancel()
+        self._task = None
+
+    def _resolve(self, port):
+        """Current device of the lost controller, or None while it is gone"""
+        key = self.core.device_key
+        if key is not None:
+            for info in list_ports():
+                if info.key == key:
+                    return info.device
+        return port if os.path.exists(port) else None
+
+    async def _reconnect(self, port, lost_at, moving):
+        core = self.core
+        loop = asyncio.get_running_loop()
+        backoff = self.BACKOFF_INITIAL
+        attempts = 0
+        with DeviceWatcher(os.path.dirname(port), loop) as watcher:
+            while True:
+                device = self._resolve(port)
+                if device is not None:
+                    attempts += 1
+                    self.attempts += 1
+                    if await core.connect(device):
+                        break
+                await watcher.wait(backoff)
+                backoff = min(backoff * 2, self.BACKOFF_MAX)
+
+        # Calibration and position (sync_state, started by connect)
+        restored = await core.synced()
+        if moving:
+            # The move was interrupted somewhere between start and target
+            core.position_synced = False
+            core.publish_state()
+            core.log("⚠ Verbindung während der Fahrt verloren - Position prüfen")
+        seconds = loop.time() - lost_at
+        self.reconnects += 1
+        self.reconnect_times.append(seconds)
+        core.publish(ConnectionRestored(device, seconds, attempts, self.outages))
+        state = "wiederhergestellt" if restored else "nicht bestätigt"
+        core.log(f"Verbindung wiederhergestellt nach {seconds * 1000:.0f} ms "
+                 f"(Versuche: {attempts}, Zustand {state})")
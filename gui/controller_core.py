@@ -0,0 +1,1210 @@
+#!/usr/bin/env python3
+"""
+Antenna Controller Core
+=======================
+Headless asyncio core of the magnet loop controller. It owns the serial
+connection, the response parser, the ``Configuration`` and the motor
+state, and publishes everything that happens as events:
+
+    - the typed firmware events of ``response_parser``
+    - ``LogMessage``, ``Alert``, ``ConnectionChanged``, ``ConnectionReady``,
+      ``StateChanged``, ``CalibrationChanged`` and ``CommandSent`` defined here
+    - ``ConnectionLost`` and ``ConnectionRestored`` of ``connection_supervisor``
+
+Commands that have a firmware reply return an ``asyncio.Future`` (or None
+if the command was not sent) that ``command_tracker.CommandTracker``
+resolves when the reply arrives: moves with the final position after
+"Motor fertig", ``query_position`` with the reported position,
+``calibrate`` with the acknowledgement. Callers can pipeline commands and
+await them instead of sleeping.
+
+All methods must be called from the thread running the event loop.
+With ``framed_baudrate`` set (argument or configuration) the core
+negotiates the compact binary protocol of ``framed_protocol`` after
+connect and falls back to the text protocol if the firmware does not
+support it. Events are the same in both modes. A port that fails while
+connected is reopened by ``connection_supervisor.ConnectionSupervisor``
+as soon as the device is back.
+
+Commands are written by ``serial_writer.SerialWriter`` on its own thread,
+paced to the baud rate; STOP and P overtake queued commands, so a stalled
+port never blocks the event loop and STOP is not stuck behind moves.
+
+Frontends subscribe with ``subscribe(callback)``; callbacks run in the
+event loop and must not block; ``received_at`` holds the monotonic
+time at which the data behind the current event was read. The Tk GUI uses ``core_bridge.CoreBridge``
+to run the core in a background loop; a headless frontend just calls
+``asyncio.run()`` and needs no extra thread and no Tk.
+
+Usage:
+    async def main():
+        core = AntennaControllerCore()
+        core.subscribe(print)
+        await core.connect("/dev/ttyACM0")
+        await core.calibrate(0, 2370)
+        position = await core.move_to_channel(19)
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import serial
+
+from band_sweep import BandSweep, SerialResonanceMeter
+from calibration_table import FREQUENCY_POSITIONS, MAX_POSITION
+from command_tracker import CommandTracker, CommandError, is_move
+from configuration import Configuration
+from connection_supervisor import ConnectionSupervisor
+from framed_protocol import FrameDecoder, FrameEncoder, NAK, decode_frame
+from motion_coalescer import MotionCoalescer
+from motion_model import MotionModel, MotionPredicted
+from port_discovery import remember_controller
+from serial_reader import IncrementalLineDecoder
+from serial_writer import SerialWriter
+from response_parser import (
+    parse_response, PositionReport, PositionSet, MotionStarted, MotionFinished,
+    MotionStopped, AlreadyOnChannel, MotorStatus, CalibrationAck, CalibrationTableAck, FallbackWarning,
+    ProtocolSwitched, ControllerReady, RpmReport
+)
+
+
+@dataclass(frozen=True, slots=True)
+class LogMessage:
+    """Text for the operator log"""
+    text: str
+
+
+@dataclass(frozen=True, slots=True)
+class Alert:
+    """Something the operator must acknowledge (level: info, warning, error)"""
+    title: str
+    message: str
+    level: str = "warning"
+
+
+@dataclass(frozen=True, slots=True)
+class ConnectionChanged:
+    connected: bool
+    port: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class ConnectionReady:
+    """The firmware answered after connect: ready banner or ping reply (via "Banner"/"Ping")"""
+    port: str
+    seconds: float  # port opened -> ready
+    via: str
+
+
+@dataclass(frozen=True, slots=True)
+class StateChanged:
+    """Snapshot of the tracked controller state"""
+    channel: int
+    position: int
+    moving: bool
+    synced: bool
+
+
+@dataclass(frozen=True, slots=True)
+class CalibrationChanged:
+    channel_41_position: int
+    channel_40_position: int
+    steps_per_channel: float
+    valid: bool
+    message: str
+    points: tuple = ()  # further (channel, position) calibration points
+
+
+@dataclass(frozen=True, slots=True)
+class CommandSent:
+    command: str
+
+
+class AntennaControllerCore:
+    """Serial protocol, state tracking and commands of one antenna controller"""
+
+    # Readiness handshake after connect: banner or reply to a Q ping
+    READY_TIMEOUT = 5.0
+    READY_PING_INTERVAL = 0.5
+    # Delay of the position query after a move without prediction (after S);
+    # predicted moves are confirmed at their predicted end (see motion_model)
+    POSITION_QUERY_DELAY_MS = 500
+    # Timeouts of awaitable commands in seconds
+    REPLY_TIMEOUT = 2.0
+    MOVE_TIMEOUT = 60.0
+    # Outbound queue: a write blocked longer than WRITE_TIMEOUT means the port is dead
+    WRITE_TIMEOUT = 2.0
+    OUTBOUND_QUEUE_SIZE = 32
+    PRIORITY_COMMANDS = ("S", "P")  # written before queued commands
+    WRITE_PACING = True
+
+    def __init__(self, config=None):
+        self.config = config if config is not None else Configuration()
+
+        # Serial connection
+        self.serial_connection = None
+        self.port_name = None
+        self.device_key = None  # USB identity of the connected controller
+        self.is_connected = False
+        self._decoder = IncrementalLineDecoder()
+        self.received_at = None  # time.monotonic() the data being handled arrived
+        self.framed = False  # framed binary protocol negotiated
+        self._framed_ports = {}  # port -> baud rate of boards this core switched to frames
+        self.frames = FrameDecoder()
+        self._encoder = FrameEncoder()
+        self._loop = None
+        self._reader_fd = None
+        self._reader_task = None
+        self._writer = None  # SerialWriter of the open port
+        self._timers = []
+        self._tasks = set()
+        self._ready = None  # future of the readiness handshake
+        self._sync_task = None  # calibration sent after connect
+        self.ready_seconds = None  # connect -> ready of the last connection
+        self.commands = None  # CommandTracker, created with the event loop
+        self.motion = MotionCoalescer(self)  # merges channel and jog requests
+        self.supervisor = ConnectionSupervisor(self)  # reconnects after a lost port
+        self.timing = MotionModel(**self.config.get("motion_timing", {}))  # move durations
+        self.rpm = None  # last RPM reported by the firmware
+        self._move = None  # MotionPredicted of the running move
+        self._confirm_timer = None  # position query at the predicted end of the move
+        self._confirmation = None  # reply future of that query
+        self.confirm_early = True  # query at the predicted end, not after "Motor fertig" (off: band sweep)
+
+        # Motor status tracking
+        self.motor_is_moving = False
+        self.position_synced = True  # Track if position is synchronized
+
+        self._subscribers = []
+
+        # Commands, replies, position and channel changes (off without "telemetry_dir");
+        # imported here because the recorder imports the event types of this module
+        self.telemetry = None
+        if self.config.get("telemetry_dir", ""):
+            from telemetry import TelemetryRecorder
+            self.telemetry = TelemetryRecorder.create(self.config.get("telemetry_dir")).attach(self)
+
+        # Firmware event type -> handler (see response_parser)
+        self._response_handlers = {
+            PositionReport: self._on_position_report,
+            MotionStopped: self._on_motion_stopped,
+            MotionFinished: self._on_motion_finished,
+            MotionStarted: self._on_motion_started,
+            AlreadyOnChannel: self._on_already_on_channel,
+            MotorStatus: self._on_motor_status,
+            CalibrationAck: self._on_calibration_ack,
+            CalibrationTableAck: self._on_calibration_table_ack,
+            PositionSet: self._on_position_set,
+            FallbackWarning: self._on_fallback_warning,
+            ProtocolSwitched: self._on_protocol_switched,
+            ControllerReady: self._on_controller_ready,
+            RpmReport: self._on_rpm_report,
+        }
+
+    # ------------------------------------------------------------------
+    # Events
+
+    def subscribe(self, callback):
+        """Call ``callback(event)`` for every published event; returns an unsubscribe function"""
+        self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback)
+
+    def publish(self, event):
+        for callback in list(self._subscribers):
+            callback(event)
+
+    def log(self, message):
+        self.publish(LogMessage(message))
+
+    def alert(self, title, message, level="warning"):
+        self.publish(Alert(title, message, level))
+
+    def state(self):
+        return StateChanged(channel=self.config.get("current_channel", 41),
+                            position=self.config.get("current_position", 0),
+                            moving=self.motor_is_moving,
+                            synced=self.position_synced)
+
+    def publish_state(self):
+        self.publish(self.state())
+
+    def calibration(self):
+        valid, msg = self.config.is_calibration_valid()
+        return CalibrationChanged(channel_41_position=self.config.get("channel_41_position", 0),
+                                  channel_40_position=self.config.get("channel_40_position", 2400),
+                                  steps_per_channel=self.config.get_calculated_steps_per_channel(),
+                                  valid=valid, message=msg,
+                                  points=tuple(map(tuple, self.config.get_calibration_points())))
+
+    def publish_calibration(self):
+        self.publish(self.calibration())
+
+    def _set_moving(self, moving):
+        self.motor_is_moving = moving
+        self.publish_state()
+
+    # ------------------------------------------------------------------
+    # Connection
+
+    async def connect(self, port_name, baudrate=9600, framed_baudrate=None):
+        """Open ``port_name``; calibration is sent as soon as the board is ready
+
+        Returns True once the firmware answered (see ``wait_ready``), without
+        a fixed boot delay, and False if the port could not be opened or
+        nothing answered within ``READY_TIMEOUT`` (the port is closed again).
+
+        ``framed_baudrate`` (default: configuration ``framed_baudrate``, 0 = off)
+        switches to the framed binary protocol at that baud rate.
+        """
+        if framed_baudrate is None:
+            framed_baudrate = self.config.get("framed_baudrate", 0)
+        self.supervisor.cancel()
+        loop = self._loop = asyncio.get_running_loop()
+        if self.commands is None:
+            self.commands = CommandTracker(loop)
+        try:
+            # Non-blocking reads, data is read when the event loop reports it;
+            # writes block the writer thread at most WRITE_TIMEOUT
+            self.serial_connection = serial.Serial(port=port_name, baudrate=baudrate, timeout=0,
+                                                   write_timeout=self.WRITE_TIMEOUT)
+        except Exception as e:
+            if not self.supervisor.reconnecting:
+                self.alert("Verbindungsfehler", f"Fehler beim Verbinden: {str(e)}", "error")
+            self.log(f"Verbindungsfehler: {str(e)}")
+            return False
+
+        opened = loop.time()
+        self.port_name = port_name
+        self.is_connected = True
+        self._decoder.reset()
+        self._start_reading(loop)
+        self._start_writing(loop)
+
+        # Wait for Arduino to initialize. A board that keeps running over
+        # reconnects may still exchange frames: try them first if this core
+        # switched the port before, and after text got no answer
+        resume = self._framed_ports.get(port_name) or framed_baudrate
+        framed_first = port_name in self._framed_ports
+        via = await self._resume_framing(resume) if framed_first else None
+        if via is None and self.is_connected:
+            via = await self.wait_ready()
+        if via is None and self.is_connected and resume and not framed_first:
+            via = await self._resume_framing(resume)
+        if not self.is_connected:
+            return False  # disconnected meanwhile
+        if via is None:
+            # A silent or foreign device: close the port without announcing a connection
+            message = f"Keine Antwort vom Arduino nach {self.READY_TIMEOUT:.0f} s"
+            if not self.supervisor.reconnecting:
+                self.alert("Verbindungsfehler", f"{message} ({port_name})", "error")
+            self.log(f"⚠ {message}")
+            self.is_connected = False
+            self.disconnect()
+            return False
+        self.ready_seconds = loop.time() - opened
+        self.publish(ConnectionReady(port_name, self.ready_seconds, via))
+        self.log(f"Arduino bereit nach {self.ready_seconds * 1000:.0f} ms ({via})")
+        # Found again by its USB identity on the next start (see port_discovery)
+        self.device_key = remember_controller(self.config, port_name)
+        if self.device_key:
+            self.config.save_config()
+
+        if framed_baudrate and not self.framed:
+            try:
+                await self.negotiate_framing(framed_baudrate)
+            except ConnectionError as e:
+                if not self.is_connected:
+                    return False  # disconnected meanwhile
+                # The board is stuck in binary mode; reopening the port resets most boards
+                self.log(f"{e} - verbinde neu mit Textprotokoll")
+                self.disconnect()
+                return await self.connect(port_name, baudrate, framed_baudrate=0)
+            if not self.is_connected:
+                return False
+        self.publish(ConnectionChanged(True, port_name))
+        self.log(f"Verbunden mit {port_name}")
+
+        # Send calibration and position to Arduino after successful connection
+        self._sync_task = self._spawn(self.sync_state())
+        return True
+
+    async def wait_ready(self, timeout=None):
+        """Wait until the firmware answers after the port was opened
+
+        Boards that reset on open print the ready banner after booting;
+        boards that keep running answer a ``Q`` ping, which is repeated
+        every ``READY_PING_INTERVAL`` (pings sent while the bootloader runs
+        are lost). Returns "Banner" or "Ping", or None after ``timeout``
+        (default ``READY_TIMEOUT``) or a disconnect.
+        """
+        loop = self._loop
+        ready = self._ready = loop.create_future()
+        deadline = loop.time() + (timeout or self.READY_TIMEOUT)
+        ping = None
+        try:
+            while not ready.done():
+                remaining = deadline - loop.time()
+                if remaining <= 0 or not self.is_connected:
+                    return None
+                ping = self.request("Q", min(self.READY_PING_INTERVAL, remaining))
+                if ping is None:
+                    return None
+                await asyncio.wait([ready, ping], return_when=asyncio.FIRST_COMPLETED)
+                if not ready.done() and ping.done() and ping.exception() is None:
+                    ready.set_result("Ping")
+            return ready.result()
+        finally:
+            self._ready = None
+            if not ready.done():
+                ready.cancel()
+            if ping is not None and not ping.done():
+                # Sent while the board booted; its reply would answer a later Q
+                self.commands.forget(ping)
+
+    async def _resume_framing(self, baudrate):
+        """Framed ``Q`` at ``baudrate`` to a board left in binary mode; "Binärprotokoll" or None"""
+        text_baudrate = self.serial_connection.baudrate
+        self._use_framing(baudrate)
+        status = self.request("Q", self.REPLY_TIMEOUT)
+        try:
+            if status is not None:
+                await status
+                self.log(f"✓ Arduino noch im Binärprotokoll ({baudrate} Baud)")
+                return "Binärprotokoll"
+        except (CommandError, TimeoutError, ConnectionError):
+            pass
+        self._framed_ports.pop(self.port_name, None)
+        if self.is_connected:
+            self.serial_connection.baudrate = text_baudrate
+            self.framed = False
+            self._decoder.reset()
+        return None
+
+    async def synced(self):
+        """Wait for the calibration sent after connect; True if it was acknowledged"""
+        if self._sync_task is None:
+            return False
+        return await asyncio.shield(self._sync_task)
+
+    def disconnect(self):
+        """Close the serial port"""
+        was_connected = self.is_connected
+        self.supervisor.cancel()
+        self._stop_reading()
+        for timer in self._timers:
+            timer.cancel()
+        self._timers.clear()
+        self._move = self._confirm_timer = self._confirmation = None
+        self.motion.cancel()
+        if self.commands is not None:
+            self.commands.fail_all(ConnectionError("Verbindung getrennt"))
+        if self._writer is not None:
+            self._writer.stop()
+            self._writer = None
+        if self.serial_connection:
+            self.serial_connection.close()
+            self.serial_connection = None
+        self.is_connected = False
+        self.framed = False
+        if was_connected:
+            self.publish(ConnectionChanged(False, self.port_name))
+            self.log("Verbindung getrennt")
+
+    def close(self):
+        """Disconnect and write pending configuration changes and telemetry"""
+        self.disconnect()
+        if self.telemetry is not None:
+            self.telemetry.close()
+        self.config.save_config()
+        self.config.close()
+
+    def _later(self, delay_ms, func):
+        timer = self._loop.call_later(delay_ms / 1000, func)
+        now = self._loop.time()
+        self._timers = [t for t in self._timers if not t.cancelled() and t.when() > now] + [timer]
+        return timer
+
+    def _spawn(self, coroutine):
+        task = self._loop.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _start_reading(self, loop):
+        try:
+            fd = self.serial_connection.fileno()
+            loop.add_reader(fd, self._on_readable)
+            self._reader_fd = fd
+        except (AttributeError, NotImplementedError):
+            # No selectable handle (Windows): blocking reads in the default executor
+            self._reader_task = loop.create_task(self._read_in_executor(loop))
+
+    def _start_writing(self, loop):
+        def on_error(error):
+            # Runs in the writer thread
+            loop.call_soon_threadsafe(self._write_failed, writer, error)
+        writer = SerialWriter(self.serial_connection, on_error, self.OUTBOUND_QUEUE_SIZE, self.WRITE_PACING)
+        self._writer = writer.start()
+
+    def _write_failed(self, writer, error):
+        if writer is self._writer:  # not the writer of an earlier connection
+            self._connection_lost(error, "Sendefehler")
+
+    def _stop_reading(self):
+        if self._reader_fd is not None:
+            self._loop.remove_reader(self._reader_fd)
+            self._reader_fd = None
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+
+    def _on_readable(self):
+        try:
+            # Raises SerialException when the device went away
+            data = self.serial_connection.read(self.serial_connection.in_waiting or 1)
+        except Exception as e:
+            self._connection_lost(e)
+            return
+        self._feed(data)
+
+    async def _read_in_executor(self, loop):
+        connection = self.serial_connection
+        connection.timeout = 0.1
+
+        def read_available():
+            # Wait for at least one byte, then take everything already buffered
+            data = connection.read(1)
+            if data and connection.in_waiting:
+                data += connection.read(connection.in_waiting)
+            return data
+
+        while self.serial_connection:
+            try:
+                data = await loop.run_in_executor(None, read_available)
+            except Exception as e:
+                self._connection_lost(e)
+                return
+            self._feed(data)
+
+    def _feed(self, data):
+        """Received bytes: frames once the binary protocol is active, text lines before
+
+        ``received_at`` is stamped once per read, so all lines and frames of a
+        chunk share it; handlers and subscribers read it while they run.
+        """
+        self.received_at = time.monotonic()
+        if self.framed:
+            for seq, frame_type, payload in self.frames.feed(data):
+                self.handle_frame(seq, frame_type, payload)
+            return
+        for line in self._decoder.feed(data):
+            # The firmware sends no frame before it received one, so the
+            # switch never happens in the middle of a chunk
+            self.handle_line(line)
+
+    def _connection_lost(self, error, kind="Lesefehler"):
+        """The port failed: close it and let the supervisor reconnect"""
+        if not self.is_connected:
+            return
+        port, moving = self.port_name, self.motor_is_moving
+        self.log(f"{kind}: {str(error)}")
+        self.disconnect()
+        self._set_moving(False)
+        self.supervisor.connection_lost(port, error, moving)
+
+    # ------------------------------------------------------------------
+    # Replies
+
+    def handle_line(self, line):
+        """Process one line received from the firmware"""
+        data = line.strip()
+        if not data:
+            return
+        self.log(f"Arduino: {data}")
+        try:
+            self._dispatch(parse_response(data), data)
+        except Exception as e:
+            self.log(f"Fehler beim Verarbeiten der Arduino-Antwort: {e}")
+
+    def handle_frame(self, seq, frame_type, payload):
+        """Process one frame received from the firmware (framed protocol)"""
+        if frame_type == NAK:
+            self._resend(payload[0] if payload else None)
+            return
+        for event, text in decode_frame(frame_type, payload):
+            self.log(f"Arduino: {text}")
+            try:
+                self._dispatch(event, text)
+            except Exception as e:
+                self.log(f"Fehler beim Verarbeiten der Arduino-Antwort: {e}")
+
+    def _dispatch(self, event, response):
+        if event is None:
+            return
+        handler = self._response_handlers.get(type(event))
+        if handler:
+            handler(event, response)
+        self.commands.on_event(event)
+        self.publish(event)
+
+    def _resend(self, seq):
+        """The firmware received a corrupted command frame"""
+        frame = self._encoder.resend(seq) if seq is not None else None
+        if frame is None:
+            self.log(f"⚠ Befehlsrahmen {seq} beschädigt und nicht mehr vorhanden")
+            return
+        self.log(f"⚠ Befehlsrahmen {seq} beschädigt, sende erneut")
+        self._writer.put(f"#{seq}", frame, priority=True)
+
+    def _on_position_report(self, event, response):
+        """Handle "Aktuelle Position: <n>" """
+        new_position = event.position
+        old_position = self.config.get("current_position", 0)
+
+        # Check for suspicious position jumps
+        position_diff = abs(new_position - old_position)
+        if position_diff > 4100 and old_position != 0:  # Larger than maximum possible range
+            self.log(f"⚠ WARNUNG: Verdächtiger Positionssprung von {old_position} zu {new_position} (Diff: {position_diff})")
+            self.alert("Position Anomalie",
+                f"Verdächtiger Positionssprung erkannt!\n"
+                f"Alt: {old_position} → Neu: {new_position}\n"
+                f"Differenz: {position_diff} Schritte\n\n"
+                f"Dies könnte auf ein Arduino-Problem hindeuten.\n"
+                f"Bitte Position manuell überprüfen!")
+            # Mark position as not synchronized
+            self.position_synced = False
+
+        self.config.set("current_position", new_position)
+
+        # Update current channel based on position
+        channel = self.config.calculate_channel_from_position(new_position)
+        if channel:
+            self.config.set("current_channel", channel)
+            # Save configuration to keep position and channel synchronized
+            self.config.save_config()
+        self.publish_state()
+
+        self.log(f"Position aktualisiert: {new_position} (Kanal {channel})")
+
+    def _on_motion_stopped(self, event, response):
+        """Handle "Motor angehalten" """
+        self._move = self._confirmation = None
+        self._cancel_confirmation()
+        self._set_moving(False)
+        self.log("✓ Motor gestoppt")
+
+    def _on_motion_finished(self, event, response):
+        """Handle "Motor fertig - Bewegung abgeschlossen" """
+        self._set_moving(False)
+        self.log("✓ Motor fertig - Bewegung abgeschlossen")
+        move, self._move = self._move, None
+        if move is not None:
+            self.timing.observe(move.steps, move.rpm, time.monotonic() - move.started)
+            self.config.set("motion_timing", self.timing.parameters())
+        confirmation, self._confirmation = self._confirmation, None
+        if (self._confirm_timer is not None or (confirmation is not None and confirmation.done())
+                or not self.confirm_early):
+            # Done before the predicted end, or the query was answered
+            # while the motor still ran (or not sent): confirm now
+            self._cancel_confirmation()
+            self.query_position()
+        elif move is None:
+            # Request position update after movement completes
+            self._later(self.POSITION_QUERY_DELAY_MS, self.query_position)
+
+    def _on_motion_started(self, event, response):
+        """Handle "Motor startet - Fahre ..." """
+        self.motor_is_moving = True
+        if event.channel is not None:
+            self.config.set("current_channel", event.channel)
+        self._predict_move(event.steps)
+        self.publish_state()
+        self.log("⚡ " + response)
+
+    def _predict_move(self, steps):
+        """Publish the expected duration and confirm the position at its end"""
+        rpm = self.rpm or self.config.get("last_rpm", 12)
+        self._move = MotionPredicted(abs(steps), rpm, self.timing.predict(steps, rpm), time.monotonic())
+        self._cancel_confirmation()
+        self._confirmation = None
+        if self.confirm_early:
+            self._confirm_timer = self._later(self._move.seconds * 1000, self._confirm_position)
+        self.publish(self._move)
+
+    def _confirm_position(self):
+        # Reaches the firmware as the move ends; answered right after "Motor fertig"
+        self._confirm_timer = None
+        self._confirmation = self.query_position()
+
+    def _cancel_confirmation(self):
+        if self._confirm_timer is not None:
+            self._confirm_timer.cancel()
+            self._confirm_timer = None
+
+    def _on_rpm_report(self, event, response):
+        """Handle "Drehzahl gesetzt auf: <n>" and the "Stepper RPM: <n>" banner line"""
+        self.rpm = event.rpm
+
+    def _on_already_on_channel(self, event, response):
+        """Handle "Bereits auf Kanal <n>" """
+        # Motor is not moving when already on target channel
+        self.motor_is_moving = False
+        self.config.set("current_channel", event.channel)
+        self.publish_state()
+        self.log("✓ " + response)
+
+    def _on_motor_status(self, event, response):
+        """Handle "Motor Status: Bereit|Beschäftigt" """
+        self._set_moving(event.busy)
+
+    def _on_calibration_ack(self, event, response):
+        """Handle "Kalibrierung empfangen: ..." """
+        self.log("✓ Arduino hat Kalibrierung empfangen")
+
+    def _on_calibration_table_ack(self, event, response):
+        """Handle "Kalibrierungstabelle empfangen: <n>/80" """
+        if event.positions == FREQUENCY_POSITIONS:
+            self.log("✓ Arduino hat Kalibrierungstabelle empfangen")
+
+    def _on_position_set(self, event, response):
+        """Handle "Position gesetzt auf: <n>" """
+        self.config.set("current_position", event.position)
+        self.publish_state()
+        self.log(f"✓ Arduino Position gesetzt: {event.position}")
+
+    def _on_controller_ready(self, event, response):
+        """Handle "Magnet Loop Antenna Controller Ready" """
+        if self._ready is not None and not self._ready.done():
+            self._ready.set_result("Banner")
+
+    def _on_protocol_switched(self, event, response):
+        """Handle "Binärprotokoll aktiv: <baud> Baud" """
+        # Switch before the next byte arrives: everything after the
+        # acknowledgement is framed and at the new baud rate
+        self._use_framing(event.baudrate)
+        self.log(f"✓ Binärprotokoll aktiv ({event.baudrate} Baud)")
+
+    def _use_framing(self, baudrate):
+        self.serial_connection.baudrate = baudrate
+        self.framed = True
+        self.frames.reset()
+        self._encoder = FrameEncoder()
+        self._framed_ports[self.port_name] = baudrate
+
+    def _on_fallback_warning(self, event, response):
+        """Handle "Warnung: Verwende Fallback-Berechnung" """
+        self.log("⚠ " + response)
+        self.alert("Arduino Warnung",
+            "Arduino verwendet Fallback-Berechnung!\n"
+            "Kalibrierung wurde nicht korrekt übertragen.\n"
+            "Bitte Verbindung neu aufbauen.")
+
+    # ------------------------------------------------------------------
+    # Commands
+
+    def send_command(self, command):
+        """Send command to Arduino"""
+        if not self.is_connected or not self.serial_connection:
+            self.alert("Warnung", "Nicht mit Arduino verbunden!")
+            return False
+
+        try:
+            if self.framed:
+                data = self._encoder.encode(command)
+            else:
+                data = f"{command}\n".encode('utf-8')
+        except Exception as e:
+            self.log(f"Sendefehler: {str(e)}")
+            return False
+        # Written by the writer thread; write errors end in _connection_lost
+        if not self._writer.put(command, data, priority=command in self.PRIORITY_COMMANDS):
+            if self._writer.running:
+                self.log(f"Sendepuffer voll ({self.OUTBOUND_QUEUE_SIZE} Befehle) - {command} nicht gesendet")
+            else:
+                self.log(f"Schreiben gestoppt - {command} nicht gesendet")
+            return False
+        self.publish(CommandSent(command))
+        self.log(f"Gesendet: {command}")
+        return True
+
+    def request(self, command, timeout=None):
+        """Send ``command``; returns a Future for its reply, or None if it was not sent"""
+        if not self.send_command(command):
+            return None
+        return self.commands.track(command, timeout)
+
+    async def negotiate_framing(self, baudrate):
+        """BIN<baudrate>: switch to the framed binary protocol
+
+        Returns True when frames are confirmed and False if the firmware
+        stays on the text protocol (old firmware, rejected baud rate).
+        Raises ConnectionError if the firmware switched but does not
+        answer frames; only a reset brings it back to text.
+
+        BIN is only sent to firmware that answers STATE: old firmware
+        takes BIN for a B move of 0 steps, does not answer it and queues
+        it as a move while the motor runs.
+        """
+        identified = self.query_state()
+        if identified is None:
+            return False
+        try:
+            await identified
+        except ConnectionError:
+            return False
+        except (CommandError, TimeoutError) as e:
+            self.log(f"Firmware ohne Binärprotokoll, verwende Textprotokoll: {e}")
+            return False
+
+        switched = self.request(f"BIN{baudrate}", self.REPLY_TIMEOUT)
+        if switched is None:
+            return False
+        try:
+            await switched
+        except ConnectionError:
+            return False
+        except (CommandError, TimeoutError) as e:
+            self.log(f"Binärprotokoll nicht verfügbar, verwende Textprotokoll: {e}")
+            return False
+
+        # First framed round trip
+        status = self.request("Q", self.REPLY_TIMEOUT)
+        try:
+            if status is not None:
+                await status
+                return True
+        except (CommandError, TimeoutError):
+            pass
+        raise ConnectionError("Binärprotokoll nicht bestätigt")
+
+    def move_to_channel(self, channel, timeout=None):
+        """CH<channel>; resolves to the final position (None if already there)"""
+        return self.request(f"CH{channel}", timeout or self.MOVE_TIMEOUT)
+
+    def query_position(self, timeout=None):
+        """P; resolves to the position reported by the firmware"""
+        return self.request("P", timeout or self.REPLY_TIMEOUT)
+
+    def calibrate(self, ch41_pos, ch40_pos, timeout=None):
+        """CAL; resolves to the CalibrationAck, raises CommandError if rejected"""
+        return self.request(f"CAL{ch41_pos},{ch40_pos}", timeout or self.REPLY_TIMEOUT)
+
+    def calibrate_table(self, table, timeout=None):
+        """CALT segments of a CalibrationTable; list of futures (None if one was not sent)
+
+        The segments are pipelined; each resolves to its CalibrationTableAck
+        and raises CommandError if the firmware rejected it.
+        """
+        replies = []
+        for segment in table.segments():
+            reply = self.request(segment, timeout or self.REPLY_TIMEOUT)
+            if reply is None:
+                for sent in replies:
+                    sent.cancel()
+                return None
+            replies.append(reply)
+        return replies
+
+    def set_position(self, position, timeout=None):
+        """SETPOS; resolves to the position the firmware set"""
+        return self.request(f"SETPOS{position}", timeout or self.REPLY_TIMEOUT)
+
+    def query_state(self, timeout=None):
+        """STATE; resolves to the FirmwareState, raises CommandError on firmware without STATE"""
+        return self.request("STATE", timeout or self.REPLY_TIMEOUT)
+
+    @property
+    def firmware_queue_depth(self):
+        """Moves waiting in the firmware moveQueue (client-side model)"""
+        return self.commands.queue_depth if self.commands else 0
+
+    @property
+    def pending_moves(self):
+        """Moves sent and not yet complete"""
+        return self.commands.pending_moves if self.commands else 0
+
+    def idle(self):
+        """Future resolving when all sent moves are complete"""
+        return self.commands.idle()
+
+    def _check_channel_navigation(self):
+        """Common preconditions of change_channel and goto_channel"""
+        if not self.is_connected:
+            self.alert("Warnung", "Nicht mit Arduino verbunden!")
+            return False
+
+        # Prüfe Kalibrierung
+        valid, msg = self.config.is_calibration_valid()
+        if not valid:
+            self.alert("Kalibrierung ungültig", f"Kanalnavigation nicht möglich:\n{msg}", "error")
+            return False
+        return True
+
+    def change_channel(self, delta):
+        """Change channel by delta amount with wrap-around (cyclic)
+
+        While the motor moves, the change is merged into the pending goal
+        (see ``motion_coalescer``). Returns the Future of that goal, or None
+        if the change was refused.
+        """
+        if not self._check_channel_navigation():
+            return None
+        return self.motion.change_channel(delta)
+
+    def goto_channel(self, target_channel):
+        """Go directly to specified channel
+
+        Returns the Future of the (merged) goal, or None if the command was refused.
+        """
+        if target_channel < 1 or target_channel > 80:
+            self.alert("Fehler", "Kanal muss zwischen 1 und 80 liegen!", "error")
+            return None
+
+        if not self._check_channel_navigation():
+            return None
+        return self.motion.goto_channel(target_channel)
+
+    def jog_steps(self, steps, forward=True):
+        """Relative move merged with other pending jogs into one net move
+
+        Returns the Future of the merged move, or None if not connected.
+        """
+        if steps <= 0:
+            raise ValueError("Anzahl Schritte muss positiv sein")
+        if not self.is_connected:
+            self.alert("Warnung", "Nicht mit Arduino verbunden!")
+            return None
+        return self.motion.step(steps if forward else -steps)
+
+    def start_channel_move(self, channel):
+        """Send CH<channel> now and track it as the current channel (used by the coalescer)"""
+        move = self.move_to_channel(channel)
+        if move is None:
+            return None
+
+        # Update local tracking, set motor as moving
+        self.config.set("current_channel", channel)
+        self._set_moving(True)
+
+        self.log(f"Befehl gesendet: Gehe zu Kanal {channel}")
+        return move
+
+    def move_steps(self, steps, forward=True, timeout=None):
+        """Move stepper motor by specified steps; resolves to the final position"""
+        if steps <= 0:
+            raise ValueError("Anzahl Schritte muss positiv sein")  # the firmware ignores it silently
+        move = self.request(f"F{steps}" if forward else f"B{steps}", timeout or self.MOVE_TIMEOUT)
+        if move is None:
+            return None
+
+        # Update estimated position
+        current_pos = self.config.get("current_position", 0)
+        self.config.set("current_position", current_pos + steps if forward else current_pos - steps)
+        self._set_moving(True)
+        return move
+
+    def stop_movement(self):
+        """Stop stepper movement and drop merged requests and moves that were not written yet"""
+        self.motion.cancel()
+        dropped = self._writer.drop(is_move) if self._writer is not None else []
+        self.send_command("S")  # overtakes everything still queued
+        if dropped:
+            self.commands.withdraw(dropped)
+            self.log(f"{len(dropped)} wartende Fahrbefehle verworfen: {', '.join(dropped)}")
+            self.query_position()  # the estimates of the dropped moves are wrong
+        self._set_moving(False)
+
+    def set_rpm(self, rpm):
+        """Set stepper RPM"""
+        if self.send_command(f"RPM{rpm}"):
+            self.config.set("last_rpm", rpm)
+            return True
+        return False
+
+    # ------------------------------------------------------------------
+    # Calibration
+
+    async def send_calibration(self):
+        """Send calibration and position to Arduino and wait for both replies"""
+        if not self.is_connected:
+            return False
+
+        # Check if we have valid calibration
+        valid, msg = self.config.is_calibration_valid()
+        if not valid:
+            self.log(f"Kalibrierung nicht gesendet: {msg}")
+            return False
+
+        current_pos = self.config.get("current_position", 0)
+
+        # All commands are pipelined, the firmware answers in order
+        calibration = self._send_calibration()
+        if calibration is None:
+            self.log("Fehler beim Senden der Kalibrierung an Arduino")
+            return False
+
+        # Set current position on Arduino
+        position = self.set_position(current_pos)
+        if position is None:
+            self.log("Fehler beim Senden der Position an Arduino")
+            return False
+        self.log(f"Position an Arduino gesendet: {current_pos}")
+
+        try:
+            await asyncio.gather(*calibration, position)
+        except (CommandError, TimeoutError, ConnectionError) as e:
+            self.log(f"Kalibrierung nicht bestätigt: {e}")
+            return False
+        self.position_synced = True
+        self.publish_state()
+        return True
+
+    async def sync_state(self):
+        """Bring the firmware in line with the configuration after connect
+
+        The firmware reports its calibration and position (STATE) and only
+        what differs is sent. A calibrated firmware was not reset since the
+        last session (warm reconnect, e.g. USB re-enumeration without DTR
+        reset): its position is newer than the cached one and is adopted
+        instead of overwritten. An uncalibrated firmware has just booted
+        and gets CAL and SETPOS, like firmware without STATE.
+        """
+        if not self.is_connected:
+            return False
+        query = self.query_state()
+        if query is None:
+            self.log("Arduino-Zustand nicht abgefragt")
+            return False
+        try:
+            state = await query
+        except CommandError:
+            return await self.send_calibration()
+        except (TimeoutError, ConnectionError) as e:
+            self.log(f"Arduino-Zustand nicht abgefragt: {e}")
+            return False
+        if not state.calibrated:
+            return await self.send_calibration()
+
+        replies = []
+        valid, msg = self.config.is_calibration_valid()
+        table = self.config.calibration_table()
+        if table is not None:
+            current = state.table == table.checksum()
+        else:
+            current = state.table is None and (state.channel_41_position, state.channel_40_position) == (
+                self.config.get("channel_41_position", 0), self.config.get("channel_40_position", 2400))
+        if not valid:
+            self.log(f"Kalibrierung nicht gesendet: {msg}")
+        elif not current:
+            replies = self._send_calibration()
+            if replies is None:
+                return False
+        else:
+            self.log("✓ Kalibrierung im Arduino ist aktuell")
+
+        cached = self.config.get("current_position", 0)
+        if state.position != cached:
+            self.config.set("current_position", state.position)
+            channel = self.config.calculate_channel_from_position(state.position)
+            if channel:
+                self.config.set("current_channel", channel)
+            self.config.save_config()
+            self.log(f"Position vom Arduino übernommen: {state.position} (gespeichert war {cached})")
+
+        try:
+            await asyncio.gather(*replies)
+        except (CommandError, TimeoutError, ConnectionError) as e:
+            self.log(f"Kalibrierung nicht bestätigt: {e}")
+            return False
+        self.position_synced = True
+        self.publish_state()
+        return True
+
+    def _send_calibration(self):
+        """CAL, or the CALT segments with further calibration points; list of futures (None on error)"""
+        table = self.config.calibration_table()
+        if table is not None:
+            replies = self.calibrate_table(table)
+            if replies is not None:
+                points = len(self.config.get_calibration_points())
+                self.log(f"Kalibrierungstabelle an Arduino gesendet: {points} Stützpunkte, "
+                         f"{len(replies)} Segmente")
+            return replies
+        ch41_pos = self.config.get("channel_41_position", 0)
+        ch40_pos = self.config.get("channel_40_position", 2400)
+        calibration = self.calibrate(ch41_pos, ch40_pos)
+        if calibration is None:
+            return None
+        self.log(f"Kalibrierung an Arduino gesendet: CH41={ch41_pos}, CH40={ch40_pos}")
+        return [calibration]
+
+    async def _resend_calibration(self):
+        """Send a changed calibration to a connected firmware"""
+        valid, msg = self.config.is_calibration_valid()
+        if not valid:
+            self.log(f"Kalibrierung nicht gesendet: {msg}")
+            return False
+        if not self.is_connected:
+            return True
+        replies = self._send_calibration()
+        if replies is None:
+            self.log("Fehler beim Senden der Kalibrierung an Arduino")
+            return False
+        try:
+            await asyncio.gather(*replies)
+        except (CommandError, TimeoutError, ConnectionError) as e:
+            self.log(f"Kalibrierung nicht bestätigt: {e}")
+            return False
+        return True
+
+    async def add_calibration_point(self, channel=None):
+        """Store the position reported by the firmware as calibration point of ``channel``
+
+        ``channel`` defaults to the current channel: move there, correct
+        the tuning with F/B and store the point, so the next move to the
+        channel needs no correction. The new table is sent right away.
+        """
+        if not self.is_connected:
+            self.alert("Warnung", "Nicht mit Arduino verbunden!")
+            return False
+        channel = channel or self.config.get("current_channel", 41)
+        reported = self.query_position()
+        if reported is None:
+            self.log("Position nicht abgefragt")
+            return False
+        try:
+            current_pos = await reported
+        except (TimeoutError, ConnectionError) as e:
+            self.log(f"Position nicht abgefragt: {e}")
+            return False
+        self.config.add_calibration_point(channel, current_pos)
+        self.config.save_config()
+        self.publish_calibration()
+        self.log(f"Stützpunkt gespeichert: Kanal {channel} auf Position {current_pos}")
+        return await self._resend_calibration()
+
+    async def remove_calibration_points(self, channel=None):
+        """Remove the calibration point of ``channel`` (all points without a channel)"""
+        if channel is None:
+            self.config.set("calibration_points", [])
+            self.log("Alle Stützpunkte gelöscht")
+        else:
+            self.config.remove_calibration_point(channel)
+            self.log(f"Stützpunkt von Kanal {channel} gelöscht")
+        self.config.save_config()
+        self.publish_calibration()
+        return await self._resend_calibration()
+
+    async def sweep_calibration(self, meter=None, start=0, end=MAX_POSITION):
+        """Calibrate all channels from one band sweep (see band_sweep.py); resolves to the SweepFinished
+
+        ``meter`` defaults to the resonance meter on ``resonance_meter_port``.
+        The result is stored as calibration and sent to the firmware.
+        """
+        if not self.is_connected:
+            self.alert("Warnung", "Nicht mit Arduino verbunden!")
+            return None
+        own_meter = meter is None
+        if own_meter:
+            port = self.config.get("resonance_meter_port", "")
+            if not port:
+                self.alert("Warnung", "Kein Resonanzmessgerät eingestellt (resonance_meter_port)")
+                return None
+            try:
+                meter = SerialResonanceMeter(port)
+            except serial.SerialException as e:
+                self.log(f"Resonanzmessgerät nicht geöffnet: {e}")
+                return None
+
+        self.log(f"Band-Sweep von Position {start} bis {end}...")
+        try:
+            result = await BandSweep(self, meter, start, end).run()
+        except (CommandError, TimeoutError, ConnectionError, ValueError, serial.SerialException) as e:
+            self.log(f"Band-Sweep abgebrochen: {e}")
+            return None
+        finally:
+            if own_meter:
+                meter.close()
+        self.publish(result)
+        self.log(f"Band-Sweep: {result.samples} Messungen in {result.seconds:.1f} s, "
+                 f"{result.steps} Schritte, {result.reversals} Richtungswechsel")
+        if result.problem:
+            self.log(f"Kalibrierung nicht übernommen: {result.problem}")
+            return result
+
+        first, *points, last = result.points
+        self.config.set("calibration_points", [list(point) for point in points])
+        self.config.add_calibration_point(*first)
+        self.config.add_calibration_point(*last)
+        self.config.save_config()
+        self.publish_calibration()
+        if result.skipped:
+            self.log(f"Nicht in Kanalreihenfolge, interpoliert: Kanal {', '.join(map(str, result.skipped))}")
+        await self._resend_calibration()
+        return result
+
+    async def set_calibration_point(self, key):
+        """Store the position reported by the firmware as ``channel_41_position`` or ``channel_40_position``"""
+        if not self.is_connected:
+            self.alert("Warnung", "Nicht mit Arduino verbunden!")
+            return False
+
+        # Get current position from Arduino and use the reply, not the cached value
+        reported = self.query_position()
+        if reported is None:
+            self.log("Position nicht abgefragt")
+            return False
+        try:
+            current_pos = await reported
+        except (TimeoutError, ConnectionError) as e:
+            self.log(f"Position nicht abgefragt: {e}")
+            return False
+        self.config.set(key, current_pos)
+        self.publish_calibration()
+
+        channel = 41 if key == "channel_41_position" else 40
+        self.log(f"Kanal {channel} Position auf {current_pos} gesetzt")
+        return True
+
+    def save_calibration(self, ch41_pos, ch40_pos):
+        """Store validated calibration positions"""
+        self.config.set("channel_41_position", ch41_pos)
+        self.config.set("channel_40_position", ch40_pos)
+        self.config.save_config()
+        self.publish_calibration()
+
+        calculated_steps = self.config.get_calculated_steps_per_channel()
+        self.log(f"Kalibrierung gespeichert: CH41={ch41_pos}, CH40={ch40_pos}, Schritte/Kanal={calculated_steps:.2f}")
+
+    async def sync_position(self):
+        """Synchronize position with Arduino"""
+        if not self.is_connected:
+            self.alert("Warnung", "Nicht mit Arduino verbunden!")
+            return False
+
+        # First send current position to Arduino
+        current_pos = self.config.get("current_position", 0)
+        position_set = self.set_position(current_pos)
+        if position_set is None:
+            self.log("Fehler beim Synchronisieren der Position")
+            return False
+        self.log(f"Position an Arduino gesendet: {current_pos}")
+
+        # Then request position from Arduino to verify
+        try:
+            await position_set
+            query = self.query_position()
+            if query is None:
+                self.log("Fehler beim Synchronisieren der Position")
+                return False
+            reported = await query
+        except (TimeoutError, ConnectionError) as e:
+            self.log(f"Fehler beim Synchronisieren der Position: {e}")
+            return False
+        self.position_synced = reported == current_pos
+        self.publish_state()
+        if self.position_synced:
+            self.log("Position mit Arduino synchronisiert")
+        return self.position_synced
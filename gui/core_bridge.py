@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Core Bridge
+===========
+Runs an ``AntennaControllerCore`` on an asyncio loop in a background
+thread for frontends with their own main loop (Tk).
+
+    - ``call(func, *args)`` runs a core method (plain or coroutine) in the
+      loop thread and returns a ``concurrent.futures.Future``; exceptions
+      are also logged, as most GUI callers never read the result
+    - core events are collected in a thread-safe queue; the frontend takes
+      them with ``drain()`` from its own thread, one batch per frame. Events
+      that describe the whole current state (``latest_only``) are reduced
+      to the newest of the batch, so a burst of state changes is applied
+      and redrawn once.
+"""
+
+import asyncio
+import concurrent.futures
+import queue
+import threading
+import traceback
+
+
+class CoreBridge:
+    """Thread-safe access to a core running in its own event loop"""
+
+    def __init__(self, core):
+        self.core = core
+        self.loop = asyncio.new_event_loop()
+        self.events = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="controller-core", daemon=True)
+        self.core.subscribe(self.events.put)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def call(self, func, *args):
+        """Run ``func(*args)`` in the core thread; returns a Future with the result"""
+        if asyncio.iscoroutinefunction(func):
+            future = asyncio.run_coroutine_threadsafe(func(*args), self.loop)
+            future.add_done_callback(lambda f: self._report(func, f))
+            return future
+        future = concurrent.futures.Future()
+        future.add_done_callback(lambda f: self._report(func, f))
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(func(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+        self.loop.call_soon_threadsafe(run)
+        return future
+
+    def _report(self, func, future):
+        """Print and log the exception of a failed call, like Tk did for handlers"""
+        if future.cancelled() or future.exception() is None:
+            return
+        error = future.exception()
+        traceback.print_exception(type(error), error, error.__traceback__)
+        name = getattr(func, "__name__", repr(func))
+        if not self.loop.is_closed():
+            # May run in the calling thread if the call finished at once
+            self.loop.call_soon_threadsafe(self.core.log, f"Fehler in {name}: {error}")
+
+    def drain(self, limit=None, latest_only=()):
+        """All events published since the last call (at most ``limit``)
+
+        Of the event types in ``latest_only`` only the newest of the batch
+        is returned, at its position; all other events keep their order.
+        """
+        events = []
+        while limit is None or len(events) < limit:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        if latest_only:
+            newest = {type(event): index for index, event in enumerate(events)
+                      if isinstance(event, latest_only)}
+            events = [event for index, event in enumerate(events)
+                      if newest.get(type(event), index) == index]
+        return events
+
+    def stop(self, timeout=5):
+        """Close the core and stop the loop thread"""
+        if self._thread.is_alive():
+            try:
+                self.call(self.core.close).result(timeout)
+            finally:
+                self.loop.call_soon_threadsafe(self.loop.stop)
+                self._thread.join(timeout)
+        else:
+            self.core.close()
+        self.loop.close()
@@ -0,0 +1,25 @@
+"""
+Firmware Simulator
+==================
+Pure-Python stand-in for the Uno R4 running src/main.cpp.
+
+    SimulatedFirmware     - protocol and motion model driven by explicit time
+    PtyFirmwareSimulator  - the model served on a pty that pyserial can open
+    PtyResonanceMeter     - antenna analyser on a second pty reporting the
+                            resonance at the simulated shaft position
+
+Run ``python3 -m firmware_simulator`` from the gui directory to start a
+simulator and print its port for the GUI.
+"""
+
+from .firmware import (
+    SimulatedFirmware, CheapStepperModel, FREQUENCY_ORDER, STEPS_PER_REVOLUTION, READY_BANNER
+)
+from .pty_simulator import PtyFirmwareSimulator
+from .resonance_meter import ResonanceCurve, SimulatedResonanceMeter, PtyResonanceMeter
+
+__all__ = [
+    "SimulatedFirmware", "CheapStepperModel", "PtyFirmwareSimulator",
+    "ResonanceCurve", "SimulatedResonanceMeter", "PtyResonanceMeter",
+    "FREQUENCY_ORDER", "STEPS_PER_REVOLUTION", "READY_BANNER",
+]
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Start a simulated controller on a pty and keep it running.
+
+Usage:
+    python3 -m firmware_simulator [--time-scale 1] [--link /tmp/ttyMAGLOOP] [--meter]
+"""
+
+import argparse
+import contextlib
+import time
+
+from .pty_simulator import PtyFirmwareSimulator
+from .resonance_meter import PtyResonanceMeter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Magnet Loop firmware simulator")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="firmware time runs this many times faster than real time")
+    parser.add_argument("--baudrate", type=int, default=9600)
+    parser.add_argument("--link", help="create a stable symlink to the pty at this path")
+    parser.add_argument("--no-reset", action="store_true",
+                        help="do not reset the board when the port is opened")
+    parser.add_argument("--meter", action="store_true",
+                        help="also serve a resonance meter for the band sweep (needs --time-scale 1)")
+    args = parser.parse_args()
+
+    simulator = PtyFirmwareSimulator(time_scale=args.time_scale, baudrate=args.baudrate,
+                                     reset_on_open=not args.no_reset, link_path=args.link)
+    with simulator, contextlib.ExitStack() as stack:
+        print(f"Simulierter Controller auf {simulator.port} (Zeitfaktor {args.time_scale})")
+        if args.meter:
+            meter = stack.enter_context(PtyResonanceMeter(simulator))
+            print(f"Simuliertes Resonanzmessgerät auf {meter.port}")
+        print("Beenden mit Strg+C")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
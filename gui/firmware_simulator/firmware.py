@@ -0,0 +1,580 @@
+#!/usr/bin/env python3
+"""
+Firmware Model
+==============
+Pure-Python model of src/main.cpp running on the Uno R4 with a 28BYJ-48
+stepper driven by CheapStepper.
+
+The model has no clock of its own: every call passes the firmware time in
+seconds, so it can run in real time behind a pty or instantly in tests.
+Replies are collected as ``(firmware_time, line)`` tuples.
+
+Reproduced behaviour of main.cpp / CheapStepper:
+    - F/B/S/P/Q/D/RPM/CH/CAL/CALT/SETPOS/STATE with the exact German reply strings
+    - moveQueue: F/B/CH are queued while the motor is busy, one queued
+      command is executed per loop() once the motor is idle, S clears it
+    - currentPosition jumps to the target when a move starts (also on S)
+    - "Motor fertig" + position are printed when the steps run out,
+      including after S
+    - float32 arithmetic of the channel calculations, or the calibration
+      table received with CALT (nearest entry, ties to the higher channel)
+    - step timing: delay = 60e6 / (totalSteps * rpm) µs per step; the
+      startup setRpm(8) runs before set4076StepMode() and thus uses 4096
+    - BIN<baud>: framed binary protocol at a new baud rate (see
+      ``framed_protocol``); replies are then ``bytes`` frames instead of
+      text lines, corrupted command frames are answered with NAK
+"""
+
+import re
+import struct
+from typing import NamedTuple
+
+# 28BYJ-48 in CheapStepper 4076-step mode
+STEPS_PER_REVOLUTION = 4076
+
+# cbChannelToPosition: index = frequency position, value = channel
+FREQUENCY_ORDER = (
+    41, 42, 43, 44, 45, 46, 47, 48, 49, 50,
+    51, 52, 53, 54, 55, 56, 57, 58, 59, 60,
+    61, 62, 63, 64, 65, 66, 67, 68, 69, 70,
+    71, 72, 73, 74, 75, 76, 77, 78, 79, 80,
+    1, 2, 3, 4, 5, 6, 7, 8, 9, 10,
+    11, 12, 13, 14, 15, 16, 17, 18, 19, 20,
+    21, 22, 23, 24, 25, 26, 27, 28, 29, 30,
+    31, 32, 33, 34, 35, 36, 37, 38, 39, 40,
+)
+
+READY_BANNER = "Magnet Loop Antenna Controller Ready"
+
+HEX_DIGITS = "0123456789ABCDEF"
+
+# Framed protocol of main.cpp
+FRAME_START = 0xA5
+MAX_FRAME_PAYLOAD = 48
+FRAME_COMMAND = 0x43
+FRAME_POSITION = 0x01
+FRAME_POSITION_SET = 0x02
+FRAME_CHANNEL = 0x03
+FRAME_MOTION_STARTED = 0x10
+FRAME_MOTION_FINISHED = 0x11
+FRAME_MOTION_STOPPED = 0x12
+FRAME_ALREADY_ON_CHANNEL = 0x13
+FRAME_COMMAND_QUEUED = 0x14
+FRAME_QUEUED_COMMAND_STARTED = 0x15
+FRAME_QUEUE_STATUS = 0x16
+FRAME_STATE = 0x17
+FRAME_CALIBRATION = 0x20
+FRAME_CALIBRATION_REJECTED = 0x21
+FRAME_RPM = 0x22
+FRAME_INVALID_RPM = 0x23
+FRAME_INVALID_CHANNEL = 0x24
+FRAME_UNKNOWN_COMMAND = 0x25
+FRAME_FALLBACK_WARNING = 0x26
+FRAME_CALIBRATION_TABLE = 0x27
+FRAME_TEXT = 0x30
+FRAME_NAK = 0x7F
+
+
+class CorruptFrame(NamedTuple):
+    """A command frame with a wrong CRC (answered with NAK)"""
+    seq: int
+
+
+def crc8(data):
+    """crc8() of main.cpp: polynomial 0x07, initial value 0, bitwise"""
+    crc = 0
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+_LEADING_INT = re.compile(r"\s*([+-]?\d+)")
+
+
+def _f32(value):
+    """Round a value to single precision (Arduino float)"""
+    return struct.unpack("f", struct.pack("f", value))[0]
+
+
+def _to_int(text):
+    """Arduino String::toInt() (atol semantics)"""
+    match = _LEADING_INT.match(text)
+    return int(match.group(1)) if match else 0
+
+
+def _is_move(command):
+    """F/B/CH commands go into the moveQueue while the motor runs (BIN does not)"""
+    return command.startswith(("F", "B", "CH")) and not command.startswith("BIN")
+
+
+def _c_div(a, b):
+    """C integer division (truncates toward zero)"""
+    q = abs(a) // abs(b)
+    return q if (a >= 0) == (b >= 0) else -q
+
+
+class CheapStepperModel:
+    """Timing model of the CheapStepper library"""
+
+    def __init__(self):
+        self.total_steps = 4096
+        self.delay_us = 900
+        self.steps_left = 0  # > 0 clockwise, < 0 counter-clockwise
+        self.last_step_time = 0.0
+        self.shaft_position = 0  # Physical position, independent of the firmware bookkeeping
+
+    def _calc_delay(self, rpm):
+        if rpm < 6:
+            return self.delay_us  # will overheat, no change
+        if rpm >= 24:
+            return 600  # highest speed
+        return 60000000 // (self.total_steps * rpm)
+
+    def set_rpm(self, rpm, now):
+        # Steps already due are taken at the old speed
+        self.run(now)
+        self.delay_us = self._calc_delay(rpm)
+
+    def get_rpm(self):
+        return 60000000 // self.delay_us // self.total_steps
+
+    def set_4076_step_mode(self):
+        self.total_steps = 4076
+
+    def new_move(self, clockwise, steps, now):
+        self.steps_left = abs(steps) if clockwise else -abs(steps)
+        self.last_step_time = now
+
+    def stop(self, now):
+        self.run(now)
+        self.steps_left = 0
+
+    @property
+    def step_time(self):
+        return self.delay_us / 1e6
+
+    def run(self, now):
+        """Take all steps that are due at firmware time ``now``"""
+        if not self.steps_left:
+            return
+        due = int((now - self.last_step_time) / self.step_time + 1e-9)
+        steps = min(due, abs(self.steps_left))
+        if steps <= 0:
+            return
+        direction = 1 if self.steps_left > 0 else -1
+        self.steps_left -= direction * steps
+        self.shaft_position += direction * steps
+        self.last_step_time += steps * self.step_time
+
+    def position_at(self, now):
+        """Physical position at firmware time ``now``, without taking the steps"""
+        if not self.steps_left:
+            return self.shaft_position
+        due = max(0, int((now - self.last_step_time) / self.step_time + 1e-9))
+        steps = min(due, abs(self.steps_left))
+        return self.shaft_position + (steps if self.steps_left > 0 else -steps)
+
+    def finish_time(self):
+        """Firmware time of the last step of the current move, or None"""
+        if not self.steps_left:
+            return None
+        return self.last_step_time + abs(self.steps_left) * self.step_time
+
+
+class SimulatedFirmware:
+    """State machine of src/main.cpp driven by explicit firmware time"""
+
+    def __init__(self, now=0.0, boot_baudrate=9600):
+        self.stepper = CheapStepperModel()
+        self.output = []
+        self.boot_baudrate = boot_baudrate
+        self.reset(now)
+
+    # ------------------------------------------------------------------
+    # Board level
+
+    def reset(self, now=0.0):
+        """Power-on / DTR reset: clear all globals and run setup()"""
+        shaft_position = self.stepper.shaft_position
+        self.stepper = CheapStepperModel()
+        self.stepper.shaft_position = shaft_position  # the capacitor does not move on reset
+        self.now = now
+        self.current_position = 0
+        self.motor_is_busy = False
+        self.move_queue = []
+        self.current_channel = 1
+        self.displayed_channel = None
+        self._last_channel = 1  # static in updatePosition()
+        self.cb_channel_steps = 30
+        self.channel_41_position = 0
+        self.channel_40_position = 2400
+        self.calibration_received = False
+        self.channel_table = [0] * 80  # positions by frequency position (CALT)
+        self.pending_table = [0] * 80  # table being received
+        self.table_filled = 0  # positions of pending_table received
+        self.use_table = False
+        self.baudrate = self.boot_baudrate
+        self.binary_mode = False
+        self._tx_seq = 0
+        self._input = bytearray()  # inputString / frame being received
+        self._setup()
+
+    def _setup(self):
+        self.stepper.set_rpm(8, self.now)
+        self.stepper.set_4076_step_mode()
+        self._println(READY_BANNER)
+        self._println(f"Stepper RPM: {self.stepper.get_rpm()}")
+        self._println("Steps per revolution: 4096")
+        self._println("Commands: F<steps>, B<steps>, S (stop), P (position), RPM<value>, "
+                      "Q (queue status), CH<channel>, D (display)")
+        self._println("Calibration: CAL<ch41_pos>,<ch40_pos>, SETPOS<position>")
+        self._println("Example: F100 (forward 100 steps), B50 (backward 50 steps), "
+                      "CH41 (go to channel 41), D (refresh display)")
+        self._println("Calibration Example: CAL1000,2500 SETPOS1000")
+        self._println("LED Matrix shows current channel (01-80)")
+        self._display(self.current_channel)
+
+    def _println(self, text):
+        self.output.append((self.now, text))
+
+    def _send_frame(self, frame_type, payload=b""):
+        body = bytes((len(payload), self._tx_seq, frame_type)) + payload
+        self._tx_seq = (self._tx_seq + 1) & 0xFF
+        self.output.append((self.now, bytes((FRAME_START,)) + body + bytes((crc8(body),))))
+
+    def _reply(self, lines, frame_type, payload=b""):
+        """Text lines in text mode, one frame in binary mode"""
+        if self.binary_mode:
+            self._send_frame(frame_type, payload)
+        else:
+            for line in lines:
+                self._println(line)
+
+    def _display(self, channel):
+        if 1 <= channel <= 80:
+            self.displayed_channel = channel
+
+    def take_output(self):
+        """Return and clear the output so far: text lines (``str``) or frames (``bytes``)"""
+        output, self.output = self.output, []
+        return output
+
+    @property
+    def rpm(self):
+        return self.stepper.get_rpm()
+
+    @property
+    def shaft_position(self):
+        """Physical motor position in steps"""
+        return self.stepper.shaft_position
+
+    def next_event_time(self):
+        """Firmware time at which the model next prints something on its own"""
+        # Queued commands only start when a move finishes
+        return self.stepper.finish_time()
+
+    # ------------------------------------------------------------------
+    # loop()
+
+    def advance(self, now):
+        """Run loop() until firmware time ``now``"""
+        while True:
+            finish = self.stepper.finish_time()
+            if finish is None or finish > now:
+                break
+            self.now = max(self.now, finish)
+            self.stepper.run(finish)
+            self._run_loop()
+        self.now = max(self.now, now)
+        self.stepper.run(self.now)
+        self._run_loop()
+
+    def serial_event(self, byte):
+        """serialEvent() for one received byte
+
+        Returns the completed command (``str``), a ``CorruptFrame`` or None.
+        """
+        if not self.binary_mode:
+            if byte == 0x0A:  # '\n' completes a command
+                line = self._input.decode("utf-8", "replace")
+                self._input.clear()
+                return line
+            self._input.append(byte)
+            return None
+
+        buffer = self._input
+        if not buffer and byte != FRAME_START:
+            return None  # resynchronize on the start byte
+        buffer.append(byte)
+        if len(buffer) == 2 and buffer[1] > MAX_FRAME_PAYLOAD:
+            buffer.clear()
+            return None
+        if len(buffer) < 5 or len(buffer) != buffer[1] + 5:
+            return None
+        length, seq, frame_type = buffer[1], buffer[2], buffer[3]
+        valid = crc8(buffer[1:length + 4]) == buffer[length + 4] and frame_type == FRAME_COMMAND
+        command = buffer[4:length + 4].decode("ascii", "replace")
+        buffer.clear()
+        return command if valid else CorruptFrame(seq)
+
+    def discard_input(self):
+        """Drop a partially received command (bytes lost with the port)"""
+        self._input.clear()
+
+    def receive(self, line, now):
+        """A complete command line (or a ``CorruptFrame``) arrived at firmware time ``now``"""
+        self.advance(now)
+        if isinstance(line, CorruptFrame):
+            self._send_frame(FRAME_NAK, bytes((line.seq,)))
+            return
+        self._run_loop(command=line)
+
+    def _run_loop(self, command=None):
+        # loop() runs continuously; iterate until nothing changes any more
+        while self._loop_iteration(command):
+            command = None
+
+    def _loop_iteration(self, command=None):
+        previously_busy = self.motor_is_busy
+        self.motor_is_busy = self.stepper.steps_left != 0
+        finished = previously_busy and not self.motor_is_busy
+        if finished:
+            self._reply(["Motor fertig - Bewegung abgeschlossen", f"Aktuelle Position: {self.current_position}"],
+                        FRAME_MOTION_FINISHED, struct.pack("<i", self.current_position))
+
+        if command is not None:
+            self._process_command(command)
+
+        queued = self._process_queue()
+        self._update_position()
+        return finished or queued or command is not None or self.motor_is_busy != (self.stepper.steps_left != 0)
+
+    # ------------------------------------------------------------------
+    # Commands
+
+    def _process_command(self, command):
+        command = command.strip().upper()
+        if self.motor_is_busy and _is_move(command):
+            self.move_queue.append(command)
+            self._reply(["Befehl in Warteschlange eingereiht: " + command],
+                        FRAME_COMMAND_QUEUED, command.encode())
+            return
+        self._execute_command(command)
+
+    def _execute_command(self, command):
+        if command.startswith("BIN"):
+            self._switch_protocol(_to_int(command[3:]))
+        elif command.startswith("F"):
+            steps = _to_int(command[1:])
+            if steps > 0:
+                self._move(True, steps)
+                self._reply_motion_started(0, steps)
+        elif command.startswith("B"):
+            steps = _to_int(command[1:])
+            if steps > 0:
+                self._move(False, steps)
+                self._reply_motion_started(0, -steps)
+        elif command == "S":
+            self.stepper.stop(self.now)
+            self.move_queue.clear()
+            self._reply(["Motor angehalten - Warteschlange geleert"], FRAME_MOTION_STOPPED)
+        elif command == "P":
+            self.current_channel = self.calculate_channel_from_position(self.current_position)
+            self._reply([f"Aktuelle Position: {self.current_position}", f"Aktueller Kanal: {self.current_channel}"],
+                        FRAME_POSITION, struct.pack("<iB", self.current_position, self.current_channel))
+            self._display(self.current_channel)
+        elif command == "Q":
+            self._reply([f"Warteschlange: {len(self.move_queue)} Befehle wartend",
+                         "Motor Status: " + ("Beschäftigt" if self.motor_is_busy else "Bereit")],
+                        FRAME_QUEUE_STATUS, struct.pack("<BB", min(len(self.move_queue), 255), self.motor_is_busy))
+        elif command == "STATE":
+            calibrated = int(self.calibration_received)
+            line = (f"Zustand: CH41={self.channel_41_position}, CH40={self.channel_40_position}, "
+                    f"Kalibriert={calibrated}, Position={self.current_position}")
+            payload = struct.pack("<iiBi", self.channel_41_position, self.channel_40_position,
+                                  calibrated, self.current_position)
+            if self.use_table:
+                checksum = self.table_checksum()
+                line += f", Tabelle={checksum:02X}"
+                payload += bytes((checksum,))
+            self._reply([line], FRAME_STATE, payload)
+        elif command == "D":
+            self._reply([f"Zeige Kanal auf Matrix: {self.current_channel}"],
+                        FRAME_CHANNEL, struct.pack("<B", self.current_channel))
+            self._display(self.current_channel)
+        elif command.startswith("RPM"):
+            rpm = _to_int(command[3:])
+            if 5 < rpm <= 25:
+                self.stepper.set_rpm(rpm, self.now)
+                self._reply([f"Drehzahl gesetzt auf: {rpm}"], FRAME_RPM, struct.pack("<B", rpm))
+            else:
+                self._reply(["Ungültige Drehzahl(6-24)"], FRAME_INVALID_RPM)
+        elif command.startswith("CH"):
+            self._goto_channel(_to_int(command[2:]))
+        elif command.startswith("CALT"):
+            self._calibrate_table(command[4:])
+        elif command.startswith("CAL"):
+            self._calibrate(command[3:])
+        elif command.startswith("SETPOS"):
+            self.current_position = _to_int(command[6:])
+            self._reply([f"Position gesetzt auf: {self.current_position}"],
+                        FRAME_POSITION_SET, struct.pack("<i", self.current_position))
+            self._update_position()
+        else:
+            self._reply(["Unbekannter Befehl: " + command], FRAME_UNKNOWN_COMMAND, command.encode()[:MAX_FRAME_PAYLOAD])
+
+    def _reply_motion_started(self, channel, steps):
+        direction = "vorwärts" if steps > 0 else "rückwärts"
+        target = f"zu Kanal {channel} - " if channel else ""
+        self._reply([f"Motor startet - Fahre {target}{abs(steps)} Schritte {direction}"],
+                    FRAME_MOTION_STARTED, struct.pack("<iB", steps, channel))
+
+    def _switch_protocol(self, baudrate):
+        if self.binary_mode:
+            self._reply([], FRAME_UNKNOWN_COMMAND, f"BIN{baudrate}".encode())
+        elif 9600 <= baudrate <= 1000000:
+            # Acknowledged in text at the old rate, then Serial.begin(baud)
+            self._println(f"Binärprotokoll aktiv: {baudrate} Baud")
+            self.baudrate = baudrate
+            self.binary_mode = True
+            self._input.clear()
+        else:
+            self._println("Ungültige Baudrate (9600-1000000)")
+
+    def _goto_channel(self, channel):
+        if not 1 <= channel <= 80:
+            self._reply(["Ungültiger Kanal (1-80)"], FRAME_INVALID_CHANNEL)
+            return
+        if self.calibration_received and self.use_table:
+            target_position = self.channel_table[FREQUENCY_ORDER.index(channel)]
+        elif self.calibration_received:
+            freq_pos = FREQUENCY_ORDER.index(channel)
+            steps_per_channel = _f32((self.channel_40_position - self.channel_41_position) / 79.0)
+            target_position = self.channel_41_position + int(_f32(freq_pos * steps_per_channel))
+        else:
+            target_position = FREQUENCY_ORDER[channel - 1] * self.cb_channel_steps
+            self._reply(["Warnung: Verwende Fallback-Berechnung - Kalibrierung fehlt"], FRAME_FALLBACK_WARNING)
+
+        steps_to_move = target_position - self.current_position
+        self.current_channel = channel
+        self._display(channel)
+
+        if steps_to_move != 0:
+            self._move(steps_to_move > 0, abs(steps_to_move))
+            self._reply_motion_started(channel, steps_to_move)
+        else:
+            self._reply([f"Bereits auf Kanal {channel}"], FRAME_ALREADY_ON_CHANNEL, struct.pack("<B", channel))
+
+    def _calibrate(self, params):
+        comma_index = params.find(",")
+        if comma_index <= 0:
+            self._reply(["Kalibrierung Format: CAL<ch41_pos>,<ch40_pos>"], FRAME_CALIBRATION_REJECTED, b"\x01")
+            return
+        ch41_pos = _to_int(params[:comma_index])
+        ch40_pos = _to_int(params[comma_index + 1:])
+        if ch40_pos > ch41_pos and ch41_pos >= 0 and ch40_pos <= 4075:
+            self.channel_41_position = ch41_pos
+            self.channel_40_position = ch40_pos
+            self.calibration_received = True
+            self.use_table = False
+            self.table_filled = 0
+            steps_per_channel = _f32((ch40_pos - ch41_pos) / 79.0)
+            self.cb_channel_steps = int(steps_per_channel)
+            self._reply([f"Kalibrierung empfangen: CH41={ch41_pos}, CH40={ch40_pos}, "
+                         f"Schritte/Kanal={steps_per_channel:.2f}"],
+                        FRAME_CALIBRATION, struct.pack("<ii", ch41_pos, ch40_pos))
+        else:
+            self._reply(["Ungültige Kalibrierung: CH40 muss > CH41 sein, Bereich 0-4075"],
+                        FRAME_CALIBRATION_REJECTED, b"\x00")
+
+    def _calibrate_table(self, params):
+        # CALT<start>:<3 hex digits position><2 hex digits steps to the next>...
+        colon_index = params.find(":")
+        start = _to_int(params[:colon_index]) if colon_index > 0 else -1
+        digits = params[colon_index + 1:]
+        count = (len(digits) - 1) // 2
+        valid = (colon_index > 0 and len(digits) >= 3 and len(digits) % 2 == 1
+                 and 0 <= start and start + count <= 80 and (start == 0 or start == self.table_filled)
+                 and all(digit in HEX_DIGITS for digit in digits))
+        if valid:
+            position = int(digits[:3], 16)
+            valid = position <= 4075 and (start == 0 or position > self.pending_table[start - 1])
+            for index in range(count):
+                if index:
+                    steps = int(digits[1 + 2 * index:3 + 2 * index], 16)
+                    position += steps
+                    valid = valid and steps > 0 and position <= 4075
+                self.pending_table[start + index] = position
+        if not valid:
+            self.table_filled = 0
+            self._reply(["Ungültige Kalibrierung: Tabelle fehlerhaft oder nicht in Reihenfolge"],
+                        FRAME_CALIBRATION_REJECTED, b"\x02")
+            return
+        self.table_filled = start + count
+        if self.table_filled == 80:
+            self.channel_table = list(self.pending_table)
+            self.use_table = True
+            self.calibration_received = True
+            self.channel_41_position = self.channel_table[0]
+            self.channel_40_position = self.channel_table[79]
+            self.cb_channel_steps = int(_f32((self.channel_40_position - self.channel_41_position) / 79.0))
+        self._reply([f"Kalibrierungstabelle empfangen: {self.table_filled}/80"],
+                    FRAME_CALIBRATION_TABLE, struct.pack("<B", self.table_filled))
+
+    def table_checksum(self):
+        """tableChecksum() of main.cpp: crc8 over the positions as little-endian uint16"""
+        return crc8(struct.pack("<80H", *self.channel_table))
+
+    def _process_queue(self):
+        if not self.motor_is_busy and self.move_queue:
+            next_command = self.move_queue.pop(0)
+            self._reply(["Führe Befehl aus Warteschlange aus: " + next_command],
+                        FRAME_QUEUED_COMMAND_STARTED, next_command.encode())
+            self._execute_command(next_command)
+            return True
+        return False
+
+    def _move(self, forward, steps):
+        self.stepper.new_move(forward, steps, self.now)
+        self.current_position += steps if forward else -steps
+
+    def _update_position(self):
+        if not self.motor_is_busy:
+            new_channel = self.calculate_channel_from_position(self.current_position)
+            if new_channel != self._last_channel:
+                self.current_channel = new_channel
+                self._display(new_channel)
+                self._last_channel = new_channel
+
+    def calculate_channel_from_position(self, position):
+        """calculateChannelFromPosition() of main.cpp"""
+        if not self.calibration_received:
+            estimated_channel = _c_div(position, self.cb_channel_steps) + 1
+            return max(1, min(80, estimated_channel))
+
+        if position < self.channel_41_position:
+            return 41
+        if position > self.channel_40_position:
+            return 40
+        if self.use_table:
+            # Binary search for the last entry <= position, then the nearer neighbour
+            low, high = 0, 79
+            while low < high:
+                middle = (low + high + 1) // 2
+                if self.channel_table[middle] <= position:
+                    low = middle
+                else:
+                    high = middle - 1
+            if low < 79 and 2 * position >= self.channel_table[low] + self.channel_table[low + 1]:
+                low += 1
+            return FREQUENCY_ORDER[low]
+        steps_per_channel = _f32((self.channel_40_position - self.channel_41_position) / 79.0)
+        freq_pos = int(_f32((position - self.channel_41_position) / steps_per_channel) + 0.5)
+        freq_pos = max(0, min(79, freq_pos))
+        return FREQUENCY_ORDER[freq_pos]
+
+    def move_duration(self, steps):
+        """Time in seconds the current speed needs for ``steps`` steps"""
+        return abs(steps) * self.stepper.step_time
+
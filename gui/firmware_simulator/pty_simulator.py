@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Pty Firmware Simulator
+======================
+Serves the firmware model on a pseudo terminal so that the unchanged
+``serial.Serial(port=...)`` in ``MagnetLoopController.connect`` can open it
+like a real Uno R4.
+
+A background thread owns the pty master. It paces bytes in both
+directions at the configured baud rate (10 bit times per byte, 8N1),
+feeds complete command lines to the model at their arrival time and
+writes replies when their last byte would have left the UART. Opening the
+port resets the board like the DTR line does; the banner follows after
+``boot_time``.
+
+After ``BIN<baud>`` the firmware talks in frames and both directions are
+paced at the new rate. A pty has no real baud rate, so the host may set
+``serial.Serial.baudrate`` freely.
+
+``unplug`` and ``replug`` pull and reconnect the USB cable: the pty goes
+away (the host's reads fail) and a new one appears under ``link_path``.
+
+All firmware timing (steps, bytes, boot) runs ``time_scale`` times faster
+than real time, so long scenarios finish quickly.
+"""
+
+import os
+import select
+import threading
+import time
+import tty
+
+from .firmware import SimulatedFirmware
+
+
+class PtyFirmwareSimulator:
+    """Simulated controller behind a pty
+
+    Usage:
+        with PtyFirmwareSimulator(time_scale=10) as sim:
+            port = serial.Serial(sim.port, 9600)
+    """
+
+    def __init__(self, time_scale=1.0, baudrate=9600, boot_time=1.5,
+                 reset_on_open=True, link_path=None, firmware=None):
+        self.time_scale = time_scale
+        self.baudrate = baudrate
+        self.boot_time = boot_time
+        self.reset_on_open = reset_on_open
+        self.link_path = link_path
+        self.firmware = firmware or SimulatedFirmware(boot_baudrate=baudrate)
+        self.lock = threading.RLock()
+
+        self._master = None
+        self._slave_name = None
+        self._thread = None
+        self._running = False
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        self._t0 = time.monotonic()
+
+        self._rx_free = 0.0  # firmware time at which the host->board line is idle
+        self._rx_lines = []  # (arrival time, command or CorruptFrame)
+        self._tx_free = 0.0
+        self._tx_lines = []  # (time the last byte is sent, bytes)
+        self._boot_at = None
+        self._port_open = False
+        self._powered = True
+
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.resets = 0
+        self.unplugs = 0
+
+    # ------------------------------------------------------------------
+    # Clock
+
+    def now(self):
+        """Current firmware time in seconds"""
+        return (time.monotonic() - self._t0) * self.time_scale
+
+    def to_wall(self, firmware_seconds):
+        """Convert a firmware duration to wall-clock seconds"""
+        return firmware_seconds / self.time_scale
+
+    @property
+    def byte_time(self):
+        """Time of one byte at the firmware's current baud rate"""
+        return 10.0 / self.firmware.baudrate
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+
+    @property
+    def port(self):
+        """Device path to open with pyserial"""
+        return self.link_path or self._slave_name
+
+    def start(self):
+        self._open_pty()
+        with self.lock:
+            # The board has been powered before anyone listened; a board that
+            # is not reset on open is already running
+            if not self.reset_on_open:
+                self.firmware.reset(self.now())
+            self.firmware.take_output()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="pty-firmware", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        self._wake()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+        self._close_pty()
+        for fd in (self._wakeup_r, self._wakeup_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _open_pty(self):
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        self._master = master
+        self._slave_name = os.ttyname(slave)
+        # Only the host keeps the slave open, so a hangup marks "port closed"
+        os.close(slave)
+        os.set_blocking(master, False)
+        if self.link_path:
+            if os.path.lexists(self.link_path):
+                os.unlink(self.link_path)
+            os.symlink(self._slave_name, self.link_path)
+
+    def _close_pty(self):
+        if self.link_path and os.path.lexists(self.link_path):
+            os.unlink(self.link_path)
+        if self._master is not None:
+            os.close(self._master)
+            self._master = None
+
+    def _wake(self):
+        try:
+            os.write(self._wakeup_w, b"x")
+        except OSError:
+            pass
+
+    # ------------------------------------------------------------------
+    # Control from tests
+
+    def inject(self, func):
+        """Run ``func(firmware, now)`` in the simulator thread context"""
+        with self.lock:
+            now = self.now()
+            self.firmware.advance(now)
+            func(self.firmware, now)
+            self._queue_output()
+        self._wake()
+
+    def shaft_position(self):
+        """Physical motor position at the current firmware time (e.g. for a meter on the loop)"""
+        with self.lock:
+            return self.firmware.stepper.position_at(self.now())
+
+    def reset_board(self):
+        """Reset the board as if DTR was toggled"""
+        with self.lock:
+            self._boot_at = self.now() + self.boot_time
+        self._wake()
+
+    def unplug(self, power_loss=True):
+        """Pull the USB cable: the device disappears and reads on the host fail
+
+        A board powered over USB stops and boots again on ``replug``; with
+        ``power_loss=False`` (external supply) it keeps running meanwhile.
+        """
+        with self.lock:
+            self.firmware.advance(self.now())
+            self._close_pty()
+            self._port_open = False
+            self._tx_lines.clear()
+            self._rx_lines.clear()
+            self.firmware.discard_input()
+            self._powered = not power_loss
+            self._boot_at = None
+            self.unplugs += 1
+        self._wake()
+
+    def replug(self):
+        """Plug the cable back in: a new pty, the board boots if it lost power"""
+        with self.lock:
+            if not self._powered:
+                self._powered = True
+                self._boot_at = self.now() + self.boot_time
+            self._open_pty()
+        self._wake()
+
+    # ------------------------------------------------------------------
+    # Thread
+
+    def _run(self):
+        poller = select.poll()
+        poller.register(self._wakeup_r, select.POLLIN)
+        registered = None
+        while self._running:
+            with self.lock:
+                self._check_open()
+                self._process(self.now())
+                deadline = self._next_deadline()
+                # A master without an open slave reports POLLHUP permanently, so
+                # it is only polled while the host has the port open
+                master = self._master if self._port_open else None
+            if master != registered:
+                if registered is not None:
+                    poller.unregister(registered)
+                if master is not None:
+                    poller.register(master, select.POLLIN)
+                registered = master
+            timeout_ms = None
+            if deadline is not None:
+                timeout_ms = max(0, self.to_wall(deadline - self.now()) * 1000)
+            if not self._port_open:
+                # Check for the host opening the port every few milliseconds
+                timeout_ms = 5 if timeout_ms is None else min(timeout_ms, 5)
+            for fd, event in poller.poll(timeout_ms):
+                if fd == self._wakeup_r:
+                    os.read(self._wakeup_r, 1024)
+                elif event & select.POLLIN:
+                    self._read_input()
+
+    def _check_open(self):
+        """Detect the host opening/closing the port via pty hangup"""
+        if self._master is None:
+            return  # unplugged
+        probe = select.poll()
+        probe.register(self._master, select.POLLHUP)
+        hung_up = any(event & select.POLLHUP for _, event in probe.poll(0))
+        if hung_up and self._port_open:
+            self._port_open = False
+            # Host closed the port: bytes in flight are lost
+            self._tx_lines.clear()
+            self.firmware.discard_input()
+            self._rx_lines.clear()
+        elif not hung_up and not self._port_open:
+            self._port_open = True
+            if self.reset_on_open:
+                self._boot_at = self.now() + self.boot_time
+                self._tx_lines.clear()
+                self.firmware.take_output()
+
+    def _read_input(self):
+        with self.lock:
+            try:
+                data = os.read(self._master, 4096)
+            except (BlockingIOError, OSError, TypeError):
+                return  # TypeError: unplugged meanwhile
+            now = self.now()
+            self.bytes_received += len(data)
+            byte_time = self.byte_time
+            for byte in data:
+                arrival = max(self._rx_free, now) + byte_time
+                self._rx_free = arrival
+                command = self.firmware.serial_event(byte)
+                if command is not None:
+                    self._rx_lines.append((arrival, command))
+
+    def _process(self, now):
+        if not self._powered:
+            return
+        if self._boot_at is not None and self._boot_at <= now:
+            self.firmware.reset(self._boot_at)
+            self.resets += 1
+            self._boot_at = None
+            self._rx_lines.clear()
+
+        booting = self._boot_at is not None
+        while self._rx_lines and self._rx_lines[0][0] <= now:
+            arrival, line = self._rx_lines.pop(0)
+            if not booting:
+                self.firmware.receive(line, arrival)
+        if not booting:
+            self.firmware.advance(now)
+        self._queue_output()
+        self._write_due(now)
+
+    def _queue_output(self):
+        firmware = self.firmware
+        for printed_at, item in firmware.take_output():
+            if isinstance(item, bytes):
+                data, byte_time = item, 10.0 / firmware.baudrate
+            else:
+                # Text only goes out before BIN, at the boot baud rate
+                data, byte_time = (item + "\r\n").encode("utf-8"), 10.0 / firmware.boot_baudrate
+            done = max(self._tx_free, printed_at) + len(data) * byte_time
+            self._tx_free = done
+            self._tx_lines.append((done, data))
+
+    def _write_due(self, now):
+        chunk = bytearray()
+        while self._tx_lines and self._tx_lines[0][0] <= now:
+            chunk += self._tx_lines.pop(0)[1]
+        # Without an open port the bytes leave the UART into nowhere
+        if chunk and self._port_open:
+            try:
+                os.write(self._master, chunk)
+                self.bytes_sent += len(chunk)
+            except OSError:
+                pass
+
+    def _next_deadline(self):
+        candidates = []
+        if self._boot_at is not None:
+            candidates.append(self._boot_at)
+        if self._rx_lines:
+            candidates.append(self._rx_lines[0][0])
+        if self._tx_lines:
+            candidates.append(self._tx_lines[0][0])
+        event = self.firmware.next_event_time()
+        if event is not None:
+            candidates.append(event)
+        return min(candidates) if candidates else None
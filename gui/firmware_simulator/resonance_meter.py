@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Resonance Meter Simulator
+=========================
+Stand-in for the resonance indicator of the band sweep: an antenna
+analyser on a second serial port that reports the frequency of the SWR
+minimum of the loop at the simulated motor's current shaft position.
+
+    ResonanceCurve            - resonance frequency of the loop by motor position
+    SimulatedResonanceMeter   - the curve read in-process (``read()``)
+    PtyResonanceMeter         - the same meter served on a pty
+
+Protocol (one line each way):
+
+    host:  RES?
+    meter: RES <frequency in Hz>
+"""
+
+import math
+import os
+import random
+import select
+import threading
+import time
+import tty
+
+QUERY = b"RES?"
+
+
+class ResonanceCurve:
+    """Resonance of the loop inductance with a nonlinear variable capacitor
+
+    The capacitance falls from ``c_max`` at position 0 to ``c_min`` at
+    ``span`` steps with the power ``shape`` of the position (plate cut),
+    so the resonance rises with the position like channel 41 -> 40.
+    """
+
+    def __init__(self, inductance=1.0e-6, c_max=37e-12, c_min=33e-12, span=4075, shape=1.3):
+        self.inductance = inductance
+        self.c_max = c_max
+        self.c_min = c_min
+        self.span = span
+        self.shape = shape
+
+    def frequency(self, position):
+        """Resonance frequency in Hz at motor ``position``"""
+        fraction = min(max(position / self.span, 0.0), 1.0)
+        capacitance = self.c_max - (self.c_max - self.c_min) * fraction ** self.shape
+        return 1 / (2 * math.pi * math.sqrt(self.inductance * capacitance))
+
+    def position(self, frequency):
+        """Motor position of resonance at ``frequency`` (bisection, for checking a calibration)"""
+        low, high = 0.0, float(self.span)
+        for _ in range(60):
+            middle = (low + high) / 2
+            if self.frequency(middle) < frequency:
+                low = middle
+            else:
+                high = middle
+        return (low + high) / 2
+
+
+class SimulatedResonanceMeter:
+    """Resonance at the shaft position of a PtyFirmwareSimulator, with Gaussian ``noise`` in Hz"""
+
+    def __init__(self, simulator, curve=None, noise=0.0, seed=1):
+        self.simulator = simulator
+        self.curve = curve or ResonanceCurve()
+        self.noise = noise
+        self._random = random.Random(seed)
+
+        # Statistics
+        self.readings = 0
+
+    def read(self):
+        self.readings += 1
+        frequency = self.curve.frequency(self.simulator.shaft_position())
+        if self.noise:
+            frequency += self._random.gauss(0.0, self.noise)
+        return frequency
+
+    def close(self):
+        pass
+
+
+class PtyResonanceMeter(SimulatedResonanceMeter):
+    """SimulatedResonanceMeter answering ``RES?`` on a pty
+
+    Usage:
+        with PtyResonanceMeter(simulator) as meter:
+            analyser = serial.Serial(meter.port, 9600)
+    """
+
+    def __init__(self, simulator, curve=None, noise=0.0, seed=1):
+        super().__init__(simulator, curve, noise, seed)
+        self._master = None
+        self._slave_name = None
+        self._thread = None
+        self._running = False
+        self._wakeup_r, self._wakeup_w = os.pipe()
+
+    @property
+    def port(self):
+        """Device path to open with pyserial"""
+        return self._slave_name
+
+    def start(self):
+        master, slave = os.openpty()
+        tty.setraw(slave)
+        self._master = master
+        self._slave_name = os.ttyname(slave)
+        os.close(slave)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="pty-resonance-meter", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        os.write(self._wakeup_w, b"x")
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+        for fd in (self._master, self._wakeup_r, self._wakeup_w):
+            try:
+                os.close(fd)
+            except (OSError, TypeError):
+                pass
+        self._master = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        buffer = b""
+        poller = select.poll()
+        poller.register(self._wakeup_r, select.POLLIN)
+        poller.register(self._master, select.POLLIN)
+        while self._running:
+            for fd, event in poller.poll(100):
+                if fd == self._wakeup_r:
+                    continue
+                if not event & select.POLLIN:
+                    time.sleep(0.005)  # hangup: no host has the port open
+                    continue
+                try:
+                    buffer += os.read(self._master, 256)
+                except OSError:
+                    continue  # no host on the port
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    if line.strip() == QUERY:
+                        os.write(self._master, f"RES {self.read():.0f}\r\n".encode())
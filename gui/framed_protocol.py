@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Framed Protocol
+===============
+Compact binary protocol between host and firmware, negotiated after
+connect with the text command ``BIN<baud>``. The firmware acknowledges
+with "Binärprotokoll aktiv: <baud> Baud" (still as text, at the old baud
+rate) and switches to frames at the new rate. The host sends BIN only
+after ``STATE`` was answered: old firmware answers "Unbekannter Befehl"
+to STATE, while it would take BIN for a B move of 0 steps (no reply,
+queued while the motor runs). A board that resets when the port is
+opened starts every connection in text mode; one that keeps running stays
+in binary mode until its next reset. The host therefore sends a framed
+``Q`` at the framed baud rate when text gets no answer, and first if it
+switched the port to frames before.
+
+Frame layout (both directions):
+
+    0xA5 | length | seq | type | payload[length] | crc8
+
+``crc8`` (polynomial 0x07, initial value 0) covers length, seq, type and
+payload. Every sender numbers its frames 0-255; the receiver detects lost
+frames by gaps. The host sends commands as ``COMMAND`` frames with the
+unchanged text command as payload; the firmware answers a corrupted
+command frame with ``NAK`` and its sequence number, and the host sends it
+again.
+
+Firmware frames replace the German reply lines with fixed-width fields
+(little-endian ``int32`` positions, ``uint8`` channels). ``decode_frame``
+turns them into the same ``response_parser`` events as the text lines,
+together with the equivalent text for the log. "Motor fertig" and the
+position line after it are one ``MOTION_FINISHED`` frame, the two lines
+of ``P`` and ``Q`` one frame each.
+"""
+
+import struct
+
+from response_parser import (
+    parse_response, PositionReport, ChannelReport, PositionSet, MotionStarted,
+    MotionFinished, MotionStopped, AlreadyOnChannel, MotorStatus, QueueStatus,
+    CommandQueued, QueuedCommandStarted, CalibrationAck, CalibrationRejected,
+    FallbackWarning, RpmReport, InvalidRpm, InvalidChannel, UnknownCommand,
+    FirmwareState, CalibrationTableAck
+)
+
+FRAME_START = 0xA5
+MAX_PAYLOAD = 48
+HEADER_SIZE = 4  # start, length, seq, type
+
+# Host -> firmware
+COMMAND = 0x43
+
+# Firmware -> host
+POSITION = 0x01  # int32 position, uint8 channel (reply to P)
+POSITION_SET = 0x02  # int32 position
+CHANNEL = 0x03  # uint8 channel (reply to D)
+MOTION_STARTED = 0x10  # int32 steps (negative: backward), uint8 channel (0: F/B)
+MOTION_FINISHED = 0x11  # int32 position
+MOTION_STOPPED = 0x12
+ALREADY_ON_CHANNEL = 0x13  # uint8 channel
+COMMAND_QUEUED = 0x14  # command text
+QUEUED_COMMAND_STARTED = 0x15  # command text
+QUEUE_STATUS = 0x16  # uint8 pending, uint8 busy
+STATE = 0x17  # int32 ch41, int32 ch40, uint8 calibrated, int32 position[, uint8 table checksum] (reply to STATE)
+CALIBRATION = 0x20  # int32 ch41, int32 ch40
+CALIBRATION_REJECTED = 0x21  # uint8 reason
+RPM = 0x22  # uint8 rpm
+INVALID_RPM = 0x23
+INVALID_CHANNEL = 0x24
+UNKNOWN_COMMAND = 0x25  # command text
+FALLBACK_WARNING = 0x26
+CALIBRATION_TABLE = 0x27  # uint8 positions stored so far (reply to CALT)
+TEXT = 0x30  # any other line
+NAK = 0x7F  # uint8 seq of the corrupted command frame
+
+# Baud rates the firmware accepts for BIN<baud>
+MIN_BAUDRATE = 9600
+MAX_BAUDRATE = 1000000
+
+_CALIBRATION_REJECTED = (
+    "Ungültige Kalibrierung: CH40 muss > CH41 sein, Bereich 0-4075",
+    "Kalibrierung Format: CAL<ch41_pos>,<ch40_pos>",
+    "Ungültige Kalibrierung: Tabelle fehlerhaft oder nicht in Reihenfolge",
+)
+
+
+def _crc8_table():
+    table = []
+    for value in range(256):
+        crc = value
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table.append(crc)
+    return bytes(table)
+
+
+_CRC8_TABLE = _crc8_table()
+
+
+def crc8(data):
+    """CRC-8, polynomial 0x07, initial value 0"""
+    crc = 0
+    for byte in data:
+        crc = _CRC8_TABLE[crc ^ byte]
+    return crc
+
+
+def encode_frame(seq, frame_type, payload=b""):
+    """Complete frame with start byte and CRC"""
+    if len(payload) > MAX_PAYLOAD:
+        raise ValueError(f"Nutzdaten zu lang ({len(payload)} > {MAX_PAYLOAD})")
+    body = bytes((len(payload), seq & 0xFF, frame_type)) + payload
+    return bytes((FRAME_START,)) + body + bytes((crc8(body),))
+
+
+class FrameEncoder:
+    """Numbers outgoing command frames and keeps the recent ones for NAK"""
+
+    HISTORY = 16
+
+    def __init__(self):
+        self._seq = 0
+        self._history = {}  # seq -> frame
+
+    def encode(self, command):
+        frame = encode_frame(self._seq, COMMAND, command.encode("ascii"))
+        self._history[self._seq] = frame
+        self._history.pop((self._seq - self.HISTORY) & 0xFF, None)
+        self._seq = (self._seq + 1) & 0xFF
+        return frame
+
+    def resend(self, seq):
+        """The frame with ``seq`` again, or None if it is too old"""
+        return self._history.get(seq)
+
+
+class FrameDecoder:
+    """Splits a byte stream into ``(seq, type, payload)`` frames
+
+    Bytes outside a frame and frames with a wrong CRC are skipped; the
+    decoder resynchronizes on the next start byte.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._expected_seq = None
+        self.frames = 0
+        self.crc_errors = 0
+        self.frames_lost = 0  # gaps in the sequence numbers
+
+    def reset(self):
+        self._buffer.clear()
+        self._expected_seq = None
+
+    def feed(self, data):
+        """Feed raw bytes and return the list of complete, valid frames"""
+        buffer = self._buffer
+        buffer += data
+        frames = []
+        while True:
+            start = buffer.find(FRAME_START)
+            if start < 0:
+                buffer.clear()
+                break
+            if start:
+                del buffer[:start]
+            if len(buffer) < 2:
+                break
+            length = buffer[1]
+            if length > MAX_PAYLOAD:
+                del buffer[:1]
+                continue
+            size = HEADER_SIZE + length + 1
+            if len(buffer) < size:
+                break
+            body = bytes(buffer[1:size - 1])
+            if crc8(body) != buffer[size - 1]:
+                self.crc_errors += 1
+                del buffer[:1]
+                continue
+            del buffer[:size]
+            seq = body[1]
+            if self._expected_seq is not None and seq != self._expected_seq:
+                self.frames_lost += (seq - self._expected_seq) & 0xFF
+            self._expected_seq = (seq + 1) & 0xFF
+            self.frames += 1
+            frames.append((seq, body[2], body[3:]))
+        return frames
+
+
+def _f32(value):
+    return struct.unpack("<f", struct.pack("<f", value))[0]
+
+
+def _text(payload):
+    return payload.decode("utf-8", "replace")
+
+
+def _motion_started(payload):
+    steps, channel = struct.unpack("<iB", payload)
+    direction = "vorwärts" if steps > 0 else "rückwärts"
+    target = f"zu Kanal {channel} - " if channel else ""
+    return [(MotionStarted(steps=abs(steps), forward=steps > 0, channel=channel or None),
+             f"Motor startet - Fahre {target}{abs(steps)} Schritte {direction}")]
+
+
+def _motion_finished(payload):
+    (position,) = struct.unpack("<i", payload)
+    return [(MotionFinished(), "Motor fertig - Bewegung abgeschlossen"),
+            (PositionReport(position), f"Aktuelle Position: {position}")]
+
+
+def _position(payload):
+    position, channel = struct.unpack("<iB", payload)
+    return [(PositionReport(position), f"Aktuelle Position: {position}"),
+            (ChannelReport(channel), f"Aktueller Kanal: {channel}")]
+
+
+def _queue_status(payload):
+    pending, busy = struct.unpack("<BB", payload)
+    return [(QueueStatus(pending), f"Warteschlange: {pending} Befehle wartend"),
+            (MotorStatus(bool(busy)), "Motor Status: " + ("Beschäftigt" if busy else "Bereit"))]
+
+
+def _calibration(payload):
+    ch41, ch40 = struct.unpack("<ii", payload)
+    steps = _f32((ch40 - ch41) / 79.0)  # float arithmetic of the firmware
+    return [(CalibrationAck(ch41, ch40, round(steps, 2)),
+             f"Kalibrierung empfangen: CH41={ch41}, CH40={ch40}, Schritte/Kanal={steps:.2f}")]
+
+
+def _state(payload):
+    ch41, ch40, calibrated, position = struct.unpack("<iiBi", payload[:13])
+    table = payload[13] if len(payload) == 14 else None
+    text = f"Zustand: CH41={ch41}, CH40={ch40}, Kalibriert={int(bool(calibrated))}, Position={position}"
+    if table is not None:
+        text += f", Tabelle={table:02X}"
+    return [(FirmwareState(ch41, ch40, bool(calibrated), position, table), text)]
+
+
+def _calibration_rejected(payload):
+    text = (_CALIBRATION_REJECTED[payload[0]] if payload and payload[0] < len(_CALIBRATION_REJECTED)
+            else "Ungültige Kalibrierung")
+    return [(CalibrationRejected(text), text)]
+
+
+def _int_frame(fmt, event_type, template):
+    def decode(payload):
+        (value,) = struct.unpack(fmt, payload)
+        return [(event_type(value), template.format(value))]
+    return decode
+
+
+def _text_frame(event_type, prefix):
+    def decode(payload):
+        text = _text(payload)
+        return [(event_type(text), prefix + text)]
+    return decode
+
+
+def _constant_frame(event, text):
+    return lambda payload: [(event, text)]
+
+
+def _text_line(payload):
+    text = _text(payload)
+    return [(parse_response(text), text)]
+
+
+_DECODERS = {
+    POSITION: _position,
+    POSITION_SET: _int_frame("<i", PositionSet, "Position gesetzt auf: {}"),
+    CHANNEL: _int_frame("<B", ChannelReport, "Zeige Kanal auf Matrix: {}"),
+    MOTION_STARTED: _motion_started,
+    MOTION_FINISHED: _motion_finished,
+    MOTION_STOPPED: _constant_frame(MotionStopped(), "Motor angehalten - Warteschlange geleert"),
+    ALREADY_ON_CHANNEL: _int_frame("<B", AlreadyOnChannel, "Bereits auf Kanal {}"),
+    COMMAND_QUEUED: _text_frame(CommandQueued, "Befehl in Warteschlange eingereiht: "),
+    QUEUED_COMMAND_STARTED: _text_frame(QueuedCommandStarted, "Führe Befehl aus Warteschlange aus: "),
+    QUEUE_STATUS: _queue_status,
+    STATE: _state,
+    CALIBRATION: _calibration,
+    CALIBRATION_REJECTED: _calibration_rejected,
+    RPM: _int_frame("<B", RpmReport, "Drehzahl gesetzt auf: {}"),
+    INVALID_RPM: _constant_frame(InvalidRpm(), "Ungültige Drehzahl(6-24)"),
+    INVALID_CHANNEL: _constant_frame(InvalidChannel(), "Ungültiger Kanal (1-80)"),
+    UNKNOWN_COMMAND: _text_frame(UnknownCommand, "Unbekannter Befehl: "),
+    FALLBACK_WARNING: _constant_frame(FallbackWarning(), "Warnung: Verwende Fallback-Berechnung - Kalibrierung fehlt"),
+    CALIBRATION_TABLE: _int_frame("<B", CalibrationTableAck, "Kalibrierungstabelle empfangen: {}/80"),
+    TEXT: _text_line,
+}
+
+
+def decode_frame(frame_type, payload):
+    """Events of a firmware frame as ``(event or None, equivalent text line)`` pairs"""
+    decode = _DECODERS.get(frame_type)
+    if decode is None:
+        return [(None, f"Unbekannter Frame-Typ 0x{frame_type:02X}")]
+    try:
+        return decode(payload)
+    except (struct.error, IndexError):
+        return [(None, f"Fehlerhafter Frame 0x{frame_type:02X}: {payload.hex()}")]
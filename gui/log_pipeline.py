@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Log Pipeline
+============
+Coalesced, bounded logging for the Tk log widget.
+
+``log()`` may be called from any thread; it only formats the timestamp and
+appends to a ring buffer. The GUI flushes the buffer once per frame with a
+single Text insert, trims the widget to a maximum scrollback in one delete
+and never renders lines hidden by the current filter.
+"""
+
+import threading
+from collections import deque
+from datetime import datetime
+
+
+class LogPipeline:
+    """Ring buffer between log producers and the log widget"""
+
+    def __init__(self, max_lines=2000, max_pending=5000):
+        self.max_lines = max_lines
+        self._pending = deque(maxlen=max_pending)
+        self._lock = threading.Lock()
+        # Last max_lines messages (unfiltered), used to re-render on filter change
+        self._history = deque(maxlen=max_lines)
+        self._filter = ""
+        self._rendered_lines = 0
+        self.dropped = 0
+
+    def push(self, message):
+        """Queue a message for the widget (thread-safe)"""
+        timestamp = datetime.now().strftime("%H:%M:%S")
+        with self._lock:
+            if len(self._pending) == self._pending.maxlen:
+                self.dropped += 1
+            self._pending.append(f"[{timestamp}] {message}")
+
+    def drain(self):
+        """Take all queued messages"""
+        with self._lock:
+            if not self._pending:
+                return []
+            messages = list(self._pending)
+            self._pending.clear()
+        self._history.extend(messages)
+        return messages
+
+    def _visible(self, messages):
+        if not self._filter:
+            return messages
+        return [m for m in messages if self._filter in m.lower()]
+
+    def flush(self, text_widget):
+        """Render queued messages into a Text widget (main thread only)"""
+        lines = self._visible(self.drain())
+        if not lines:
+            return 0
+        text_widget.insert("end", "\n".join(lines) + "\n")
+        self._rendered_lines += len(lines)
+        self._trim(text_widget)
+        text_widget.see("end")
+        return len(lines)
+
+    def _trim(self, text_widget):
+        excess = self._rendered_lines - self.max_lines
+        if excess > 0:
+            text_widget.delete("1.0", f"{excess + 1}.0")
+            self._rendered_lines -= excess
+
+    def set_filter(self, text, text_widget):
+        """Show only messages containing ``text`` (case-insensitive) and
+        re-render the retained history with the new filter"""
+        self.drain()
+        self._filter = text.strip().lower()
+        lines = self._visible(list(self._history))
+        text_widget.delete("1.0", "end")
+        self._rendered_lines = len(lines)
+        if lines:
+            text_widget.insert("end", "\n".join(lines) + "\n")
+            text_widget.see("end")
+
+    def clear(self, text_widget):
+        """Forget the history and empty the widget"""
+        with self._lock:
+            self._pending.clear()
+        self._history.clear()
+        self._rendered_lines = 0
+        text_widget.delete("1.0", "end")
@@ -5,179 +5,35 @@ Magnet Loop Antenna Controller GUI
 GUI for controlling stepper motor of a 11m band magnet loop antenna
 with variable capacitor for 80 channels.
 
+The serial protocol and all state live in the headless
+``controller_core.AntennaControllerCore``; this window only forwards
+button presses to it and renders the events it publishes.
+
 Requirements:
     pip install pyserial tkinter
 
 Author: Generated for Arduino Stepper Control
 """
 
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
-import serial
-import serial.tools.list_ports
-import threading
-import time
-import json
-import os
-from datetime import datetime
-
-class Configuration:
-    """Configuration management for the antenna controller"""
-    
-    def __init__(self, config_file="antenna_config.json"):
-        self.config_file = config_file
-        self.config = {
-            "channel_41_position": 0,  # Base position offset to match Arduino behavior
-            "channel_40_position": 2400,  # Highest frequency position (channel 40)
-            "current_channel": 41,  # Current channel position
-            "current_position": 0,  # Current motor position
-            "last_port": "",  # Last used serial port
-            "last_rpm": 12  # Last used RPM setting
-        }
-        
-        # Arduino channel to frequency position mapping (CB Funk Frequenz-Reihenfolge)
-        # Dies ist die Reihenfolge der Kanäle nach Frequenz (niedrigste zu höchste)
-        # Index = Frequenz-Position (0 = niedrigste Frequenz, 79 = höchste Frequenz)
-        # Wert = Kanal-Nummer
-        self.frequency_order_channels = [
-            41, 42, 43, 44, 45, 46, 47, 48, 49, 50,  # Frequenz-Positionen 0-9: Kanäle 41-50
-            51, 52, 53, 54, 55, 56, 57, 58, 59, 60,  # Frequenz-Positionen 10-19: Kanäle 51-60
-            61, 62, 63, 64, 65, 66, 67, 68, 69, 70,  # Frequenz-Positionen 20-29: Kanäle 61-70
-            71, 72, 73, 74, 75, 76, 77, 78, 79, 80,  # Frequenz-Positionen 30-39: Kanäle 71-80
-            1, 2, 3, 4, 5, 6, 7, 8, 9, 10,          # Frequenz-Positionen 40-49: Kanäle 1-10
-            11, 12, 13, 14, 15, 16, 17, 18, 19, 20,  # Frequenz-Positionen 50-59: Kanäle 11-20
-            21, 22, 23, 24, 25, 26, 27, 28, 29, 30,  # Frequenz-Positionen 60-69: Kanäle 21-30
-            31, 32, 33, 34, 35, 36, 37, 38, 39, 40   # Frequenz-Positionen 70-79: Kanäle 31-40
-        ]
-        
-        self.load_config()
-    
-    def load_config(self):
-        """Load configuration from file"""
-        try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r') as f:
-                    saved_config = json.load(f)
-                    self.config.update(saved_config)
-        except Exception as e:
-            print(f"Error loading config: {e}")
-    
-    def save_config(self):
-        """Save configuration to file"""
-        try:
-            with open(self.config_file, 'w') as f:
-                json.dump(self.config, f, indent=2)
-        except Exception as e:
-            print(f"Error saving config: {e}")
-    
-    def get(self, key, default=None):
-        """Get configuration value"""
-        return self.config.get(key, default)
-    
-    def set(self, key, value):
-        """Set configuration value"""
-        self.config[key] = value
-    
-    def get_channel_frequency_position(self, channel):
-        """Gibt die Frequenz-Position für einen Kanal zurück (0-79)"""
-        try:
-            return self.frequency_order_channels.index(channel)
-        except ValueError:
-            return None
-    
-    def get_channel_from_frequency_position(self, freq_pos):
-        """Gibt den Kanal für eine Frequenz-Position zurück"""
-        if 0 <= freq_pos < len(self.frequency_order_channels):
-            return self.frequency_order_channels[freq_pos]
-        return None
-    
-    def is_calibration_valid(self):
-        """Prüft ob die Kalibrierung gültig ist"""
-        ch40_pos = self.config.get("channel_40_position", -1)
-        ch41_pos = self.config.get("channel_41_position", -1)
-        
-        # Kalibrierung muss vorliegen
-        if ch40_pos < 0 or ch41_pos < 0:
-            return False, "Kalibrierung fehlt: Beide Kanäle müssen kalibriert werden"
-        
-        # Positionen müssen in gültigen Bereichen sein
-        if not (0 <= ch40_pos <= 4075) or not (0 <= ch41_pos <= 4075):
-            return False, "Kalibrierung ungültig: Positionen müssen zwischen 0 und 4075 liegen"
-        
-        # Kanal 40 muss höher als Kanal 41 sein (höchste Frequenz = höchste Position)
-        if ch40_pos <= ch41_pos:
-            return False, "Kalibrierung ungültig: Kanal 40 (höchste Freq.) muss höhere Position als Kanal 41 (niedrigste Freq.) haben"
-        
-        return True, "Kalibrierung gültig"
-    
-    def get_steps_per_channel(self):
-        """Berechnet Schritte pro Kanal aus der Kalibrierung"""
-        valid, msg = self.is_calibration_valid()
-        if not valid:
-            return 30.0  # Fallback-Wert
-        
-        ch40_pos = self.config.get("channel_40_position", 0)
-        ch41_pos = self.config.get("channel_41_position", 0)
-        
-        # Kanal 41 ist bei Frequenz-Position 0 (niedrigste Frequenz, niedrigste Position)
-        # Kanal 40 ist bei Frequenz-Position 79 (höchste Frequenz, höchste Position)
-        # Der Unterschied ist 79 Frequenz-Positionen
-        frequency_positions_diff = 79  # Von Position 0 (Kanal 41) zu Position 79 (Kanal 40)
-        motor_positions_diff = ch40_pos - ch41_pos  # CH40 ist höher als CH41
-        
-        return motor_positions_diff / frequency_positions_diff
-    
-    def calculate_channel_position(self, channel):
-        """Calculate motor position for a given channel using calibration"""
-        if channel < 1 or channel > 80:
-            return None
-        
-        # Prüfe Kalibrierung
-        valid, msg = self.is_calibration_valid()
-        if not valid:
-            return None
-        
-        # Finde Frequenz-Position des Kanals
-        freq_pos = self.get_channel_frequency_position(channel)
-        if freq_pos is None:
-            return None
-        
-        # Berechne Position basierend auf Kalibrierung
-        ch41_pos = self.config.get("channel_41_position", 0)  # Frequenz-Position 0
-        steps_per_channel = self.get_steps_per_channel()
-        
-        # Motorposition = Basis-Position + (Frequenz-Position * Schritte pro Kanal)
-        return ch41_pos + (freq_pos * steps_per_channel)
-    
-    def calculate_channel_from_position(self, position):
-        """Calculate channel number from motor position using calibration"""
-        # Prüfe Kalibrierung
-        valid, msg = self.is_calibration_valid()
-        if not valid:
-            return 41  # Fallback zu Kanal 41
-        
-        # Berechne Frequenz-Position aus Motor-Position
-        ch41_pos = self.config.get("channel_41_position", 0)  # Frequenz-Position 0
-        steps_per_channel = self.get_steps_per_channel()
-        
-        if steps_per_channel <= 0:
-            return 41  # Fallback
-        
-        # Frequenz-Position = (Motor-Position - Basis-Position) / Schritte pro Kanal
-        relative_position = position - ch41_pos
-        freq_pos = round(relative_position / steps_per_channel)
-        
-        # Begrenze auf gültigen Bereich
-        freq_pos = max(0, min(79, freq_pos))
-        
-        # Finde Kanal für diese Frequenz-Position
-        return self.get_channel_from_frequency_position(freq_pos)
-    
-    def get_calculated_steps_per_channel(self):
-        """Get steps per channel - calculated from calibration positions for display only"""
-        return self.get_steps_per_channel()
+from configuration import Configuration
+from controller_core import (
+    AntennaControllerCore, LogMessage, Alert, ConnectionChanged, StateChanged, CalibrationChanged
+)
+from connection_supervisor import ConnectionLost
+from core_bridge import CoreBridge
+from log_pipeline import LogPipeline
+from motion_model import MotionPredicted
+from port_discovery import auto_connect, list_ports
+from rigctl_server import RigctlServer
+from state_store import StateStore
 
 class MagnetLoopController:
+    # Interval for rendering buffered log messages and core events (about one frame)
+    LOG_FLUSH_INTERVAL_MS = 50
+    
     def __init__(self, root):
         self.root = root
         self.root.title("Magnet Loop Antenna Controller - 11m Band")
@@ -186,23 +42,52 @@ class MagnetLoopController:
         # Configuration management
         self.config = Configuration()
         
-        # Serial connection variables
-        self.serial_connection = None
-        self.is_connected = False
-        self.reading_thread = None
-        self.stop_reading = False
+        # Serial protocol and state run headless in the controller core
+        self.core = AntennaControllerCore(self.config)
+        self.bridge = CoreBridge(self.core).start()
         
-        # Motor status tracking
-        self.motor_is_moving = False
-        self.position_synced = True  # Track if position is synchronized
+        # Optional rigctld server for logging and contest software
+        self.rigctl_server = None
+        if self.config.get("rigctl_port", 0):
+            self.rigctl_server = RigctlServer(self.core, port=self.config.get("rigctl_port"))
+            self.bridge.call(self.rigctl_server.start)
+        
+        # Last state published by the core; widgets redraw only the fields that changed
+        self.is_connected = False
+        self.state = StateStore()
+        self.motion_prediction = None  # MotionPredicted of the running move
+        
+        # Log messages are buffered and rendered once per frame
+        self.log_pipeline = LogPipeline(max_lines=self.config.get("log_max_lines", 2000))
+        
+        # Core event type -> handler
+        self._event_handlers = {
+            LogMessage: lambda event: self.log(event.text),
+            Alert: self._on_alert,
+            ConnectionChanged: self._on_connection_changed,
+            ConnectionLost: self._on_connection_lost,
+            StateChanged: self._on_state_changed,
+            CalibrationChanged: self._on_calibration_changed,
+            MotionPredicted: self._on_motion_predicted,
+        }
         
         # Create GUI
         self.create_widgets()
+        self.state.subscribe(lambda changes: self.update_channel_display(), ("channel",))
+        self.state.subscribe(lambda changes: self.update_motor_status_display(), ("moving",))
+        self.state.subscribe(lambda changes: self.update_sync_status(), ("synced",))
+        self.state.subscribe(lambda changes: self.update_calibration_status(), ("calibration",))
         self.refresh_ports()
         self.load_settings()
         
+        # Connect to the known controller (or search one) in the core thread
+        self.bridge.call(auto_connect, self.core)
+        
         # Bind window close event
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
+        
+        # Start periodic log flushing and event processing
+        self.flush_log()
     
     def create_widgets(self):
         """Create all GUI widgets"""
@@ -260,7 +145,6 @@ class MagnetLoopController:
         self.motor_status_label = ttk.Label(connection_frame, textvariable=self.motor_status_var, 
                                           font=("Arial", 10, "bold"), foreground="green")
         self.motor_status_label.grid(row=0, column=5, padx=(10, 0))
-        self.update_motor_status_display()
         
         # Channel Control Frame
         channel_frame = ttk.LabelFrame(main_frame, text="Kanal Kontrolle (CB Linear)", padding="5")
@@ -282,6 +166,12 @@ class MagnetLoopController:
                                          foreground="green")
         self.sync_status_label.grid(row=0, column=2, padx=(20, 0))
         
+        # Progress of the running move (predicted by the motion model, no serial traffic)
+        self.motion_progress = ttk.Progressbar(current_channel_frame, length=200, maximum=1.0)
+        self.motion_progress.grid(row=1, column=0, columnspan=2, pady=(5, 0), sticky=tk.W)
+        self.motion_eta_var = tk.StringVar()
+        ttk.Label(current_channel_frame, textvariable=self.motion_eta_var).grid(row=1, column=2, padx=(20, 0), pady=(5, 0))
+        
         # Channel navigation buttons
         nav_frame = ttk.Frame(channel_frame)
         nav_frame.grid(row=1, column=0, columnspan=4, pady=(0, 10))
@@ -334,6 +224,10 @@ class MagnetLoopController:
                   command=self.set_channel_41_position).grid(row=0, column=0, padx=(0, 5))
         ttk.Button(cal_buttons_frame, text="Aktuelle Position als Kanal 40 setzen", 
                   command=self.set_channel_40_position).grid(row=0, column=1, padx=(0, 5))
+        ttk.Button(cal_buttons_frame, text="Aktuellen Kanal als Stützpunkt speichern", 
+                  command=self.add_calibration_point).grid(row=0, column=2, padx=(0, 5))
+        ttk.Button(cal_buttons_frame, text="Stützpunkte löschen", 
+                  command=self.clear_calibration_points).grid(row=0, column=3, padx=(0, 5))
         
         # Calibration status
         cal_status_frame = ttk.Frame(cal_frame)
@@ -352,6 +246,8 @@ class MagnetLoopController:
                   command=self.sync_position).grid(row=0, column=1, padx=(0, 5))
         ttk.Button(cal_buttons2_frame, text="Kalibrierung an Arduino senden", 
                   command=self.send_calibration_to_arduino).grid(row=0, column=2, padx=(0, 5))
+        ttk.Button(cal_buttons2_frame, text="Band-Sweep (automatisch kalibrieren)", 
+                  command=self.sweep_calibration).grid(row=0, column=3, padx=(0, 5))
         
         # Control Frame
         control_frame = ttk.LabelFrame(main_frame, text="Manuelle Stepper Kontrolle", padding="5")
@@ -418,8 +314,15 @@ class MagnetLoopController:
         self.log_text = scrolledtext.ScrolledText(log_frame, height=25, width=60)
         self.log_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
-        # Clear log button
-        ttk.Button(log_frame, text="Log löschen", command=self.clear_log).grid(row=1, column=0, pady=(5, 0))
+        # Log filter and clear button
+        log_buttons_frame = ttk.Frame(log_frame)
+        log_buttons_frame.grid(row=1, column=0, pady=(5, 0))
+        
+        ttk.Label(log_buttons_frame, text="Filter:").grid(row=0, column=0, padx=(0, 5))
+        self.log_filter_var = tk.StringVar()
+        self.log_filter_var.trace_add("write", lambda *args: self.apply_log_filter())
+        ttk.Entry(log_buttons_frame, textvariable=self.log_filter_var, width=20).grid(row=0, column=1, padx=(0, 10))
+        ttk.Button(log_buttons_frame, text="Log löschen", command=self.clear_log).grid(row=0, column=2)
         
         # Configure grid weights für besseres Layout
         main_frame.columnconfigure(2, weight=1)
@@ -427,43 +330,33 @@ class MagnetLoopController:
     
     def load_settings(self):
         """Load settings from configuration"""
-        # Load calibration values into existing StringVars
-        self.ch41_pos_var.set(str(self.config.get("channel_41_position", 0)))
-        self.ch40_pos_var.set(str(self.config.get("channel_40_position", 2400)))
-        
-        # Calculate and display steps per channel (read-only)
-        calculated_steps = self.config.get_calculated_steps_per_channel()
-        self.steps_per_channel_var.set(f"{calculated_steps:.2f}")
-        
-        # Update current channel display
-        self.update_channel_display()
+        # Initial state: renders channel, motor and sync status and the calibration
+        state = self.core.state()
+        self.state.set(channel=state.channel, position=state.position, moving=state.moving,
+                       synced=state.synced, calibration=self.core.calibration())
         
         # Set last used RPM
         self.rpm_var.set(str(self.config.get("last_rpm", 12)))
         
-        # Set sync status
-        self.update_sync_status()
-        
-        # Check calibration status
-        self.update_calibration_status()
-        
         # Try to select last used port
-        last_port = self.config.get("last_port", "")
-        if last_port:
+        self.select_port(self.config.get("last_port", ""))
+    
+    def select_port(self, port_name):
+        """Select ``port_name`` in the port list if it is there"""
+        if port_name:
             port_values = self.port_combo['values']
             for i, port_desc in enumerate(port_values):
-                if port_desc.startswith(last_port):
+                if port_desc.startswith(port_name + " - "):
                     self.port_combo.current(i)
                     break
     
     def update_channel_display(self):
         """Update the current channel display"""
-        current_channel = self.config.get("current_channel", 41)
-        self.current_channel_var.set(f"Kanal {current_channel}")
+        self.current_channel_var.set(f"Kanal {self.state['channel']}")
     
     def update_sync_status(self):
         """Update the position synchronization status"""
-        if self.position_synced:
+        if self.state["synced"]:
             self.sync_status_var.set("Position synchronisiert")
             self.sync_status_label.config(foreground="green")
         else:
@@ -472,140 +365,118 @@ class MagnetLoopController:
     
     def update_motor_status_display(self):
         """Update the motor status display"""
-        if self.motor_is_moving:
+        if self.state["moving"]:
             self.motor_status_var.set("🔄 Motor läuft")
             self.motor_status_label.config(foreground="orange")
         else:
             self.motor_status_var.set("⚫ Motor bereit")
             self.motor_status_label.config(foreground="green")
     
+    def update_motion_progress(self):
+        """Advance the progress bar and ETA of the running move"""
+        prediction = self.motion_prediction
+        if prediction is None:
+            return
+        if not self.state["moving"]:
+            self.motion_prediction = None
+            self.motion_progress["value"] = 0.0
+            self.motion_eta_var.set("")
+            return
+        now = time.monotonic()
+        self.motion_progress["value"] = prediction.progress(now)
+        self.motion_eta_var.set(f"Fertig in {prediction.remaining(now):.1f} s")
+    
     def update_calibration_status(self):
-        """Update calibration status display"""
-        valid, msg = self.config.is_calibration_valid()
-        if hasattr(self, 'calibration_status_label'):
-            if valid:
-                self.calibration_status_label.config(text=f"✓ {msg}", foreground="green")
-            else:
-                self.calibration_status_label.config(text=f"⚠ {msg}", foreground="red")
+        """Update calibration values and status display"""
+        calibration = self.state["calibration"]
+        self.ch41_pos_var.set(str(calibration.channel_41_position))
+        self.ch40_pos_var.set(str(calibration.channel_40_position))
+        self.steps_per_channel_var.set(f"{calibration.steps_per_channel:.2f}")
+        if calibration.valid:
+            self.calibration_status_label.config(text=f"✓ {calibration.message}", foreground="green")
+        else:
+            self.calibration_status_label.config(text=f"⚠ {calibration.message}", foreground="red")
+    
+    # ------------------------------------------------------------------
+    # Core events (main thread)
+    
+    def process_core_events(self):
+        """Apply the events the core published since the last call
+
+        State snapshots are reduced to the newest of the batch and the
+        batch is one state transaction, so a burst of replies redraws only
+        the status widgets whose value differs, once per frame.
+        """
+        with self.state.transaction():
+            for event in self.bridge.drain(latest_only=(StateChanged, CalibrationChanged)):
+                handler = self._event_handlers.get(type(event))
+                if handler:
+                    handler(event)
+    
+    def _on_alert(self, event):
+        show = {"info": messagebox.showinfo, "error": messagebox.showerror}.get(event.level, messagebox.showwarning)
+        show(event.title, event.message)
+    
+    def _on_connection_changed(self, event):
+        self.is_connected = event.connected
+        if event.connected:
+            self.connect_button.config(text="Trennen")
+            self.select_port(event.port)
+            self.status_label.config(text="Verbunden", foreground="green")
+        else:
+            self.connect_button.config(text="Verbinden")
+            self.status_label.config(text="Nicht verbunden", foreground="red")
+    
+    def _on_connection_lost(self, event):
+        if self.config.get("auto_reconnect", True):
+            self.status_label.config(text="Verbindung verloren - warte auf Gerät", foreground="orange")
+    
+    def _on_state_changed(self, event):
+        self.state.set(channel=event.channel, position=event.position,
+                       moving=event.moving, synced=event.synced)
+    
+    def _on_calibration_changed(self, event):
+        self.state.set(calibration=event)
+    
+    def _on_motion_predicted(self, event):
+        self.motion_prediction = event
+    
+    # ------------------------------------------------------------------
+    # Commands (forwarded to the core)
     
     def change_channel(self, delta):
         """Change channel by delta amount with wrap-around (cyclic)"""
-        if not self.is_connected:
-            messagebox.showwarning("Warnung", "Nicht mit Arduino verbunden!")
-            return
-        
-        if self.motor_is_moving:
-            messagebox.showwarning("Warnung", "Motor bewegt sich gerade. Bitte warten!")
-            return
-        
-        # Prüfe Kalibrierung
-        valid, msg = self.config.is_calibration_valid()
-        if not valid:
-            messagebox.showerror("Kalibrierung ungültig", f"Kanalnavigation nicht möglich:\n{msg}")
-            return
-        
-        current_channel = self.config.get("current_channel", 41)
-        new_channel = current_channel + delta
-        
-        # Implement wrap-around (cyclic) channel navigation
-        # Channels are 1-80, so we need to handle overflow/underflow
-        while new_channel > 80:
-            new_channel -= 80
-        while new_channel < 1:
-            new_channel += 80
-        
-        # Send channel command to Arduino (let Arduino handle the calculations)
-        self.send_command(f"CH{new_channel}")
-        
-        # Update current channel
-        self.config.set("current_channel", new_channel)
-        self.update_channel_display()
-        
-        # Set motor as moving
-        self.motor_is_moving = True
-        self.update_motor_status_display()
-        
-        self.log(f"Befehl gesendet: Fahre zu Kanal {new_channel} (von Kanal {current_channel} mit Delta {delta})")
+        self.bridge.call(self.core.change_channel, delta)
     
     def goto_channel(self):
         """Go directly to specified channel"""
         try:
             target_channel = int(self.goto_channel_var.get())
-            
-            if target_channel < 1 or target_channel > 80:
-                messagebox.showerror("Fehler", "Kanal muss zwischen 1 und 80 liegen!")
-                return
-            
-            if not self.is_connected:
-                messagebox.showwarning("Warnung", "Nicht mit Arduino verbunden!")
-                return
-            
-            if self.motor_is_moving:
-                messagebox.showwarning("Warnung", "Motor bewegt sich gerade. Bitte warten!")
-                return
-            
-            # Prüfe Kalibrierung
-            valid, msg = self.config.is_calibration_valid()
-            if not valid:
-                messagebox.showerror("Kalibrierung ungültig", f"Kanalnavigation nicht möglich:\n{msg}")
-                return
-            
-            # Send channel command directly to Arduino
-            self.send_command(f"CH{target_channel}")
-            
-            # Update local tracking
-            self.config.set("current_channel", target_channel)
-            self.update_channel_display()
-            
-            # Set motor as moving
-            self.motor_is_moving = True
-            self.update_motor_status_display()
-            
-            self.log(f"Befehl gesendet: Gehe zu Kanal {target_channel}")
-                
         except ValueError:
             messagebox.showerror("Fehler", "Ungültiger Kanal!")
+            return
+        self.bridge.call(self.core.goto_channel, target_channel)
     
     def set_channel_41_position(self):
         """Set current position as channel 41 position"""
-        if not self.is_connected:
-            messagebox.showwarning("Warnung", "Nicht mit Arduino verbunden!")
-            return
-        
-        # Get current position from Arduino
-        self.send_command("P")
-        # Note: The actual position will be updated via serial response
-        
-        # For now, use the stored position
-        current_pos = self.config.get("current_position", 0)
-        self.config.set("channel_41_position", current_pos)
-        self.ch41_pos_var.set(str(current_pos))
-        
-        # Update calculated steps per channel
-        calculated_steps = self.config.get_calculated_steps_per_channel()
-        self.steps_per_channel_var.set(f"{calculated_steps:.2f}")
-        
-        self.log(f"Kanal 41 Position auf {current_pos} gesetzt")
+        self.bridge.call(self.core.set_calibration_point, "channel_41_position")
     
     def set_channel_40_position(self):
         """Set current position as channel 40 position"""
-        if not self.is_connected:
-            messagebox.showwarning("Warnung", "Nicht mit Arduino verbunden!")
-            return
-        
-        # Get current position from Arduino
-        self.send_command("P")
-        
-        # For now, use the stored position
-        current_pos = self.config.get("current_position", 0)
-        self.config.set("channel_40_position", current_pos)
-        self.ch40_pos_var.set(str(current_pos))
-        
-        # Update calculated steps per channel
-        calculated_steps = self.config.get_calculated_steps_per_channel()
-        self.steps_per_channel_var.set(f"{calculated_steps:.2f}")
-        
-        self.log(f"Kanal 40 Position auf {current_pos} gesetzt")
+        self.bridge.call(self.core.set_calibration_point, "channel_40_position")
+    
+    def add_calibration_point(self):
+        """Store the current position as calibration point of the current channel"""
+        self.bridge.call(self.core.add_calibration_point)
+    
+    def sweep_calibration(self):
+        """Calibrate all channels from one band sweep with the resonance meter"""
+        self.bridge.call(self.core.sweep_calibration)
+    
+    def clear_calibration_points(self):
+        """Remove all further calibration points"""
+        if messagebox.askyesno("Stützpunkte löschen", "Alle Stützpunkte zwischen Kanal 41 und 40 löschen?"):
+            self.bridge.call(self.core.remove_calibration_points)
     
     def save_calibration(self):
         """Save calibration settings"""
@@ -640,47 +511,23 @@ class MagnetLoopController:
                 if not result:
                     return
             
-            self.config.set("channel_41_position", ch41_pos)
-            self.config.set("channel_40_position", ch40_pos)
-            self.config.save_config()
-            
-            # Update the calculated steps per channel display
-            calculated_steps = self.config.get_calculated_steps_per_channel()
-            self.steps_per_channel_var.set(f"{calculated_steps:.2f}")
-            
-            # Update calibration status
-            self.update_calibration_status()
-            
+            self.bridge.call(self.core.save_calibration, ch41_pos, ch40_pos)
             messagebox.showinfo("Info", "Kalibrierung gespeichert!")
-            self.log(f"Kalibrierung gespeichert: CH41={ch41_pos}, CH40={ch40_pos}, Schritte/Kanal={calculated_steps:.2f}")
             
         except ValueError:
             messagebox.showerror("Fehler", "Ungültige Eingaben für Kalibrierung!")
     
     def sync_position(self):
         """Synchronize position with Arduino"""
-        if not self.is_connected:
-            messagebox.showwarning("Warnung", "Nicht mit Arduino verbunden!")
-            return
-        
-        # First send current position to Arduino
-        current_pos = self.config.get("current_position", 0)
-        pos_command = f"SETPOS{current_pos}"
-        if self.send_command(pos_command):
-            self.log(f"Position an Arduino gesendet: {current_pos}")
-            
-            # Then request position from Arduino to verify
-            self.send_command("P")
-            self.position_synced = True
-            self.update_sync_status()
-            self.log("Position mit Arduino synchronisiert")
-        else:
-            self.log("Fehler beim Synchronisieren der Position")
+        self.bridge.call(self.core.sync_position)
+    
+    def send_calibration_to_arduino(self):
+        """Send calibration data to Arduino"""
+        self.bridge.call(self.core.send_calibration)
     
     def refresh_ports(self):
         """Refresh available serial ports"""
-        ports = serial.tools.list_ports.comports()
-        port_list = [f"{port.device} - {port.description}" for port in ports]
+        port_list = [f"{port.device} - {port.description}" for port in list_ports()]
         self.port_combo['values'] = port_list
         if port_list:
             self.port_combo.current(0)
@@ -693,265 +540,23 @@ class MagnetLoopController:
             self.disconnect()
     
     def connect(self):
-        """Connect to selected serial port"""
+        """Connect to selected serial port (does not block the GUI)"""
         if not self.port_var.get():
             messagebox.showerror("Fehler", "Bitte wählen Sie einen Port aus.")
             return
         
         # Extract port name from combo box selection
         port_name = self.port_var.get().split(' - ')[0]
-        
-        try:
-            self.serial_connection = serial.Serial(
-                port=port_name,
-                baudrate=9600,
-                timeout=1
-            )
-            
-            # Wait for Arduino to initialize
-            time.sleep(2)
-            
-            self.is_connected = True
-            self.connect_button.config(text="Trennen")
-            self.status_label.config(text="Verbunden", foreground="green")
-            
-            # Start reading thread
-            self.stop_reading = False
-            self.reading_thread = threading.Thread(target=self.read_serial, daemon=True)
-            self.reading_thread.start()
-            
-            self.log(f"Verbunden mit {port_name}")
-            
-            # Send calibration and position to Arduino after successful connection
-            self.root.after(3000, self.send_calibration_to_arduino)  # Wait 3 seconds for Arduino to be ready
-            
-        except Exception as e:
-            messagebox.showerror("Verbindungsfehler", f"Fehler beim Verbinden: {str(e)}")
-            self.log(f"Verbindungsfehler: {str(e)}")
+        self.status_label.config(text="Verbinde...", foreground="orange")
+        self.bridge.call(self.core.connect, port_name)
     
     def disconnect(self):
         """Disconnect from serial port"""
-        self.stop_reading = True
-        if self.serial_connection:
-            self.serial_connection.close()
-            self.serial_connection = None
-        
-        self.is_connected = False
-        self.connect_button.config(text="Verbinden")
-        self.status_label.config(text="Nicht verbunden", foreground="red")
-        self.log("Verbindung getrennt")
-    
-    def send_calibration_to_arduino(self):
-        """Send calibration data to Arduino after connection"""
-        if not self.is_connected:
-            return
-            
-        # Check if we have valid calibration
-        valid, msg = self.config.is_calibration_valid()
-        if not valid:
-            self.log(f"Kalibrierung nicht gesendet: {msg}")
-            return
-        
-        ch41_pos = self.config.get("channel_41_position", 0)
-        ch40_pos = self.config.get("channel_40_position", 2400)
-        current_pos = self.config.get("current_position", 0)
-        
-        # Send calibration to Arduino
-        cal_command = f"CAL{ch41_pos},{ch40_pos}"
-        if self.send_command(cal_command):
-            self.log(f"Kalibrierung an Arduino gesendet: CH41={ch41_pos}, CH40={ch40_pos}")
-            
-            # Set current position on Arduino
-            pos_command = f"SETPOS{current_pos}"
-            if self.send_command(pos_command):
-                self.log(f"Position an Arduino gesendet: {current_pos}")
-                self.position_synced = True
-                self.update_sync_status()
-            else:
-                self.log("Fehler beim Senden der Position an Arduino")
-        else:
-            self.log("Fehler beim Senden der Kalibrierung an Arduino")
-    
-    def read_serial(self):
-        """Read data from serial port in separate thread"""
-        while not self.stop_reading and self.serial_connection:
-            try:
-                if self.serial_connection.in_waiting > 0:
-                    data = self.serial_connection.readline().decode('utf-8').strip()
-                    if data:
-                        self.log(f"Arduino: {data}")
-                        self.parse_arduino_response(data)
-            except Exception as e:
-                self.log(f"Lesefehler: {str(e)}")
-                break
-            time.sleep(0.1)
-    
-    def parse_arduino_response(self, response):
-        """Parse Arduino response and update internal state"""
-        try:
-            if "Position:" in response or "Aktuelle Position:" in response:
-                # Extract position from response
-                parts = response.split(":")
-                if len(parts) >= 2:
-                    new_position = int(parts[1].strip())
-                    old_position = self.config.get("current_position", 0)
-                    
-                    # Check for suspicious position jumps
-                    position_diff = abs(new_position - old_position)
-                    if position_diff > 4100 and old_position != 0:  # Larger than maximum possible range
-                        self.log(f"⚠ WARNUNG: Verdächtiger Positionssprung von {old_position} zu {new_position} (Diff: {position_diff})")
-                        messagebox.showwarning("Position Anomalie", 
-                            f"Verdächtiger Positionssprung erkannt!\n"
-                            f"Alt: {old_position} → Neu: {new_position}\n"
-                            f"Differenz: {position_diff} Schritte\n\n"
-                            f"Dies könnte auf ein Arduino-Problem hindeuten.\n"
-                            f"Bitte Position manuell überprüfen!")
-                        # Mark position as not synchronized
-                        self.position_synced = False
-                        self.update_sync_status()
-                    
-                    self.config.set("current_position", new_position)
-                    
-                    # Update current channel based on position
-                    channel = self.config.calculate_channel_from_position(new_position)
-                    if channel:
-                        self.config.set("current_channel", channel)
-                        self.update_channel_display()
-                        # Save configuration to keep position and channel synchronized
-                        self.config.save_config()
-                    
-                    self.log(f"Position aktualisiert: {new_position} (Kanal {channel})")
-            
-            elif "Motor angehalten" in response or "STOPP" in response:
-                self.motor_is_moving = False
-                self.update_motor_status_display()
-                self.log("✓ Motor gestoppt")
-                
-            elif "Motor fertig" in response or "Bewegung abgeschlossen" in response:
-                self.motor_is_moving = False
-                self.update_motor_status_display()
-                self.log("✓ Motor fertig - Bewegung abgeschlossen")
-                # Request position update after movement completes
-                self.root.after(500, lambda: self.send_command("P"))
-                
-            elif "Motor startet" in response:
-                self.motor_is_moving = True
-                self.update_motor_status_display()
-                if "Kanal" in response:
-                    # Extract channel number from response
-                    try:
-                        parts = response.split()
-                        for i, part in enumerate(parts):
-                            if part == "Kanal" and i + 1 < len(parts):
-                                channel = int(parts[i + 1])
-                                self.config.set("current_channel", channel)
-                                self.update_channel_display()
-                                break
-                    except (ValueError, IndexError):
-                        pass
-                self.log("⚡ " + response)
-                
-            elif "Fahre zu Kanal" in response:
-                self.motor_is_moving = True
-                self.update_motor_status_display()
-                # Extract channel number from response
-                try:
-                    parts = response.split()
-                    for i, part in enumerate(parts):
-                        if part == "Kanal" and i + 1 < len(parts):
-                            channel = int(parts[i + 1])
-                            self.config.set("current_channel", channel)
-                            self.update_channel_display()
-                            break
-                except (ValueError, IndexError):
-                    pass
-                self.log("➡ " + response)
-                
-            elif "Fahre" in response and "Schritte" in response:
-                self.motor_is_moving = True
-                self.update_motor_status_display()
-                # Mark position as potentially out of sync for manual moves
-                if "Schritte" in response and self.position_synced:
-                    self.position_synced = False
-                    self.update_sync_status()
-                self.log("➡ " + response)
-            
-            elif "Bereits auf Kanal" in response:
-                # Motor is not moving when already on target channel
-                self.motor_is_moving = False
-                self.update_motor_status_display()
-                # Extract channel number
-                try:
-                    parts = response.split()
-                    channel = int(parts[-1])
-                    self.config.set("current_channel", channel)
-                    self.update_channel_display()
-                    self.log("✓ " + response)
-                except (ValueError, IndexError):
-                    self.log("✓ " + response)
-                    
-            elif "Motor Status:" in response:
-                if "Bereit" in response:
-                    self.motor_is_moving = False
-                    self.update_motor_status_display()
-                elif "Beschäftigt" in response:
-                    self.motor_is_moving = True
-                    self.update_motor_status_display()
-            
-            elif "Kalibrierung empfangen:" in response:
-                self.log("✓ Arduino hat Kalibrierung empfangen")
-                
-            elif "Position gesetzt auf:" in response:
-                # Extract position from response
-                try:
-                    parts = response.split(":")
-                    if len(parts) >= 2:
-                        position = int(parts[1].strip())
-                        self.config.set("current_position", position)
-                        self.log(f"✓ Arduino Position gesetzt: {position}")
-                except ValueError:
-                    pass
-                    
-            elif "Warnung: Verwende Fallback-Berechnung" in response:
-                self.log("⚠ " + response)
-                messagebox.showwarning("Arduino Warnung", 
-                    "Arduino verwendet Fallback-Berechnung!\n"
-                    "Kalibrierung wurde nicht korrekt übertragen.\n"
-                    "Bitte Verbindung neu aufbauen.")
-                    
-        except Exception as e:
-            self.log(f"Fehler beim Verarbeiten der Arduino-Antwort: {e}")
-    
-    def send_command(self, command):
-        """Send command to Arduino"""
-        if not self.is_connected or not self.serial_connection:
-            messagebox.showwarning("Warnung", "Nicht mit Arduino verbunden!")
-            return False
-        
-        try:
-            self.serial_connection.write(f"{command}\n".encode('utf-8'))
-            self.log(f"Gesendet: {command}")
-            return True
-        except Exception as e:
-            self.log(f"Sendefehler: {str(e)}")
-            return False
+        self.bridge.call(self.core.disconnect)
     
     def move_steps(self, steps, forward=True):
-        """Move stepper motor by specified steps"""
-        if forward:
-            command = f"F{steps}"
-            # Update estimated position
-            current_pos = self.config.get("current_position", 0)
-            self.config.set("current_position", current_pos + steps)
-        else:
-            command = f"B{steps}"
-            # Update estimated position
-            current_pos = self.config.get("current_position", 0)
-            self.config.set("current_position", current_pos - steps)
-        
-        self.send_command(command)
-        self.motor_is_moving = True
-        self.update_motor_status_display()
+        """Move stepper motor by specified steps (merged with further clicks)"""
+        self.bridge.call(self.core.jog_steps, steps, forward)
     
     def move_custom_forward(self):
         """Move forward with custom step count"""
@@ -977,46 +582,46 @@ class MagnetLoopController:
     
     def stop_movement(self):
         """Stop stepper movement"""
-        self.send_command("S")
-        self.motor_is_moving = False
-        self.update_motor_status_display()
+        self.bridge.call(self.core.stop_movement)
     
     def get_position(self):
         """Get current stepper position"""
-        self.send_command("P")
+        self.bridge.call(self.core.query_position)
     
     def set_rpm(self):
         """Set stepper RPM"""
         try:
             rpm = int(self.rpm_var.get())
             if 1 <= rpm <= 20:
-                self.send_command(f"RPM{rpm}")
+                self.bridge.call(self.core.set_rpm, rpm)
             else:
                 messagebox.showerror("Fehler", "RPM muss zwischen 1 und 20 liegen!")
         except ValueError:
             messagebox.showerror("Fehler", "Ungültige RPM Eingabe!")
     
     def log(self, message):
-        """Add message to log"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        log_message = f"[{timestamp}] {message}\n"
-        
-        # Thread-safe GUI update
-        self.root.after(0, self._update_log, log_message)
+        """Add message to log (thread-safe, rendered with the next flush)"""
+        self.log_pipeline.push(message)
     
-    def _update_log(self, message):
-        """Update log text widget (must be called from main thread)"""
-        self.log_text.insert(tk.END, message)
-        self.log_text.see(tk.END)
+    def flush_log(self):
+        """Apply core events and render buffered log messages in one batch (main thread)"""
+        self.process_core_events()
+        self.update_motion_progress()
+        self.log_pipeline.flush(self.log_text)
+        self.root.after(self.LOG_FLUSH_INTERVAL_MS, self.flush_log)
+    
+    def apply_log_filter(self):
+        """Re-render the log with the current filter text"""
+        self.log_pipeline.set_filter(self.log_filter_var.get(), self.log_text)
     
     def clear_log(self):
         """Clear log text"""
-        self.log_text.delete(1.0, tk.END)
+        self.log_pipeline.clear(self.log_text)
     
     def on_closing(self):
         """Handle application closing"""
         # Check if motor is moving
-        if self.motor_is_moving:
+        if self.state["moving"]:
             result = messagebox.askyesno(
                 "Warnung", 
                 "Der Motor bewegt sich noch!\n\n"
@@ -1030,7 +635,7 @@ class MagnetLoopController:
                 return
             
             # Mark position as not synced for next startup
-            self.position_synced = False
+            self.state.set(synced=False)
             self.log("WARNUNG: GUI geschlossen während Motor bewegung - Position könnte ungenau sein!")
         
         # Save current settings
@@ -1046,17 +651,13 @@ class MagnetLoopController:
                 self.config.set("last_rpm", rpm)
             except ValueError:
                 pass
-            
-            # Save configuration
-            self.config.save_config()
-            self.log("Konfiguration gespeichert")
-            
         except Exception as e:
             self.log(f"Fehler beim Speichern der Konfiguration: {e}")
         
-        # Disconnect and close
-        if self.is_connected:
-            self.disconnect()
+        # Disconnect, write the configuration and close
+        if self.rigctl_server:
+            self.bridge.call(self.rigctl_server.close)
+        self.bridge.stop()
         self.root.destroy()
 
 def main():
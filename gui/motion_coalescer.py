@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Motion Coalescer
+================
+Folds motion requests into one goal before they reach the serial port.
+
+The firmware executes every F/B/CH command as its own move (start ramp,
+travel, "Motor fertig") and cannot retarget a running move: after S it
+reports the target of the stopped move as position. So instead of
+queueing each click in the firmware ``moveQueue`` (or refusing it while
+the motor runs), requests are merged into a pending plan:
+
+    - a channel request replaces the pending plan ("latest target wins");
+      relative channel changes count from the pending goal
+    - relative steps are added up into one net move (F10, F10, B5 -> F15;
+      F10, B10 -> nothing), applied after a pending channel goal
+
+The plan is sent as soon as no move is running. Every request returns the
+future of the plan it was merged into; it resolves to the final position
+(None if nothing had to move) or raises ``MotionCancelled`` after STOP.
+"""
+
+import asyncio
+
+from command_tracker import CommandError, MotionCancelled
+
+
+class MotionPlan:
+    """Pending goal: an optional channel, then a net number of steps"""
+
+    __slots__ = ("channel", "steps", "requests", "future")
+
+    def __init__(self, future):
+        self.channel = None
+        self.steps = 0  # positive: forward (F), negative: backward (B)
+        self.requests = 0
+        self.future = future
+
+
+class MotionCoalescer:
+    """Merges channel and step requests of one ``AntennaControllerCore``"""
+
+    def __init__(self, core):
+        self.core = core
+        self._plan = None
+        self._task = None
+
+        # Statistics
+        self.requests = 0  # motion requests received
+        self.merged = 0  # requests merged into a pending plan
+        self.moves_sent = 0  # F/B/CH commands written
+
+    @property
+    def target_channel(self):
+        """Channel of the pending plan, or None"""
+        return self._plan.channel if self._plan is not None else None
+
+    @property
+    def pending_requests(self):
+        return self._plan.requests if self._plan is not None else 0
+
+    # ------------------------------------------------------------------
+    # Requests
+
+    def _pending(self):
+        """The plan new requests are merged into"""
+        self.requests += 1
+        if self._plan is None:
+            future = asyncio.get_running_loop().create_future()
+            # Nobody may await a click; retrieve its exception
+            future.add_done_callback(lambda f: f.cancelled() or f.exception())
+            self._plan = MotionPlan(future)
+        else:
+            self.merged += 1
+        self._plan.requests += 1
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._dispatch())
+        return self._plan
+
+    def goto_channel(self, channel):
+        """Make ``channel`` the goal; pending channels and steps are dropped"""
+        plan = self._pending()
+        plan.channel = channel
+        plan.steps = 0
+        return plan.future
+
+    def change_channel(self, delta):
+        """Goal ``delta`` channels from the pending goal (or the current channel), cyclic 1-80"""
+        base = self.target_channel or self.core.config.get("current_channel", 41)
+        return self.goto_channel((base + delta - 1) % 80 + 1)
+
+    def step(self, steps):
+        """Add ``steps`` (negative: backward) to the pending net move"""
+        plan = self._pending()
+        plan.steps += steps
+        return plan.future
+
+    def cancel(self):
+        """Drop the pending plan (STOP)"""
+        plan, self._plan = self._plan, None
+        if plan is not None and not plan.future.done():
+            plan.future.set_exception(MotionCancelled("Geplante Bewegung verworfen"))
+
+    async def settled(self):
+        """Wait until every accepted request has been sent and completed"""
+        while self._task is not None and not self._task.done():
+            await asyncio.wait([self._task])
+
+    # ------------------------------------------------------------------
+    # Sending
+
+    async def _dispatch(self):
+        """Send the pending plan whenever no move is running"""
+        while self._plan is not None:
+            if self.core.commands is not None and self.core.pending_moves:
+                await self.core.idle()
+            plan, self._plan = self._plan, None
+            if plan is None:
+                break
+            if plan.requests > 1:
+                self.core.log(f"{plan.requests} Bewegungsbefehle zu einer Bewegung zusammengefasst")
+            moves = []
+            if plan.channel is not None:
+                moves.append(self.core.start_channel_move(plan.channel))
+            if plan.steps:
+                moves.append(self.core.move_steps(abs(plan.steps), plan.steps > 0))
+            # A move that was sent runs (and is tracked) even if the next one was not
+            sent = [move for move in moves if move is not None]
+            self.moves_sent += len(sent)
+            try:
+                results = await asyncio.gather(*sent)
+            except (CommandError, TimeoutError, ConnectionError) as e:
+                if not plan.future.done():
+                    plan.future.set_exception(e)
+            else:
+                if plan.future.done():
+                    continue
+                if len(sent) < len(moves):
+                    plan.future.set_exception(ConnectionError("Bewegung nicht gesendet"))
+                else:
+                    plan.future.set_result(results[-1] if results else None)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Motion Model
+============
+Predicts how long a move of the firmware takes, so the host knows when
+the motor will stop without asking it.
+
+CheapStepper in 4076-step mode waits ``60e6 / (4076 * rpm)`` µs (integer
+division, 600 µs from 24 RPM up) between two steps. The time from the
+"Motor startet" to the "Motor fertig" line as seen by the host is modelled
+as
+
+    seconds = overhead + scale * steps * step interval(rpm)
+
+``overhead`` covers the loop and reply latency of a move, ``scale`` how
+far the real step rate is off the nominal one (loop time per step on the
+board, a simulator running faster than real time). Both are fitted online
+by weighted least squares from every completed move, with older moves
+weighted down by ``FORGETTING`` per observation. The fit starts from two
+pseudo-moves on the initial parameters (weight ``PRIOR_WEIGHT``, halved
+with every observed move), so the first moves already count; a small
+ridge towards the initial parameters keeps it defined while all moves
+have the same length.
+Once ``SETTLE_OBSERVATIONS`` moves were fitted, observations far off the
+prediction (a stalled board, a lost reply) are ignored.
+
+The core predicts every move when the firmware starts it, publishes the
+prediction as ``MotionPredicted`` (progress bar and ETA in the GUI) and
+asks for the position when the move should be complete, so the reply
+follows "Motor fertig" without a fixed delay. If "Motor fertig" comes
+first, or the query was answered while the motor still ran, it asks again
+at once.
+"""
+
+from collections import deque
+from dataclasses import dataclass
+
+# 28BYJ-48 in CheapStepper 4076-step mode (set4076StepMode in main.cpp)
+STEPS_PER_REVOLUTION = 4076
+
+
+def step_interval(rpm):
+    """Seconds between two steps at ``rpm`` (CheapStepper calcDelay)"""
+    if rpm >= 24:
+        return 600e-6
+    return 60000000 // (STEPS_PER_REVOLUTION * max(rpm, 6)) / 1e6
+
+
+@dataclass(frozen=True, slots=True)
+class MotionPredicted:
+    """The firmware started a move; expected duration from the motion model"""
+    steps: int
+    rpm: int
+    seconds: float
+    started: float  # time.monotonic() when the move started
+
+    def remaining(self, now):
+        """Seconds until the predicted end (0 once it passed)"""
+        return max(self.started + self.seconds - now, 0.0)
+
+    def progress(self, now):
+        """Fraction of the move done at ``now`` (0..1)"""
+        if self.seconds <= 0:
+            return 1.0
+        return min(max((now - self.started) / self.seconds, 0.0), 1.0)
+
+
+class MotionModel:
+    """Online fit of move duration over steps and RPM"""
+
+    PRIOR_WEIGHT = 1.0
+    PRIOR_DECAY = 0.5
+    PRIOR_SPAN = 1.0  # nominal seconds of the long pseudo-move
+    RIDGE = 1e-3
+    FORGETTING = 0.95
+    # After this many moves, observations longer than OUTLIER_FACTOR times
+    # the prediction (plus a second) are ignored
+    SETTLE_OBSERVATIONS = 5
+    OUTLIER_FACTOR = 3.0
+
+    def __init__(self, overhead=0.0, scale=1.0):
+        self._prior = (overhead, scale)
+        self.overhead = overhead
+        self.scale = scale
+        self._prior_weight = self.PRIOR_WEIGHT
+        # Weighted sums of x (nominal seconds) and y (observed seconds)
+        self._w = self._x = self._y = self._xx = self._xy = 0.0
+
+        # Statistics
+        self.observations = 0
+        self.rejected = 0
+        self.errors = deque(maxlen=100)  # observed - predicted seconds
+
+    def predict(self, steps, rpm):
+        """Expected seconds from "Motor startet" to "Motor fertig" """
+        return max(self.overhead + self.scale * abs(steps) * step_interval(rpm), 0.0)
+
+    def observe(self, steps, rpm, seconds):
+        """Fit a completed move; returns False if it was ignored as an outlier"""
+        predicted = self.predict(steps, rpm)
+        settled = self.observations >= self.SETTLE_OBSERVATIONS
+        if seconds < 0 or (settled and seconds > predicted * self.OUTLIER_FACTOR + 1.0):
+            self.rejected += 1
+            return False
+        self.errors.append(seconds - predicted)
+        self.observations += 1
+
+        x = abs(steps) * step_interval(rpm)
+        forget = self.FORGETTING
+        self._w = self._w * forget + 1.0
+        self._x = self._x * forget + x
+        self._y = self._y * forget + seconds
+        self._xx = self._xx * forget + x * x
+        self._xy = self._xy * forget + x * seconds
+        self._prior_weight *= self.PRIOR_DECAY
+        self._solve()
+        return True
+
+    def _solve(self):
+        # Normal equations with the pseudo-moves (0, overhead0) and
+        # (PRIOR_SPAN, overhead0 + scale0 * PRIOR_SPAN), plus the ridge
+        overhead0, scale0 = self._prior
+        weight, span, ridge = self._prior_weight, self.PRIOR_SPAN, self.RIDGE
+        a = self._w + 2 * weight + ridge
+        b = self._x + weight * span
+        d = self._xx + weight * span * span + ridge
+        ry = self._y + weight * (2 * overhead0 + scale0 * span) + ridge * overhead0
+        rxy = self._xy + weight * span * (overhead0 + scale0 * span) + ridge * scale0
+        det = a * d - b * b
+        if det <= 0:
+            return
+        self.overhead = (d * ry - b * rxy) / det
+        self.scale = (a * rxy - b * ry) / det
+
+    @property
+    def mean_error(self):
+        """Mean absolute prediction error of the recent moves in seconds"""
+        if not self.errors:
+            return None
+        return sum(abs(error) for error in self.errors) / len(self.errors)
+
+    def parameters(self):
+        """Fitted parameters, e.g. for the configuration"""
+        return {"overhead": round(self.overhead, 4), "scale": round(self.scale, 4)}
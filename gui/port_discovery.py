@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Port Discovery
+==============
+Finds serial ports running the magnet loop firmware and remembers
+controllers by their USB identity instead of the device path, which
+changes when ttyACM numbers are reassigned.
+
+    - ``device_key`` identifies a USB serial device as "VID:PID:SERIAL"
+    - ``probe_port`` opens one port and waits for the ready banner (boards
+      that reset on open) or the reply to ``STATE`` (boards that keep
+      running; older firmware answers "Unbekannter Befehl: STATE")
+    - ``discover`` probes all candidate ports in parallel
+    - ``locate_controller`` returns the port of a remembered controller
+      straight from the port list, without opening anything; only if none
+      is present are the candidates probed: USB IDs of the boards
+      (``BOARD_USB_IDS``) first, the other USB serial ports only if none
+      of them answers
+
+Probing has side effects: opening a port toggles DTR and RTS, which keys
+the PTT of many radio interfaces, and the port gets a ``STATE`` line. Ports
+listed in ``probe_exclude`` (device paths or VID:PID) and the resonance
+meter port are never opened.
+
+The core remembers every controller it connected to in the configuration
+(``known_controllers``), so the next start connects without probing.
+
+Usage:
+    python3 port_discovery.py            # list ports running the firmware
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import serial
+import serial.tools.list_ports
+
+from response_parser import parse_response, ControllerReady, FirmwareState, UnknownCommand
+from serial_reader import IncrementalLineDecoder
+
+# Banner after a reset on open: boot time of the board plus the banner at 9600 baud
+PROBE_TIMEOUT = 2.5
+IDENTIFY_COMMAND = "STATE"
+# Arduino (and its second vendor ID), CH340 and FTDI FT232R of Uno clones; "VID:" matches any PID
+BOARD_USB_IDS = ("2341:", "2A03:", "1A86:7523", "0403:6001")
+
+
+@dataclass(frozen=True, slots=True)
+class PortInfo:
+    """A serial port and its USB identity (None for non-USB ports and ptys)"""
+    device: str
+    description: str = ""
+    key: Optional[str] = None
+
+
+@dataclass(frozen=True, slots=True)
+class DiscoveredController:
+    port: PortInfo
+    via: str  # "Banner" or "Identify"
+    seconds: float  # probe time
+
+
+def device_key(port):
+    """"VID:PID:SERIAL" of a ``list_ports`` entry, or None without USB identity"""
+    if getattr(port, "vid", None) is None:
+        return None
+    return f"{port.vid:04X}:{port.pid:04X}:{port.serial_number or ''}"
+
+
+def list_ports():
+    """Serial ports of the system plus the ports in ``MAGNET_LOOP_PORTS``"""
+    ports = [PortInfo(port.device, port.description, device_key(port))
+             for port in serial.tools.list_ports.comports()]
+    # Zusätzliche Ports (z.B. der pty des Firmware-Simulators)
+    for device in filter(None, os.environ.get("MAGNET_LOOP_PORTS", "").split(os.pathsep)):
+        ports.insert(0, PortInfo(device, "Simuliert"))
+    return ports
+
+
+def _matches(port, patterns):
+    return any(port.device == pattern or (port.key or "").startswith(pattern.upper()) for pattern in patterns)
+
+
+def candidates(ports, exclude=()):
+    """Ports worth probing: USB serial devices and explicitly added ports, without ``exclude``
+
+    Built-in UARTs (ttyS*) have no USB identity and are never the Uno R4.
+    ``exclude`` holds device paths and "VID:PID" prefixes.
+    """
+    return [port for port in ports
+            if (port.key is not None or port.description == "Simuliert") and not _matches(port, exclude)]
+
+
+def is_board(port):
+    """USB ID of a board that may run the firmware (added ports count as boards)"""
+    return port.description == "Simuliert" or _matches(port, BOARD_USB_IDS)
+
+
+def probe_port(device, timeout=PROBE_TIMEOUT, baudrate=9600, stop=None):
+    """Open ``device`` and look for the firmware
+
+    Returns "Banner" or "Identify", or None if the port cannot be opened or
+    does not answer like the firmware within ``timeout`` (or ``stop`` is set).
+    """
+    decoder = IncrementalLineDecoder()
+    deadline = time.monotonic() + timeout
+    try:
+        with serial.Serial(device, baudrate, timeout=0.05) as port:
+            # Lost while a resetting board boots; it prints the banner instead
+            port.write(f"{IDENTIFY_COMMAND}\n".encode())
+            while time.monotonic() < deadline and not (stop and stop.is_set()):
+                for line in decoder.feed(port.read(port.in_waiting or 1)):
+                    event = parse_response(line.strip())
+                    if isinstance(event, ControllerReady):
+                        return "Banner"
+                    if isinstance(event, FirmwareState) or event == UnknownCommand(IDENTIFY_COMMAND):
+                        return "Identify"
+    except (serial.SerialException, OSError, ValueError):
+        return None
+    return None
+
+
+async def discover(ports=None, timeout=PROBE_TIMEOUT, first=False):
+    """Probe the candidate ports in parallel; list of ``DiscoveredController``
+
+    With ``first`` the search ends with the first controller found and the
+    remaining probes are stopped.
+    """
+    ports = candidates(list_ports()) if ports is None else ports
+    if not ports:
+        return []
+    loop = asyncio.get_running_loop()
+    stop = threading.Event()
+    # One thread per port: probes mostly wait, a smaller pool would serialize them
+    executor = concurrent.futures.ThreadPoolExecutor(len(ports), thread_name_prefix="port-probe")
+    start = loop.time()
+
+    async def probe(port):
+        via = await loop.run_in_executor(executor, probe_port, port.device, timeout, 9600, stop)
+        return DiscoveredController(port, via, loop.time() - start) if via else None
+
+    found = []
+    try:
+        for result in asyncio.as_completed([probe(port) for port in ports]):
+            controller = await result
+            if controller is not None:
+                found.append(controller)
+                if first:
+                    break
+    finally:
+        stop.set()
+        executor.shutdown(wait=False)
+    return found
+
+
+def remember_controller(config, device, ports=None):
+    """Store the USB identity of ``device`` in ``known_controllers``"""
+    ports = list_ports() if ports is None else ports
+    key = next((port.key for port in ports if port.device == device), None)
+    if key is None:
+        return None
+    known = list(config.get("known_controllers", []))
+    if key in known:
+        known.remove(key)
+    config.set("known_controllers", [key] + known)  # most recent first
+    return key
+
+
+def known_port(config, ports=None):
+    """Current device of a remembered controller, else ``last_port`` if it still exists
+
+    With remembered controllers ``last_port`` is only used for a port
+    without USB identity (a pty): a USB device under that path now is
+    another one (renumbered ttyACM).
+    """
+    ports = list_ports() if ports is None else ports
+    by_key = {port.key: port.device for port in ports if port.key is not None}
+    known = config.get("known_controllers", [])
+    for key in known:
+        if key in by_key:
+            return by_key[key]
+    last_port = config.get("last_port", "")
+    listed = next((port for port in ports if port.device == last_port), None)
+    if not last_port or (listed is None and not os.path.exists(last_port)):
+        return None
+    if known and listed is not None and listed.key is not None:
+        return None
+    return last_port
+
+
+async def locate_controller(config, probe=True, timeout=PROBE_TIMEOUT):
+    """Port of the controller: remembered ones without delay, else the first found by probing
+
+    Boards are probed first; the other USB serial ports only if no board answers.
+    """
+    ports = list_ports()
+    device = known_port(config, ports)
+    if device is not None or not probe:
+        return device
+    exclude = list(config.get("probe_exclude", [])) + [config.get("resonance_meter_port", "")]
+    ports = candidates(ports, [pattern for pattern in exclude if pattern])
+    boards = [port for port in ports if is_board(port)]
+    found = await discover(boards, timeout, first=True)
+    if not found:
+        found = await discover([port for port in ports if not is_board(port)], timeout, first=True)
+    return found[0].port.device if found else None
+
+
+async def auto_connect(core, probe=True):
+    """Connect ``core`` to its controller at startup; False if none was found"""
+    device = await locate_controller(core.config, probe)
+    if device is None:
+        core.log("Kein Controller gefunden")
+        return False
+    if core.is_connected:
+        return True  # connected by hand meanwhile
+    core.log(f"Controller gefunden: {device}")
+    return await core.connect(device)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ports mit Magnet-Loop-Firmware suchen")
+    parser.add_argument("--timeout", type=float, default=PROBE_TIMEOUT, help="seconds per port")
+    parser.add_argument("--exclude", action="append", default=[], help="device path or VID:PID not to open")
+    args = parser.parse_args()
+
+    ports = candidates(list_ports(), args.exclude)
+    print(f"Prüfe {len(ports)} Ports...")
+    for controller in asyncio.run(discover(ports, args.timeout)):
+        port = controller.port
+        print(f"{port.device:<20} {port.key or '-':<24} {controller.via:<9} {controller.seconds * 1000:6.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Arduino Response Parser
+=======================
+Table-driven parser for the replies of the Magnet Loop firmware (src/main.cpp).
+
+The first characters of every line select a builder from a dispatch
+table; the builder checks the fixed text of the message and turns the
+rest of the line into a typed event object in a single pass, so callers
+never have to test substrings or re-split the line to extract numbers.
+
+Example:
+    >>> parse_response("Motor startet - Fahre zu Kanal 23 - 480 Schritte vorwärts")
+    MotionStarted(steps=480, forward=True, channel=23)
+"""
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+
+@dataclass(frozen=True, slots=True)
+class ControllerReady:
+    """Startup banner: "Magnet Loop Antenna Controller Ready" """
+
+
+@dataclass(frozen=True, slots=True)
+class PositionReport:
+    """"Aktuelle Position: <position>" """
+    position: int
+
+
+@dataclass(frozen=True, slots=True)
+class ChannelReport:
+    """"Aktueller Kanal: <channel>" / "Zeige Kanal auf Matrix: <channel>" """
+    channel: int
+
+
+@dataclass(frozen=True, slots=True)
+class PositionSet:
+    """"Position gesetzt auf: <position>" (reply to SETPOS)"""
+    position: int
+
+
+@dataclass(frozen=True, slots=True)
+class MotionStarted:
+    """"Motor startet - Fahre [zu Kanal <channel> - ]<steps> Schritte vorwärts|rückwärts" """
+    steps: int
+    forward: bool
+    channel: Optional[int] = None
+
+
+@dataclass(frozen=True, slots=True)
+class MotionFinished:
+    """"Motor fertig - Bewegung abgeschlossen" """
+
+
+@dataclass(frozen=True, slots=True)
+class MotionStopped:
+    """"Motor angehalten - Warteschlange geleert" (reply to S)"""
+
+
+@dataclass(frozen=True, slots=True)
+class AlreadyOnChannel:
+    """"Bereits auf Kanal <channel>" """
+    channel: int
+
+
+@dataclass(frozen=True, slots=True)
+class MotorStatus:
+    """"Motor Status: Bereit|Beschäftigt" """
+    busy: bool
+
+
+@dataclass(frozen=True, slots=True)
+class QueueStatus:
+    """"Warteschlange: <pending> Befehle wartend" """
+    pending: int
+
+
+@dataclass(frozen=True, slots=True)
+class CommandQueued:
+    """"Befehl in Warteschlange eingereiht: <command>" """
+    command: str
+
+
+@dataclass(frozen=True, slots=True)
+class QueuedCommandStarted:
+    """"Führe Befehl aus Warteschlange aus: <command>" """
+    command: str
+
+
+@dataclass(frozen=True, slots=True)
+class CalibrationAck:
+    """"Kalibrierung empfangen: CH41=<pos>, CH40=<pos>, Schritte/Kanal=<steps>" """
+    channel_41_position: int
+    channel_40_position: int
+    steps_per_channel: float
+
+
+@dataclass(frozen=True, slots=True)
+class CalibrationTableAck:
+    """"Kalibrierungstabelle empfangen: <n>/80" (reply to CALT, n = positions stored so far)"""
+    positions: int
+
+
+@dataclass(frozen=True, slots=True)
+class CalibrationRejected:
+    """"Ungültige Kalibrierung: ..." / "Kalibrierung Format: ..." """
+    message: str
+
+
+@dataclass(frozen=True, slots=True)
+class FallbackWarning:
+    """"Warnung: Verwende Fallback-Berechnung - Kalibrierung fehlt" """
+
+
+@dataclass(frozen=True, slots=True)
+class RpmReport:
+    """"Drehzahl gesetzt auf: <rpm>" / "Stepper RPM: <rpm>" """
+    rpm: int
+
+
+@dataclass(frozen=True, slots=True)
+class InvalidRpm:
+    """"Ungültige Drehzahl(6-24)" """
+
+
+@dataclass(frozen=True, slots=True)
+class InvalidChannel:
+    """"Ungültiger Kanal (1-80)" """
+
+
+@dataclass(frozen=True, slots=True)
+class FirmwareState:
+    """"Zustand: CH41=<pos>, CH40=<pos>, Kalibriert=<0|1>, Position=<pos>[, Tabelle=<crc>]" (reply to STATE)"""
+    channel_41_position: int
+    channel_40_position: int
+    calibrated: bool
+    position: int
+    table: Optional[int] = None  # checksum of the active calibration table (CALT)
+
+
+@dataclass(frozen=True, slots=True)
+class ProtocolSwitched:
+    """"Binärprotokoll aktiv: <baud> Baud" (reply to BIN)"""
+    baudrate: int
+
+
+@dataclass(frozen=True, slots=True)
+class InvalidBaudrate:
+    """"Ungültige Baudrate (9600-1000000)" """
+
+
+@dataclass(frozen=True, slots=True)
+class UnknownCommand:
+    """"Unbekannter Befehl: <command>" """
+    command: str
+
+
+_MOTION_STARTED = re.compile(
+    r"Motor startet - Fahre (?:zu Kanal (?P<channel>\d+) - )?(?P<steps>\d+) Schritte (?P<direction>\S+)")
+_CALIBRATION_ACK = re.compile(
+    r"Kalibrierung empfangen: CH41=(?P<ch41>-?\d+), CH40=(?P<ch40>-?\d+), Schritte/Kanal=(?P<steps>-?[\d.]+)")
+_FIRMWARE_STATE = re.compile(
+    r"Zustand: CH41=(?P<ch41>-?\d+), CH40=(?P<ch40>-?\d+), Kalibriert=(?P<calibrated>[01]), Position=(?P<position>-?\d+)"
+    r"(?:, Tabelle=(?P<table>[0-9A-F]{2}))?")
+
+# Events without fields are shared instances
+_CONTROLLER_READY = ControllerReady()
+_MOTION_FINISHED = MotionFinished()
+_MOTION_STOPPED = MotionStopped()
+_FALLBACK_WARNING = FallbackWarning()
+_INVALID_RPM = InvalidRpm()
+_INVALID_CHANNEL = InvalidChannel()
+_INVALID_BAUDRATE = InvalidBaudrate()
+
+
+def _motor(line):
+    # "Motor fertig", "Motor startet", "Motor angehalten", "Motor Status:"
+    kind = line[6:7]
+    if kind == "f" and line.startswith("Motor fertig"):
+        return _MOTION_FINISHED
+    if kind == "s":
+        match = _MOTION_STARTED.match(line)
+        if match is None:
+            return None
+        channel = match["channel"]
+        return MotionStarted(
+            steps=int(match["steps"]),
+            # "vorwärts" / "rückwärts"; only the first letter is checked so a
+            # mangled umlaut does not flip the direction
+            forward=match["direction"].startswith("v"),
+            channel=int(channel) if channel is not None else None,
+        )
+    if kind == "a" and line.startswith("Motor angehalten"):
+        return _MOTION_STOPPED
+    if kind == "S" and line.startswith("Motor Status:"):
+        return MotorStatus(busy=not line[13:].strip().startswith("Bereit"))
+    return None
+
+
+def _current(line):
+    # "Aktuelle Position: <n>", "Aktueller Kanal: <n>"
+    if line.startswith("Aktuelle Position:"):
+        return PositionReport(int(line[18:]))
+    if line.startswith("Aktueller Kanal:"):
+        return ChannelReport(int(line[16:]))
+    return None
+
+
+def _calibration(line):
+    if line.startswith("Kalibrierung empfangen:"):
+        match = _CALIBRATION_ACK.match(line)
+        if match is None:
+            return None
+        return CalibrationAck(
+            channel_41_position=int(match["ch41"]),
+            channel_40_position=int(match["ch40"]),
+            steps_per_channel=float(match["steps"]),
+        )
+    if line.startswith("Kalibrierungstabelle empfangen:"):
+        return CalibrationTableAck(int(line[31:].split("/")[0]))
+    if line.startswith("Kalibrierung Format:"):
+        return CalibrationRejected(line)
+    return None
+
+
+def _state(line):
+    match = _FIRMWARE_STATE.match(line)
+    if match is None:
+        return None
+    return FirmwareState(
+        channel_41_position=int(match["ch41"]),
+        channel_40_position=int(match["ch40"]),
+        calibrated=match["calibrated"] == "1",
+        position=int(match["position"]),
+        table=int(match["table"], 16) if match["table"] is not None else None,
+    )
+
+
+def _invalid(line):
+    # "Ungültige Kalibrierung: ...", "Ungültige Drehzahl(6-24)", "Ungültiger Kanal (1-80)",
+    # "Ungültige Baudrate (9600-1000000)"
+    if line.startswith("Ungültige Kalibrierung:"):
+        return CalibrationRejected(line)
+    if line.startswith("Ungültige Drehzahl"):
+        return _INVALID_RPM
+    if line.startswith("Ungültige Baudrate"):
+        return _INVALID_BAUDRATE
+    if line.startswith("Ungültiger Kanal"):
+        return _INVALID_CHANNEL
+    return None
+
+
+def _int_message(prefix, event_type):
+    """Builder for "<prefix> <integer>" messages"""
+    offset = len(prefix)
+
+    def build(line):
+        if line.startswith(prefix):
+            return event_type(int(line[offset:]))
+        return None
+    return build
+
+
+def _text_message(prefix, event_type):
+    """Builder for "<prefix> <text>" messages"""
+    offset = len(prefix)
+
+    def build(line):
+        if line.startswith(prefix):
+            return event_type(line[offset:].strip())
+        return None
+    return build
+
+
+def _constant_message(prefix, event):
+    """Builder for fixed messages"""
+    def build(line):
+        if line.startswith(prefix):
+            return event
+        return None
+    return build
+
+
+# Prefix trie, flattened: the first characters of a line select the
+# builder, which checks the full prefix and extracts the fields. Fixed
+# prefixes plus int() cover most messages; only the three messages with
+# several fields need a (precompiled) regular expression.
+_KEY_LENGTH = 6
+_BUILDERS = {
+    "Motor ": _motor,
+    "Aktuel": _current,
+    "Positi": _int_message("Position gesetzt auf:", PositionSet),
+    "Bereit": _int_message("Bereits auf Kanal", AlreadyOnChannel),
+    "Wartes": lambda line: QueueStatus(int(line[14:].split()[0])) if line.startswith("Warteschlange:") else None,
+    "Befehl": _text_message("Befehl in Warteschlange eingereiht:", CommandQueued),
+    "Führe ": _text_message("Führe Befehl aus Warteschlange aus:", QueuedCommandStarted),
+    "Kalibr": _calibration,
+    "Ungült": _invalid,
+    "Warnun": _constant_message("Warnung: Verwende Fallback-Berechnung", _FALLBACK_WARNING),
+    "Drehza": _int_message("Drehzahl gesetzt auf:", RpmReport),
+    "Steppe": _int_message("Stepper RPM:", RpmReport),
+    "Zeige ": _int_message("Zeige Kanal auf Matrix:", ChannelReport),
+    "Unbeka": _text_message("Unbekannter Befehl:", UnknownCommand),
+    "Magnet": _constant_message("Magnet Loop Antenna Controller Ready", _CONTROLLER_READY),
+    "Zustan": _state,
+    "Binärp": lambda line: (ProtocolSwitched(int(line[21:].split()[0]))
+                            if line.startswith("Binärprotokoll aktiv:") else None),
+}
+
+
+# The firmware speaks a small vocabulary (positions are bounded by one
+# motor revolution), so nearly every line of a session has been seen
+# before. Events are immutable and can be shared between callers.
+_CACHE_SIZE = 8192
+
+
+@lru_cache(maxsize=_CACHE_SIZE)
+def parse_response(line):
+    """Parse one firmware line into an event object, or None if the line
+    carries no information for the controller (help texts etc.)"""
+    build = _BUILDERS.get(line[:_KEY_LENGTH])
+    if build is None:
+        line = line.strip()
+        build = _BUILDERS.get(line[:_KEY_LENGTH])
+        if build is None:
+            return None
+    try:
+        return build(line)
+    except ValueError:
+        return None
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+rigctld Server
+==============
+TCP server speaking the Hamlib ``rigctld`` network protocol, so logging
+and contest programs can tune the magnet loop like a radio ("Hamlib NET
+rigctl", model 2). It runs on the event loop of an
+``AntennaControllerCore`` and serves any number of clients.
+
+Frequencies are mapped to the nearest CB channel (see ``cb_band``):
+26.565 - 27.405 MHz select channels 41-80 and 1-40, frequencies outside
+the band are rejected with ``RPRT -1``.
+
+Set requests go through ``goto_channel`` and its motion coalescer: only
+the newest target is sent when the running move is complete, so a burst
+of set_freq requests (VFO knob, band map clicks, several programs) ends
+in at most one more move instead of a queue of stale ones. The reply is
+sent when the target is accepted, not when the motor arrives.
+
+Supported commands (short and long form, ``+`` for extended replies):
+
+    F / set_freq  f / get_freq   M / set_mode  m / get_mode
+    V / set_vfo   v / get_vfo    T / set_ptt   t / get_ptt
+    S / set_split_vfo            s / get_split_vfo
+    q / quit      dump_state     chk_vfo       get_powerstat
+
+Usage:
+    python3 rigctl_server.py --port /dev/ttyACM0 [--listen 127.0.0.1:4532]
+    rigctl -m 2 -r localhost:4532 F 27185000
+"""
+
+import argparse
+import asyncio
+
+from cb_band import BAND_END, BAND_START, channel_for_frequency, channel_frequency
+from controller_core import AntennaControllerCore, LogMessage
+from port_discovery import auto_connect
+
+DEFAULT_PORT = 4532
+
+# Hamlib error codes (sent negated in "RPRT <code>")
+RIG_OK = 0
+RIG_EINVAL = 1
+RIG_ECONF = 2
+RIG_ENIMPL = 4
+RIG_EIO = 6
+
+# Answer to \dump_state (protocol version 0): the receive and transmit
+# range is the CB band, everything else is "not available"
+DUMP_STATE = "\n".join([
+    "0",
+    "2",
+    "1",
+    f"{BAND_START}.000000 {BAND_END}.000000 0x1ff -1 -1 0x3 0x1",
+    "0 0 0 0 0 0 0",
+    f"{BAND_START}.000000 {BAND_END}.000000 0x1ff 1000 4000 0x3 0x1",
+    "0 0 0 0 0 0 0",
+    "0x1ff 10",
+    "0 0",
+    "0x1ff 0",
+    "0 0",
+    "0",
+    "0",
+    "0",
+    "0",
+    "0 0 0 0 0 0 0",
+    "0 0 0 0 0 0 0",
+    "0x0",
+    "0x0",
+    "0x0",
+    "0x0",
+    "0x0",
+    "0x0",
+])
+
+
+class RigctlServer:
+    """rigctld protocol on top of one ``AntennaControllerCore``"""
+
+    def __init__(self, core, host="127.0.0.1", port=DEFAULT_PORT):
+        self.core = core
+        self.host = host
+        self.port = port
+        self._server = None
+        self._writers = set()
+        self._frequency = None  # last accepted set_freq
+        self._mode = ("AM", 0)
+        self._vfo = "VFOA"
+        self._ptt = 0
+
+        self.set_requests = 0  # accepted set_freq requests
+
+        # Command name -> (short form, handler(args) -> (result, values))
+        self._commands = {
+            "set_freq": ("F", self._set_freq),
+            "get_freq": ("f", self._get_freq),
+            "set_mode": ("M", self._set_mode),
+            "get_mode": ("m", self._get_mode),
+            "set_vfo": ("V", self._set_vfo),
+            "get_vfo": ("v", self._get_vfo),
+            "set_ptt": ("T", self._set_ptt),
+            "get_ptt": ("t", self._get_ptt),
+            "set_split_vfo": ("S", lambda args: (RIG_OK, [])),
+            "get_split_vfo": ("s", lambda args: (RIG_OK, [("Split", 0), ("TX VFO", self._vfo)])),
+            "chk_vfo": (None, lambda args: (RIG_OK, [("ChkVFO", 0)])),
+            "get_powerstat": (None, lambda args: (RIG_OK, [("Power Status", 1)])),
+        }
+        self._short_commands = {short: name for name, (short, _) in self._commands.items() if short}
+
+    # ------------------------------------------------------------------
+    # Server
+
+    async def start(self):
+        """Start listening; ``port=0`` picks a free port (see ``self.port``)"""
+        try:
+            self._server = await asyncio.start_server(self._serve_client, self.host, self.port)
+        except OSError as e:
+            self.core.log(f"rigctld-Server konnte nicht starten: {e}")
+            raise
+        self.port = self._server.sockets[0].getsockname()[1]
+        self.core.log(f"rigctld-Server lauscht auf {self.host}:{self.port}")
+        return self
+
+    def close(self):
+        """Stop listening and disconnect all clients"""
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        for writer in list(self._writers):
+            writer.close()
+
+    @property
+    def clients(self):
+        return len(self._writers)
+
+    async def _serve_client(self, reader, writer):
+        self._writers.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                reply = self.handle_line(line.decode("ascii", errors="replace"))
+                if reply is None:
+                    break
+                if reply:
+                    writer.write(reply.encode("ascii"))
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    # ------------------------------------------------------------------
+    # Protocol
+
+    def handle_line(self, line):
+        """Reply to one request line; None means the client quit"""
+        line = line.strip()
+        extended = line.startswith("+")
+        if extended:
+            line = line[1:].lstrip()
+        if not line:
+            return ""
+        if line[0] == "\\":
+            name, *args = line[1:].split()
+        else:
+            name, args = line[0], line[1:].split()
+            name = self._short_commands.get(name, name)
+        if name in ("q", "Q", "quit", "exit"):
+            return None
+        if name == "dump_state":
+            return DUMP_STATE + "\n"
+
+        command = self._commands.get(name)
+        if command is None:
+            return f"RPRT -{RIG_ENIMPL}\n"
+        try:
+            result, values = command[1](args)
+        except (ValueError, IndexError):
+            result, values = RIG_EINVAL, []
+
+        if extended:
+            lines = [f"{name}: {' '.join(args)}".rstrip()]
+            lines += [f"{key}: {value}" for key, value in values]
+            lines.append(f"RPRT {-result}")
+            return "\n".join(lines) + "\n"
+        if result != RIG_OK or not values:
+            return f"RPRT {-result}\n"
+        return "".join(f"{value}\n" for _, value in values)
+
+    def _set_freq(self, args):
+        # With "rigctld --vfo" the VFO comes first, the frequency is always last
+        frequency = int(float(args[-1]))
+        result = self.set_frequency(frequency)
+        return result, []
+
+    def _get_freq(self, args):
+        return RIG_OK, [("Frequency", self.get_frequency())]
+
+    def _set_mode(self, args):
+        self._mode = (args[0], int(args[1]) if len(args) > 1 else 0)
+        return RIG_OK, []
+
+    def _get_mode(self, args):
+        return RIG_OK, [("Mode", self._mode[0]), ("Passband", self._mode[1])]
+
+    def _set_vfo(self, args):
+        self._vfo = args[0]
+        return RIG_OK, []
+
+    def _get_vfo(self, args):
+        return RIG_OK, [("VFO", self._vfo)]
+
+    def _set_ptt(self, args):
+        self._ptt = int(args[-1])
+        return RIG_OK, []
+
+    def _get_ptt(self, args):
+        return RIG_OK, [("PTT", self._ptt)]
+
+    # ------------------------------------------------------------------
+    # Tuning
+
+    def set_frequency(self, frequency):
+        """Accept ``frequency`` (Hz) as the newest target; returns a Hamlib result code"""
+        channel = channel_for_frequency(frequency)
+        if channel is None:
+            return RIG_EINVAL
+        if not self.core.is_connected:
+            return RIG_EIO
+        valid, _ = self.core.config.is_calibration_valid()
+        if not valid:
+            return RIG_ECONF
+
+        self.set_requests += 1
+        self._frequency = frequency
+        self.core.goto_channel(channel)
+        return RIG_OK
+
+    def get_frequency(self):
+        """Last set frequency while it belongs to the tuned channel, else the channel centre"""
+        channel = self.core.motion.target_channel or self.core.config.get("current_channel", 41)
+        if self._frequency is not None and channel_for_frequency(self._frequency) == channel:
+            return self._frequency
+        return channel_frequency(channel)
+
+    async def tuned(self):
+        """Wait until the newest accepted target has been sent and reached"""
+        await self.core.motion.settled()
+
+
+async def _run(args):
+    host, _, port = args.listen.rpartition(":")
+    core = AntennaControllerCore()
+    core.subscribe(lambda event: isinstance(event, LogMessage) and print(event.text))
+    server = RigctlServer(core, host or "127.0.0.1", int(port))
+    try:
+        if args.port:
+            if not await core.connect(args.port):
+                return
+        elif not await auto_connect(core):
+            return
+        await core.synced()
+        await server.start()
+        await asyncio.Event().wait()
+    finally:
+        server.close()
+        core.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="rigctld-kompatibler TCP-Server für den Magnet Loop Tuner")
+    parser.add_argument("--port", help="serial port of the controller (default: known controller or search)")
+    parser.add_argument("--listen", default=f"127.0.0.1:{DEFAULT_PORT}", metavar="HOST:PORT")
+    try:
+        asyncio.run(_run(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
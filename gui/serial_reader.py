@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Serial Reader Engine
+====================
+Line decoding for the Arduino serial link.
+
+``controller_core.AntennaControllerCore`` reads whatever the port has
+buffered as soon as it becomes readable (no polling of ``in_waiting``)
+and feeds it to ``IncrementalLineDecoder``; the core stamps each read
+with a monotonic receive time (``received_at``). Partial lines
+are kept until their line ending arrives, and invalid UTF-8 (e.g.
+truncated German umlauts) is replaced instead of raising.
+"""
+
+import codecs
+
+
+class IncrementalLineDecoder:
+    """Splits a byte stream into decoded text lines"""
+
+    def __init__(self, encoding="utf-8", errors="replace"):
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors=errors)
+        self._pending = ""
+
+    def feed(self, data):
+        """Feed raw bytes and return the list of completed lines"""
+        text = self._pending + self._decoder.decode(data)
+        if "\n" not in text:
+            self._pending = text
+            return []
+
+        *lines, self._pending = text.split("\n")
+        return [line.rstrip("\r") for line in lines]
+
+    def reset(self):
+        """Drop any partially received line"""
+        self._decoder.reset()
+        self._pending = ""
+
+    @property
+    def pending(self):
+        """Text of the line that is still being received"""
+        return self._pending
+
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Serial Writer
+=============
+Writes outgoing commands on a dedicated thread, so a stalled USB CDC
+endpoint blocks neither the event loop nor the GUI.
+
+Commands wait in two lanes:
+
+    priority    STOP and position queries; always written before the
+                normal lane (the firmware answers P while the motor runs)
+    normal      everything else, bounded to ``maxsize`` entries; ``put``
+                refuses new entries while it is full
+
+Writes are paced to the baud rate of the port (10 bit times per byte):
+the next command is taken from the lanes only when the previous one has
+left the UART. The backlog therefore stays here, where STOP can overtake
+it, instead of in the OS and USB buffers, where it cannot. ``drop``
+removes entries that were not written yet, e.g. stale moves when STOP is
+issued. A write that fails or exceeds the port's ``write_timeout``
+stops the writer and is reported through ``on_error`` (called in the
+writer thread).
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class SerialWriter:
+    """Writer thread with a bounded normal lane and a priority lane"""
+
+    def __init__(self, connection, on_error, maxsize=32, pacing=True):
+        self.connection = connection
+        self.on_error = on_error
+        self.maxsize = maxsize
+        self.pacing = pacing
+        self._line_free = 0.0  # monotonic time the last written byte leaves the UART
+        self._priority = deque()  # (command, data)
+        self._normal = deque()
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+
+        # Statistics
+        self.written = 0
+        self.dropped = 0
+        self.refused = 0  # normal lane full
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="serial-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop after the write in progress; queued commands are discarded"""
+        with self._condition:
+            self._running = False
+            self._priority.clear()
+            self._normal.clear()
+            self._condition.notify()
+        self._thread = None
+
+    @property
+    def running(self):
+        """False once stopped (by ``stop`` or a failed write)"""
+        return self._running
+
+    @property
+    def pending(self):
+        """Commands waiting to be written"""
+        return len(self._priority) + len(self._normal)
+
+    def put(self, command, data, priority=False):
+        """Queue ``data`` (the encoded ``command``); False if the normal lane is full"""
+        with self._condition:
+            if not self._running:
+                return False
+            if priority:
+                self._priority.append((command, data))
+            elif len(self._normal) >= self.maxsize:
+                self.refused += 1
+                return False
+            else:
+                self._normal.append((command, data))
+            self._condition.notify()
+        return True
+
+    def drop(self, predicate):
+        """Remove queued normal-lane commands matching ``predicate``; returns them, oldest first"""
+        with self._condition:
+            kept = deque(entry for entry in self._normal if not predicate(entry[0]))
+            dropped = [command for command, _ in self._normal if predicate(command)]
+            self._normal = kept
+            self.dropped += len(dropped)
+        return dropped
+
+    def _next(self):
+        """Wait for the line and the next command; None once stopped"""
+        with self._condition:
+            while self._running:
+                if not (self._priority or self._normal):
+                    self._condition.wait()
+                    continue
+                busy = self._line_free - time.monotonic()
+                if busy > 0:
+                    self._condition.wait(busy)  # a STOP may arrive meanwhile
+                    continue
+                lane = self._priority if self._priority else self._normal
+                return lane.popleft()
+        return None
+
+    def _run(self):
+        while True:
+            entry = self._next()
+            if entry is None:
+                return
+            command, data = entry
+            try:
+                self.connection.write(data)
+            except Exception as e:
+                with self._condition:
+                    failed = self._running  # not closed by stop()
+                    self._running = False
+                    self._priority.clear()
+                    self._normal.clear()
+                if failed:
+                    self.on_error(e)
+                return
+            self.written += 1
+            baudrate = getattr(self.connection, "baudrate", 0)
+            if self.pacing and baudrate:
+                now = time.monotonic()
+                self._line_free = max(self._line_free, now) + len(data) * 10.0 / baudrate
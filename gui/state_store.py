@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+State Store
+===========
+Observable controller state for the GUI: channel, position, moving,
+synced and calibration.
+
+Changes are made in transactions. Inside a transaction ``set`` only
+records the new values; when the outermost transaction ends, the store
+compares them with the committed state and notifies each subscriber once,
+with only the fields it subscribed to that actually differ. A field that
+changes and changes back within one transaction (A -> B -> A) is not
+reported at all, and a transaction that changes nothing notifies nobody.
+
+A ``set`` outside a transaction is a transaction of its own. If the body
+of a transaction raises, its changes are discarded.
+
+Subscribers are called in the thread that commits (the Tk main thread in
+the GUI). The store counts transactions, notifications per field and the
+time spent in subscribers, so the UI work per batch of replies can be
+measured.
+"""
+
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+FIELDS = ("channel", "position", "moving", "synced", "calibration")
+
+
+class StateStore:
+    """Transactional state with per-field change notifications"""
+
+    def __init__(self, **initial):
+        self._check(initial)
+        self._state = dict.fromkeys(FIELDS)
+        self._state.update(initial)
+        self._pending = {}
+        self._depth = 0
+        self._subscribers = []  # (callback, fields)
+
+        # Statistics
+        self.transactions = 0  # commits that changed at least one field
+        self.notifications = Counter()  # field -> subscriber calls that carried it
+        self.callbacks = 0  # subscriber calls
+        self.callback_seconds = 0.0  # time spent in subscribers
+
+    @staticmethod
+    def _check(fields):
+        unknown = [name for name in fields if name not in FIELDS]
+        if unknown:
+            raise ValueError(f"Unbekannte Zustandsfelder: {', '.join(sorted(unknown))}")
+
+    def get(self, name):
+        """Committed value of ``name``"""
+        return self._state[name]
+
+    def __getitem__(self, name):
+        return self._state[name]
+
+    def snapshot(self):
+        """Committed state as a dict"""
+        return dict(self._state)
+
+    def subscribe(self, callback, fields=None):
+        """Call ``callback(changes)`` with ``{field: new value}`` after each commit
+
+        ``fields`` limits the subscription; the callback is only called if
+        one of them changed. Returns a function that unsubscribes.
+        """
+        fields = frozenset(FIELDS if fields is None else fields)
+        self._check(fields)
+        entry = (callback, fields)
+        self._subscribers.append(entry)
+
+        def unsubscribe():
+            if entry in self._subscribers:
+                self._subscribers.remove(entry)
+        return unsubscribe
+
+    @contextmanager
+    def transaction(self):
+        """Batch ``set`` calls; subscribers are notified once at the end"""
+        self._depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._depth -= 1
+            if self._depth == 0:
+                self._pending.clear()
+            raise
+        self._depth -= 1
+        if self._depth == 0:
+            self._commit()
+
+    def set(self, **fields):
+        """Change fields (committed at the end of the current transaction)"""
+        self._check(fields)
+        self._pending.update(fields)
+        if self._depth == 0:
+            self._commit()
+
+    def _commit(self):
+        changes = {name: value for name, value in self._pending.items() if self._state[name] != value}
+        self._pending.clear()
+        if not changes:
+            return
+        self._state.update(changes)
+        self.transactions += 1
+        for callback, fields in list(self._subscribers):
+            relevant = {name: value for name, value in changes.items() if name in fields}
+            if not relevant:
+                continue
+            self.notifications.update(relevant.keys())
+            self.callbacks += 1
+            start = time.perf_counter()
+            try:
+                callback(relevant)
+            finally:
+                self.callback_seconds += time.perf_counter() - start
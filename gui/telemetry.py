@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Telemetry Recorder
+==================
+Records what the tuner did: every command sent, every firmware reply and
+every change of the tracked position and channel, as fixed-width binary
+records in a memory-mapped file.
+
+A record is 12 bytes (``RECORD``, little endian):
+
+    dt      uint32  milliseconds since the previous record
+    kind    uint8   COMMAND, REPLY, POSITION or CHANNEL
+    code    uint8   command (``COMMANDS``) or reply type (``REPLIES``), 1-based; 0 = other
+    dpos    int16   POSITION: change of the position since the previous one
+                    (``ABSOLUTE``: the position is in ``value``)
+    value   int32   argument of the command, number of the reply (position,
+                    signed steps, channel, RPM ...), the channel of CHANNEL
+
+Records are grouped in chunks of ``CHUNK_RECORDS``. Every chunk starts
+with the absolute time and position its deltas count from, so it can be
+decoded on its own, and all chunks have the same size, so chunk ``n`` is
+at a fixed offset. The recorder fills the current chunk in a preallocated
+buffer and copies it into the mapped file when it is full, on close and
+(in an event loop) ``FLUSH_INTERVAL`` seconds after a record was added;
+a crash loses at most that much.
+The file grows by ``GROW_CHUNKS`` chunks at a time.
+
+About nine records per channel change make a week with a QSY every
+30 s about 2 MB (``benchmarks/bench_telemetry.py``). Readers map the file and decode chunk by chunk
+(``read_chunks``, ``iter_records``), without loading it into memory.
+
+The recorder subscribes to the core's events: ``CommandSent`` (send
+path), the parsed firmware events (parse path) and ``StateChanged``.
+It is switched on by ``telemetry_dir`` in the configuration; every
+session writes its own file ``telemetry-<date>-<time>.mlt`` there.
+"""
+
+import asyncio
+import mmap
+import os
+import struct
+import time
+from typing import NamedTuple
+
+from controller_core import CommandSent, StateChanged
+from response_parser import (
+    ControllerReady, PositionReport, ChannelReport, PositionSet, MotionStarted, MotionFinished,
+    MotionStopped, AlreadyOnChannel, MotorStatus, QueueStatus, CommandQueued, QueuedCommandStarted,
+    CalibrationAck, CalibrationRejected, FallbackWarning, RpmReport, InvalidRpm, InvalidChannel,
+    FirmwareState, ProtocolSwitched, InvalidBaudrate, UnknownCommand, CalibrationTableAck
+)
+
+MAGIC = b"MLTELEM1"
+FILE_HEADER = struct.Struct("<8sHHIq")  # magic, version, record size, chunk records, start (ms)
+CHUNK_HEADER = struct.Struct("<qiI")  # base time (ms since epoch), base position, records
+RECORD = struct.Struct("<IBBhi")
+VERSION = 1
+CHUNK_RECORDS = 4096
+CHUNK_SIZE = CHUNK_HEADER.size + CHUNK_RECORDS * RECORD.size
+
+COMMAND, REPLY, POSITION, CHANNEL = 1, 2, 3, 4
+KINDS = {COMMAND: "command", REPLY: "reply", POSITION: "position", CHANNEL: "channel"}
+ABSOLUTE = -32768
+
+# code = index + 1; new commands are appended so recorded codes keep their meaning
+COMMANDS = ("SETPOS", "STATE", "RPM", "CAL", "BIN", "CH", "F", "B", "S", "P", "Q", "D", "CALT")
+_PREFIXES = sorted(enumerate(COMMANDS, 1), key=lambda item: -len(item[1]))  # longest first
+
+REPLIES = (
+    ControllerReady, PositionReport, ChannelReport, PositionSet, MotionStarted, MotionFinished,
+    MotionStopped, AlreadyOnChannel, MotorStatus, QueueStatus, CommandQueued, QueuedCommandStarted,
+    CalibrationAck, CalibrationRejected, FallbackWarning, RpmReport, InvalidRpm, InvalidChannel,
+    FirmwareState, ProtocolSwitched, InvalidBaudrate, UnknownCommand, CalibrationTableAck,
+)
+_REPLY_CODES = {kind: code for code, kind in enumerate(REPLIES, 1)}
+
+# Reply type -> number recorded as value
+_REPLY_VALUES = {
+    PositionReport: lambda e: e.position,
+    PositionSet: lambda e: e.position,
+    FirmwareState: lambda e: e.position,
+    ChannelReport: lambda e: e.channel,
+    AlreadyOnChannel: lambda e: e.channel,
+    MotionStarted: lambda e: e.steps if e.forward else -e.steps,
+    MotorStatus: lambda e: int(e.busy),
+    QueueStatus: lambda e: e.pending,
+    CalibrationAck: lambda e: e.channel_40_position,
+    RpmReport: lambda e: e.rpm,
+    ProtocolSwitched: lambda e: e.baudrate,
+    CalibrationTableAck: lambda e: e.positions,
+}
+
+
+def encode_command(command):
+    """(code, value) of a command string: "F100" -> (F, 100), "CAL0,2370" -> (CAL, 0)"""
+    for code, prefix in _PREFIXES:
+        if command.startswith(prefix):
+            digits = command[len(prefix):].split(",")[0].split(":")[0]
+            try:
+                value = int(digits) if digits else 0
+            except ValueError:
+                return 0, 0
+            return code, min(max(value, -2**31), 2**31 - 1)
+    return 0, 0
+
+
+class Record(NamedTuple):
+    """Decoded record with absolute time and position"""
+    time: float  # seconds since the epoch
+    kind: int
+    code: int
+    position: int  # tracked position after the record
+    value: int
+
+    @property
+    def name(self):
+        """Command prefix or reply type of the record"""
+        if self.kind == COMMAND and self.code:
+            return COMMANDS[self.code - 1]
+        if self.kind == REPLY and self.code:
+            return REPLIES[self.code - 1].__name__
+        return KINDS.get(self.kind, "?")
+
+
+class TelemetryRecorder:
+    """Writes the events of one core into a chunked, memory-mapped file"""
+
+    FLUSH_INTERVAL = 10.0
+    GROW_CHUNKS = 16
+
+    def __init__(self, path, clock=time.time):
+        self.path = path
+        self.clock = clock
+        self._file = open(path, "w+b")
+        start = self._now()
+        self._file.write(FILE_HEADER.pack(MAGIC, VERSION, RECORD.size, CHUNK_RECORDS, start))
+        self._file.truncate(FILE_HEADER.size + self.GROW_CHUNKS * CHUNK_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._buffer = bytearray(CHUNK_SIZE)  # current chunk
+        self._chunk = 0  # index of the current chunk in the file
+        self._count = 0  # records in the current chunk
+        self._last_time = start
+        self._position = None  # last recorded position
+        self._channel = None
+        self._flush_handle = None  # pending flush of a partial chunk
+        self._unsubscribe = None
+
+        # Statistics
+        self.records = 0
+        self.flushes = 0
+
+    @classmethod
+    def create(cls, directory, **options):
+        """Recorder writing a new session file in ``directory``"""
+        os.makedirs(directory, exist_ok=True)
+        stem = time.strftime("telemetry-%Y%m%d-%H%M%S")
+        path = os.path.join(directory, stem + ".mlt")
+        number = 1
+        while os.path.exists(path):  # several antennas started in the same second
+            number += 1
+            path = os.path.join(directory, f"{stem}-{number}.mlt")
+        return cls(path, **options)
+
+    def attach(self, core):
+        """Record the events of ``core``"""
+        self._unsubscribe = core.subscribe(self.on_event)
+        return self
+
+    def _now(self):
+        return int(self.clock() * 1000)
+
+    # ------------------------------------------------------------------
+    # Recording
+
+    def on_event(self, event):
+        kind = type(event)
+        if kind is CommandSent:
+            self.record(COMMAND, *encode_command(event.command))
+        elif kind is StateChanged:
+            if event.position != self._position:
+                self.position(event.position)
+            if event.channel != self._channel:
+                self._channel = event.channel
+                self.record(CHANNEL, 0, event.channel)
+        else:
+            code = _REPLY_CODES.get(kind)
+            if code is not None:
+                value = _REPLY_VALUES.get(kind)
+                self.record(REPLY, code, value(event) if value else 0)
+
+    def position(self, position):
+        """Record a change of the tracked position (delta encoded)"""
+        delta = position - (self._position or 0)
+        if -32768 < delta <= 32767:
+            self.record(POSITION, 0, 0, delta)
+        else:
+            self.record(POSITION, 0, position, ABSOLUTE)
+        self._position = position
+
+    def record(self, kind, code, value, dpos=0):
+        now = self._now()
+        if self._count == 0:
+            # Time and position the deltas of the chunk count from
+            CHUNK_HEADER.pack_into(self._buffer, 0, now, self._position or 0, 0)
+            self._last_time = now
+        RECORD.pack_into(self._buffer, CHUNK_HEADER.size + self._count * RECORD.size,
+                         min(max(now - self._last_time, 0), 0xFFFFFFFF), kind, code, dpos, value)
+        self._last_time = now
+        self._count += 1
+        self.records += 1
+        if self._count == CHUNK_RECORDS:
+            self.flush()
+            self._chunk += 1
+            self._count = 0
+        elif self._flush_handle is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return  # no event loop: flushed when full and on close
+            self._flush_handle = loop.call_later(self.FLUSH_INTERVAL, self.flush)
+
+    def flush(self):
+        """Copy the current chunk into the mapped file"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._map is None or self._count == 0:
+            return
+        struct.pack_into("<I", self._buffer, CHUNK_HEADER.size - 4, self._count)
+        offset = FILE_HEADER.size + self._chunk * CHUNK_SIZE
+        if offset + CHUNK_SIZE > len(self._map):
+            self._map.resize(len(self._map) + self.GROW_CHUNKS * CHUNK_SIZE)
+        self._map[offset:offset + CHUNK_SIZE] = self._buffer
+        self.flushes += 1
+
+    def close(self):
+        """Flush, cut the file after the last chunk and close it"""
+        if self._map is None:
+            return
+        if self._unsubscribe is not None:
+            self._unsubscribe()
+            self._unsubscribe = None
+        self.flush()
+        chunks = self._chunk + (1 if self._count else 0)
+        self._map.flush()
+        self._map.close()
+        self._map = None
+        self._file.truncate(FILE_HEADER.size + chunks * CHUNK_SIZE)
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ----------------------------------------------------------------------
+# Reading
+
+def read_chunks(path):
+    """Yield ``(base_time_ms, base_position, records)`` per chunk of a recording
+
+    ``records`` is a memoryview of the packed records of the chunk (valid
+    while the generator runs); the file is mapped, not read.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < FILE_HEADER.size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            magic, version, record_size, chunk_records, _ = FILE_HEADER.unpack_from(data)
+            if magic != MAGIC or record_size != RECORD.size:
+                raise ValueError(f"{path}: keine Telemetrie-Aufzeichnung (Version {version})")
+            chunk_size = CHUNK_HEADER.size + chunk_records * record_size
+            view = memoryview(data)
+            try:
+                offset = FILE_HEADER.size
+                while offset + chunk_size <= len(data):
+                    base_time, base_position, count = CHUNK_HEADER.unpack_from(data, offset)
+                    if count == 0:
+                        break  # preallocated, never written
+                    start = offset + CHUNK_HEADER.size
+                    records = view[start:start + count * record_size]
+                    try:
+                        yield base_time, base_position, records
+                    finally:
+                        records.release()  # also when the consumer stops early
+                    offset += chunk_size
+            finally:
+                view.release()
+
+
+def iter_records(path):
+    """Decode a recording record by record (absolute time and position)"""
+    for base_time, position, records in read_chunks(path):
+        now = base_time
+        for dt, kind, code, dpos, value in RECORD.iter_unpack(records):
+            now += dt
+            if kind == POSITION:
+                position = value if dpos == ABSOLUTE else position + dpos
+            yield Record(now / 1000, kind, code, position, value)
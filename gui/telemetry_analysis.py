@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Telemetry Analysis
+==================
+Statistics over recorded telemetry (``telemetry.py``), computed with NumPy
+on the memory-mapped recordings:
+
+    drift       position reports that differ from the previous report plus
+                the steps of the moves started in between (no stop, SETPOS
+                or reset in between); the core only warns about jumps of
+                more than 4100 steps
+    moves       duration from "Motor startet" to "Motor fertig" per RPM
+                (the RPM the firmware reported last), stopped moves left out
+    channels    arrivals on each channel and corrections (F/B commands)
+                sent while on it, the channels retuned most often first
+
+Every recording is decoded chunk-wise into columns (``load``) and reduced
+to a small ``FileSummary`` (drift values, one row per move, counts per
+channel); the summaries of all files are combined into the report. With
+more than one file the summaries are computed in a process pool.
+
+Usage:
+    python3 telemetry_analysis.py telemetry/ [--workers 4] [--json report.json] [--csv DIR]
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+
+from telemetry import (
+    FILE_HEADER, MAGIC, RECORD, REPLIES, COMMANDS, COMMAND, REPLY, POSITION, CHANNEL, ABSOLUTE
+)
+from response_parser import (
+    ControllerReady, PositionReport, PositionSet, MotionStarted, MotionFinished, MotionStopped,
+    RpmReport, FirmwareState
+)
+
+RECORD_DTYPE = np.dtype([("dt", "<u4"), ("kind", "u1"), ("code", "u1"), ("dpos", "<i2"), ("value", "<i4")])
+CHUNK_HEADER_DTYPE = np.dtype([("time", "<i8"), ("position", "<i4"), ("count", "<u4")])
+assert RECORD_DTYPE.itemsize == RECORD.size
+
+CHANNELS = 80
+
+
+def _reply(kind):
+    return REPLIES.index(kind) + 1
+
+
+def _command(prefix):
+    return COMMANDS.index(prefix) + 1
+
+
+# Replies after which the firmware position is not the previous one plus the moves
+_POSITION_RESETS = [_reply(kind) for kind in (MotionStopped, PositionSet, ControllerReady, FirmwareState)]
+_CORRECTIONS = [_command("F"), _command("B")]
+
+
+class Records(NamedTuple):
+    """Columns of a decoded recording"""
+    time: np.ndarray  # ms since the epoch (int64)
+    kind: np.ndarray
+    code: np.ndarray
+    position: np.ndarray  # tracked position after the record
+    value: np.ndarray
+
+
+def _no_records():
+    empty = np.zeros(0, np.int64)
+    return Records(empty, empty.astype(np.uint8), empty.astype(np.uint8), empty, empty)
+
+
+def load(path):
+    """Decode a recording into ``Records`` (the file is memory-mapped)"""
+    if os.path.getsize(path) < FILE_HEADER.size:
+        return _no_records()
+    data = np.memmap(path, dtype=np.uint8, mode="r")
+    magic, version, record_size, chunk_records, _ = FILE_HEADER.unpack_from(data)
+    if magic != MAGIC or record_size != RECORD.size:
+        raise ValueError(f"{path}: keine Telemetrie-Aufzeichnung (Version {version})")
+    chunk_dtype = np.dtype([("header", CHUNK_HEADER_DTYPE), ("records", RECORD_DTYPE, (chunk_records,))])
+    chunks = (data.size - FILE_HEADER.size) // chunk_dtype.itemsize
+    chunks = data[FILE_HEADER.size:FILE_HEADER.size + chunks * chunk_dtype.itemsize].view(chunk_dtype)
+
+    counts = chunks["header"]["count"].astype(np.int64)
+    unwritten = np.flatnonzero(counts == 0)
+    used = unwritten[0] if unwritten.size else counts.size  # preallocated chunks follow
+    if used == 0:
+        return _no_records()
+    counts = counts[:used]
+    header = chunks["header"][:used]
+    records = chunks["records"][:used][np.arange(chunk_records) < counts[:, None]]
+
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    chunk = np.repeat(np.arange(used), counts)
+    dt = records["dt"].astype(np.int64)
+    elapsed = np.cumsum(dt)
+    time = elapsed - (elapsed[starts] - dt[starts])[chunk] + header["time"][chunk]
+
+    # Position: running sum of the deltas from the last anchor, which is the
+    # start of the chunk (its base position) or an absolute position record
+    kind, dpos, value = records["kind"], records["dpos"], records["value"].astype(np.int64)
+    is_position = kind == POSITION
+    absolute = is_position & (dpos == ABSOLUTE)
+    delta = np.where(is_position & ~absolute, dpos, 0).astype(np.int64)
+    total = np.cumsum(delta)
+    anchor = np.full(len(records), -1)
+    anchor_value = np.zeros(len(records), np.int64)
+    anchor[starts] = starts
+    anchor_value[starts] = header["position"]
+    absolute = np.flatnonzero(absolute)
+    anchor[absolute] = absolute
+    anchor_value[absolute] = value[absolute]
+    anchor = np.maximum.accumulate(anchor)
+    position = anchor_value[anchor] + total - (total - delta)[anchor]
+    return Records(time, kind, records["code"], position, value)
+
+
+class FileSummary(NamedTuple):
+    """What the report needs from one recording"""
+    records: int
+    hours: float
+    reports: int  # position reports checked for drift
+    drift: np.ndarray  # reported - expected position per checked report
+    move_rpm: np.ndarray
+    move_steps: np.ndarray
+    move_ms: np.ndarray
+    arrivals: np.ndarray  # per channel (index = channel)
+    corrections: np.ndarray
+
+
+def summarize(path):
+    """Reduce one recording to a ``FileSummary``"""
+    r = load(path)
+    reply = r.kind == REPLY
+    count = len(r.time)
+    hours = (r.time[-1] - r.time[0]) / 3.6e6 if count else 0.0
+
+    # Drift between consecutive position reports
+    reports = np.flatnonzero(reply & (r.code == _reply(PositionReport)))
+    steps = np.cumsum(np.where(reply & (r.code == _reply(MotionStarted)), r.value, 0))
+    resets = np.cumsum(reply & np.isin(r.code, _POSITION_RESETS))
+    previous, current = reports[:-1], reports[1:]
+    checked = resets[current] == resets[previous]
+    expected = r.value[previous] + steps[current] - steps[previous]
+    drift = (r.value[current] - expected)[checked]
+
+    # Moves: "Motor startet" to the next "Motor fertig", no other start in between
+    started = np.flatnonzero(reply & (r.code == _reply(MotionStarted)))
+    ended = np.flatnonzero(reply & np.isin(r.code, [_reply(MotionFinished), _reply(MotionStopped)]))
+    following = np.searchsorted(ended, started)
+    complete = following < ended.size
+    begin, end = started[complete], ended[following[complete]]
+    next_start = np.append(started[1:], count)[complete]
+    finished = (end < next_start) & (r.code[end] == _reply(MotionFinished))
+    begin, end = begin[finished], end[finished]
+    rpm_reports = np.flatnonzero(reply & (r.code == _reply(RpmReport)))
+    last_rpm = np.searchsorted(rpm_reports, begin) - 1
+    rpm = np.zeros(begin.size, np.int64)  # 0 = not reported yet
+    known = last_rpm >= 0
+    rpm[known] = r.value[rpm_reports[last_rpm[known]]]
+
+    # Channels: arrivals and the corrections sent while on them
+    changes = np.flatnonzero(r.kind == CHANNEL)
+    on_channel = np.clip(r.value[changes], 0, CHANNELS)
+    corrections = np.flatnonzero((r.kind == COMMAND) & np.isin(r.code, _CORRECTIONS))
+    current_channel = np.searchsorted(changes, corrections) - 1
+    current_channel = on_channel[current_channel[current_channel >= 0]]
+
+    return FileSummary(
+        records=count,
+        hours=float(hours),
+        reports=int(checked.sum()),
+        drift=drift.astype(np.int32),
+        move_rpm=rpm.astype(np.int32),
+        move_steps=np.abs(r.value[begin]).astype(np.int32),
+        move_ms=(r.time[end] - r.time[begin]).astype(np.int32),
+        arrivals=np.bincount(on_channel, minlength=CHANNELS + 1),
+        corrections=np.bincount(current_channel, minlength=CHANNELS + 1),
+    )
+
+
+def recordings(paths):
+    """Recording files of ``paths`` (files, or directories searched for *.mlt)"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "**", "*.mlt"), recursive=True)))
+        else:
+            files.append(path)
+    return files
+
+
+def summarize_all(files, workers=None):
+    """``FileSummary`` of every file, in a process pool for more than one file"""
+    if workers == 1 or len(files) < 2:
+        return [summarize(path) for path in files]
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(summarize, files, chunksize=max(1, len(files) // (4 * workers))))
+
+
+def report(summaries, tolerance=0):
+    """Combine the file summaries into the report (JSON-serialisable dict)"""
+    def concat(field, dtype=np.int32):
+        arrays = [getattr(s, field) for s in summaries]
+        return np.concatenate(arrays) if arrays else np.zeros(0, dtype)
+
+    hours = sum(s.hours for s in summaries)
+    reports = sum(s.reports for s in summaries)
+    drift = np.abs(concat("drift"))
+    drifted = drift[drift > tolerance]
+
+    rpm, steps, ms = concat("move_rpm"), concat("move_steps"), concat("move_ms")
+    moves = []
+    for value in np.unique(rpm):
+        group = rpm == value
+        durations = ms[group]
+        moving = group & (steps > 0)
+        moves.append({
+            "rpm": int(value),
+            "moves": int(group.sum()),
+            "steps": int(steps[group].sum()),
+            "median_ms": float(np.median(durations)),
+            "p90_ms": float(np.percentile(durations, 90)),
+            "ms_per_step": float(np.median(ms[moving] / steps[moving])) if moving.any() else None,
+        })
+
+    arrivals = sum((s.arrivals for s in summaries), np.zeros(CHANNELS + 1, np.int64))
+    corrections = sum((s.corrections for s in summaries), np.zeros(CHANNELS + 1, np.int64))
+    order = np.lexsort((-arrivals[1:], -corrections[1:])) + 1
+    channels = [{"channel": int(channel), "corrections": int(corrections[channel]),
+                 "arrivals": int(arrivals[channel])} for channel in order]
+
+    return {
+        "files": len(summaries),
+        "records": int(sum(s.records for s in summaries)),
+        "hours": round(hours, 3),
+        "drift": {
+            "reports": reports,
+            "drifts": int(drifted.size),
+            "per_hour": round(drifted.size / hours, 4) if hours else None,
+            "per_1000_reports": round(1000 * drifted.size / reports, 3) if reports else None,
+            "mean_steps": float(drifted.mean()) if drifted.size else 0.0,
+            "max_steps": int(drifted.max()) if drifted.size else 0,
+        },
+        "moves": moves,
+        "channels": channels,
+    }
+
+
+def write_csv(result, directory):
+    """drift.csv, moves.csv and channels.csv in ``directory``"""
+    os.makedirs(directory, exist_ok=True)
+    tables = {"drift": [result["drift"]], "moves": result["moves"], "channels": result["channels"]}
+    for name, rows in tables.items():
+        with open(os.path.join(directory, name + ".csv"), "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["empty"])
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+def print_report(result, top=10):
+    drift = result["drift"]
+    print(f"{result['files']} Aufzeichnungen, {result['records']} Datensätze, {result['hours']:.1f} h")
+    print(f"Drift: {drift['drifts']} von {drift['reports']} Positionsmeldungen"
+          f" ({drift['per_hour'] or 0:.3f}/h, max {drift['max_steps']} Schritte)")
+    print(f"\n{'RPM':>4} {'Fahrten':>8} {'Median ms':>10} {'p90 ms':>8} {'ms/Schritt':>11}")
+    for row in result["moves"]:
+        per_step = f"{row['ms_per_step']:.3f}" if row["ms_per_step"] is not None else "-"
+        print(f"{row['rpm']:>4} {row['moves']:>8} {row['median_ms']:>10.0f} {row['p90_ms']:>8.0f} {per_step:>11}")
+    print(f"\n{'Kanal':>5} {'Korrekturen':>12} {'Ankünfte':>9}")
+    for row in result["channels"][:top]:
+        print(f"{row['channel']:>5} {row['corrections']:>12} {row['arrivals']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auswertung der Telemetrie-Aufzeichnungen")
+    parser.add_argument("paths", nargs="+", help="recordings or directories with *.mlt files")
+    parser.add_argument("--workers", type=int, help="processes (default: one per CPU, 1 = no pool)")
+    parser.add_argument("--tolerance", type=int, default=0, help="steps of deviation not counted as drift")
+    parser.add_argument("--json", metavar="FILE", help="write the report as JSON ('-' = stdout)")
+    parser.add_argument("--csv", metavar="DIR", help="write drift.csv, moves.csv and channels.csv")
+    parser.add_argument("--top", type=int, default=10, help="channels listed in the summary")
+    args = parser.parse_args()
+
+    files = recordings(args.paths)
+    if not files:
+        parser.error("keine Aufzeichnungen gefunden")
+    result = report(summarize_all(files, args.workers), args.tolerance)
+    if args.json == "-":
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    else:
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2)
+        if args.csv:
+            write_csv(result, args.csv)
+        print_report(result, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Test script for several antennas in one event loop
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from antenna_group import AntennaGroup
+from firmware_simulator import PtyFirmwareSimulator
+from response_parser import PositionSet
+
+
+def test_group_tunes_antennas_in_parallel():
+    """Group command moves all antennas at once, one profile each"""
+    async def scenario(tmp, sims):
+        profiles = os.path.join(tmp, "antennas")
+        group = AntennaGroup(profiles)
+        synced = set()
+        group.subscribe(lambda name, event: isinstance(event, PositionSet) and synced.add(name))
+        for name, sim, ch40 in zip(("north", "south"), sims, (2370, 1580)):
+            core = group.add_antenna(name, sim.port)
+            core.config.set("channel_40_position", ch40)
+
+        assert await group.connect_all() == {"north": True, "south": True}
+        while len(synced) < 2:
+            await asyncio.sleep(0.01)
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        assert await group.goto_channel(40) == {"north": 2370, "south": 1580}
+        elapsed = loop.time() - start
+        # 2370 steps at 8 RPM take 4.3 s firmware time (0.22 s at time scale 20);
+        # sequential moves would need 0.36 s
+        assert elapsed < 0.33, elapsed
+        group.close()
+
+        # Each antenna keeps its own profile
+        reloaded = AntennaGroup.from_profiles(profiles)
+        assert sorted(reloaded.antennas) == ["north", "south"]
+        assert reloaded["south"].config.get("channel_40_position") == 1580
+        assert reloaded["north"].config.get("current_channel") == 40
+        assert reloaded["north"].config.get("last_port") == sims[0].port
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with PtyFirmwareSimulator(time_scale=20) as a, PtyFirmwareSimulator(time_scale=20) as b:
+            asyncio.run(scenario(tmp, (a, b)))
+    print("✓ Group tunes antennas in parallel")
+
+
+if __name__ == "__main__":
+    test_group_tunes_antennas_in_parallel()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test script for the automatic calibration by band sweep
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from band_sweep import SweepFinished, channel_positions, rising_points
+from cb_band import CHANNEL_FREQUENCIES
+from configuration import Configuration
+from controller_core import AntennaControllerCore, CommandSent
+from firmware_simulator import PtyFirmwareSimulator, PtyResonanceMeter, ResonanceCurve, FREQUENCY_ORDER
+
+
+def test_positions_from_noisy_samples():
+    curve = ResonanceCurve()
+    rng = random.Random(5)
+    samples = [(position, curve.frequency(position) + rng.gauss(0, 300))
+               for position in range(1000, 4000, 7)]
+    positions = channel_positions(samples)
+    assert set(positions) == set(CHANNEL_FREQUENCIES)
+    errors = [abs(positions[channel] - curve.position(frequency))
+              for channel, frequency in CHANNEL_FREQUENCIES.items()]
+    assert max(errors) < 3, max(errors)
+
+    # Falling readings (capacitor turning the other way) and a band not covered
+    mirrored = channel_positions([(-position, frequency) for position, frequency in samples])
+    assert abs(mirrored[23] + positions[23]) < 1e-9
+    assert 40 not in channel_positions([s for s in samples if s[0] < 3000])
+
+    points, skipped = rising_points({c: round(p) for c, p in positions.items()}, FREQUENCY_ORDER)
+    assert skipped == (23,)  # 27.255 MHz, above channels 24 and 25
+    assert points[0][0] == 41 and points[-1][0] == 40 and len(points) == 79
+    print(f"✓ 80 channels within {max(errors):.1f} steps from {len(samples)} noisy readings")
+
+
+def sweep_scenario(time_scale, tolerance):
+    """Sweep 1300-3700 at 24 RPM with the firmware running ``time_scale`` times faster than nominal"""
+    async def scenario(tmp, sim, meter):
+        config = Configuration(os.path.join(tmp, "antenna_config.json"))
+        config.set("resonance_meter_port", meter.port)
+        core = AntennaControllerCore(config)
+        sent, results = [], []
+        core.subscribe(lambda e: isinstance(e, CommandSent) and sent.append(e.command))
+        core.subscribe(lambda e: isinstance(e, SweepFinished) and results.append(e))
+        assert await core.connect(sim.port)
+        assert await core.synced()
+        assert await core.request("RPM24", core.REPLY_TIMEOUT) is not None
+        result = await core.sweep_calibration(start=1300, end=3700)
+        assert results == [result] and result.problem is None
+        assert [c for c in sent if c[0] in "FB"] == ["F1300", "F2400"]
+        assert result.reversals == 0 and result.steps == 3700 and result.samples > 100
+
+        errors = [abs(result.positions[channel] - meter.curve.position(frequency))
+                  for channel, frequency in CHANNEL_FREQUENCIES.items()]
+        assert max(errors) <= tolerance, max(errors)
+        assert config.is_calibration_valid() == (True, "Kalibrierung gültig (77 Stützpunkte)")
+        assert result.skipped == (23,)
+        assert sim.firmware.table_checksum() == config.calibration_table().checksum()
+        assert await core.move_to_channel(13) == result.positions[13]
+        core.close()
+        return result, max(errors)
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            PtyFirmwareSimulator(time_scale=time_scale, reset_on_open=False) as sim, \
+            PtyResonanceMeter(sim) as meter:
+        return asyncio.run(scenario(tmp, sim, meter))
+
+
+def test_sweep_calibrates_all_channels():
+    result, error = sweep_scenario(1, 4)
+    print(f"✓ Sweep in {result.seconds:.1f} s ({result.samples} readings, {result.reversals} reversals), "
+          f"channels within {error:.1f} steps")
+
+
+def test_sweep_measures_the_step_rate():
+    # Steps 10% faster / slower than the RPM says. The simulator runs its
+    # serial line faster / slower as well, which the line time of the
+    # anchors (at the nominal baud rate) does not know: ~4 ms = ~8 steps
+    for time_scale in (1.1, 0.9):
+        result, error = sweep_scenario(time_scale, 12)
+        print(f"✓ Step rate x{time_scale}: channels within {error:.1f} steps")
+
+
+if __name__ == "__main__":
+    test_positions_from_noisy_samples()
+    test_sweep_calibrates_all_channels()
+    test_sweep_measures_the_step_rate()
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Test script for the multi-point calibration table
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from calibration_table import CalibrationTable, interpolate, FREQUENCY_POSITIONS
+from configuration import Configuration
+from controller_core import AntennaControllerCore, CommandSent
+from firmware_simulator import SimulatedFirmware, PtyFirmwareSimulator
+from firmware_simulator.firmware import FREQUENCY_ORDER
+from framed_protocol import MAX_PAYLOAD
+
+
+def capacitor(freq_pos):
+    """Motor position of a frequency position on a nonlinear variable capacitor"""
+    return round(300 + 3200 * (freq_pos / 79) ** 1.4)
+
+
+ANCHORS = [(freq_pos, capacitor(freq_pos)) for freq_pos in (0, 10, 25, 45, 65, 79)]
+
+
+def make_config(directory):
+    config = Configuration(os.path.join(directory, "antenna_config.json"))
+    config.set("channel_41_position", capacitor(0))
+    config.set("channel_40_position", capacitor(79))
+    for freq_pos, position in ANCHORS[1:-1]:
+        config.add_calibration_point(config.get_channel_from_frequency_position(freq_pos), position)
+    return config
+
+
+def test_interpolation_and_lookup():
+    for method in ("spline", "linear"):
+        positions = interpolate(ANCHORS, method)
+        assert all(abs(positions[x] - y) < 1e-9 for x, y in ANCHORS)
+        assert all(a < b for a, b in zip(positions, positions[1:])), method
+    spline = CalibrationTable.from_points(ANCHORS, "spline")
+    linear = CalibrationTable.from_points(ANCHORS, "linear")
+    two_point = CalibrationTable.from_points([ANCHORS[0], ANCHORS[-1]])
+
+    def error(table):
+        return max(abs(table.position(x) - capacitor(x)) for x in range(FREQUENCY_POSITIONS))
+    assert error(spline) < error(linear) < error(two_point)
+
+    for freq_pos in range(FREQUENCY_POSITIONS):
+        assert spline.frequency_position(spline.position(freq_pos)) == freq_pos
+    assert spline.frequency_position(-100) == 0 and spline.frequency_position(5000) == 79
+    a, b = spline.position(30), spline.position(31)
+    if (a + b) % 2 == 0:
+        assert spline.frequency_position((a + b) // 2) == 31  # ties go up
+    assert spline.problem() is None
+    assert CalibrationTable([0] + [300] * 79).problem() is not None  # not rising
+    assert CalibrationTable([i * 300 for i in range(80)]).problem() is not None  # spacing > 255
+    print(f"✓ Spline within {error(spline)} steps of the capacitor, linear {error(linear)}, "
+          f"two points {error(two_point)}")
+
+
+def test_configuration_points():
+    with tempfile.TemporaryDirectory() as tmp:
+        config = make_config(tmp)
+        valid, msg = config.is_calibration_valid()
+        assert valid and msg == "Kalibrierung gültig (4 Stützpunkte)"
+        table = config.calibration_table()
+        for channel in range(1, 81):
+            freq_pos = config.get_channel_frequency_position(channel)
+            assert config.calculate_channel_position(channel) == table.position(freq_pos)
+            assert config.calculate_channel_from_position(table.position(freq_pos)) == channel
+
+        # Not rising with the frequency
+        channel = config.get_channel_from_frequency_position(30)
+        config.add_calibration_point(channel, capacitor(20))
+        assert not config.is_calibration_valid()[0] and config.calibration_table() is None
+        config.remove_calibration_point(channel)
+        assert config.is_calibration_valid()[0]
+        config.add_calibration_point(40, capacitor(79) + 10)  # end point
+        assert config.get("channel_40_position") == capacitor(79) + 10
+        config.set("calibration_points", [])
+        assert config.is_calibration_valid() == (True, "Kalibrierung gültig")
+        assert config.calibration_table() is None  # two-point CAL
+    print("✓ Calibration points validated, table used in both directions")
+
+
+def test_firmware_takes_table():
+    table = CalibrationTable.from_points(ANCHORS)
+    segments = table.segments()
+    assert len(segments) == 4 and all(len(s) <= MAX_PAYLOAD for s in segments)
+
+    fw = SimulatedFirmware()
+    fw.take_output()
+    fw.receive(segments[1], 0.0)  # out of order
+    assert [line for _, line in fw.take_output()] == [
+        "Ungültige Kalibrierung: Tabelle fehlerhaft oder nicht in Reihenfolge"]
+    for time, segment in enumerate(segments, 1):
+        fw.receive(segment, time * 0.01)
+    assert [line for _, line in fw.take_output()][-1] == "Kalibrierungstabelle empfangen: 80/80"
+    assert fw.use_table and fw.table_checksum() == table.checksum()
+    assert fw.channel_table == list(table.positions)
+    for position in range(table.position(0), table.position(79) + 1):
+        freq_pos = table.frequency_position(position)
+        assert fw.calculate_channel_from_position(position) == FREQUENCY_ORDER[freq_pos], position
+    fw.receive("STATE", 1.0)
+    [state] = [line for _, line in fw.take_output()]
+    assert state.endswith(f", Tabelle={table.checksum():02X}")
+    fw.receive("CAL300,3500", 1.1)  # back to two points
+    assert not fw.use_table
+    print("✓ Firmware takes the table in 4 segments and finds the same channels")
+
+
+def test_core_sends_table():
+    async def session(tmp, sim):
+        core = AntennaControllerCore(make_config(tmp))
+        sent = []
+        core.subscribe(lambda e: isinstance(e, CommandSent) and sent.append(e.command))
+        assert await core.connect(sim.port)
+        assert await core.synced()
+        return core, sent
+
+    async def scenario(tmp, sim):
+        core, sent = await session(tmp, sim)
+        table = core.config.calibration_table()
+        assert sent == ["Q", "STATE"] + table.segments() + [f"SETPOS{core.config.get('current_position', 0)}"]
+        assert sim.firmware.table_checksum() == table.checksum()
+        channel = core.config.get_channel_from_frequency_position(37)
+        assert await core.move_to_channel(channel) == table.position(37)
+        core.close()
+
+        # Warm reconnect: the table in the firmware is current
+        core, sent = await session(tmp, sim)
+        assert sent == ["Q", "STATE"]
+        del sent[:]
+        corrected = capacitor(37)
+        await core.move_steps(abs(corrected - table.position(37)), corrected > table.position(37))
+        del sent[:]
+        assert await core.add_calibration_point()  # corrected on channel 37
+        assert core.config.get_calibration_points()[2] == (channel, corrected)
+        assert sent[0] == "P" and [s[:4] for s in sent[1:]] == ["CALT"] * 4
+        assert core.config.calculate_channel_position(channel) == corrected
+        assert sim.firmware.table_checksum() == core.config.calibration_table().checksum()
+        assert await core.remove_calibration_points()
+        assert sent[-1] == f"CAL{capacitor(0)},{capacitor(79)}" and not sim.firmware.use_table
+        core.close()
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            PtyFirmwareSimulator(time_scale=20, reset_on_open=False) as sim:
+        asyncio.run(scenario(tmp, sim))
+    print("✓ Core sends the table, skips it on warm reconnect and resends changed points")
+
+
+if __name__ == "__main__":
+    test_interpolation_and_lookup()
+    test_configuration_points()
+    test_firmware_takes_table()
+    test_core_sends_table()
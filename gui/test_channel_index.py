@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test script for the precomputed channel/frequency-position index
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from magnet_loop_controller import Configuration
+
+
+def make_config(directory):
+    return Configuration(os.path.join(directory, "antenna_config.json"))
+
+
+def test_index_matches_linear_calibration():
+    """Every channel maps to CH41 + freq_pos * steps and back"""
+    with tempfile.TemporaryDirectory() as tmp:
+        config = make_config(tmp)
+        config.set("channel_41_position", 1000)
+        config.set("channel_40_position", 2975)
+        for freq_pos, channel in enumerate(config.frequency_order_channels):
+            position = config.calculate_channel_position(channel)
+            assert position == 1000 + freq_pos * 25.0
+            assert config.get_channel_frequency_position(channel) == freq_pos
+            assert config.calculate_channel_from_position(position) == channel
+        assert config.calculate_channel_position(0) is None
+        assert config.calculate_channel_position(81) is None
+        assert config.get_channel_frequency_position(99) is None
+    print("✓ Index matches linear calibration for all 80 channels")
+
+
+def test_index_rebuilt_on_calibration_change():
+    """Changing a calibration position through set() rebuilds the index"""
+    with tempfile.TemporaryDirectory() as tmp:
+        config = make_config(tmp)
+        config.set("channel_41_position", 0)
+        config.set("channel_40_position", 790)
+        assert config.get_steps_per_channel() == 10.0
+        assert config.calculate_channel_position(40) == 790
+
+        config.set("channel_40_position", 0)
+        assert config.is_calibration_valid()[0] is False
+        assert config.calculate_channel_position(40) is None
+        assert config.calculate_channel_from_position(500) == 41
+        assert config.get_steps_per_channel() == 30.0
+
+        config.set("channel_40_position", 1580)
+        assert config.is_calibration_valid() == (True, "Kalibrierung gültig")
+        assert config.calculate_channel_position(40) == 1580
+    print("✓ Index rebuilt on calibration change")
+
+
+if __name__ == "__main__":
+    test_index_matches_linear_calibration()
+    test_index_rebuilt_on_calibration_change()
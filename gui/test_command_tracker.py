@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test script for reply correlation and the moveQueue model
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from command_tracker import CommandTracker, CommandError, MotionCancelled, is_move
+from firmware_simulator import SimulatedFirmware
+from response_parser import parse_response
+
+
+class Link:
+    """Commands to the firmware model, parsed replies to the tracker"""
+
+    def __init__(self, loop):
+        self.firmware = SimulatedFirmware()
+        self.firmware.receive("CAL0,2370", 0.0)
+        self.firmware.take_output()
+        self.tracker = CommandTracker(loop)
+        self.now = 0.0
+
+    def send(self, command, timeout=None):
+        future = self.tracker.track(command, timeout)
+        self.firmware.receive(command, self.now)
+        self.deliver()
+        return future
+
+    def run_until(self, now):
+        self.now = now
+        self.firmware.advance(now)
+        self.deliver()
+
+    def deliver(self):
+        for _, line in self.firmware.take_output():
+            event = parse_response(line)
+            if event is not None:
+                self.tracker.on_event(event)
+
+
+def test_pipelined_moves_resolve_in_order():
+    """Moves sent back-to-back resolve with their final positions"""
+    async def scenario():
+        link = Link(asyncio.get_running_loop())
+        moves = [link.send("CH40"), link.send("CH41"), link.send("F10")]
+        assert link.tracker.queue_depth == 2
+        assert link.tracker.pending_moves == 3
+        # P while moving is answered immediately with the firmware position
+        position = link.send("P")
+        assert position.result() == 2370
+        queue_status = link.send("Q")
+        assert queue_status.result().pending == 2
+
+        link.run_until(60.0)
+        assert [m.result() for m in moves] == [2370, 0, 10]
+        assert link.tracker.queue_depth == 0
+        assert link.tracker.idle().done()
+
+        # Same channel: no motion, resolved with None
+        back = link.send("CH41")
+        link.run_until(61.0)
+        assert back.result() == 0
+        assert link.send("CH41").result() is None
+    asyncio.run(scenario())
+    print("✓ Pipelined moves resolve in order")
+
+
+def test_stop_cancels_running_and_queued_moves():
+    """S fails the running move and every queued one"""
+    async def scenario():
+        link = Link(asyncio.get_running_loop())
+        running, queued = link.send("CH40"), link.send("CH20")
+        idle = link.tracker.idle()
+        link.run_until(0.5)
+        link.send("S")
+        for move in (running, queued):
+            assert isinstance(move.exception(), MotionCancelled)
+        assert idle.done() and link.tracker.queue_depth == 0
+
+        # The position printed after the stop belongs to no request
+        position = link.send("P")
+        link.run_until(1.0)
+        assert position.result() == 2370
+    asyncio.run(scenario())
+    print("✓ STOP cancels running and queued moves")
+
+
+def test_errors_and_timeouts():
+    """Rejected commands fail, missing replies time out"""
+    async def scenario():
+        link = Link(asyncio.get_running_loop())
+        assert isinstance(link.send("CAL5,1").exception(), CommandError)
+        assert isinstance(link.send("CH99").exception(), CommandError)
+        silent = link.tracker.track("P", timeout=0.01)  # never written
+        await asyncio.sleep(0.05)
+        assert isinstance(silent.exception(), TimeoutError)
+        # A later reply goes to the next request, not the timed-out one
+        assert link.send("P").result() == 0
+    asyncio.run(scenario())
+    print("✓ Errors and timeouts")
+
+
+def test_bin_is_no_move():
+    """STOP drops queued moves by is_move; BIN must stay queued"""
+    assert all(is_move(command) for command in ("F10", "B5", "CH40"))
+    assert not any(is_move(command) for command in ("BIN115200", "P", "CAL0,2370", "S"))
+    print("✓ BIN is not a move")
+
+
+if __name__ == "__main__":
+    test_pipelined_moves_resolve_in_order()
+    test_stop_cancels_running_and_queued_moves()
+    test_errors_and_timeouts()
+    test_bin_is_no_move()
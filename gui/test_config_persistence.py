@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script for the write-behind configuration persistence
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from magnet_loop_controller import Configuration
+
+
+def test_burst_is_coalesced():
+    """A burst of position reports results in a single write"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "antenna_config.json")
+        config = Configuration(path, save_delay=0.2)
+
+        for position in range(100):
+            config.set("current_position", position)
+            config.save_config()
+        assert config.writes == 0
+        assert not os.path.exists(path)
+
+        time.sleep(0.5)
+        assert config.writes == 1
+        assert config.writes_avoided == 99
+        with open(path) as f:
+            assert json.load(f)["current_position"] == 99
+        # Only the config file remains, no temp files
+        assert os.listdir(tmp) == ["antenna_config.json"]
+    print("✓ 100 saves merged into 1 write")
+
+
+def test_steady_saves_are_written_by_one_thread():
+    """Saves that never pause are still written after max_save_delay"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "antenna_config.json")
+        config = Configuration(path, save_delay=0.2, max_save_delay=0.5)
+        threads = threading.active_count()
+        for position in range(24):  # 1.2 s, never 0.2 s quiet
+            config.set("current_position", position)
+            config.save_config()
+            assert threading.active_count() <= threads + 1
+            time.sleep(0.05)
+        assert config.writes >= 2
+        with open(path) as f:
+            assert json.load(f)["current_position"] >= 8
+        config.close()
+        assert config.writes_avoided + config.writes == 24
+    print(f"✓ Steady saves written {config.writes} times by one saver thread")
+
+
+def test_close_flushes_pending_save():
+    """Shutdown writes pending changes without waiting for the quiet period"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "antenna_config.json")
+        config = Configuration(path, save_delay=60)
+        config.set("current_channel", 7)
+        config.save_config()
+        config.close()
+        with open(path) as f:
+            assert json.load(f)["current_channel"] == 7
+        config.close()
+        assert config.writes == 1
+    print("✓ close() flushes pending save")
+
+
+def test_set_without_save_is_not_written():
+    """set() alone never touches the file"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "antenna_config.json")
+        config = Configuration(path, save_delay=0)
+        config.set("current_channel", 3)
+        config.close()
+        assert not os.path.exists(path)
+        config.save_config()
+        assert config.writes == 1
+        assert Configuration(path).get("current_channel") == 3
+    print("✓ Synchronous save with save_delay=0")
+
+
+if __name__ == "__main__":
+    test_burst_is_coalesced()
+    test_steady_saves_are_written_by_one_thread()
+    test_close_flushes_pending_save()
+    test_set_without_save_is_not_written()
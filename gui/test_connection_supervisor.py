@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test script for the reconnect after an unplugged USB cable
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from configuration import Configuration
+from connection_supervisor import ConnectionLost, ConnectionRestored
+from controller_core import AntennaControllerCore, CommandSent, ConnectionChanged
+from firmware_simulator import PtyFirmwareSimulator
+
+
+async def wait_for(core, event_type, timeout=5):
+    future = asyncio.get_running_loop().create_future()
+    unsubscribe = core.subscribe(lambda e: isinstance(e, event_type) and not future.done()
+                                 and future.set_result(e))
+    try:
+        return await asyncio.wait_for(future, timeout)
+    finally:
+        unsubscribe()
+
+
+async def connected_core(sim, directory):
+    config = Configuration(os.path.join(directory, "antenna_config.json"))
+    config.set("channel_41_position", 0)
+    config.set("channel_40_position", 2370)
+    core = AntennaControllerCore(config)
+    core.POSITION_QUERY_DELAY_MS = 10
+    assert await core.connect(sim.port)
+    assert await core.synced()
+    return core
+
+
+def run(scenario, **options):
+    with tempfile.TemporaryDirectory() as tmp:
+        link = os.path.join(tmp, "ttyMAGLOOP")
+        with PtyFirmwareSimulator(time_scale=20, link_path=link, **options) as sim:
+            asyncio.run(scenario(sim, tmp))
+
+
+def test_unplug_power_cycle_restores_calibration_and_position():
+    async def scenario(sim, tmp):
+        core = await connected_core(sim, tmp)
+        assert await core.move_to_channel(40) == 2370
+        await asyncio.sleep(0.05)  # follow-up P
+        sent = []
+        core.subscribe(lambda e: isinstance(e, CommandSent) and sent.append(e.command))
+
+        unplugged = time.monotonic()
+        sim.unplug()
+        lost = await wait_for(core, ConnectionLost, 1)
+        detected = time.monotonic() - unplugged
+        assert lost.port == sim.port and not core.is_connected
+        assert detected < 0.2, detected
+
+        await asyncio.sleep(0.3)  # cable out
+        sim.replug()
+        restored = await wait_for(core, ConnectionRestored)
+        assert restored.port == sim.port and restored.outages == 1
+        assert core.is_connected and core.position_synced
+        assert "CAL0,2370" in sent and "SETPOS2370" in sent  # the board booted
+        assert sim.firmware.calibration_received and sim.firmware.current_position == 2370
+        assert await core.query_position() == 2370
+
+        supervisor = core.supervisor
+        assert (supervisor.outages, supervisor.reconnects) == (1, 1)
+        assert supervisor.reconnect_times == [restored.seconds]
+        core.close()
+        print(f"✓ Unplug detected in {detected * 1000:.0f} ms, restored {restored.seconds * 1000:.0f} ms "
+              f"after the loss (attempts: {restored.attempts})")
+
+    run(scenario)
+
+
+def test_glitch_without_power_loss_keeps_firmware_state():
+    async def scenario(sim, tmp):
+        core = await connected_core(sim, tmp)
+        assert await core.move_to_channel(40) == 2370
+        await asyncio.sleep(0.05)
+        sent = []
+        core.subscribe(lambda e: isinstance(e, CommandSent) and sent.append(e.command))
+
+        sim.unplug(power_loss=False)
+        await wait_for(core, ConnectionLost, 1)
+        sim.replug()
+        await wait_for(core, ConnectionRestored)
+        assert sent == ["Q", "STATE"]  # ping and state, nothing to restore
+        assert core.config.get("current_position") == 2370
+        core.close()
+
+    run(scenario, reset_on_open=False)
+    print("✓ Glitch without power loss keeps the firmware state")
+
+
+def test_disconnect_stops_reconnecting():
+    async def scenario(sim, tmp):
+        core = await connected_core(sim, tmp)
+        sim.unplug()
+        await wait_for(core, ConnectionLost, 1)
+        core.disconnect()  # operator gives up
+        assert not core.supervisor.reconnecting
+
+        connected = []
+        core.subscribe(lambda e: isinstance(e, ConnectionChanged) and connected.append(e.connected))
+        sim.replug()
+        await asyncio.sleep(0.3)
+        assert not core.is_connected and connected == []
+        core.close()
+
+    run(scenario)
+    print("✓ Disconnect by the operator stops reconnecting")
+
+
+if __name__ == "__main__":
+    test_unplug_power_cycle_restores_calibration_and_position()
+    test_glitch_without_power_loss_keeps_firmware_state()
+    test_disconnect_stops_reconnecting()
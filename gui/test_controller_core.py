@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Test script for the headless controller core
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from configuration import Configuration
+from controller_core import (
+    AntennaControllerCore, Alert, ConnectionChanged, ConnectionReady, StateChanged, CommandSent,
+    LogMessage
+)
+from core_bridge import CoreBridge
+from firmware_simulator import PtyFirmwareSimulator
+from response_parser import MotionFinished, MotionStarted, PositionReport, PositionSet
+
+
+def make_core(directory):
+    config = Configuration(os.path.join(directory, "antenna_config.json"))
+    config.set("channel_41_position", 0)
+    config.set("channel_40_position", 2370)
+    core = AntennaControllerCore(config)
+    core.POSITION_QUERY_DELAY_MS = 10
+    return core
+
+
+async def wait_for(events, event_type, timeout=5):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not any(isinstance(e, event_type) for e in events):
+        assert asyncio.get_running_loop().time() < deadline, f"kein {event_type.__name__}"
+        await asyncio.sleep(0.01)
+    index = next(i for i, e in enumerate(events) if isinstance(e, event_type))
+    return events.pop(index)
+
+
+def test_core_runs_headless():
+    """Connect, calibrate and change channels without Tk"""
+    async def scenario(tmp):
+        with PtyFirmwareSimulator(time_scale=20) as sim:
+            core = make_core(tmp)
+            events = []
+            core.subscribe(events.append)
+            assert await core.connect(sim.port)
+            assert (await wait_for(events, ConnectionChanged)).connected
+            await wait_for(events, PositionSet)
+
+            assert core.goto_channel(40)
+            await wait_for(events, MotionFinished)
+            await wait_for(events, PositionReport)  # printed with "Motor fertig"
+            report = await wait_for(events, PositionReport)  # reply to the follow-up P
+            assert report.position == 2370
+            assert core.state() == StateChanged(channel=40, position=2370, moving=False, synced=True)
+
+            # Clicks while the motor moves are merged into one goal (40 + 1 wraps to 41)
+            events.clear()
+            first = core.change_channel(1)
+            await wait_for(events, MotionStarted)
+            second, third = core.change_channel(1), core.change_channel(1)
+            assert second is third
+            assert await first == 0
+            assert await third == core.config.calculate_channel_position(43)
+            moves = [e.command for e in events if isinstance(e, CommandSent) and e.command != "P"]
+            assert moves == ["CH41", "CH43"]
+            assert not any(isinstance(e, Alert) for e in events)
+
+            core.close()
+            assert not (await wait_for(events, ConnectionChanged)).connected
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(tmp))
+    assert "tkinter" not in sys.modules or "magnet_loop_controller" in sys.modules
+    print("✓ Core connects and navigates headless")
+
+
+def test_awaitable_commands():
+    """Pipelined commands resolve with the firmware replies, no sleeps"""
+    async def scenario(tmp):
+        with PtyFirmwareSimulator(time_scale=20) as sim:
+            core = make_core(tmp)
+            events = []
+            core.subscribe(events.append)
+            await core.connect(sim.port)
+            await wait_for(events, PositionSet)
+
+            moves = [core.move_to_channel(40), core.move_steps(20, False), core.move_to_channel(40)]
+            await asyncio.sleep(0.05)
+            assert core.firmware_queue_depth == 2
+            await core.idle()
+            assert [m.result() for m in moves] == [2370, 2350, 2370]
+
+            # The calibration point is taken from the firmware reply
+            core.config.set("current_position", 0)
+            assert await core.set_calibration_point("channel_40_position")
+            assert core.config.get("channel_40_position") == 2370
+            core.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(tmp))
+    print("✓ Awaitable commands")
+
+
+def test_unsent_queries_fail_cleanly():
+    """A query the writer refuses makes the calibration helpers return False"""
+    async def scenario(tmp):
+        with PtyFirmwareSimulator(time_scale=20) as sim:
+            core = make_core(tmp)
+            events = []
+            core.subscribe(events.append)
+            await core.connect(sim.port)
+            await wait_for(events, PositionSet)
+
+            core._writer.stop()  # connected, but nothing is sent any more
+            assert core.query_position() is None
+            position = core.config.get("current_position")
+            assert core.move_steps(10) is None
+            assert core.config.get("current_position") == position and not core.motor_is_moving
+            assert any(isinstance(e, LogMessage) and e.text == "Schreiben gestoppt - F10 nicht gesendet"
+                       for e in events)
+            assert await core.set_calibration_point("channel_40_position") is False
+            assert await core.sync_position() is False
+            assert await core.sync_state() is False
+            assert await core.add_calibration_point(13) is False
+            core.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(tmp))
+    print("✓ Unsent queries fail without an exception")
+
+
+def test_readiness_handshake():
+    """Calibration follows the banner (board resets) or a ping reply (board keeps running)"""
+    async def scenario(tmp, sim, via):
+        core = make_core(tmp)
+        events = []
+        core.subscribe(events.append)
+        assert await core.connect(sim.port)
+        ready = await wait_for(events, ConnectionReady)
+        assert ready.via == via
+        assert core.ready_seconds == ready.seconds
+        assert await core.synced()
+        # Calibration right after ready, not after a fixed delay
+        assert [e.command for e in events if isinstance(e, CommandSent)][-2:] == ["CAL0,2370", "SETPOS0"]
+        core.close()
+        return ready.seconds
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with PtyFirmwareSimulator(time_scale=20) as sim:
+            booted = asyncio.run(scenario(tmp, sim, "Banner"))
+            assert booted >= sim.to_wall(sim.boot_time)
+        with PtyFirmwareSimulator(time_scale=20, reset_on_open=False) as sim:
+            running = asyncio.run(scenario(tmp, sim, "Ping"))
+            assert running < booted
+    print(f"✓ Ready after {booted * 1000:.0f} ms (banner) / {running * 1000:.0f} ms (ping)")
+
+
+def test_silent_device_is_not_connected():
+    """A port that never answers is closed again and connect returns False"""
+    async def scenario(tmp, port):
+        core = make_core(tmp)
+        core.READY_TIMEOUT = 0.3
+        events = []
+        core.subscribe(events.append)
+        assert await core.connect(port) is False
+        assert not core.is_connected and core.serial_connection is None
+        assert not any(isinstance(e, (ConnectionChanged, ConnectionReady)) for e in events)
+        assert any(isinstance(e, Alert) for e in events)
+        assert core._sync_task is None
+        core.close()
+
+    master, slave = os.openpty()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            asyncio.run(scenario(tmp, os.ttyname(slave)))
+    finally:
+        os.close(slave)
+        os.close(master)
+    print("✓ Silent device is not reported as connected")
+
+
+def test_received_lines_are_stamped():
+    """Events carry the monotonic time their line was read from the port"""
+    async def scenario(tmp):
+        with PtyFirmwareSimulator(time_scale=20) as sim:
+            core = make_core(tmp)
+            stamps = []
+
+            def on_event(event):
+                if isinstance(event, (MotionStarted, MotionFinished, PositionReport)):
+                    stamps.append((core.received_at, time.monotonic()))
+
+            core.subscribe(on_event)
+            assert await core.connect(sim.port)
+            await core.synced()
+            sent = time.monotonic()
+            assert await core.goto_channel(40) == 2370
+            assert len(stamps) >= 3
+            assert all(sent < received <= dispatched for received, dispatched in stamps)
+            assert [received for received, _ in stamps] == sorted(received for received, _ in stamps)
+            core.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(scenario(tmp))
+    print("✓ Received lines are stamped before dispatch")
+
+
+def test_warm_reconnect_keeps_firmware_position():
+    """A board that was not reset keeps its position; only differing calibration is sent"""
+    async def session(tmp, sim, stale_position=None, calibration=(0, 2370)):
+        core = make_core(tmp)
+        core.config.set("channel_41_position", calibration[0])
+        core.config.set("channel_40_position", calibration[1])
+        if stale_position is not None:
+            core.config.set("current_position", stale_position)
+        sent = []
+        core.subscribe(lambda e: isinstance(e, CommandSent) and sent.append(e.command))
+        assert await core.connect(sim.port)
+        assert await core.synced()
+        return core, sent
+
+    async def scenario(tmp, sim):
+        core, sent = await session(tmp, sim)
+        assert sent == ["Q", "STATE", "CAL0,2370", "SETPOS0"]  # fresh board
+        assert await core.move_to_channel(40) == 2370
+        core.close()
+
+        # Cached position is stale (e.g. another program moved the motor)
+        core, sent = await session(tmp, sim, stale_position=500)
+        assert sent == ["Q", "STATE"]
+        assert core.state().position == 2370 and core.state().channel == 40
+        core.close()
+
+        core, sent = await session(tmp, sim, calibration=(30, 2400))
+        assert sent == ["Q", "STATE", "CAL30,2400"]
+        assert sim.firmware.current_position == 2370
+        core.close()
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            PtyFirmwareSimulator(time_scale=20, reset_on_open=False) as sim:
+        asyncio.run(scenario(tmp, sim))
+    print("✓ Warm reconnect keeps the firmware position")
+
+
+def test_bridge_forwards_calls_and_events():
+    """CoreBridge runs methods in the loop thread and queues events"""
+    with tempfile.TemporaryDirectory() as tmp:
+        core = make_core(tmp)
+        bridge = CoreBridge(core).start()
+        try:
+            assert bridge.call(core.send_command, "P").result(timeout=2) is False
+            assert bridge.call(core.goto_channel, 99).result(timeout=2) is None
+            events = bridge.drain()
+            assert [e.message for e in events if isinstance(e, Alert)] == [
+                "Nicht mit Arduino verbunden!", "Kanal muss zwischen 1 und 80 liegen!"]
+        finally:
+            bridge.stop()
+    print("✓ Bridge forwards calls and events")
+
+
+def test_bridge_logs_failed_calls():
+    """Exceptions of calls nobody waits for end up in the log"""
+    with tempfile.TemporaryDirectory() as tmp:
+        core = make_core(tmp)
+        bridge = CoreBridge(core).start()
+
+        def broken():
+            raise ValueError("kaputt")
+
+        async def broken_async():
+            raise RuntimeError("auch kaputt")
+
+        try:
+            bridge.call(broken)
+            bridge.call(broken_async)
+            logged = []
+            deadline = time.monotonic() + 2
+            while len(logged) < 2 and time.monotonic() < deadline:
+                logged += [e.text for e in bridge.drain() if isinstance(e, LogMessage)]
+                time.sleep(0.01)
+            assert sorted(logged) == ["Fehler in broken: kaputt", "Fehler in broken_async: auch kaputt"]
+            assert bridge.call(core.send_command, "P").result(timeout=2) is False
+            assert not any(isinstance(e, LogMessage) and e.text.startswith("Fehler in") for e in bridge.drain())
+        finally:
+            bridge.stop()
+    print("✓ Bridge logs exceptions of calls")
+
+
+def test_bridge_coalesces_state_snapshots():
+    """A burst of state changes is drained as one StateChanged, other events keep their order"""
+    with tempfile.TemporaryDirectory() as tmp:
+        core = make_core(tmp)
+        bridge = CoreBridge(core).start()
+        try:
+            def burst():
+                for position in range(100, 600, 100):
+                    core.config.set("current_position", position)
+                    core.publish_state()
+                    core.log(f"Position {position}")
+            bridge.call(burst).result(timeout=2)
+            events = bridge.drain(latest_only=(StateChanged,))
+            assert [type(e) for e in events] == [LogMessage] * 4 + [StateChanged, LogMessage]
+            assert events[4].position == 500
+            assert [e.text for e in events if isinstance(e, LogMessage)][-1] == "Position 500"
+        finally:
+            bridge.stop()
+    print("✓ Bridge reduces a burst of state changes to the newest")
+
+
+if __name__ == "__main__":
+    test_core_runs_headless()
+    test_awaitable_commands()
+    test_unsent_queries_fail_cleanly()
+    test_readiness_handshake()
+    test_silent_device_is_not_connected()
+    test_received_lines_are_stamped()
+    test_warm_reconnect_keeps_firmware_position()
+    test_bridge_forwards_calls_and_events()
+    test_bridge_logs_failed_calls()
+    test_bridge_coalesces_state_snapshots()
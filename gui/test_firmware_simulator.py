@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test script for the firmware simulator
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import serial
+
+from firmware_simulator import SimulatedFirmware, PtyFirmwareSimulator, READY_BANNER
+
+
+def lines(firmware):
+    return [line for _, line in firmware.take_output()]
+
+
+def test_banner_and_fallback_channel():
+    """Setup prints the banner; CH without calibration uses the fallback"""
+    fw = SimulatedFirmware()
+    banner = lines(fw)
+    assert banner[0] == READY_BANNER
+    assert banner[1] == "Stepper RPM: 8"
+
+    fw.receive("CH2", 0.0)
+    assert lines(fw) == [
+        "Warnung: Verwende Fallback-Berechnung - Kalibrierung fehlt",
+        "Motor startet - Fahre zu Kanal 2 - 1260 Schritte vorwärts",
+    ]
+    fw.receive("P", 0.1)
+    assert lines(fw) == ["Aktuelle Position: 1260", "Aktueller Kanal: 43"]
+    print("✓ Banner and fallback channel calculation")
+
+
+def test_calibrated_move_queue_and_timing():
+    """Calibrated CH, queued commands and step timing at 12 RPM"""
+    fw = SimulatedFirmware()
+    fw.take_output()
+    fw.receive("RPM12", 0.0)
+    fw.receive("CAL1000,2975", 0.0)
+    assert lines(fw) == ["Drehzahl gesetzt auf: 12",
+                         "Kalibrierung empfangen: CH41=1000, CH40=2975, Schritte/Kanal=25.00"]
+    assert fw.stepper.delay_us == 1226
+
+    fw.receive("SETPOS1000", 0.0)
+    fw.receive("F10", 0.0)
+    fw.receive("B10", 0.001)
+    assert lines(fw)[1:] == ["Motor startet - Fahre 10 Schritte vorwärts",
+                             "Befehl in Warteschlange eingereiht: B10"]
+
+    # 10 steps of 1226 µs, then the queued command starts
+    fw.advance(0.0123)
+    assert lines(fw) == ["Motor fertig - Bewegung abgeschlossen",
+                         "Aktuelle Position: 1010",
+                         "Führe Befehl aus Warteschlange aus: B10",
+                         "Motor startet - Fahre 10 Schritte rückwärts"]
+    fw.advance(1.0)
+    lines(fw)
+    assert fw.shaft_position == 0 and fw.current_position == 1000
+
+    fw.receive("CH40", 1.0)
+    assert lines(fw) == ["Motor startet - Fahre zu Kanal 40 - 1975 Schritte vorwärts"]
+    assert abs(fw.next_event_time() - (1.0 + 1975 * 0.001226)) < 1e-9
+    fw.receive("CH40", 1.1)
+    fw.receive("S", 1.2)
+    assert lines(fw) == ["Befehl in Warteschlange eingereiht: CH40",
+                         "Motor angehalten - Warteschlange geleert",
+                         "Motor fertig - Bewegung abgeschlossen",
+                         "Aktuelle Position: 2975"]
+    assert fw.shaft_position == int(0.2 / 0.001226)
+    fw.receive("CH40", 1.3)
+    assert lines(fw) == ["Bereits auf Kanal 40"]
+    print("✓ Calibrated moves, queue, STOP and step timing")
+
+
+def test_pty_round_trip():
+    """pyserial talks to the simulator like to the real board"""
+    with PtyFirmwareSimulator(time_scale=20, boot_time=1.5) as sim:
+        port = serial.Serial(sim.port, 9600, timeout=2)
+        try:
+            assert port.readline().decode().strip() == READY_BANNER
+            while port.readline().strip() != b"LED Matrix shows current channel (01-80)":
+                pass
+            port.write(b"F50\n")
+            start = time.monotonic()
+            assert port.readline().decode().strip() == "Motor startet - Fahre 50 Schritte vorwärts"
+            assert port.readline().decode().strip() == "Motor fertig - Bewegung abgeschlossen"
+            # 50 steps at 8 RPM (1831 µs) take 92 ms firmware time
+            assert time.monotonic() - start < 1.0
+            assert port.readline().decode().strip() == "Aktuelle Position: 50"
+        finally:
+            port.close()
+        assert sim.resets == 1
+    print("✓ pty round trip")
+
+
+if __name__ == "__main__":
+    test_banner_and_fallback_channel()
+    test_calibrated_move_queue_and_timing()
+    test_pty_round_trip()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Test script for the framed binary protocol
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import framed_protocol
+from configuration import Configuration
+from controller_core import AntennaControllerCore, LogMessage
+from firmware_simulator import PtyFirmwareSimulator, SimulatedFirmware
+from framed_protocol import FrameDecoder, FrameEncoder, decode_frame, encode_frame
+from response_parser import (
+    CalibrationAck, MotionFinished, MotionStarted, PositionReport, PositionSet, parse_response
+)
+
+
+def test_frames_round_trip():
+    """Encoder and decoder agree; garbage, bad CRCs and gaps are detected"""
+    encoder = FrameEncoder()
+    frames = [encoder.encode(command) for command in ("CH40", "P", "CAL0,2370")]
+    assert frames[0] == encode_frame(0, framed_protocol.COMMAND, b"CH40")
+    assert len(frames[1]) == 6  # start, length, seq, type, "P", crc
+
+    decoder = FrameDecoder()
+    corrupted = bytearray(frames[1])
+    corrupted[4] ^= 0x01
+    stream = b"\x00noise\xa5" + frames[0] + bytes(corrupted) + frames[2]
+    received = []
+    for index in range(len(stream)):  # byte by byte
+        received += decoder.feed(stream[index:index + 1])
+    assert [(seq, payload) for seq, _, payload in received] == [(0, b"CH40"), (2, b"CAL0,2370")]
+    assert decoder.crc_errors == 1
+    assert decoder.frames_lost == 1
+    assert encoder.resend(1) == frames[1]
+    print("✓ Frames round trip")
+
+
+def test_firmware_frames_match_text_replies():
+    """Every framed reply of the simulator decodes to the events of its text reply"""
+    commands = ["P", "Q", "D", "STATE", "RPM12", "RPM3", "CH90", "CAL0,2370", "CAL5", "CAL9,3",
+                "SETPOS100", "CH40", "F50", "S", "CH40", "X1", "F20", "STATE"]
+
+    def replies(binary):
+        firmware = SimulatedFirmware()
+        firmware.take_output()
+        if binary:
+            firmware.receive("BIN115200", 0.0)
+            assert firmware.take_output() == [(0.0, "Binärprotokoll aktiv: 115200 Baud")]
+        events, now = [], 0.0
+        for command in commands:
+            firmware.receive(command, now)
+            now += 0.1
+        firmware.advance(60.0)
+        for _, item in firmware.take_output():
+            if binary:
+                (_, frame_type, payload), = FrameDecoder().feed(item)
+                events += [event for event, _ in decode_frame(frame_type, payload)]
+            else:
+                events.append(parse_response(item))
+        return events
+
+    text, framed = replies(False), replies(True)
+    assert framed == text
+    assert CalibrationAck(0, 2370, 30.0) in framed
+    assert MotionStarted(steps=2270, forward=True, channel=40) in framed
+    print(f"✓ {len(framed)} framed replies decode like the text replies")
+
+
+def test_corrupted_command_is_nacked():
+    firmware = SimulatedFirmware()
+    firmware.receive("BIN115200", 0.0)
+    firmware.take_output()
+    frame = bytearray(encode_frame(7, framed_protocol.COMMAND, b"P"))
+    frame[4] = ord("Q")
+    results = [firmware.serial_event(byte) for byte in frame]
+    firmware.receive(results[-1], 0.1)
+    (_, reply), = firmware.take_output()
+    (seq, frame_type, payload), = FrameDecoder().feed(reply)
+    assert (frame_type, payload) == (framed_protocol.NAK, b"\x07")
+    print("✓ Corrupted command frame answered with NAK")
+
+
+class FlakyLineFirmware(SimulatedFirmware):
+    """Flips one bit of the next command frame after ``corrupt_next`` was set"""
+
+    corrupt_next = False
+
+    def serial_event(self, byte):
+        if self.corrupt_next and self.binary_mode and len(self._input) == 4:  # first payload byte
+            self.corrupt_next = False
+            byte ^= 0x10
+        return super().serial_event(byte)
+
+
+class TextOnlyFirmware(SimulatedFirmware):
+    """Firmware from before BIN and STATE (processCommand/executeCommand of the first main.cpp)"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.commands = []
+
+    def _process_command(self, command):
+        command = command.strip().upper()
+        self.commands.append(command)
+        if self.motor_is_busy and command.startswith("BIN"):  # startsWith("B"): a move
+            self.move_queue.append(command)
+            self._println("Befehl in Warteschlange eingereiht: " + command)
+            return
+        super()._process_command(command)
+
+    def _execute_command(self, command):
+        if command.startswith("BIN"):
+            return  # B with toInt("IN...") = 0 steps: nothing, no reply
+        if command == "STATE":
+            self._println("Unbekannter Befehl: " + command)
+            return
+        super()._execute_command(command)
+
+
+async def connected_core(sim, directory, framed_baudrate=115200):
+    config = Configuration(os.path.join(directory, "antenna_config.json"))
+    config.set("channel_41_position", 0)
+    config.set("channel_40_position", 2370)
+    core = AntennaControllerCore(config)
+    core.POSITION_QUERY_DELAY_MS = 10
+    synced = asyncio.Event()
+    core.subscribe(lambda event: isinstance(event, PositionSet) and synced.set())
+    assert await core.connect(sim.port, framed_baudrate=framed_baudrate)
+    await asyncio.wait_for(synced.wait(), 5)
+    return core
+
+
+def test_core_over_framed_link():
+    """Negotiation, moves and a NAK resend against the simulator"""
+    async def scenario(sim, tmp):
+        core = await connected_core(sim, tmp)
+        events, logs = [], []
+        core.subscribe(events.append)
+        core.subscribe(lambda e: isinstance(e, LogMessage) and logs.append(e.text))
+        assert core.framed and sim.firmware.binary_mode
+        assert sim.firmware.baudrate == 115200
+
+        sim.firmware.corrupt_next = True
+        assert await core.move_to_channel(40) == 2370
+        assert await core.query_position() == 2370
+        assert any(isinstance(e, MotionFinished) for e in events)
+        assert PositionReport(2370) in events
+        assert "Arduino: Motor fertig - Bewegung abgeschlossen" in logs
+        assert any("sende erneut" in line for line in logs)
+        assert core.frames.crc_errors == 0 and core.frames.frames_lost == 0
+        core.close()
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            PtyFirmwareSimulator(time_scale=20, firmware=FlakyLineFirmware()) as sim:
+        asyncio.run(scenario(sim, tmp))
+    print("✓ Core works over the framed link and resends a corrupted frame")
+
+
+def test_running_board_keeps_frames_over_reconnect():
+    """A board that does not reset on open is found again in binary mode"""
+    async def scenario(sim, tmp):
+        core = await connected_core(sim, tmp)
+        assert core.framed
+        core.disconnect()
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        assert await core.connect(sim.port, framed_baudrate=115200)
+        assert core.framed and loop.time() - started < core.REPLY_TIMEOUT  # frames tried first
+        assert await core.synced()
+        assert await core.move_to_channel(40) == 2370
+        core.close()
+
+        # A new core (app restart) tries frames once text got no answer
+        fresh = AntennaControllerCore(core.config)
+        fresh.READY_TIMEOUT = 0.5
+        assert await fresh.connect(sim.port, framed_baudrate=115200)
+        assert fresh.framed and await fresh.synced()
+        assert await fresh.query_position() == 2370
+        fresh.close()
+        assert sim.firmware.binary_mode and sim.resets == 0
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            PtyFirmwareSimulator(time_scale=20, reset_on_open=False) as sim:
+        asyncio.run(scenario(sim, tmp))
+    print("✓ Reconnect to a running board resumes the framed protocol")
+
+
+def test_old_firmware_ignores_bin():
+    firmware = TextOnlyFirmware()
+    firmware.take_output()  # banner
+    firmware.receive("BIN115200", 0.0)
+    assert firmware.take_output() == []
+    firmware.receive("F100", 0.1)
+    firmware.receive("BIN115200", 0.11)
+    assert firmware.take_output()[-1][1] == "Befehl in Warteschlange eingereiht: BIN115200"
+    firmware.advance(1.0)
+    assert not firmware.binary_mode and not firmware.move_queue
+    print("✓ Old firmware does not answer BIN and queues it while moving")
+
+
+def test_old_firmware_stays_on_text():
+    async def scenario(sim, tmp):
+        started = asyncio.get_running_loop().time()
+        core = await connected_core(sim, tmp)
+        assert asyncio.get_running_loop().time() - started < core.REPLY_TIMEOUT
+        assert not core.framed
+        assert await core.move_to_channel(40) == 2370
+        assert "STATE" in sim.firmware.commands
+        assert not any(command.startswith("BIN") for command in sim.firmware.commands)
+        core.close()
+
+    with tempfile.TemporaryDirectory() as tmp, \
+            PtyFirmwareSimulator(time_scale=20, firmware=TextOnlyFirmware()) as sim:
+        asyncio.run(scenario(sim, tmp))
+    print("✓ Old firmware keeps the text protocol")
+
+
+if __name__ == "__main__":
+    test_frames_round_trip()
+    test_firmware_frames_match_text_replies()
+    test_corrupted_command_is_nacked()
+    test_core_over_framed_link()
+    test_running_board_keeps_frames_over_reconnect()
+    test_old_firmware_ignores_bin()
+    test_old_firmware_stays_on_text()
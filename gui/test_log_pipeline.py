@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test script for the coalesced, bounded log pipeline
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from log_pipeline import LogPipeline
+
+
+class RecordingText:
+    """Minimal stand-in for tk.Text that records widget operations"""
+
+    def __init__(self):
+        self.lines = []
+        self.inserts = 0
+        self.deletes = 0
+
+    def insert(self, index, text):
+        assert index == "end"
+        self.inserts += 1
+        self.lines.extend(text.split("\n")[:-1])
+
+    def delete(self, start, end):
+        self.deletes += 1
+        if end == "end":
+            self.lines = []
+        else:
+            # "<n>.0" deletes the first n-1 lines
+            del self.lines[:int(end.split(".")[0]) - 1]
+
+    def see(self, index):
+        pass
+
+
+def test_batched_flush():
+    """Many messages are rendered with a single insert"""
+    pipeline = LogPipeline(max_lines=100)
+    widget = RecordingText()
+    for i in range(50):
+        pipeline.push(f"Nachricht {i}")
+    assert pipeline.flush(widget) == 50
+    assert widget.inserts == 1
+    assert widget.lines[-1].endswith("Nachricht 49")
+    assert pipeline.flush(widget) == 0
+    assert widget.inserts == 1
+    print("✓ 50 messages rendered with one insert")
+
+
+def test_scrollback_trim():
+    """The widget never holds more than max_lines"""
+    pipeline = LogPipeline(max_lines=10)
+    widget = RecordingText()
+    for batch in range(5):
+        for i in range(7):
+            pipeline.push(f"Zeile {batch}-{i}")
+        pipeline.flush(widget)
+        assert len(widget.lines) <= 10
+    assert widget.lines[-1].endswith("Zeile 4-6")
+    assert widget.lines[0].endswith("Zeile 3-4")
+    print("✓ Scrollback trimmed in bulk")
+
+
+def test_filter():
+    """Filtered lines are never rendered; changing the filter re-renders history"""
+    pipeline = LogPipeline(max_lines=100)
+    widget = RecordingText()
+    pipeline.set_filter("position", widget)
+    pipeline.push("Gesendet: P")
+    pipeline.push("Arduino: Aktuelle Position: 10")
+    pipeline.flush(widget)
+    assert len(widget.lines) == 1 and widget.lines[0].endswith("Aktuelle Position: 10")
+
+    pipeline.set_filter("", widget)
+    assert len(widget.lines) == 2
+    print("✓ Filter applied before rendering")
+
+
+def test_bounded_pending():
+    """The pending buffer is a ring; overflow is counted"""
+    pipeline = LogPipeline(max_lines=10, max_pending=5)
+    for i in range(8):
+        pipeline.push(str(i))
+    assert pipeline.dropped == 3
+    assert [m.split("] ")[1] for m in pipeline.drain()] == ["3", "4", "5", "6", "7"]
+    print("✓ Pending buffer bounded")
+
+
+if __name__ == "__main__":
+    test_batched_flush()
+    test_scrollback_trim()
+    test_filter()
+    test_bounded_pending()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test script for the motion coalescer
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from command_tracker import MotionCancelled
+from configuration import Configuration
+from controller_core import AntennaControllerCore, CommandSent
+from firmware_simulator import PtyFirmwareSimulator
+from response_parser import MotionStarted, PositionSet
+
+
+async def connected_core(sim, directory):
+    config = Configuration(os.path.join(directory, "antenna_config.json"))
+    config.set("channel_41_position", 0)
+    config.set("channel_40_position", 2370)
+    core = AntennaControllerCore(config)
+    core.POSITION_QUERY_DELAY_MS = 10
+    synced = asyncio.Event()
+    core.subscribe(lambda event: isinstance(event, PositionSet) and synced.set())
+    await core.connect(sim.port)
+    await asyncio.wait_for(synced.wait(), 5)
+    return core
+
+
+def test_jogs_fold_into_net_move():
+    """F10, F10, B5 behind a running move become one F15; F10, B10 sends nothing"""
+    async def scenario(sim, tmp):
+        core = await connected_core(sim, tmp)
+        sent, started = [], asyncio.Event()
+        core.subscribe(lambda e: isinstance(e, CommandSent) and e.command != "P" and sent.append(e.command))
+        core.subscribe(lambda e: isinstance(e, MotionStarted) and started.set())
+
+        running = core.goto_channel(40)
+        await started.wait()
+        jogs = [core.jog_steps(10), core.jog_steps(10), core.jog_steps(5, forward=False)]
+        assert jogs[0] is jogs[1] is jogs[2]
+        assert await running == 2370
+        assert await jogs[0] == 2385
+        assert sent == ["CH40", "F15"]
+
+        # A channel request replaces pending jogs
+        sent.clear()
+        started.clear()
+        running = core.jog_steps(100, forward=False)
+        await started.wait()
+        core.jog_steps(10)
+        core.jog_steps(10, forward=False)
+        assert core.motion.pending_requests == 2
+        assert await running == 2285
+        await core.motion.settled()
+        assert sent == ["B100"]
+        core.close()
+
+    with tempfile.TemporaryDirectory() as tmp, PtyFirmwareSimulator(time_scale=20) as sim:
+        asyncio.run(scenario(sim, tmp))
+    print("✓ Jogs fold into one net move")
+
+
+def test_stop_drops_pending_goal():
+    """STOP cancels the running move and the merged requests behind it"""
+    async def scenario(sim, tmp):
+        core = await connected_core(sim, tmp)
+        sent, started = [], asyncio.Event()
+        core.subscribe(lambda e: isinstance(e, CommandSent) and sent.append(e.command))
+        core.subscribe(lambda e: isinstance(e, MotionStarted) and started.set())
+
+        running = core.goto_channel(40)
+        await started.wait()
+        pending = core.change_channel(-5)
+        core.stop_movement()
+        for future in (running, pending):
+            try:
+                await future
+                assert False, "Bewegung nicht abgebrochen"
+            except MotionCancelled:
+                pass
+        await core.motion.settled()
+        assert [c for c in sent if c != "P"] == ["CH40", "S"]
+        assert core.motion.target_channel is None
+        core.close()
+
+    with tempfile.TemporaryDirectory() as tmp, PtyFirmwareSimulator(time_scale=20) as sim:
+        asyncio.run(scenario(sim, tmp))
+    print("✓ STOP drops the pending goal")
+
+
+def test_unsent_steps_fail_after_the_channel_move():
+    """A channel move that was sent completes when the steps behind it could not be sent"""
+    async def scenario(sim, tmp):
+        core = await connected_core(sim, tmp)
+        sent = []
+        core.subscribe(lambda e: isinstance(e, CommandSent) and e.command != "P" and sent.append(e.command))
+        core.move_steps = lambda steps, forward=True, timeout=None: None  # send buffer full
+
+        plan = core.goto_channel(40)
+        assert core.jog_steps(10) is plan
+        try:
+            await plan
+            assert False, "Bewegung gesendet"
+        except ConnectionError:
+            pass
+        assert sent == ["CH40"]
+        assert core.pending_moves == 0  # failed once CH40 was done
+        assert core.config.get("current_position") == 2370
+        core.close()
+
+    with tempfile.TemporaryDirectory() as tmp, PtyFirmwareSimulator(time_scale=20) as sim:
+        asyncio.run(scenario(sim, tmp))
+    print("✓ Unsent steps fail after the channel move completed")
+
+
+if __name__ == "__main__":
+    test_jogs_fold_into_net_move()
+    test_stop_drops_pending_goal()
+    test_unsent_steps_fail_after_the_channel_move()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test script for the motion-timing model and the confirmation at the predicted end
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from configuration import Configuration
+from controller_core import AntennaControllerCore, CommandSent
+from firmware_simulator import PtyFirmwareSimulator
+from motion_model import MotionModel, MotionPredicted, step_interval
+from response_parser import MotionFinished, PositionReport
+
+
+def test_step_interval_matches_cheapstepper():
+    assert step_interval(12) == 1226e-6  # 60e6 // (4076 * 12) µs
+    assert step_interval(8) == 1840e-6
+    assert step_interval(24) == step_interval(25) == 600e-6
+    print("✓ Step interval of CheapStepper in 4076-step mode")
+
+
+def test_fit_converges_and_ignores_outliers():
+    rng = random.Random(7)
+    model = MotionModel()
+    assert model.predict(300, 12) == 300 * 1226e-6  # nominal before any move
+
+    def true_seconds(steps, rpm):
+        return 0.03 + 1.1 * steps * step_interval(rpm)
+
+    for _ in range(60):
+        steps, rpm = rng.choice((30, 300, 2370)), rng.choice((8, 12, 24))
+        assert model.observe(steps, rpm, true_seconds(steps, rpm) + rng.gauss(0, 0.002))
+    assert abs(model.overhead - 0.03) < 0.01 and abs(model.scale - 1.1) < 0.01, model.parameters()
+    assert abs(model.predict(1000, 16) - true_seconds(1000, 16)) < 0.02
+
+    assert not model.observe(30, 12, 10.0)  # board stalled, reply lost
+    assert model.rejected == 1 and abs(model.scale - 1.1) < 0.01
+    print(f"✓ Fit converges to overhead {model.overhead * 1000:.1f} ms, scale {model.scale:.3f}")
+
+
+def test_confirmation_at_predicted_end():
+    """The model learns the simulator speed; P is answered right after "Motor fertig" """
+    async def scenario(sim, tmp):
+        config = Configuration(os.path.join(tmp, "antenna_config.json"))
+        config.set("channel_41_position", 0)
+        config.set("channel_40_position", 2370)
+        core = AntennaControllerCore(config)
+        assert await core.connect(sim.port)
+        await core.synced()
+        await core.request("RPM12")
+        assert core.rpm == 12
+
+        predictions, events = [], []
+        core.subscribe(lambda e: isinstance(e, MotionPredicted) and predictions.append(e))
+        core.subscribe(lambda e: isinstance(e, (MotionFinished, PositionReport)) and
+                       events.append((time.monotonic(), type(e))))
+        sent = []
+        core.subscribe(lambda e: isinstance(e, CommandSent) and e.command == "P" and sent.append(e))
+        confirmed = []
+        for channel in (40, 41, 20, 40, 1, 41, 30, 40):
+            events.clear()
+            await core.move_to_channel(channel)
+            await asyncio.sleep(0.1)  # confirmation
+            # "Motor fertig", its position line, then the reply to the confirming P
+            kinds = [kind for _, kind in events]
+            finish = kinds.index(MotionFinished)
+            assert kinds[finish + 1:finish + 3] == [PositionReport, PositionReport], kinds
+            confirmed.append(events[finish + 2][0] - events[finish][0])
+
+        assert len(predictions) == 8 and predictions[0].rpm == 12
+        assert len(sent) <= 2 * 8
+        assert abs(core.timing.scale - 1 / 20) < 0.01, core.timing.parameters()
+        assert config.get("motion_timing") == core.timing.parameters()
+        # Confirmed within a few ms instead of POSITION_QUERY_DELAY_MS after the finish
+        assert all(delay < 0.1 for delay in confirmed), confirmed
+        core.close()
+        return confirmed
+
+    with tempfile.TemporaryDirectory() as tmp, PtyFirmwareSimulator(time_scale=20) as sim:
+        confirmed = asyncio.run(scenario(sim, tmp))
+    print("✓ Position confirmed " + ", ".join(f"{delay * 1000:.0f}" for delay in confirmed)
+          + " ms after the finish")
+
+
+if __name__ == "__main__":
+    test_step_interval_matches_cheapstepper()
+    test_fit_converges_and_ignores_outliers()
+    test_confirmation_at_predicted_end()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test script for port discovery and remembered controllers
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import port_discovery
+from configuration import Configuration
+from controller_core import AntennaControllerCore
+from firmware_simulator import PtyFirmwareSimulator
+from port_discovery import (
+    PortInfo, candidates, device_key, discover, is_board, known_port, remember_controller
+)
+
+
+def test_known_controller_found_by_usb_identity():
+    """The remembered controller is found under its new device name without probing"""
+    usb = SimpleNamespace(device="/dev/ttyACM0", vid=0x2341, pid=0x1002, serial_number="F412FA6F")
+    assert device_key(usb) == "2341:1002:F412FA6F"
+    assert device_key(SimpleNamespace(device="/dev/ttyS0", vid=None)) is None
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = Configuration(os.path.join(tmp, "antenna_config.json"), save_delay=0)
+        before = [PortInfo("/dev/ttyACM0", "UNO R4", "2341:1002:F412FA6F"),
+                  PortInfo("/dev/ttyACM1", "GPS", "1546:01A7:")]
+        assert remember_controller(config, "/dev/ttyACM1", before) == "1546:01A7:"
+        assert remember_controller(config, "/dev/ttyACM0", before) == "2341:1002:F412FA6F"
+        assert config.get("known_controllers") == ["2341:1002:F412FA6F", "1546:01A7:"]
+
+        # Replugged in the other order: the device names swapped
+        after = [PortInfo("/dev/ttyACM0", "GPS", "1546:01A7:"),
+                 PortInfo("/dev/ttyACM1", "UNO R4", "2341:1002:F412FA6F")]
+        assert known_port(config, after) == "/dev/ttyACM1"
+
+        # The controller is gone and another USB device took its old path
+        config.set("known_controllers", ["2341:0043:ABC"])
+        config.set("last_port", "/dev/ttyACM0")
+        assert known_port(config, [PortInfo("/dev/ttyACM0", "CH340", "1A86:7523:XYZ")]) is None
+        config.set("last_port", "/dev/pts/4")
+        assert known_port(config, [PortInfo("/dev/pts/4", "Simuliert")]) == "/dev/pts/4"
+
+        config.set("known_controllers", [])
+        config.set("last_port", "/dev/ttyACM7")
+        assert known_port(config, after) is None  # gone
+        config.set("last_port", "/dev/ttyACM0")
+        assert known_port(config, after) == "/dev/ttyACM0"
+    print("✓ Known controller found by USB identity")
+
+
+def test_probe_candidates():
+    """Excluded ports are never opened; boards are told apart from other USB serial devices"""
+    ports = [PortInfo("/dev/ttyS0", "UART"),
+             PortInfo("/dev/ttyACM0", "UNO R4", "2341:1002:F412FA6F"),
+             PortInfo("/dev/ttyUSB0", "CH340", "1A86:7523:"),
+             PortInfo("/dev/ttyUSB1", "Radio CAT", "10C4:EA60:0001"),
+             PortInfo("/dev/ttyUSB2", "PTT", "067B:2303:")]
+    assert [p.device for p in candidates(ports)] == ["/dev/ttyACM0", "/dev/ttyUSB0", "/dev/ttyUSB1", "/dev/ttyUSB2"]
+    assert [p.device for p in candidates(ports, ["10c4:ea60", "/dev/ttyUSB2"])] == ["/dev/ttyACM0", "/dev/ttyUSB0"]
+    assert [p.device for p in ports if is_board(p)] == ["/dev/ttyACM0", "/dev/ttyUSB0"]
+    print("✓ Excluded ports are not probed, boards first")
+
+
+def test_parallel_discovery():
+    """Banner and identify reply are both recognized; silent ports cost one timeout in total"""
+    master, slave = os.openpty()
+    silent = [PortInfo(os.ttyname(slave), "Simuliert")]
+    try:
+        with PtyFirmwareSimulator(time_scale=20) as resetting, \
+                PtyFirmwareSimulator(time_scale=20, reset_on_open=False) as running:
+            ports = [PortInfo(resetting.port, "Simuliert"), PortInfo(running.port, "Simuliert")]
+            start = time.monotonic()
+            found = asyncio.run(discover(ports + silent + [PortInfo("/dev/does-not-exist", "Simuliert")],
+                                         timeout=1.0))
+            elapsed = time.monotonic() - start
+
+            assert {(c.port.device, c.via) for c in found} == {
+                (resetting.port, "Banner"), (running.port, "Identify")}
+            assert elapsed < 1.8, elapsed  # not one timeout per port
+
+            start = time.monotonic()
+            first = asyncio.run(discover(ports[1:] + silent, timeout=1.0, first=True))
+            assert [c.port.device for c in first] == [running.port]
+            assert time.monotonic() - start < 0.8  # the silent probe was stopped
+    finally:
+        os.close(master)
+        os.close(slave)
+    print(f"✓ 4 ports probed in parallel in {elapsed * 1000:.0f} ms")
+
+
+def test_auto_connect_searches_without_known_controller():
+    async def scenario(sim, tmp):
+        config = Configuration(os.path.join(tmp, "antenna_config.json"))
+        core = AntennaControllerCore(config)
+        config.set("probe_exclude", [sim.port])
+        assert not await port_discovery.auto_connect(core)  # never opened
+        config.set("probe_exclude", [])
+        assert await port_discovery.auto_connect(core)
+        assert core.port_name == sim.port
+        await core.synced()
+        core.close()
+
+    environ = os.environ.get("MAGNET_LOOP_PORTS")
+    with tempfile.TemporaryDirectory() as tmp, \
+            PtyFirmwareSimulator(time_scale=20, reset_on_open=False) as sim:
+        os.environ["MAGNET_LOOP_PORTS"] = sim.port
+        try:
+            asyncio.run(scenario(sim, tmp))
+        finally:
+            if environ is None:
+                del os.environ["MAGNET_LOOP_PORTS"]
+            else:
+                os.environ["MAGNET_LOOP_PORTS"] = environ
+    print("✓ Auto-connect finds the controller by probing")
+
+
+if __name__ == "__main__":
+    test_known_controller_found_by_usb_identity()
+    test_probe_candidates()
+    test_parallel_discovery()
+    test_auto_connect_searches_without_known_controller()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test script for the table-driven Arduino response parser
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from response_parser import (
+    parse_response, ControllerReady, PositionReport, ChannelReport, PositionSet,
+    MotionStarted, MotionFinished, MotionStopped, AlreadyOnChannel, MotorStatus,
+    QueueStatus, CommandQueued, QueuedCommandStarted, CalibrationAck,
+    CalibrationRejected, FallbackWarning, RpmReport, InvalidRpm, InvalidChannel,
+    UnknownCommand, FirmwareState, ProtocolSwitched, InvalidBaudrate
+)
+
+# Firmware line (src/main.cpp) -> expected event
+CASES = [
+    ("Magnet Loop Antenna Controller Ready", ControllerReady()),
+    ("Stepper RPM: 8", RpmReport(8)),
+    ("Aktuelle Position: 1320", PositionReport(1320)),
+    ("Aktuelle Position: -30", PositionReport(-30)),
+    ("Aktueller Kanal: 41", ChannelReport(41)),
+    ("Zeige Kanal auf Matrix: 7", ChannelReport(7)),
+    ("Position gesetzt auf: 1000", PositionSet(1000)),
+    ("Motor startet - Fahre zu Kanal 23 - 480 Schritte vorwärts", MotionStarted(480, True, 23)),
+    ("Motor startet - Fahre zu Kanal 41 - 1650 Schritte rückwärts", MotionStarted(1650, False, 41)),
+    ("Motor startet - Fahre 100 Schritte vorwärts", MotionStarted(100, True)),
+    ("Motor startet - Fahre 10 Schritte r�ckw�rts", MotionStarted(10, False)),
+    ("Motor fertig - Bewegung abgeschlossen", MotionFinished()),
+    ("Motor angehalten - Warteschlange geleert", MotionStopped()),
+    ("Motor Status: Bereit", MotorStatus(False)),
+    ("Motor Status: Beschäftigt", MotorStatus(True)),
+    ("Bereits auf Kanal 16", AlreadyOnChannel(16)),
+    ("Warteschlange: 2 Befehle wartend", QueueStatus(2)),
+    ("Befehl in Warteschlange eingereiht: CH13", CommandQueued("CH13")),
+    ("Führe Befehl aus Warteschlange aus: F10", QueuedCommandStarted("F10")),
+    ("Kalibrierung empfangen: CH41=120, CH40=2490, Schritte/Kanal=30.00", CalibrationAck(120, 2490, 30.0)),
+    ("Ungültige Kalibrierung: CH40 muss > CH41 sein, Bereich 0-4075",
+     CalibrationRejected("Ungültige Kalibrierung: CH40 muss > CH41 sein, Bereich 0-4075")),
+    ("Kalibrierung Format: CAL<ch41_pos>,<ch40_pos>", CalibrationRejected("Kalibrierung Format: CAL<ch41_pos>,<ch40_pos>")),
+    ("Warnung: Verwende Fallback-Berechnung - Kalibrierung fehlt", FallbackWarning()),
+    ("Drehzahl gesetzt auf: 12", RpmReport(12)),
+    ("Ungültige Drehzahl(6-24)", InvalidRpm()),
+    ("Ungültiger Kanal (1-80)", InvalidChannel()),
+    ("Unbekannter Befehl: X", UnknownCommand("X")),
+    ("Zustand: CH41=0, CH40=2370, Kalibriert=1, Position=1320", FirmwareState(0, 2370, True, 1320)),
+    ("Zustand: CH41=0, CH40=2400, Kalibriert=0, Position=-30", FirmwareState(0, 2400, False, -30)),
+    ("Binärprotokoll aktiv: 115200 Baud", ProtocolSwitched(115200)),
+    ("Ungültige Baudrate (9600-1000000)", InvalidBaudrate()),
+    ("  Aktuelle Position: 5\r", PositionReport(5)),
+    # Help texts and garbage carry no state
+    ("Steps per revolution: 4096", None),
+    ("Calibration Example: CAL1000,2500 SETPOS1000", None),
+    ("Aktuelle Position: abc", None),
+    ("", None),
+]
+
+
+def test_firmware_messages():
+    """Every firmware message is mapped to its typed event"""
+    for line, expected in CASES:
+        event = parse_response(line)
+        assert event == expected, f"{line!r}: {event!r} != {expected!r}"
+    print(f"✓ {len(CASES)} firmware lines parsed")
+
+
+def test_position_set_is_not_position_report():
+    """The SETPOS reply is not confused with a position report"""
+    assert type(parse_response("Position gesetzt auf: 5")) is PositionSet
+    assert type(parse_response("Aktuelle Position: 5")) is PositionReport
+    print("✓ SETPOS reply and position report are distinct")
+
+
+if __name__ == "__main__":
+    test_firmware_messages()
+    test_position_set_is_not_position_report()
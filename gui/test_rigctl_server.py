@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script for the rigctld server and the CB band plan
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from cb_band import CHANNEL_FREQUENCIES, channel_for_frequency, channel_frequency
+from configuration import Configuration
+from controller_core import AntennaControllerCore
+from firmware_simulator import PtyFirmwareSimulator
+from response_parser import PositionSet
+from rigctl_server import RigctlServer
+
+
+def test_band_plan():
+    """80 channels, CB frequency order, nearest channel wins"""
+    assert len(set(CHANNEL_FREQUENCIES.values())) == 80
+    assert channel_frequency(41) == 26565000
+    assert channel_frequency(80) == 26955000
+    assert channel_frequency(1) == 26965000
+    assert channel_frequency(40) == 27405000
+    assert channel_for_frequency(27185000) == 19
+    assert channel_for_frequency(27186500) == 19
+    assert channel_for_frequency(27255000) == 23  # 23/24/25 are out of order
+    assert channel_for_frequency(27240000) == 24
+    assert channel_for_frequency(26560000) == 41
+    assert channel_for_frequency(26550000) is None
+    assert channel_for_frequency(27415000) is None
+    print("✓ Band plan maps frequencies to channels")
+
+
+def test_protocol_and_merged_requests():
+    """Clients tune by frequency; a burst of set_freq ends in one more move"""
+    async def request(server, line):
+        reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+        writer.write(line.encode() + b"\nq\n")
+        reply = await reader.read()
+        writer.close()
+        return reply.decode()
+
+    async def scenario(sim, tmp):
+        config = Configuration(os.path.join(tmp, "antenna_config.json"))
+        config.set("channel_40_position", 2370)
+        core = AntennaControllerCore(config)
+        synced = asyncio.Event()
+        core.subscribe(lambda event: isinstance(event, PositionSet) and synced.set())
+        server = await RigctlServer(core, port=0).start()
+        try:
+            assert await request(server, "F 27185000") == "RPRT -6\n"  # not connected
+            await core.connect(sim.port)
+            await asyncio.wait_for(synced.wait(), 5)
+
+            assert await request(server, "F 27186000") == "RPRT 0\n"
+            assert await request(server, "f") == "27186000\n"
+            assert await request(server, "\\set_freq 28500000") == "RPRT -1\n"
+            assert await request(server, "+\\get_freq") == "get_freq:\nFrequency: 27186000\nRPRT 0\n"
+            assert await request(server, "m") == "AM\n0\n"
+            assert await request(server, "X") == "RPRT -4\n"
+            await server.tuned()
+            assert core.motion.moves_sent == 1
+
+            # Many clients turn the VFO at once
+            targets = [26565000 + 10000 * i for i in range(40)]
+            replies = await asyncio.gather(*(request(server, f"F {f}") for f in targets))
+            assert set(replies) == {"RPRT 0\n"}
+            assert await request(server, "F 27405000") == "RPRT 0\n"
+            await server.tuned()
+            assert server.set_requests == 2 + len(targets)
+            assert core.motion.moves_sent <= 3, core.motion.moves_sent
+            print(f"  {server.set_requests} set requests, {core.motion.moves_sent} moves")
+            assert core.motion.merged >= len(targets) - 1
+            assert await request(server, "f") == "27405000\n"
+            assert await core.query_position() == 2370
+        finally:
+            server.close()
+            core.close()
+
+    with tempfile.TemporaryDirectory() as tmp, PtyFirmwareSimulator(time_scale=20) as sim:
+        asyncio.run(scenario(sim, tmp))
+    print("✓ rigctld protocol with merged set requests")
+
+
+if __name__ == "__main__":
+    test_band_plan()
+    test_protocol_and_merged_requests()
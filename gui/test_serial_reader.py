@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Test script for the incremental serial line decoder
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from serial_reader import IncrementalLineDecoder
+
+
+def test_partial_lines():
+    """Lines split across reads are reassembled"""
+    decoder = IncrementalLineDecoder()
+    assert decoder.feed(b"Aktuelle Posi") == []
+    assert decoder.feed(b"tion: 480\r\nMotor ") == ["Aktuelle Position: 480"]
+    assert decoder.pending == "Motor "
+    assert decoder.feed(b"fertig\n\n") == ["Motor fertig", ""]
+    print("✓ Partial lines reassembled")
+
+
+def test_split_umlaut():
+    """A multi-byte umlaut split between two reads is decoded correctly"""
+    decoder = IncrementalLineDecoder()
+    raw = "Fahre 10 Schritte rückwärts\n".encode("utf-8")
+    split = raw.index("ü".encode("utf-8")) + 1
+    assert decoder.feed(raw[:split]) == []
+    assert decoder.feed(raw[split:]) == ["Fahre 10 Schritte rückwärts"]
+    print("✓ Split umlaut decoded")
+
+
+def test_invalid_utf8():
+    """Invalid bytes are replaced instead of raising"""
+    decoder = IncrementalLineDecoder()
+    lines = decoder.feed(b"Motor Status: Besch\xe4ftigt\n")
+    assert lines == ["Motor Status: Besch�ftigt"]
+    print("✓ Invalid UTF-8 replaced")
+
+
+if __name__ == "__main__":
+    test_partial_lines()
+    test_split_umlaut()
+    test_invalid_utf8()
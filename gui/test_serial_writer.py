@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test script for the writer thread and the STOP priority lane
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from command_tracker import MotionCancelled, is_move
+from configuration import Configuration
+from controller_core import AntennaControllerCore
+from firmware_simulator import PtyFirmwareSimulator
+from response_parser import MotionStopped
+from serial_writer import SerialWriter
+
+
+class StalledPort:
+    """Port whose first write blocks until ``release`` is set"""
+
+    baudrate = 9600
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.written = []
+
+    def write(self, data):
+        if not self.written:
+            self.release.wait(2)
+        self.written.append(data.decode().strip())
+
+
+class BrokenPort:
+    baudrate = 9600
+
+    def write(self, data):
+        raise OSError(5, "Input/output error")
+
+
+def test_priority_lane_and_drop():
+    port = StalledPort()
+    writer = SerialWriter(port, print, maxsize=4).start()
+    writer.put("CH40", b"CH40")
+    time.sleep(0.05)  # CH40 is being written, the rest waits
+    for command in ("F100", "RPM12", "B50", "CH3"):
+        assert writer.put(command, command.encode())
+    assert not writer.put("Q", b"Q")  # normal lane full
+    assert writer.put("S", b"S", priority=True) and writer.put("P", b"P", priority=True)
+    assert writer.drop(is_move) == ["F100", "B50", "CH3"]
+
+    port.release.set()
+    deadline = time.monotonic() + 2
+    while len(port.written) < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert port.written == ["CH40", "S", "P", "RPM12"]
+    assert (writer.dropped, writer.refused) == (3, 1)
+    writer.stop()
+    print("✓ STOP and P overtake queued commands, stale moves are dropped")
+
+
+def test_write_error_is_reported():
+    errors = []
+    writer = SerialWriter(BrokenPort(), errors.append).start()
+    writer.put("P", b"P\n")
+    deadline = time.monotonic() + 2
+    while not errors and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(errors) == 1 and isinstance(errors[0], OSError)
+    assert not writer.put("P", b"P\n")
+    print("✓ Write error stops the writer and is reported")
+
+
+def test_stop_under_load():
+    """Moves queued behind a running move are dropped; STOP is answered at once"""
+    async def scenario(sim, tmp):
+        config = Configuration(os.path.join(tmp, "antenna_config.json"))
+        config.set("channel_41_position", 0)
+        config.set("channel_40_position", 2370)
+        core = AntennaControllerCore(config)
+        core.POSITION_QUERY_DELAY_MS = 10
+        assert await core.connect(sim.port)
+        await core.synced()
+
+        first = core.move_steps(2000)
+        await asyncio.sleep(0.05)  # running
+        queued = [core.move_steps(10) for _ in range(20)]
+        stopped = asyncio.get_running_loop().create_future()
+        core.subscribe(lambda e: isinstance(e, MotionStopped) and not stopped.done() and stopped.set_result(None))
+
+        core.stop_movement()
+        await asyncio.wait_for(stopped, 1)
+        for move in [first] + queued:
+            try:
+                await move
+            except MotionCancelled:
+                pass
+        dropped = sum(isinstance(move.exception(), MotionCancelled) for move in queued)
+        assert dropped >= 15, dropped  # most never left the writer
+        await core.idle()
+        assert await core.query_position() == sim.firmware.current_position
+        assert not sim.firmware.move_queue and not sim.firmware.motor_is_busy
+        core.close()
+        return dropped
+
+    with tempfile.TemporaryDirectory() as tmp, PtyFirmwareSimulator(time_scale=5) as sim:
+        dropped = asyncio.run(scenario(sim, tmp))
+    print(f"✓ STOP under load: {dropped} of 20 queued moves dropped before they were written")
+
+
+if __name__ == "__main__":
+    test_priority_lane_and_drop()
+    test_write_error_is_reported()
+    test_stop_under_load()
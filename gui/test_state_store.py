@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script for the observable GUI state store
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from controller_core import CalibrationChanged
+from state_store import StateStore
+
+
+def recording_store():
+    store = StateStore(channel=41, position=0, moving=False, synced=True)
+    calls = {"all": [], "moving": []}
+    store.subscribe(calls["all"].append)
+    store.subscribe(calls["moving"].append, ("moving",))
+    return store, calls
+
+
+def test_only_changed_fields_are_notified():
+    store, calls = recording_store()
+    store.set(channel=41, moving=False)  # nothing differs
+    assert calls == {"all": [], "moving": []} and store.transactions == 0
+
+    store.set(channel=2, position=30, moving=False)
+    assert calls["all"] == [{"channel": 2, "position": 30}] and calls["moving"] == []
+    assert store["channel"] == 2 and store.get("position") == 30
+
+    store.set(moving=True)
+    assert calls["moving"] == [{"moving": True}]
+    assert store.notifications == {"channel": 1, "position": 1, "moving": 2}
+    assert store.callbacks == 3
+    print("✓ Subscribers get only the fields that differ")
+
+
+def test_transaction_batches_changes():
+    store, calls = recording_store()
+    with store.transaction():
+        store.set(moving=True, position=10)
+        with store.transaction():  # nested: committed with the outer one
+            store.set(position=20, channel=3)
+        assert calls["all"] == [] and store["position"] == 0
+        store.set(moving=False)  # back to the committed value
+    assert calls["all"] == [{"position": 20, "channel": 3}] and calls["moving"] == []
+    assert store.transactions == 1
+    print("✓ A transaction notifies once; A -> B -> A is no change")
+
+
+def test_failed_transaction_is_discarded():
+    store, calls = recording_store()
+    try:
+        with store.transaction():
+            store.set(channel=80)
+            raise RuntimeError("handler failed")
+    except RuntimeError:
+        pass
+    assert store["channel"] == 41 and calls["all"] == []
+    store.set(synced=False)
+    assert calls["all"] == [{"synced": False}]
+
+    for bad in (lambda: store.set(rpm=12), lambda: store.subscribe(print, ("rpm",))):
+        try:
+            bad()
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("unknown field accepted")
+    print("✓ Failed transactions and unknown fields change nothing")
+
+
+def test_calibration_events_compare_by_value():
+    store, calls = recording_store()
+    calibration = CalibrationChanged(0, 2370, 30.0, True, "Kalibrierung OK")
+    store.set(calibration=calibration)
+    store.set(calibration=CalibrationChanged(0, 2370, 30.0, True, "Kalibrierung OK"))
+    unsubscribe = store.subscribe(calls["moving"].append, ("calibration",))
+    unsubscribe()
+    store.set(calibration=CalibrationChanged(0, 2400, 30.38, True, "Kalibrierung OK"))
+    assert [list(changes) for changes in calls["all"]] == [["calibration"], ["calibration"]]
+    assert calls["moving"] == []
+    print("✓ Repeated calibration snapshots are not redrawn")
+
+
+if __name__ == "__main__":
+    test_only_changed_fields_are_notified()
+    test_transaction_batches_changes()
+    test_failed_transaction_is_discarded()
+    test_calibration_events_compare_by_value()
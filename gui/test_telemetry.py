@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Test script for the telemetry recorder
+"""
+
+import asyncio
+import glob
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from configuration import Configuration
+from controller_core import AntennaControllerCore, CommandSent, StateChanged
+from firmware_simulator import PtyFirmwareSimulator
+from response_parser import MotionStarted, PositionReport
+import telemetry
+from telemetry import (
+    TelemetryRecorder, iter_records, read_chunks, COMMAND, REPLY, POSITION, CHANNEL, CHUNK_RECORDS
+)
+
+
+class StepClock:
+    """Wall clock advancing 0.25 s per call"""
+
+    def __init__(self, start=1_700_000_000.0):
+        self.now = start
+
+    def __call__(self):
+        self.now += 0.25
+        return self.now
+
+
+def test_roundtrip_across_chunks():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "session.mlt")
+        positions = [(i * 37) % 4076 for i in range(CHUNK_RECORDS + 500)] + [100000, 3]
+        with TelemetryRecorder(path, clock=StepClock()) as recorder:
+            recorder.on_event(CommandSent("CAL0,2370"))
+            recorder.on_event(MotionStarted(30, False, 40))
+            for position in positions:
+                recorder.on_event(StateChanged(channel=7, position=position, moving=False, synced=True))
+            recorder.on_event(PositionReport(3))
+
+        records = list(iter_records(path))
+        assert len(records) == recorder.records == len(positions) + 4
+        assert (records[0].name, records[0].value) == ("CAL", 0)
+        assert (records[1].kind, records[1].name, records[1].value) == (REPLY, "MotionStarted", -30)
+        recorded = [r.position for r in records if r.kind == POSITION]
+        assert recorded == positions  # deltas, a chunk boundary and an absolute jump
+        assert [r.value for r in records if r.kind == CHANNEL] == [7]
+        assert records[-1].name == "PositionReport" and records[-1].position == 3
+        assert abs(records[-1].time - records[0].time - 0.25 * (len(records) - 1)) < 1e-3
+        chunks = list(read_chunks(path))
+        assert len(chunks) == 2
+        assert os.path.getsize(path) == telemetry.FILE_HEADER.size + 2 * telemetry.CHUNK_SIZE
+    print(f"✓ {len(records)} records in 2 chunks decoded with absolute positions")
+
+
+def test_stop_reading_early():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "session.mlt")
+        with TelemetryRecorder(path, clock=StepClock()) as recorder:
+            for position in range(CHUNK_RECORDS + 10):
+                recorder.on_event(StateChanged(channel=7, position=position, moving=False, synced=True))
+
+        chunks = read_chunks(path)
+        next(chunks)
+        chunks.close()  # unmaps the file with the chunk handed out
+        for record in iter_records(path):
+            break
+        assert record.kind == POSITION and record.position == 0
+        first = next(iter_records(path))  # generator dropped unfinished
+        assert first == record
+    print("✓ Reading stopped early releases the mapped file")
+
+
+def test_core_records_commands_replies_and_state():
+    async def scenario(sim, tmp):
+        config = Configuration(os.path.join(tmp, "antenna_config.json"))
+        config.set("channel_41_position", 0)
+        config.set("channel_40_position", 2370)
+        config.set("telemetry_dir", os.path.join(tmp, "telemetry"))
+        core = AntennaControllerCore(config)
+        assert await core.connect(sim.port)
+        await core.synced()
+        assert await core.move_to_channel(40) == 2370
+        await asyncio.sleep(0.05)  # confirmation
+        core.close()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with PtyFirmwareSimulator(time_scale=20) as sim:
+            asyncio.run(scenario(sim, tmp))
+        [path] = glob.glob(os.path.join(tmp, "telemetry", "telemetry-*.mlt"))
+        records = list(iter_records(path))
+        size = os.path.getsize(path)
+    names = [r.name for r in records]
+    move = names.index("CH")
+    assert records[move].kind == COMMAND and records[move].value == 40
+    started = names.index("MotionStarted", move)
+    assert records[started].value == 2370
+    assert any(r.kind == POSITION and r.position == 2370 for r in records[started:])
+    assert any(r.kind == CHANNEL and r.value == 40 for r in records[move:started])
+    assert "MotionFinished" in names[started:] and "P" in names[move:]
+    print(f"✓ Session recorded: {len(records)} records, "
+          f"{size} bytes")
+
+
+if __name__ == "__main__":
+    test_roundtrip_across_chunks()
+    test_stop_reading_early()
+    test_core_records_commands_replies_and_state()
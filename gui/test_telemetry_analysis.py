@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test script for the telemetry analysis
+"""
+
+import csv
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from controller_core import CommandSent, StateChanged
+from response_parser import (
+    ControllerReady, RpmReport, PositionReport, MotionStarted, MotionFinished, MotionStopped
+)
+from telemetry import TelemetryRecorder, iter_records, CHUNK_RECORDS
+from telemetry_analysis import load, summarize, summarize_all, report, write_csv
+
+
+class ManualClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def record_session(path):
+    """A session with one drift of 5 steps, two complete moves at 12 RPM and a stopped one"""
+    clock = ManualClock()
+    timeline = [
+        (0.0, ControllerReady()), (0.1, RpmReport(12)), (0.1, PositionReport(0)),
+        (1.0, CommandSent("CH40")), (0.0, StateChanged(40, 0, False, True)),
+        (0.02, MotionStarted(2370, True, 40)), (2.9, MotionFinished()), (0.01, PositionReport(2370)),
+        (5.0, CommandSent("F10")), (0.02, MotionStarted(10, True)), (0.012, MotionFinished()),
+        (0.01, PositionReport(2385)),  # 5 steps off
+        (5.0, CommandSent("F5")), (0.0, CommandSent("B5")),
+        (1.0, RpmReport(24)), (0.1, CommandSent("CH41")), (0.0, StateChanged(41, 2385, False, True)),
+        (0.02, MotionStarted(2385, False, 41)), (0.5, MotionStopped()), (0.01, PositionReport(1200)),
+        (1.0, PositionReport(1200)),
+    ]
+    with TelemetryRecorder(path, clock=clock) as recorder:
+        for wait, event in timeline:
+            clock.now += wait
+            recorder.on_event(event)
+
+
+def test_load_matches_iter_records():
+    rng = random.Random(3)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "walk.mlt")
+        clock = ManualClock()
+        position = 0
+        with TelemetryRecorder(path, clock=clock) as recorder:
+            for index in range(2 * CHUNK_RECORDS + 100):
+                clock.now += rng.random()
+                if index % 1000 == 999:
+                    position += 50000  # absolute record
+                else:
+                    position += rng.randint(-300, 300)
+                recorder.on_event(StateChanged(index % 80 + 1, position, False, True))
+        expected = list(iter_records(path))
+        records = load(path)
+    assert len(records.time) == len(expected) == recorder.records
+    assert [r.position for r in expected] == records.position.tolist()
+    assert [round(r.time * 1000) for r in expected] == records.time.tolist()
+    assert [r.value for r in expected] == records.value.tolist()
+    print(f"✓ {len(expected)} records decoded with NumPy as with iter_records")
+
+
+def test_summary_of_a_session():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "session.mlt")
+        record_session(path)
+        summary = summarize(path)
+    assert summary.reports == 3  # the report after the stop is not checked
+    assert summary.drift.tolist() == [0, 5, 0]
+    assert summary.move_rpm.tolist() == [12, 12] and summary.move_steps.tolist() == [2370, 10]
+    assert all(abs(ms - expected) <= 1 for ms, expected in zip(summary.move_ms, (2900, 12)))
+    assert summary.arrivals[40] == 1 and summary.arrivals[41] == 1
+    assert summary.corrections[40] == 3 and summary.corrections.sum() == 3
+    print("✓ Drift, moves per RPM and corrections per channel of one session")
+
+
+def test_report_over_files_in_a_pool():
+    with tempfile.TemporaryDirectory() as tmp:
+        files = [os.path.join(tmp, f"session-{n}.mlt") for n in range(3)]
+        for path in files:
+            record_session(path)
+        serial = report(summarize_all(files, workers=1))
+        pooled = report(summarize_all(files, workers=2))
+        assert serial == pooled
+        write_csv(pooled, os.path.join(tmp, "csv"))
+        with open(os.path.join(tmp, "csv", "channels.csv"), encoding="utf-8") as f:
+            channels = list(csv.DictReader(f))
+        tolerant = report(summarize_all(files, workers=1), tolerance=5)
+    assert serial["drift"]["reports"] == 9 and serial["drift"]["drifts"] == 3
+    assert serial["drift"]["max_steps"] == 5 and tolerant["drift"]["drifts"] == 0
+    [moves] = serial["moves"]
+    assert (moves["rpm"], moves["moves"], moves["steps"]) == (12, 6, 3 * 2380)
+    assert channels[0] == {"channel": "40", "corrections": "9", "arrivals": "3"}
+    assert len(channels) == 80
+    print("✓ Report over 3 recordings (process pool == serial), CSV written")
+
+
+if __name__ == "__main__":
+    test_load_matches_iter_records()
+    test_summary_of_a_session()
+    test_report_over_files_in_a_pool()
@@ -17,6 +17,20 @@
  * S         - Stop current movement
  * P         - Get current position
  * RPM<value> - Set RPM to <value>
+ * BIN<baud> - Switch to the framed binary protocol at <baud>
+ * STATE     - Report calibration and position (warm reconnect)
+ * CAL<ch41_pos>,<ch40_pos> - Two-point calibration (channels in between linear)
+ * CALT<start>:<hex> - Calibration table segment: position of frequency
+ *             position <start> (3 hex digits), then the steps to each
+ *             following position (2 hex digits each); segments in order
+ *             from 0, the table is used once position 79 arrived
+ *
+ * Framed protocol (after BIN, until the next reset):
+ * 0xA5 | length | seq | type | payload[length] | crc8
+ * crc8 (polynomial 0x07) covers length, seq, type and payload.
+ * Commands arrive as FRAME_COMMAND with the text command as payload,
+ * replies are fixed-width frames (little-endian int32 positions),
+ * a corrupted command frame is answered with FRAME_NAK.
  * 
  * Examples:
  * F1        - Move 1 step forward
@@ -46,6 +60,43 @@ long channel41Position = 0; // Base position for channel 41 (lowest frequency)
 long channel40Position = 2400; // Position for channel 40 (highest frequency)
 bool calibrationReceived = false; // Flag to indicate if calibration was received
 
+// Calibration table (CALT): positions by frequency position
+uint16_t channelTable[80];
+uint16_t pendingTable[80]; // Table being received
+byte tableFilled = 0;      // Positions of pendingTable received
+bool useTable = false;     // Channel positions from channelTable instead of CAL
+
+// Framed binary protocol (see gui/framed_protocol.py)
+const byte FRAME_START = 0xA5;
+const byte MAX_FRAME_PAYLOAD = 48;
+const byte FRAME_COMMAND = 0x43;
+const byte FRAME_POSITION = 0x01;
+const byte FRAME_POSITION_SET = 0x02;
+const byte FRAME_CHANNEL = 0x03;
+const byte FRAME_MOTION_STARTED = 0x10;
+const byte FRAME_MOTION_FINISHED = 0x11;
+const byte FRAME_MOTION_STOPPED = 0x12;
+const byte FRAME_ALREADY_ON_CHANNEL = 0x13;
+const byte FRAME_COMMAND_QUEUED = 0x14;
+const byte FRAME_QUEUED_COMMAND_STARTED = 0x15;
+const byte FRAME_QUEUE_STATUS = 0x16;
+const byte FRAME_STATE = 0x17;
+const byte FRAME_CALIBRATION = 0x20;
+const byte FRAME_CALIBRATION_REJECTED = 0x21;
+const byte FRAME_RPM = 0x22;
+const byte FRAME_INVALID_RPM = 0x23;
+const byte FRAME_INVALID_CHANNEL = 0x24;
+const byte FRAME_UNKNOWN_COMMAND = 0x25;
+const byte FRAME_FALLBACK_WARNING = 0x26;
+const byte FRAME_CALIBRATION_TABLE = 0x27;
+const byte FRAME_TEXT = 0x30;
+const byte FRAME_NAK = 0x7F;
+
+bool binaryMode = false;  // Framed protocol active (BIN)
+byte txSequence = 0;      // Sequence number of the next frame sent
+byte rxFrame[MAX_FRAME_PAYLOAD + 5]; // Frame being received
+byte rxLength = 0;        // Bytes of rxFrame received so far
+
 // Channel to position mapping for 80 channels
 // This maps channels 1-80 to their respective positions
 // base is zero, so channel 1 is position 0, channel 80 is position 79
@@ -134,6 +185,24 @@ int calculateChannelFromPosition(long position) {
   if (position < channel41Position) return 41; // Below range
   if (position > channel40Position) return 40; // Above range
   
+  if (useTable) {
+    // Binary search for the last entry <= position, then the nearer neighbour
+    int low = 0;
+    int high = 79;
+    while (low < high) {
+      int middle = (low + high + 1) / 2;
+      if (channelTable[middle] <= position) {
+        low = middle;
+      } else {
+        high = middle - 1;
+      }
+    }
+    if (low < 79 && 2 * position >= (long)channelTable[low] + channelTable[low + 1]) {
+      low++;
+    }
+    return cbChannelToPosition[low];
+  }
+  
   // Calculate frequency position (0-79)
   float stepsPerChannel = (float)(channel40Position - channel41Position) / 79.0;
   int freqPos = (int)((position - channel41Position) / stepsPerChannel + 0.5); // Round to nearest
@@ -144,6 +213,116 @@ int calculateChannelFromPosition(long position) {
   return cbChannelToPosition[freqPos];
 }
 
+// CRC-8, polynomial 0x07, initial value 0
+byte crc8(const byte *data, byte length) {
+  byte crc = 0;
+  for (byte i = 0; i < length; i++) {
+    crc ^= data[i];
+    for (byte bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x80) ? (crc << 1) ^ 0x07 : crc << 1;
+    }
+  }
+  return crc;
+}
+
+// Send one frame: 0xA5 | length | seq | type | payload | crc8
+void sendFrame(byte type, const byte *payload, byte length) {
+  byte header[3] = {length, txSequence++, type};
+  byte crc = crc8(header, 3);
+  for (byte i = 0; i < length; i++) {
+    crc ^= payload[i];
+    for (byte bit = 0; bit < 8; bit++) {
+      crc = (crc & 0x80) ? (crc << 1) ^ 0x07 : crc << 1;
+    }
+  }
+  Serial.write(FRAME_START);
+  Serial.write(header, 3);
+  Serial.write(payload, length);
+  Serial.write(crc);
+}
+
+// Little-endian int32 into a frame payload
+void putLong(byte *payload, long value) {
+  for (byte i = 0; i < 4; i++) {
+    payload[i] = (value >> (8 * i)) & 0xFF;
+  }
+}
+
+// Value of <count> hex digits of text starting at <from>, -1 if not hex
+long hexValue(const String &text, int from, int count) {
+  long value = 0;
+  for (int i = from; i < from + count; i++) {
+    char c = text.charAt(i);
+    int digit = (c >= '0' && c <= '9') ? c - '0' : (c >= 'A' && c <= 'F') ? c - 'A' + 10 : -1;
+    if (digit < 0) return -1;
+    value = value * 16 + digit;
+  }
+  return value;
+}
+
+// CRC-8 of the calibration table as little-endian uint16 (reported by STATE)
+byte tableChecksum() {
+  byte bytes[160];
+  for (byte i = 0; i < 80; i++) {
+    bytes[2 * i] = channelTable[i] & 0xFF;
+    bytes[2 * i + 1] = channelTable[i] >> 8;
+  }
+  return crc8(bytes, 160);
+}
+
+// Frame carrying a text (queued command, unknown command, other messages)
+void sendTextFrame(byte type, const String &text) {
+  byte length = min((unsigned int)text.length(), (unsigned int)MAX_FRAME_PAYLOAD);
+  sendFrame(type, (const byte *)text.c_str(), length);
+}
+
+// Replies in both protocols
+void replyMotionStarted(int channel, long steps) {
+  if (binaryMode) {
+    byte payload[5];
+    putLong(payload, steps);
+    payload[4] = channel;
+    sendFrame(FRAME_MOTION_STARTED, payload, 5);
+    return;
+  }
+  Serial.print("Motor startet - Fahre ");
+  if (channel > 0) {
+    Serial.print("zu Kanal ");
+    Serial.print(channel);
+    Serial.print(" - ");
+  }
+  Serial.print(abs(steps));
+  Serial.println(steps > 0 ? " Schritte vorwärts" : " Schritte rückwärts");
+}
+
+void replyMotionFinished() {
+  if (binaryMode) {
+    byte payload[4];
+    putLong(payload, currentPosition);
+    sendFrame(FRAME_MOTION_FINISHED, payload, 4);
+    return;
+  }
+  Serial.println("Motor fertig - Bewegung abgeschlossen");
+  Serial.print("Aktuelle Position: ");
+  Serial.println(currentPosition);
+}
+
+void replyText(byte type, const String &text) {
+  if (binaryMode) {
+    sendFrame(type, NULL, 0);
+  } else {
+    Serial.println(text);
+  }
+}
+
+void replyCommand(byte type, const String &prefix, const String &command) {
+  if (binaryMode) {
+    sendTextFrame(type, command);
+  } else {
+    Serial.println(prefix + command);
+  }
+}
+
 void setup() {
   // Initialize serial communication
   Serial.begin(9600);
@@ -183,9 +362,7 @@ void loop() {
 
   // Detect when motor finishes moving
   if (previouslyBusy && !motorIsBusy) {
-    Serial.println("Motor fertig - Bewegung abgeschlossen");
-    Serial.print("Aktuelle Position: ");
-    Serial.println(currentPosition);
+    replyMotionFinished();
   }
 
   stepper.run();
@@ -215,9 +392,10 @@ void processCommand(String command) {
   stringComplete = false;
   
   // If motor is busy and this is a movement command, queue it
-  if (motorIsBusy && (command.startsWith("F") || command.startsWith("B") || command.startsWith("CH"))) {
+  if (motorIsBusy && !command.startsWith("BIN") &&
+      (command.startsWith("F") || command.startsWith("B") || command.startsWith("CH"))) {
     moveQueue.push(command);
-    Serial.println("Befehl in Warteschlange eingereiht: " + command);
+    replyCommand(FRAME_COMMAND_QUEUED, "Befehl in Warteschlange eingereiht: ", command);
     return;
   }
   
@@ -227,14 +405,29 @@ void processCommand(String command) {
 
 // Function to execute a command
 void executeCommand(String command) {
-  if (command.startsWith("F")) {
+  if (command.startsWith("BIN")) {
+    // Switch to the framed protocol - BIN<baud>
+    long baud = command.substring(3).toInt();
+    if (binaryMode) {
+      sendTextFrame(FRAME_UNKNOWN_COMMAND, command);
+    } else if (baud >= 9600 && baud <= 1000000) {
+      Serial.print("Binärprotokoll aktiv: ");
+      Serial.print(baud);
+      Serial.println(" Baud");
+      Serial.flush(); // acknowledgement leaves at the old baud rate
+      Serial.begin(baud);
+      binaryMode = true;
+      rxLength = 0;
+    } else {
+      Serial.println("Ungültige Baudrate (9600-1000000)");
+    }
+  }
+  else if (command.startsWith("F")) {
     // Forward movement
     int steps = command.substring(1).toInt();
     if (steps > 0) {
       moveForward(steps);
-      Serial.print("Motor startet - Fahre ");
-      Serial.print(steps);
-      Serial.println(" Schritte vorwärts");
+      replyMotionStarted(0, steps);
     }
   }
   else if (command.startsWith("B")) {
@@ -242,39 +435,82 @@ void executeCommand(String command) {
     int steps = command.substring(1).toInt();
     if (steps > 0) {
       moveBackward(steps);
-      Serial.print("Motor startet - Fahre ");
-      Serial.print(steps);
-      Serial.println(" Schritte rückwärts");
+      replyMotionStarted(0, -steps);
     }
   }
   else if (command == "S") {
     // Stop movement - also clear the queue
     stopMovement();
     clearQueue();
-    Serial.println("Motor angehalten - Warteschlange geleert");
+    replyText(FRAME_MOTION_STOPPED, "Motor angehalten - Warteschlange geleert");
   }
   else if (command == "P") {
     currentChannel = calculateChannelFromPosition(currentPosition);
     // Get position
-    Serial.print("Aktuelle Position: ");
-    Serial.println(currentPosition);
-    Serial.print("Aktueller Kanal: ");
-    Serial.println(currentChannel);
+    if (binaryMode) {
+      byte payload[5];
+      putLong(payload, currentPosition);
+      payload[4] = currentChannel;
+      sendFrame(FRAME_POSITION, payload, 5);
+    } else {
+      Serial.print("Aktuelle Position: ");
+      Serial.println(currentPosition);
+      Serial.print("Aktueller Kanal: ");
+      Serial.println(currentChannel);
+    }
     // Update LED matrix display
     displayChannelOnMatrix(currentChannel);
   }
   else if (command == "Q") {
     // Get queue status
-    Serial.print("Warteschlange: ");
-    Serial.print(moveQueue.size());
-    Serial.println(" Befehle wartend");
-    Serial.print("Motor Status: ");
-    Serial.println(motorIsBusy ? "Beschäftigt" : "Bereit");
+    if (binaryMode) {
+      byte payload[2] = {(byte)min(moveQueue.size(), (size_t)255), motorIsBusy};
+      sendFrame(FRAME_QUEUE_STATUS, payload, 2);
+    } else {
+      Serial.print("Warteschlange: ");
+      Serial.print(moveQueue.size());
+      Serial.println(" Befehle wartend");
+      Serial.print("Motor Status: ");
+      Serial.println(motorIsBusy ? "Beschäftigt" : "Bereit");
+    }
+  }
+  else if (command == "STATE") {
+    // Calibration and position, so a reconnecting controller only sends what differs
+    if (binaryMode) {
+      byte payload[14];
+      putLong(payload, channel41Position);
+      putLong(payload + 4, channel40Position);
+      payload[8] = calibrationReceived;
+      putLong(payload + 9, currentPosition);
+      payload[13] = tableChecksum();
+      sendFrame(FRAME_STATE, payload, useTable ? 14 : 13);
+    } else {
+      Serial.print("Zustand: CH41=");
+      Serial.print(channel41Position);
+      Serial.print(", CH40=");
+      Serial.print(channel40Position);
+      Serial.print(", Kalibriert=");
+      Serial.print(calibrationReceived ? 1 : 0);
+      Serial.print(", Position=");
+      Serial.print(currentPosition);
+      if (useTable) {
+        byte checksum = tableChecksum();
+        Serial.print(", Tabelle=");
+        if (checksum < 0x10) Serial.print("0");
+        Serial.print(checksum, HEX);
+      }
+      Serial.println();
+    }
   }
   else if (command == "D") {
     // Display current channel on LED matrix
-    Serial.print("Zeige Kanal auf Matrix: ");
-    Serial.println(currentChannel);
+    if (binaryMode) {
+      byte payload[1] = {(byte)currentChannel};
+      sendFrame(FRAME_CHANNEL, payload, 1);
+    } else {
+      Serial.print("Zeige Kanal auf Matrix: ");
+      Serial.println(currentChannel);
+    }
     displayChannelOnMatrix(currentChannel);
   }
   else if (command.startsWith("RPM")) {
@@ -282,10 +518,15 @@ void executeCommand(String command) {
     int rpm = command.substring(3).toInt();
     if (rpm > 5 && rpm <= 25) {
       stepper.setRpm(rpm);
-      Serial.print("Drehzahl gesetzt auf: ");
-      Serial.println(rpm);
+      if (binaryMode) {
+        byte payload[1] = {(byte)rpm};
+        sendFrame(FRAME_RPM, payload, 1);
+      } else {
+        Serial.print("Drehzahl gesetzt auf: ");
+        Serial.println(rpm);
+      }
     } else {
-      Serial.println("Ungültige Drehzahl(6-24)");
+      replyText(FRAME_INVALID_RPM, "Ungültige Drehzahl(6-24)");
     }
   }
   else if (command.startsWith("CH")) {
@@ -295,7 +536,14 @@ void executeCommand(String command) {
       // Calculate position for this channel using calibration if available
       long targetPosition;
       
-      if (calibrationReceived) {
+      if (calibrationReceived && useTable) {
+        // Position from the calibration table
+        int freqPos = 0;
+        while (freqPos < 79 && cbChannelToPosition[freqPos] != channel) {
+          freqPos++;
+        }
+        targetPosition = channelTable[freqPos];
+      } else if (calibrationReceived) {
         // Use calibrated calculation
         // Find frequency position of the channel (0-79)
         int freqPos = -1;
@@ -312,13 +560,13 @@ void executeCommand(String command) {
           float stepsPerChannel = (float)(channel40Position - channel41Position) / 79.0;
           targetPosition = channel41Position + (long)(freqPos * stepsPerChannel);
         } else {
-          Serial.println("Fehler: Kanal nicht in Frequenz-Mapping gefunden");
+          replyCommand(FRAME_TEXT, "", "Fehler: Kanal nicht in Frequenz-Mapping gefunden");
           return;
         }
       } else {
         // Use fallback calculation
         targetPosition = cbChannelToPosition[channel - 1] * cbChannelSteps;
-        Serial.println("Warnung: Verwende Fallback-Berechnung - Kalibrierung fehlt");
+        replyText(FRAME_FALLBACK_WARNING, "Warnung: Verwende Fallback-Berechnung - Kalibrierung fehlt");
       }
       
       int stepsToMove = targetPosition - currentPosition;
@@ -330,25 +578,69 @@ void executeCommand(String command) {
       if (stepsToMove != 0) {
         if (stepsToMove > 0) {
           moveForward(abs(stepsToMove));
-          Serial.print("Motor startet - Fahre zu Kanal ");
-          Serial.print(channel);
-          Serial.print(" - ");
-          Serial.print(abs(stepsToMove));
-          Serial.println(" Schritte vorwärts");
         } else {
           moveBackward(abs(stepsToMove));
-          Serial.print("Motor startet - Fahre zu Kanal ");
-          Serial.print(channel);
-          Serial.print(" - ");
-          Serial.print(abs(stepsToMove));
-          Serial.println(" Schritte rückwärts");
         }
+        replyMotionStarted(channel, stepsToMove);
+      } else if (binaryMode) {
+        byte payload[1] = {(byte)channel};
+        sendFrame(FRAME_ALREADY_ON_CHANNEL, payload, 1);
       } else {
         Serial.print("Bereits auf Kanal ");
         Serial.println(channel);
       }
     } else {
-      Serial.println("Ungültiger Kanal (1-80)");
+      replyText(FRAME_INVALID_CHANNEL, "Ungültiger Kanal (1-80)");
+    }
+  }
+  else if (command.startsWith("CALT")) {
+    // Calibration table segment - CALT<start>:<hex>
+    int colonIndex = command.indexOf(':');
+    long start = colonIndex > 4 ? command.substring(4, colonIndex).toInt() : -1;
+    int digits = command.length() - colonIndex - 1;
+    int count = (digits - 1) / 2;
+    bool valid = colonIndex > 4 && digits >= 3 && digits % 2 == 1 &&
+                 start >= 0 && start + count <= 80 && (start == 0 || start == tableFilled);
+    if (valid) {
+      long position = hexValue(command, colonIndex + 1, 3);
+      valid = position >= 0 && position <= 4075 && (start == 0 || position > pendingTable[start - 1]);
+      for (int i = 0; valid && i < count; i++) {
+        if (i > 0) {
+          long steps = hexValue(command, colonIndex + 2 + 2 * i, 2);
+          position += steps;
+          valid = steps > 0 && position <= 4075;
+        }
+        pendingTable[start + i] = position;
+      }
+    }
+    
+    if (!valid) {
+      tableFilled = 0;
+      if (binaryMode) {
+        byte reason[1] = {2};
+        sendFrame(FRAME_CALIBRATION_REJECTED, reason, 1);
+      } else {
+        Serial.println("Ungültige Kalibrierung: Tabelle fehlerhaft oder nicht in Reihenfolge");
+      }
+    } else {
+      tableFilled = start + count;
+      if (tableFilled == 80) {
+        // Complete: switch to the table
+        memcpy(channelTable, pendingTable, sizeof(channelTable));
+        useTable = true;
+        calibrationReceived = true;
+        channel41Position = channelTable[0];
+        channel40Position = channelTable[79];
+        cbChannelSteps = (int)((float)(channel40Position - channel41Position) / 79.0);
+      }
+      if (binaryMode) {
+        byte payload[1] = {tableFilled};
+        sendFrame(FRAME_CALIBRATION_TABLE, payload, 1);
+      } else {
+        Serial.print("Kalibrierungstabelle empfangen: ");
+        Serial.print(tableFilled);
+        Serial.println("/80");
+      }
     }
   }
   else if (command.startsWith("CAL")) {
@@ -365,20 +657,35 @@ void executeCommand(String command) {
         channel41Position = ch41Pos;
         channel40Position = ch40Pos;
         calibrationReceived = true;
+        useTable = false;
+        tableFilled = 0;
         
         // Calculate steps per channel
         float stepsPerChannel = (float)(channel40Position - channel41Position) / 79.0;
         cbChannelSteps = (int)stepsPerChannel; // Update fallback value too
         
-        Serial.print("Kalibrierung empfangen: CH41=");
-        Serial.print(channel41Position);
-        Serial.print(", CH40=");
-        Serial.print(channel40Position);
-        Serial.print(", Schritte/Kanal=");
-        Serial.println(stepsPerChannel);
+        if (binaryMode) {
+          byte payload[8];
+          putLong(payload, channel41Position);
+          putLong(payload + 4, channel40Position);
+          sendFrame(FRAME_CALIBRATION, payload, 8);
+        } else {
+          Serial.print("Kalibrierung empfangen: CH41=");
+          Serial.print(channel41Position);
+          Serial.print(", CH40=");
+          Serial.print(channel40Position);
+          Serial.print(", Schritte/Kanal=");
+          Serial.println(stepsPerChannel);
+        }
+      } else if (binaryMode) {
+        byte reason[1] = {0};
+        sendFrame(FRAME_CALIBRATION_REJECTED, reason, 1);
       } else {
         Serial.println("Ungültige Kalibrierung: CH40 muss > CH41 sein, Bereich 0-4075");
       }
+    } else if (binaryMode) {
+      byte reason[1] = {1};
+      sendFrame(FRAME_CALIBRATION_REJECTED, reason, 1);
     } else {
       Serial.println("Kalibrierung Format: CAL<ch41_pos>,<ch40_pos>");
     }
@@ -387,13 +694,18 @@ void executeCommand(String command) {
     // Set current position - SETPOS<position>
     long newPos = command.substring(6).toInt();
     currentPosition = newPos;
-    Serial.print("Position gesetzt auf: ");
-    Serial.println(currentPosition);
+    if (binaryMode) {
+      byte payload[4];
+      putLong(payload, currentPosition);
+      sendFrame(FRAME_POSITION_SET, payload, 4);
+    } else {
+      Serial.print("Position gesetzt auf: ");
+      Serial.println(currentPosition);
+    }
     updatePosition();
   }
   else {
-    Serial.print("Unbekannter Befehl: ");
-    Serial.println(command);
+    replyCommand(FRAME_UNKNOWN_COMMAND, "Unbekannter Befehl: ", command);
   }
 }
 
@@ -403,7 +715,7 @@ void processQueue() {
   if (!motorIsBusy && !moveQueue.empty()) {
     String nextCommand = moveQueue.front();
     moveQueue.pop();
-    Serial.println("Führe Befehl aus Warteschlange aus: " + nextCommand);
+    replyCommand(FRAME_QUEUED_COMMAND_STARTED, "Führe Befehl aus Warteschlange aus: ", nextCommand);
     executeCommand(nextCommand);
   }
 }
@@ -447,15 +759,45 @@ void updatePosition() {
   }
 }
 
+// Receive one framed command byte; true when a complete command is in inputString
+bool receiveFrameByte(byte inByte) {
+  if (rxLength == 0 && inByte != FRAME_START) {
+    return false; // resynchronize on the start byte
+  }
+  rxFrame[rxLength++] = inByte;
+  if (rxLength == 2 && rxFrame[1] > MAX_FRAME_PAYLOAD) {
+    rxLength = 0;
+    return false;
+  }
+  if (rxLength < 5 || rxLength != rxFrame[1] + 5) {
+    return false;
+  }
+  byte length = rxFrame[1];
+  rxLength = 0;
+  if (crc8(rxFrame + 1, length + 3) != rxFrame[length + 4] || rxFrame[3] != FRAME_COMMAND) {
+    byte seq[1] = {rxFrame[2]};
+    sendFrame(FRAME_NAK, seq, 1);
+    return false;
+  }
+  inputString = "";
+  for (byte i = 0; i < length; i++) {
+    inputString += (char)rxFrame[4 + i];
+  }
+  return true;
+}
+
 // Serial event handler
 void serialEvent() {
-  while (Serial.available()) {
+  // Stop after one complete command; the rest stays in the serial buffer
+  // for the next loop() instead of being appended to this command
+  while (Serial.available() && !stringComplete) {
     char inChar = (char)Serial.read();
-    if (inChar == '\n') {
+    if (binaryMode) {
+      stringComplete = receiveFrameByte((byte)inChar);
+    } else if (inChar == '\n') {
       stringComplete = true;
     } else {
       inputString += inChar;
     }
   }
-
 }
\ No newline at end of file